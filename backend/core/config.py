@@ -24,7 +24,8 @@ class Settings(BaseSettings):
 
     model_config = ConfigDict(
         env_file=".env",
-        env_file_encoding="utf-8"
+        env_file_encoding="utf-8",
+        protected_namespaces=("settings_",),
     )
 
     api_title: str = Field(default="HospiCast API")
@@ -36,7 +37,91 @@ class Settings(BaseSettings):
     # Database configuration
     database_url: str | None = Field(default=None)
     database_type: str = Field(default="sqlite")  # sqlite or postgresql
-    
+
+    # Cache de modelos Prophet carregados em memória
+    model_cache_max_entries: int = Field(default=16)
+    model_cache_max_bytes: int = Field(default=512 * 1024 * 1024)
+    model_cache_revalidate_seconds: float = Field(default=2.0)
+
+    # Cache de resultados de /forecast/predict
+    forecast_cache_max_entries: int = Field(default=256)
+    forecast_cache_ttl_seconds: float = Field(default=300.0)
+
+    # Persistência de modelos: "joblib" (objeto completo) ou "compact" (.hcm)
+    model_storage_format: str = Field(default="joblib")
+    model_compression: str = Field(default="auto")  # auto, zstd, lz4, zlib, none
+    model_compact_history_rows: int = Field(default=60)
+
+    # Fila de treino (jobs executados fora do processo da API)
+    training_executor: str = Field(default="process")  # process ou thread
+    training_max_workers: int = Field(default=1)
+    training_max_pending: int = Field(default=8)
+    training_jobs_dir: str | None = Field(default=None)
+    training_lease_seconds: float = Field(default=60.0)  # sem heartbeat por esse tempo: job órfão
+
+    # Executores limitados das rotas de previsão (interativas x análises em lote)
+    interactive_max_workers: int = Field(default=4)
+    interactive_max_queue: int = Field(default=32)
+    interactive_retry_after_seconds: int = Field(default=2)
+    analytics_max_workers: int = Field(default=2)
+    analytics_max_queue: int = Field(default=4)
+    analytics_retry_after_seconds: int = Field(default=30)
+
+    # Backtesting: processos para as janelas (0 = um por núcleo) e timeout por janela
+    backtest_max_workers: int = Field(default=0)
+    backtest_fold_timeout_seconds: float = Field(default=300.0)
+
+    # Memoização persistente de janelas de backtesting (SQLite)
+    fold_store_enabled: bool = Field(default=True)
+    fold_store_path: str | None = Field(default=None)
+    fold_store_max_age_days: float = Field(default=30.0)
+
+    # Feriados por ano (BrasilAPI), memorizados em processo e em arquivo
+    holidays_api_enabled: bool = Field(default=True)
+    holidays_cache_path: str | None = Field(default=None)
+    holidays_cache_ttl_days: float = Field(default=365.0)
+
+    # Clima: chave do OpenWeatherMap e cache por célula da grade e dia (SQLite)
+    openweather_api_key: str | None = Field(default=None)
+    weather_cache_enabled: bool = Field(default=True)
+    weather_cache_path: str | None = Field(default=None)
+    weather_grid_degrees: float = Field(default=0.1)
+    weather_forecast_ttl_seconds: float = Field(default=3 * 3600)
+    weather_archive_dir: str | None = Field(default=None)  # clima histórico por célula/ano
+
+    # Regressores futuros da previsão: fontes consultadas em paralelo, com timeout por fonte
+    regressor_weather_timeout_seconds: float = Field(default=5.0)
+    regressor_holidays_timeout_seconds: float = Field(default=3.0)
+    regressor_max_workers: int = Field(default=4)
+
+    # Cliente HTTP compartilhado das APIs externas (pool keep-alive, limite por host)
+    http_timeout_seconds: float = Field(default=10.0)
+    http_max_connections: int = Field(default=100)
+    http_max_keepalive_connections: int = Field(default=20)
+    http_keepalive_expiry_seconds: float = Field(default=30.0)
+    http_per_host_limit: int = Field(default=8)
+    http_http2_enabled: bool = Field(default=True)  # requer o pacote opcional h2
+
+    # Circuit breaker por upstream: janela móvel de erros/latência e tempo aberto
+    circuit_breaker_enabled: bool = Field(default=True)
+    circuit_window_seconds: float = Field(default=60.0)
+    circuit_min_calls: int = Field(default=5)
+    circuit_error_rate_threshold: float = Field(default=0.5)
+    circuit_slow_call_seconds: float = Field(default=5.0)
+    circuit_slow_rate_threshold: float = Field(default=0.8)
+    circuit_open_seconds: float = Field(default=30.0)
+
+    # Cache de respostas das APIs externas: auto (Redis se REDIS_URL), memory, disk ou redis
+    response_cache_backend: str = Field(default="auto")
+    response_cache_max_entries: int = Field(default=2048)
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    response_cache_path: str | None = Field(default=None)
+    redis_url: str | None = Field(default=None)
+    response_cache_ttl_seconds: float = Field(default=3600.0)
+    response_cache_source_ttls: str = Field(default="sih=1800,cnes=86400,brasilapi=86400,openweather=600")
+    response_cache_stale_seconds: float = Field(default=1800.0)
+    response_cache_backend_retry_seconds: float = Field(default=30.0)  # backend desligado após erro
+
     def __init__(self, **data):
         # Interceptar API_ALLOWED_ORIGINS da variável de ambiente antes do Pydantic tentar fazer parse JSON
         if "allowed_origins" not in data:
@@ -69,6 +154,13 @@ class Settings(BaseSettings):
             return "sqlite"
         return value.lower()
 
+    @field_validator("model_storage_format", mode="before")
+    @classmethod
+    def _validate_model_storage_format(cls, value: str) -> str:  # type: ignore[override]
+        if str(value).lower() not in ["joblib", "compact"]:
+            return "joblib"
+        return str(value).lower()
+
 
 @lru_cache
 def get_settings() -> Settings:
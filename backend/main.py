@@ -1,7 +1,11 @@
+from contextlib import asynccontextmanager
+
 from core.config import get_settings
 from core.logging import configure_logging
-from fastapi import FastAPI
+from services.executors import ExecutorSaturated
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Verificar/instalar CmdStan se necessário (para Prophet)
@@ -83,7 +87,34 @@ except Exception as e:  # pragma: no cover
 settings = get_settings()
 logger = configure_logging()
 
-app = FastAPI(title=settings.api_title, version=settings.api_version)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Retoma jobs de treino interrompidos e encerra os processos de treino ao sair"""
+    from services.executors import analytics_executor, interactive_executor
+    from services.http_client import http_client
+    from services.training_queue import training_queue
+
+    training_queue.recover()
+    yield
+    training_queue.shutdown(wait=False)
+    interactive_executor.shutdown(wait=False)
+    analytics_executor.shutdown(wait=False)
+    # Fecha as conexões keep-alive das APIs externas
+    await http_client.aclose()
+
+
+app = FastAPI(title=settings.api_title, version=settings.api_version, lifespan=lifespan)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(_request: Request, exc: ExecutorSaturated):
+    """Rejeita rápido quando os executores de previsão/análise estão lotados"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # CORS configurável (React em 3000 durante desenvolvimento por padrão)
 allowed_origins_list = settings.get_allowed_origins_list()
@@ -23,7 +23,7 @@ async def get_city_info(city_id: str) -> Dict:
     """
     Busca informações completas de uma cidade específica
     """
-    city_info = city_service.get_city_info(city_id)
+    city_info = await city_service.aget_city_info(city_id)
     
     if not city_info:
         raise HTTPException(status_code=404, detail="Cidade não encontrada")
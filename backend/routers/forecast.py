@@ -1,9 +1,11 @@
 import io
 import logging
+from dataclasses import asdict
 
 import numpy as np
 import pandas as pd
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 from schemas.forecast import (
     ForecastPoint,
     ForecastResponse,
@@ -15,14 +17,30 @@ from services.backtesting_service import backtesting_service
 from services.baseline_service import baseline_service
 from services.calendar_service import calendar_service
 from services.ensemble_service import ensemble_service
+from services.ets_service import ETS_MODELS, ets_service
+from services.executors import analytics_executor, interactive_executor, offload
+from services.forecast_cache import forecast_cache
+from services.future_regressors import future_regressor_builder
+from services.history_store import history_store
 from services.holidays_service import holidays_service
 from services.hospital_account_service import hospital_account_service
 from services.insights_service import insights_service
 from services.metrics_service import metrics_service
+from services.model_cache import model_cache
+from services.model_registry import model_registry
 from services.prophet_service import (
     generate_forecast,
+    get_model_regressors,
+    get_model_version,
     list_available_models,
-    train_and_persist_model,
+    load_model,
+)
+from services.training_queue import (
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    TrainingJob,
+    TrainingQueueFull,
+    training_queue,
 )
 from services.weather_service import weather_service
 
@@ -30,192 +48,33 @@ router = APIRouter(prefix="/forecast", tags=["forecast"])
 logger = logging.getLogger("hospicast")
 
 
-def _ensure_dataframe_size(df: pd.DataFrame, horizon: int) -> pd.DataFrame:
-    """Garante que o DataFrame tenha exatamente o tamanho do horizonte."""
-    if len(df) >= horizon:
-        return df.head(horizon)
-    
-    # Se não tiver dados suficientes, duplicar o último
-    last_row = df.iloc[-1].copy()
-    while len(df) < horizon:
-        df = pd.concat([df, last_row.to_frame().T], ignore_index=True)
-    return df.head(horizon)
-
-
-def _fill_default_weather_values(df: pd.DataFrame) -> pd.DataFrame:
-    """Preenche valores padrão para variáveis climáticas."""
-    df["tmax"] = df.get("tmax", 25.0)
-    df["tmin"] = df.get("tmin", 15.0)
-    df["precip"] = df.get("precip", 0.0)
-    df["temp_avg"] = df.get("temp_avg", 20.0)
-    df["temp_range"] = df.get("temp_range", 10.0)
-    df["thermal_comfort"] = df.get("thermal_comfort", 1)
-    df["respiratory_risk"] = df.get("respiratory_risk", 0)
-    df["dehydration_risk"] = df.get("dehydration_risk", 0)
-    df["accident_risk"] = df.get("accident_risk", 0)
-    df["month"] = df.get("month", 1)
-    df["is_winter"] = df.get("is_winter", 0)
-    df["is_summer"] = df.get("is_summer", 0)
-    return df.fillna({
-        "tmax": 25.0,
-        "tmin": 15.0,
-        "precip": 0.0,
-        "temp_avg": 20.0,
-        "temp_range": 10.0,
-        "thermal_comfort": 1,
-        "respiratory_risk": 0,
-        "dehydration_risk": 0,
-        "accident_risk": 0,
-        "month": 1,
-        "is_winter": 0,
-        "is_summer": 0,
-    })
-
-
-def _fill_default_holiday_values(df: pd.DataFrame) -> pd.DataFrame:
-    """Preenche valores padrão para variáveis de feriados."""
-    df["is_holiday"] = df.get("is_holiday", 0)
-    df["is_extraordinary_event"] = df.get("is_extraordinary_event", 0)
-    df["event_impact_factor"] = df.get("event_impact_factor", 1.0)
-    df["is_holiday_weekend"] = df.get("is_holiday_weekend", 0)
-    df["is_holiday_monday"] = df.get("is_holiday_monday", 0)
-    return df.fillna({
-        "is_holiday": 0,
-        "is_extraordinary_event": 0,
-        "event_impact_factor": 1.0,
-        "is_holiday_weekend": 0,
-        "is_holiday_monday": 0,
-    })
-
-
-def _fix_nan_values(df: pd.DataFrame) -> pd.DataFrame:
-    """Corrige valores NaN no DataFrame."""
-    nan_columns = df.columns[df.isnull().any()].tolist()
-    if not nan_columns:
-        return df
-    
-    logger.warning("Colunas com NaN: %s", nan_columns)
-    for col in nan_columns:
-        logger.debug("%s: %d valores NaN", col, df[col].isnull().sum())
-        
-        if col in ['is_winter', 'is_summer', 'is_holiday', 'is_extraordinary_event', 
-                   'is_holiday_weekend', 'is_holiday_monday']:
-            df[col] = df[col].fillna(0)
-        elif col in ['thermal_comfort', 'respiratory_risk', 'dehydration_risk', 'accident_risk']:
-            df[col] = df[col].fillna(0)
-        elif col == 'month':
-            df[col] = df[col].fillna(1)
-        elif col == 'event_impact_factor':
-            df[col] = df[col].fillna(1.0)
-        else:
-            df[col] = df[col].fillna(0)
-    
-    return df
-
-
-def _create_default_regressors(start_date: pd.Timestamp, horizon: int) -> pd.DataFrame:
-    """Cria regressores padrão quando não há dados externos."""
-    df = pd.DataFrame({
-        "ds": pd.date_range(start=start_date, periods=horizon, freq="D")
-    })
-    df["tmax"] = 25.0
-    df["tmin"] = 15.0
-    df["precip"] = 0.0
-    df["temp_avg"] = 20.0
-    df["temp_range"] = 10.0
-    df["thermal_comfort"] = 1
-    df["respiratory_risk"] = 0
-    df["dehydration_risk"] = 0
-    df["accident_risk"] = 0
-    df["month"] = 1
-    df["is_winter"] = 0
-    df["is_summer"] = 0
-    df["is_holiday"] = 0
-    return df
-
-
-def _prepare_weather_regressors(
-    latitude: float,
-    longitude: float,
-    start_date: pd.Timestamp,
-    end_date: pd.Timestamp,
-    horizon: int
-) -> tuple[pd.DataFrame | None, list]:
-    """Prepara regressores climáticos."""
-    try:
-        logger.info("Buscando dados climáticos para %d dias", horizon)
-        weather_df, weather_insights = weather_service.get_enhanced_weather_forecast(
-            latitude, longitude, horizon
-        )
-        logger.info("Dados climáticos aprimorados: %d registros", 
-                   len(weather_df) if weather_df is not None else 0)
-        logger.info("Insights climáticos: %d encontrados", len(weather_insights))
-        return weather_df, weather_insights
-    except Exception as e:
-        logger.warning("Erro ao buscar dados climáticos: %s", e)
-        return None, []
+def _on_training_finished(job: TrainingJob) -> None:
+    """O treino roda em outro processo: descartar as cópias em memória deste"""
+    if job.status == JOB_SUCCEEDED:
+        model_cache.invalidate(job.series_id)
+        forecast_cache.invalidate_series(job.series_id)
+
+
+training_queue.add_listener(_on_training_finished)
 
 
-def _prepare_holiday_regressors(
-    start_date: pd.Timestamp,
-    end_date: pd.Timestamp
-) -> tuple[pd.DataFrame | None, list]:
-    """Prepara regressores de feriados."""
+def _submit_training(series_id: str, dataframe: pd.DataFrame, regressors: list[str]) -> dict:
+    """Enfileira o treino e devolve a resposta padrão com o id do job"""
     try:
-        logger.info("Buscando feriados aprimorados para o período")
-        holidays_df, holiday_insights = holidays_service.create_enhanced_holiday_regressor(
-            start_date, end_date
+        job, deduplicated = training_queue.submit(series_id, dataframe, regressors)
+    except TrainingQueueFull as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
         )
-        logger.info("Insights de feriados: %d encontrados", len(holiday_insights))
-        return holidays_df, holiday_insights
-    except Exception as e:
-        logger.warning("Erro ao buscar feriados: %s", e)
-        return None, []
-
-
-def _build_future_regressors(
-    latitude: float,
-    longitude: float,
-    start_date: pd.Timestamp,
-    end_date: pd.Timestamp,
-    horizon: int
-) -> tuple[pd.DataFrame, list, list]:
-    """Constrói DataFrame de regressores futuros com clima e feriados."""
-    # Buscar dados externos
-    weather_df, weather_insights = _prepare_weather_regressors(
-        latitude, longitude, start_date, end_date, horizon
-    )
-    holidays_df, holiday_insights = _prepare_holiday_regressors(start_date, end_date)
-    
-    # Criar DataFrame base
-    future_regs_df = pd.DataFrame({
-        "ds": pd.date_range(start=start_date, periods=horizon, freq="D")
-    })
-    
-    # Adicionar dados climáticos
-    if weather_df is not None and not weather_df.empty:
-        weather_df = _ensure_dataframe_size(weather_df, horizon)
-        future_regs_df = future_regs_df.merge(weather_df, on="ds", how="left")
-        future_regs_df = _fill_default_weather_values(future_regs_df)
-    else:
-        future_regs_df = _fill_default_weather_values(future_regs_df)
-    
-    # Adicionar feriados
-    if holidays_df is not None and not holidays_df.empty:
-        holidays_df = _ensure_dataframe_size(holidays_df, horizon)
-        future_regs_df = future_regs_df.merge(holidays_df, on="ds", how="left")
-        future_regs_df = _fill_default_holiday_values(future_regs_df)
-    else:
-        future_regs_df = _fill_default_holiday_values(future_regs_df)
-    
-    # Garantir tamanho correto e corrigir NaN
-    future_regs_df = future_regs_df.head(horizon)
-    future_regs_df = _fix_nan_values(future_regs_df)
-    
-    logger.debug("Regressores criados: %s", list(future_regs_df.columns))
-    logger.debug("Tamanho do DataFrame: %d linhas, horizonte: %d", len(future_regs_df), horizon)
-    
-    return future_regs_df, weather_insights, holiday_insights
+    return {
+        "status": job.status,
+        "job_id": job.job_id,
+        "series_id": series_id,
+        "deduplicated": deduplicated,
+        "status_url": f"/forecast/jobs/{job.job_id}",
+    }
 
 
 def _convert_numpy_value(value) -> float | int | None:
@@ -324,12 +183,9 @@ def train(request: TrainRequest):
     try:
         records: list[dict] = [item.dict() for item in request.data]
         dataframe = pd.DataFrame.from_records(records)
-        train_and_persist_model(
-            series_id=request.series_id,
-            dataframe=dataframe,
-            regressors=request.regressors or [],
-        )
-        return {"status": "ok", "series_id": request.series_id}
+        return _submit_training(request.series_id, dataframe, request.regressors or [])
+    except HTTPException:
+        raise
     except Exception as exc:  # pragma: no cover - defensive guard
         raise HTTPException(status_code=400, detail=str(exc))
 
@@ -380,9 +236,8 @@ async def train_file(series_id: str = Form(...), file: UploadFile = File(...)):
         if dataframe['y'].isna().any():
             raise HTTPException(status_code=422, detail="Coluna 'y' contém valores não numéricos")
 
-        # Treinar modelo
-        train_and_persist_model(series_id=series_id, dataframe=dataframe, regressors=[])
-        return {"status": "ok", "series_id": series_id, "rows": len(dataframe)}
+        # Enfileirar treino (executado fora do processo da API)
+        return {**_submit_training(series_id, dataframe, []), "rows": len(dataframe)}
     except HTTPException:
         raise
     except (ValueError, pd.errors.EmptyDataError, pd.errors.ParserError) as exc:
@@ -394,23 +249,23 @@ async def train_file(series_id: str = Form(...), file: UploadFile = File(...)):
 
 
 @router.post("/predict-ensemble")
-async def predict_ensemble(request: PredictRequest):
+@offload(interactive_executor)
+def predict_ensemble(request: PredictRequest):
     """Previsão usando ensemble Prophet + Naive Semanal"""
     try:
-        # Buscar dados históricos para Naive Semanal
-
-        from services.prophet_service import _get_model_path
+        from services.prophet_service import resolve_model_path
         
-        model_path = _get_model_path(request.series_id)
+        model_path = resolve_model_path(request.series_id)
         if not model_path.exists():
             raise HTTPException(status_code=404, detail=f"Modelo '{request.series_id}' não encontrado.")
         
-        # Carregar dados históricos (precisamos dos dados originais)
-        # Por enquanto, vamos usar uma abordagem simplificada
-        historical_data = pd.DataFrame({
-            'ds': pd.date_range(start='2024-01-01', end='2024-12-31', freq='D'),
-            'y': np.random.randint(20, 80, 365)  # Dados simulados para demonstração
-        })
+        # Histórico limpo gravado no treino (Naive Semanal usa o índice por dia da semana)
+        historical_data = history_store.load(request.series_id)
+        if historical_data is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Histórico de treino da série '{request.series_id}' não encontrado. Treine o modelo novamente.",
+            )
         
         # Criar ensemble
         ensemble_result = ensemble_service.create_ensemble_forecast(
@@ -440,49 +295,61 @@ async def predict_ensemble(request: PredictRequest):
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.post("/predict", response_model=ForecastResponse)
-async def predict(request: PredictRequest) -> ForecastResponse:
+@offload(interactive_executor)
+def predict(request: PredictRequest) -> ForecastResponse:
     """Gera previsão usando modelo Prophet com regressores externos."""
     try:
-        future_regs_df = None
-        weather_insights = []
-        holiday_insights = []
-        
-        # Habilitar regressores externos se coordenadas fornecidas
-        if request.latitude is not None and request.longitude is not None:
-            from datetime import timedelta
-            start_date = pd.Timestamp.today().normalize().date()
-            end_date = start_date + timedelta(days=request.horizon - 1)
-            
-            try:
-                future_regs_df, weather_insights, holiday_insights = _build_future_regressors(
-                    request.latitude,
-                    request.longitude,
-                    pd.Timestamp(start_date),
-                    pd.Timestamp(end_date),
-                    request.horizon
-                )
-            except Exception as e:
-                logger.warning("Erro ao buscar dados externos: %s", e)
-                future_regs_df = _create_default_regressors(pd.Timestamp(start_date), request.horizon)
+        start_date = pd.Timestamp.today().normalize().date()
+
+        # Buscar só as fontes que o modelo usa (clima/feriados), em paralelo
+        regressors = get_model_regressors(request.series_id)
+        built = future_regressor_builder.build(
+            regressors,
+            pd.Timestamp(start_date),
+            request.horizon,
+            latitude=request.latitude,
+            longitude=request.longitude,
+        )
+        if built.sources:
+            logger.info("Fontes de regressores para %s: %s", request.series_id, built.sources)
+        weather_insights = built.weather_insights
+        holiday_insights = built.holiday_insights
+        # Sem regressores externos o frame só tem ``ds``: calendário é calculado na previsão
+        future_regs_df = built.frame if len(built.frame.columns) > 1 else None
 
         logger.debug("Horizon: %d", request.horizon)
         logger.debug("Future regressors shape: %s", future_regs_df.shape if future_regs_df is not None else 'None')
         if future_regs_df is not None:
             logger.debug("Future regressors columns: %s", list(future_regs_df.columns))
 
-        forecast_df = generate_forecast(
-            series_id=request.series_id,
-            horizon=request.horizon,
-            future_regressors=future_regs_df
+        cache_key = forecast_cache.make_key(
+            request.series_id,
+            get_model_version(request.series_id),
+            request.horizon,
+            forecast_cache.fingerprint_regressors(future_regs_df),
+            start_date,
         )
-        
-        # Gerar insights derivados
-        formatted_insights = _generate_insights(forecast_df, weather_insights, holiday_insights)
+        cached = forecast_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Previsão servida do cache para %s", request.series_id)
+            forecast_df, formatted_insights = cached
+        else:
+            forecast_df = generate_forecast(
+                series_id=request.series_id,
+                horizon=request.horizon,
+                future_regressors=future_regs_df
+            )
+
+            # Gerar insights derivados
+            formatted_insights = _generate_insights(forecast_df, weather_insights, holiday_insights)
+            forecast_cache.set(cache_key, (forecast_df, formatted_insights))
         
         # Converter previsão para pontos
         points = _convert_forecast_to_points(forecast_df)
@@ -522,6 +389,68 @@ def models() -> ModelsResponse:
     return ModelsResponse(models=models_list)
 
 
+@router.get("/models/cache")
+def models_cache_stats():
+    """Estatísticas dos caches de modelos e de resultados de previsão"""
+    return {
+        "status": "ok",
+        "model_cache": model_cache.stats(),
+        "forecast_cache": forecast_cache.stats(),
+    }
+
+
+@router.get("/executors")
+def executors_stats():
+    """Ocupação dos executores de previsão (interativo) e de análises (lote)"""
+    return {
+        "status": "ok",
+        "interactive": interactive_executor.stats(),
+        "analytics": analytics_executor.stats(),
+        "training": training_queue.stats(),
+    }
+
+
+@router.get("/models/{series_id}")
+def model_metadata(series_id: str):
+    """Metadados do modelo registrado (treino, dados, regressores, métricas)"""
+    metadata = model_registry.get(series_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"Modelo '{series_id}' não encontrado.")
+    return {"status": "ok", "model": asdict(metadata)}
+
+
+@router.get("/jobs")
+def list_training_jobs(series_id: str | None = None):
+    """Jobs de treino recentes (opcionalmente filtrados por série)"""
+    return {
+        "status": "ok",
+        "queue": training_queue.stats(),
+        "jobs": [asdict(job) for job in training_queue.list_jobs(series_id)],
+    }
+
+
+@router.get("/jobs/{job_id}")
+def training_job_status(job_id: str):
+    """Estado de um job de treino"""
+    job = training_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    return {"status": "ok", "job": asdict(job)}
+
+
+@router.get("/jobs/{job_id}/result")
+def training_job_result(job_id: str):
+    """Resultado do treino: 202 enquanto o job não terminou"""
+    job = training_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado.")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=422, detail=job.error or "Falha no treino.")
+    if job.status != JOB_SUCCEEDED:
+        return JSONResponse(status_code=202, content={"status": job.status, "job_id": job_id})
+    return {"status": "ok", "job_id": job_id, "series_id": job.series_id, "model": job.result}
+
+
 @router.post("/train-external")
 async def train_with_external(
     series_id: str = Form(...),
@@ -533,7 +462,7 @@ async def train_with_external(
 ):
     """Treina mesclando regressors externos (clima + feriados) ao CSV enviado.
 
-    - Clima diário (Open-Meteo): tmax, tmin, precip
+    - Clima diário (arquivo histórico local; ver scripts/import_weather_archive.py): tmax, tmin, precip
     - Feriados (BrasilAPI): is_holiday
     """
     try:
@@ -552,8 +481,8 @@ async def train_with_external(
         start_date = date.fromisoformat(start)
         end_date = date.fromisoformat(end)
 
-        # Buscar dados climáticos históricos - MELHORADO
-        weather_df = weather_service.get_weather_forecast(latitude, longitude, (end_date - start_date).days + 1)
+        # Buscar dados climáticos históricos do arquivo local (sem rede)
+        weather_df = weather_service.get_historical_weather(latitude, longitude, start_date, end_date)
         
         # Buscar feriados com efeito rebote - MELHORADO
         holidays_df, holiday_insights = holidays_service.create_enhanced_holiday_regressor(
@@ -593,10 +522,8 @@ async def train_with_external(
             "is_monday", "is_friday", "is_school_holiday"  # Calendário
         ]
 
-        train_and_persist_model(series_id=series_id, dataframe=merged, regressors=regressors)
         return {
-            "status": "ok", 
-            "series_id": series_id, 
+            **_submit_training(series_id, merged, regressors),
             "regressors": regressors,
             "improvements": [
                 "Efeito rebote pós-feriado (after_holiday)",
@@ -614,17 +541,20 @@ async def train_with_external(
 
 
 @router.post("/backtest")
-async def backtest_model(
+@offload(analytics_executor)
+def backtest_model(
     series_id: str = Form(...),
     file: UploadFile = File(..., description="CSV com ds,y para backtesting"),
     initial_days: int = Form(365, description="Dias iniciais para treinamento"),
     horizon_days: int = Form(30, description="Horizonte de previsão em dias"),
     period_days: int = Form(30, description="Período entre janelas em dias"),
     use_prophet_cv: bool = Form(False, description="Usar Prophet cross_validation nativo"),
+    warm_start: bool = Form(False, description="Iniciar cada janela a partir do ajuste anterior"),
+    fit_ensemble_weights: bool = Form(True, description="Aprender os pesos do ensemble com as janelas"),
 ):
     """Executa backtesting com validação cruzada"""
     try:
-        raw_bytes = await file.read()
+        raw_bytes = file.file.read()
         text_stream = io.StringIO(decode_file_bytes(raw_bytes))
         try:
             df = pd.read_csv(text_stream)
@@ -644,7 +574,7 @@ async def backtest_model(
         else:
             logger.info("Usando validação cruzada manual")
             results = backtesting_service.rolling_cross_validation(
-                df, initial_days, horizon_days, period_days
+                df, initial_days, horizon_days, period_days, warm_start=warm_start
             )
         
         if not results:
@@ -657,13 +587,24 @@ async def backtest_model(
             'rmse': np.mean([r.rmse for r in results]),
             'mape': np.mean([r.mape for r in results])
         }
+        model_registry.update_backtest_metrics(
+            series_id,
+            {**avg_metrics, "folds": len(results), "horizon_days": horizon_days},
+        )
+        # Empilhamento: pesos Prophet/Naive a partir das previsões fora da amostra
+        ensemble_report = (
+            ensemble_service.fit_and_store_weights(series_id, results, df)
+            if fit_ensemble_weights else None
+        )
         
         return {
             "status": "ok",
             "series_id": series_id,
             "method": "prophet_cv" if use_prophet_cv else "rolling_cv",
             "total_tests": len(results),
+            "fits_saved": backtesting_service.count_cached(results),
             "average_metrics": avg_metrics,
+            "ensemble": ensemble_report,
             "results": [
                 {
                     "test_id": i,
@@ -683,18 +624,23 @@ async def backtest_model(
 
 
 @router.post("/grid-search")
-async def grid_search_parameters(
+@offload(analytics_executor)
+def grid_search_parameters(
     series_id: str = Form(...),
     file: UploadFile = File(..., description="CSV com ds,y para grid search"),
-    optimization_method: str = Form("random", description="Método: grid, random, bayesian"),
+    optimization_method: str = Form("random", description="Método: grid, random, bayesian, halving"),
     n_iterations: int = Form(15, description="Número de iterações para random/bayesian"),
     initial_days: int = Form(365, description="Dias iniciais para treinamento"),
     horizon_days: int = Form(30, description="Horizonte de previsão em dias"),
     period_days: int = Form(30, description="Período entre janelas em dias"),
+    max_fits: int | None = Form(
+        None, description="Orçamento total de ajustes do Stan (substitui n_iterations; padrão 60 no halving; não vale no grid)"
+    ),
+    batch_size: int | None = Form(None, description="Candidatos avaliados em paralelo por lote (bayesian)"),
 ):
     """Executa grid search para otimização de parâmetros"""
     try:
-        raw_bytes = await file.read()
+        raw_bytes = file.file.read()
         text_stream = io.StringIO(decode_file_bytes(raw_bytes))
         try:
             df = pd.read_csv(text_stream)
@@ -705,6 +651,18 @@ async def grid_search_parameters(
         if "ds" not in df.columns or "y" not in df.columns:
             raise HTTPException(status_code=422, detail="CSV deve conter colunas 'ds' e 'y'.")
 
+        if max_fits is not None and optimization_method == "grid":
+            # A grade completa não cabe num orçamento de ajustes: usar random, bayesian ou halving
+            raise HTTPException(
+                status_code=422,
+                detail="max_fits não se aplica ao método grid; use random, bayesian ou halving",
+            )
+
+        n_folds = backtesting_service.count_folds(df, initial_days, horizon_days, period_days)
+        if max_fits is not None and optimization_method in ("random", "bayesian"):
+            # Orçamento em ajustes: cada candidato custa uma validação completa
+            n_iterations = max(1, max_fits // max(1, n_folds))
+
         # Executar otimização baseada no método escolhido
         if optimization_method == "grid":
             results = backtesting_service.grid_search(
@@ -716,12 +674,16 @@ async def grid_search_parameters(
             )
         elif optimization_method == "bayesian":
             results = backtesting_service.bayesian_optimization(
-                df, n_iterations, initial_days, horizon_days, period_days
+                df, n_iterations, initial_days, horizon_days, period_days, batch_size=batch_size
+            )
+        elif optimization_method == "halving":
+            results = backtesting_service.successive_halving_search(
+                df, max_fits or 60, initial_days, horizon_days, period_days
             )
         else:
             raise HTTPException(
                 status_code=422,
-                detail="Método deve ser: grid, random ou bayesian"
+                detail="Método deve ser: grid, random, bayesian ou halving"
             )
         
         if not results:
@@ -732,12 +694,15 @@ async def grid_search_parameters(
         
         # Obter resumo da otimização
         summary = backtesting_service.get_optimization_summary(results)
+        fits_saved = sum(r.details.get("fits_saved", 0) for r in results)
         
         return {
             "status": "ok",
             "series_id": series_id,
             "optimization_method": optimization_method,
             "total_combinations": len(results),
+            "fits_used": best_results[0].details.get("fits_used", len(results) * n_folds - fits_saved),
+            "fits_saved": fits_saved,
             "best_parameters": best_results[0].params,
             "best_metrics": {
                 "smape": best_results[0].smape,
@@ -765,7 +730,8 @@ async def grid_search_parameters(
 
 
 @router.post("/baselines")
-async def evaluate_baselines(
+@offload(analytics_executor)
+def evaluate_baselines(
     series_id: str = Form(...),
     file: UploadFile = File(..., description="CSV com ds,y para avaliação de baselines"),
     horizon: int = Form(14, description="Horizonte de previsão em dias"),
@@ -776,7 +742,7 @@ async def evaluate_baselines(
 ):
     """Avalia baselines de previsão"""
     try:
-        raw_bytes = await file.read()
+        raw_bytes = file.file.read()
         text_stream = io.StringIO(decode_file_bytes(raw_bytes))
         try:
             df = pd.read_csv(text_stream)
@@ -798,7 +764,12 @@ async def evaluate_baselines(
         if use_cross_validation:
             logger.debug("Usando validação cruzada")
             results = baseline_service.compare_all_baselines(
-                df, horizon, use_cross_validation=True
+                df,
+                horizon,
+                use_cross_validation=True,
+                initial_days=initial_days,
+                horizon_days=horizon_days,
+                period_days=period_days,
             )
         else:
             logger.debug("Usando avaliação simples")
@@ -839,8 +810,64 @@ async def evaluate_baselines(
         raise HTTPException(status_code=400, detail=str(exc))
 
 
+@router.post("/ets")
+@offload(interactive_executor)
+def predict_ets(
+    series_id: str = Form(...),
+    file: UploadFile = File(..., description="CSV com ds,y (histórico diário)"),
+    horizon: int = Form(14, ge=1, le=365, description="Horizonte de previsão em dias"),
+    model: str = Form("auto", description="auto, simple, holt, holt_winters_additive ou holt_winters_multiplicative"),
+    season_length: int = Form(7, ge=2, description="Tamanho do ciclo sazonal"),
+):
+    """Previsão rápida por suavização exponencial (alternativa leve ao Prophet)"""
+    try:
+        raw_bytes = file.file.read()
+        text_stream = io.StringIO(decode_file_bytes(raw_bytes))
+        try:
+            df = pd.read_csv(text_stream)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+            text_stream.seek(0)
+            df = pd.read_csv(text_stream, sep=";")
+
+        if "ds" not in df.columns or "y" not in df.columns:
+            raise HTTPException(status_code=422, detail="CSV deve conter colunas 'ds' e 'y'.")
+        if model != "auto" and model not in ETS_MODELS:
+            raise HTTPException(status_code=422, detail=f"Modelo ETS '{model}' não suportado.")
+
+        df["ds"] = pd.to_datetime(df["ds"])
+        df = df.dropna(subset=["y"]).sort_values("ds").reset_index(drop=True)
+
+        fitted = ets_service.fit(df["y"].to_numpy(dtype=float), model=model, season_length=season_length)
+        if fitted is None:
+            raise HTTPException(status_code=400, detail="Histórico curto demais para o modelo escolhido.")
+
+        yhat = fitted.forecast(horizon)
+        lower, upper = fitted.intervals(horizon)
+        dates = pd.date_range(df["ds"].iloc[-1] + pd.Timedelta(days=1), periods=horizon, freq="D")
+        forecast_df = pd.DataFrame({
+            "ds": dates.strftime("%Y-%m-%d"),
+            "yhat": yhat,
+            "yhat_lower": lower,
+            "yhat_upper": upper,
+        })
+
+        return {
+            "status": "ok",
+            "series_id": series_id,
+            "model": fitted.model,
+            "params": fitted.params,
+            "aic": fitted.aic,
+            "forecast": _convert_forecast_to_points(forecast_df),
+        }
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
 @router.post("/compare-predictions")
-async def compare_predictions(
+@offload(interactive_executor)
+def compare_predictions(
     series_id: str = Form(...),
     file: UploadFile = File(..., description="CSV com ds,y (valores reais) para comparar com previsões"),
     start_date: str = Form(None, description="Data inicial (YYYY-MM-DD) - opcional"),
@@ -849,7 +876,7 @@ async def compare_predictions(
     """Compara previsões salvas com valores reais fornecidos"""
     try:
         # Ler arquivo com valores reais
-        raw_bytes = await file.read()
+        raw_bytes = file.file.read()
         if len(raw_bytes) == 0:
             raise HTTPException(status_code=400, detail="Arquivo vazio")
         
@@ -880,17 +907,12 @@ async def compare_predictions(
         if len(actual_df) == 0:
             raise HTTPException(status_code=422, detail="Nenhum dado encontrado no período especificado")
         
-        # Buscar previsões usando a função existente
-        from services.prophet_service import _get_model_path
-        import joblib
-        
-        model_path = _get_model_path(series_id)
-        if not model_path.exists():
+        # Carregar modelo (via cache compartilhado com /predict)
+        try:
+            model = load_model(series_id)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"Modelo '{series_id}' não encontrado. Treine o modelo primeiro.")
         
-        # Carregar modelo
-        model = joblib.load(model_path)
-        
         # Criar DataFrame futuro com as datas dos valores reais
         future = pd.DataFrame({'ds': actual_df['ds']})
         
@@ -975,7 +997,8 @@ async def compare_predictions(
 
 
 @router.post("/metrics")
-async def calculate_metrics(
+@offload(interactive_executor)
+def calculate_metrics(
     series_id: str = Form(...),
     file: UploadFile = File(..., description="CSV com ds,y para cálculo de métricas"),
     actual_column: str = Form("y", description="Nome da coluna com valores reais"),
@@ -984,7 +1007,7 @@ async def calculate_metrics(
 ):
     """Calcula métricas detalhadas (MAPE, RMSE, sMAPE) para avaliação de previsões"""
     try:
-        raw_bytes = await file.read()
+        raw_bytes = file.file.read()
         text_stream = io.StringIO(decode_file_bytes(raw_bytes))
         try:
             df = pd.read_csv(text_stream)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional, Dict
 from services.joinville_sus_service import joinville_sus_service
+import asyncio
 import logging
 
 # Configurar logging
@@ -77,14 +78,14 @@ def get_hospital_info(cnes: str):
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.get("/hospitals/{cnes}/sus-data")
-def get_hospital_sus_data(
+async def get_hospital_sus_data(
     cnes: str,
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)")
 ):
     """Retorna dados SUS de um hospital específico"""
     try:
-        data = joinville_sus_service.get_sus_data(cnes, start_date, end_date)
+        data = await joinville_sus_service.aget_sus_data(cnes, start_date, end_date)
         
         if not data:
             raise HTTPException(status_code=404, detail="Dados SUS não disponíveis para o período")
@@ -231,7 +232,7 @@ def get_joinville_specialties():
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.get("/alerts")
-def get_joinville_alerts(
+async def get_joinville_alerts(
     start_date: str = Query(..., description="Data inicial (YYYY-MM-DD)"),
     end_date: str = Query(..., description="Data final (YYYY-MM-DD)")
 ):
@@ -240,8 +241,13 @@ def get_joinville_alerts(
         hospitals = joinville_sus_service.get_all_hospitals()
         all_alerts = []
         
-        for hospital in hospitals:
-            data = joinville_sus_service.get_sus_data(hospital.cnes, start_date, end_date)
+        # Dados de todos os hospitais buscados em paralelo
+        hospitals_data = await asyncio.gather(*[
+            joinville_sus_service.aget_sus_data(hospital.cnes, start_date, end_date)
+            for hospital in hospitals
+        ])
+        
+        for hospital, data in zip(hospitals, hospitals_data):
             
             for d in data:
                 # Alertas de ocupação
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
 from services.hybrid_hospital_service import hybrid_hospital_service
 from services.real_data_service import real_data_service
 
@@ -80,7 +80,7 @@ def get_enhanced_hospital_kpis(
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.get("/weather/{latitude}/{longitude}")
-def get_weather_data(
+async def get_weather_data(
     latitude: float,
     longitude: float,
     date: str = Query(None, description="Data específica (YYYY-MM-DD)")
@@ -90,7 +90,7 @@ def get_weather_data(
         if not date:
             date = datetime.now().strftime("%Y-%m-%d")
         
-        weather_data = real_data_service.get_weather_data(latitude, longitude, date)
+        weather_data = await real_data_service.aget_weather_data(latitude, longitude, date)
         
         return {
             "status": "ok",
@@ -103,21 +103,10 @@ def get_weather_data(
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.get("/covid/{uf}")
-def get_covid_data(
-    uf: str,
-    background_tasks: BackgroundTasks = None
-):
-    """Busca dados de COVID-19 por UF"""
+async def get_covid_data(uf: str):
+    """Busca dados de COVID-19 por UF (resposta antiga é atualizada em segundo plano pelo cache)"""
     try:
-        covid_data = real_data_service.get_covid_data(uf)
-        
-        # Atualizar cache em background
-        if background_tasks:
-            background_tasks.add_task(
-                real_data_service._make_request,
-                "https://brasilapi.com.br/api/covid19/v1",
-                {"uf": uf}
-            )
+        covid_data = await real_data_service.aget_covid_data(uf)
         
         return {
             "status": "ok",
@@ -129,13 +118,13 @@ def get_covid_data(
         raise HTTPException(status_code=500, detail=str(exc))
 
 @router.get("/holidays/{year}")
-def get_holidays_data(
+async def get_holidays_data(
     year: int,
     uf: str | None = Query(None, description="Filtrar por UF")
 ):
     """Busca dados de feriados por ano"""
     try:
-        holidays = real_data_service.get_holiday_data(uf or "BR", year)
+        holidays = await real_data_service.aget_holiday_data(uf or "BR", year)
         
         return {
             "status": "ok",
@@ -172,9 +161,18 @@ def get_enhanced_regional_summary(
         logger.error(f"Erro ao buscar resumo regional enriquecido: {exc}")
         raise HTTPException(status_code=500, detail=str(exc))
 
+def _upstream_availability(snapshot: dict) -> bool | str:
+    """True só para circuito fechado com tráfego na janela; "unknown" sem chamadas recentes"""
+    if snapshot["state"] in ("open", "half_open"):
+        return False
+    if snapshot["state"] != "closed" or not snapshot.get("calls_in_window"):
+        return "unknown"
+    return True
+
+
 @router.get("/data-sources/status")
-def get_data_sources_status():
-    """Verifica status das APIs de dados externos"""
+async def get_data_sources_status():
+    """Verifica status das APIs de dados externos pelo estado dos circuit breakers"""
     try:
         status = {
             "cnes_api": False,
@@ -184,48 +182,20 @@ def get_data_sources_status():
             "overall_status": "unknown"
         }
         
-        # Testar CNES
-        try:
-            test_data = real_data_service._make_request(
-                "https://cnes.datasus.gov.br/services/estabelecimentos",
-                {"limit": 1}
-            )
-            status["cnes_api"] = test_data is not None
-        except:
-            status["cnes_api"] = False
-        
-        # Testar SIH
-        try:
-            test_data = real_data_service._make_request(
-                "https://sih.datasus.gov.br/services/ocupacao",
-                {"limit": 1}
-            )
-            status["sih_api"] = test_data is not None
-        except:
-            status["sih_api"] = False
-        
-        # Testar BrasilAPI
-        try:
-            test_data = real_data_service._make_request(
-                "https://brasilapi.com.br/api/feriados/v1/2024"
-            )
-            status["brasil_api"] = test_data is not None
-        except:
-            status["brasil_api"] = False
-        
-        # Testar OpenWeatherMap
-        try:
-            test_data = real_data_service._make_request(
-                "https://api.openweathermap.org/data/2.5/weather",
-                {"lat": -26.3044, "lon": -48.8456, "appid": "test"}
-            )
-            status["weather_api"] = True  # API existe, mas precisa de chave válida
-        except:
-            status["weather_api"] = False
+        # Estado dos circuit breakers (alimentados pelas chamadas reais), sem sondar as APIs
+        breakers = real_data_service.upstream_status()
+        for key, upstream in (
+            ("cnes_api", "cnes"), ("sih_api", "sih"),
+            ("brasil_api", "brasilapi"), ("weather_api", "openweather"),
+        ):
+            status[key] = _upstream_availability(breakers[upstream])
         
-        # Determinar status geral (contar apenas valores booleanos)
-        available_apis = sum(1 for k, v in status.items() if k != "overall_status" and v is True)
-        if available_apis >= 3:
+        # Disponível = circuito fechado com chamadas na janela; sem tráfego o estado é desconhecido
+        api_states = [v for k, v in status.items() if k != "overall_status"]
+        available_apis = sum(1 for v in api_states if v is True)
+        if all(v == "unknown" for v in api_states):
+            status["overall_status"] = "unknown"
+        elif available_apis >= 3:
             status["overall_status"] = "excellent"
         elif available_apis >= 2:
             status["overall_status"] = "good"
@@ -237,11 +207,14 @@ def get_data_sources_status():
         return {
             "status": "ok",
             "data_sources": status,
+            "circuit_breakers": breakers,
+            "response_cache": real_data_service.cache.stats(),
             "recommendation": {
                 "excellent": "Todas as APIs estão funcionando. Dados reais disponíveis.",
                 "good": "Maioria das APIs funcionando. Alguns dados podem ser simulados.",
                 "limited": "Poucas APIs funcionando. Principalmente dados simulados.",
-                "offline": "APIs externas indisponíveis. Usando apenas dados simulados."
+                "offline": "APIs externas indisponíveis. Usando apenas dados simulados.",
+                "unknown": "Nenhuma chamada recente às APIs externas. Estado ainda desconhecido."
             }[status["overall_status"]]
         }
         
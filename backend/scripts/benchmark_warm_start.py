@@ -0,0 +1,123 @@
+"""Compara a validação cruzada rolante com ajustes a frio e com warm start.
+
+Uso:
+    python scripts/benchmark_warm_start.py [--csv dados.csv] [--initial-days 365]
+        [--horizon-days 30] [--period-days 30] [--repeats 2]
+
+Sem ``--csv`` usa uma série diária sintética (tendência, sazonalidade semanal
+e anual e ruído). Mostra tempo total, iterações do otimizador do Stan por
+janela e a diferença de sMAPE entre os dois modos.
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from services.backtesting_service import BacktestingService
+
+
+def synthetic_series(days: int = 1100, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    y = (
+        80
+        + 0.03 * t
+        + 10 * np.sin(t * 2 * np.pi / 7)
+        + 6 * np.sin(t * 2 * np.pi / 365.25)
+        + rng.normal(0, 3, days)
+    )
+    return pd.DataFrame({"ds": pd.date_range("2021-01-01", periods=days, freq="D"), "y": y.round(1)})
+
+
+def stan_iterations(model) -> int:
+    """Iterações do L-BFGS lidas da saída do CmdStan (0 se indisponível)"""
+    try:
+        output = Path(model.stan_fit.runset.stdout_files[0]).read_text()
+    except Exception:
+        return 0
+    iterations = re.findall(r"^\s+(\d+)\s+-?\d", output, re.M)
+    return int(iterations[-1]) if iterations else 0
+
+
+class CountingBacktestingService(BacktestingService):
+    """Registra as iterações do Stan de cada ajuste"""
+
+    def __init__(self):
+        super().__init__()
+        self.iterations = []
+
+    def train_prophet_model(self, df, params, init_from=None, **fit_kwargs):
+        model = super().train_prophet_model(df, params, init_from=init_from, **fit_kwargs)
+        self.iterations.append(stan_iterations(model))
+        return model
+
+
+def run(df: pd.DataFrame, warm_start: bool, args) -> dict:
+    service = CountingBacktestingService()
+    start = time.perf_counter()
+    results = service.rolling_cross_validation(
+        df,
+        initial_days=args.initial_days,
+        horizon_days=args.horizon_days,
+        period_days=args.period_days,
+        max_workers=1,
+        warm_start=warm_start,
+    )
+    return {
+        "seconds": time.perf_counter() - start,
+        "smape": [r.smape for r in results],
+        "iterations": service.iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", type=Path, help="CSV com colunas ds,y")
+    parser.add_argument("--initial-days", type=int, default=365)
+    parser.add_argument("--horizon-days", type=int, default=30)
+    parser.add_argument("--period-days", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.ERROR)
+    df = pd.read_csv(args.csv) if args.csv else synthetic_series()
+    print(f"📊 Série com {len(df)} pontos")
+
+    best = {}
+    for _ in range(args.repeats):
+        for warm_start in (False, True):
+            outcome = run(df, warm_start, args)
+            if warm_start not in best or outcome["seconds"] < best[warm_start]["seconds"]:
+                best[warm_start] = outcome
+
+    cold, warm = best[False], best[True]
+    if len(cold["smape"]) != len(warm["smape"]):
+        print("❌ Quantidade de janelas diferente entre os modos")
+        sys.exit(1)
+
+    diff = np.abs(np.array(cold["smape"]) - np.array(warm["smape"]))
+    print(f"\n{'modo':<12}{'tempo (s)':>12}{'iterações':>12}{'sMAPE médio':>14}")
+    for name, outcome in (("a frio", cold), ("warm start", warm)):
+        print(
+            f"{name:<12}{outcome['seconds']:>12.2f}{sum(outcome['iterations']):>12}"
+            f"{np.mean(outcome['smape']):>14.3f}"
+        )
+    print(f"\n⚡ Speedup: {cold['seconds'] / warm['seconds']:.2f}x")
+    if sum(warm["iterations"]):
+        print(f"🔁 Iterações: {sum(cold['iterations']) / sum(warm['iterations']):.2f}x menos")
+    print(f"🎯 Diferença de sMAPE por janela: máx {diff.max():.4f}, média {diff.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
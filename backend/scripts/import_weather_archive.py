@@ -0,0 +1,54 @@
+"""Importa dumps diários de clima para o arquivo histórico local.
+
+Uso:
+    python scripts/import_weather_archive.py dump1.csv [dump2.parquet ...]
+        [--latitude -26.30 --longitude -48.84] [--archive-dir data/weather_archive]
+
+Cada arquivo precisa de data (``ds``/``date``/``time``), ``tmax``, ``tmin`` e
+``precip`` (também aceita os nomes diários do Open-Meteo, como
+``temperature_2m_max``). Dumps com vários pontos trazem ``latitude`` e
+``longitude`` por linha; para dumps de um só ponto, informe as coordenadas
+pela linha de comando. Os dados são particionados por célula da grade e ano;
+reimportar um período substitui os dias já arquivados.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from services.weather_archive import WeatherArchive, weather_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", type=Path, help="Arquivos CSV ou Parquet")
+    parser.add_argument("--latitude", type=float, help="Latitude do ponto (dumps sem coluna latitude)")
+    parser.add_argument("--longitude", type=float, help="Longitude do ponto (dumps sem coluna longitude)")
+    parser.add_argument("--archive-dir", type=Path, help="Diretório do arquivo (padrão: configuração)")
+    args = parser.parse_args()
+
+    archive = (
+        WeatherArchive(args.archive_dir, grid_degrees=weather_archive.grid_degrees)
+        if args.archive_dir else weather_archive
+    )
+    total_rows = 0
+    started = time.perf_counter()
+    for path in args.files:
+        try:
+            summary = archive.import_file(path, args.latitude, args.longitude)
+        except (OSError, ValueError, RuntimeError) as exc:
+            print(f"❌ {path}: {exc}")
+            sys.exit(1)
+        total_rows += summary["rows"]
+        print(f"✅ {path}: {summary['rows']} dias em {summary['partitions']} partições")
+
+    print(f"🗄️  {total_rows} dias importados em {time.perf_counter() - started:.2f}s para {archive.base_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
+import multiprocessing
+import os
+import random
 import pandas as pd
 import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
 from prophet import Prophet
 import warnings
+
+from core.config import get_settings
+from services.calendar_service import calendar_table
+from services.fold_result_store import FoldResultStore, fold_result_store
+from services.hyperparameter_optimizer import TPEOptimizer
+from services.metrics_service import batch_metrics, pad_ragged
+from services.prophet_warm_start import warm_start_init
+
 warnings.filterwarnings('ignore')
 
+# Features de calendário usadas no backtesting (servidas pela tabela compartilhada)
+BACKTEST_CALENDAR_FEATURES = ['year', 'month', 'day_of_week', 'is_weekend', 'is_winter']
+
 @dataclass
 class BacktestResult:
     """Resultado de um teste de backtesting"""
@@ -18,55 +34,49 @@ class BacktestResult:
     predictions: List[float]
     actuals: List[float]
     dates: List[str]
+    details: Dict = field(default_factory=dict)
 
 class BacktestingService:
     """Serviço para backtesting e validação cruzada"""
     
-    def __init__(self):
+    # Espaço de busca usado por random_search, bayesian_optimization e successive halving
+    param_spaces = {
+        'seasonality_mode': ['additive', 'multiplicative'],
+        'changepoint_prior_scale': [0.005, 0.01, 0.02, 0.05, 0.1],
+        'seasonality_prior_scale': [1, 2, 5, 10, 15],
+        'growth': ['linear', 'logistic'],
+        'changepoint_range': [0.6, 0.7, 0.8, 0.9],
+        'n_changepoints': [10, 15, 20, 25, 30, 35]
+    }
+    
+    def __init__(self, fold_store: Optional[FoldResultStore] = None):
         self.metrics = ['smape', 'mae', 'rmse', 'mape']
+        self.fold_store = fold_store
     
     def calculate_smape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula sMAPE (Symmetric Mean Absolute Percentage Error)"""
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        # Evitar divisão por zero
-        denominator = (np.abs(actual) + np.abs(predicted)) / 2
-        denominator = np.where(denominator == 0, 1, denominator)
-        
-        smape = np.mean(np.abs(actual - predicted) / denominator) * 100
-        return float(smape)
+        return self.calculate_metrics(actual, predicted)['smape']
     
     def calculate_mae(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula MAE (Mean Absolute Error)"""
-        return float(np.mean(np.abs(actual - predicted)))
+        return self.calculate_metrics(actual, predicted)['mae']
     
     def calculate_rmse(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula RMSE (Root Mean Square Error)"""
-        return float(np.sqrt(np.mean((actual - predicted) ** 2)))
+        return self.calculate_metrics(actual, predicted)['rmse']
     
     def calculate_mape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
-        """Calcula MAPE (Mean Absolute Percentage Error)"""
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        # Evitar divisão por zero
-        actual = np.where(actual == 0, 1e-8, actual)
-        
-        mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-        return float(mape)
+        """Calcula MAPE (Mean Absolute Percentage Error; reais iguais a zero viram 1e-8)"""
+        return self.calculate_metrics(actual, predicted)['mape']
     
     def calculate_metrics(self, actual: List[float], predicted: List[float]) -> Dict[str, float]:
         """Calcula todas as métricas de erro"""
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        return {
-            'smape': self.calculate_smape(actual, predicted),
-            'mae': self.calculate_mae(actual, predicted),
-            'rmse': self.calculate_rmse(actual, predicted),
-            'mape': self.calculate_mape(actual, predicted)
-        }
+        metrics = batch_metrics(
+            np.asarray(actual, dtype=float).reshape(1, -1),
+            np.asarray(predicted, dtype=float).reshape(1, -1),
+            mape_zero_handling='epsilon',
+        )
+        return {name: float(getattr(metrics, name)[0]) for name in ('smape', 'mae', 'rmse', 'mape')}
     
     def prepare_data_for_prophet(self, df: pd.DataFrame, regressors: List[str] = None) -> pd.DataFrame:
         """Prepara dados para o Prophet"""
@@ -75,11 +85,7 @@ class BacktestingService:
         df_prep = df_prep.sort_values('ds').reset_index(drop=True)
         
         # Adicionar features de calendário
-        df_prep['year'] = df_prep['ds'].dt.year
-        df_prep['month'] = df_prep['ds'].dt.month
-        df_prep['day_of_week'] = df_prep['ds'].dt.dayofweek
-        df_prep['is_weekend'] = (df_prep['day_of_week'] >= 5).astype(int)
-        df_prep['is_winter'] = df_prep['month'].isin([5, 6, 7, 8, 9]).astype(int)
+        calendar_table.add_features(df_prep, BACKTEST_CALENDAR_FEATURES)
         
         # Calcular cap baseado no P95
         y_values = df_prep['y'].values
@@ -90,8 +96,8 @@ class BacktestingService:
         
         return df_prep
     
-    def train_prophet_model(self, df: pd.DataFrame, params: Dict) -> Prophet:
-        """Treina modelo Prophet com parâmetros específicos"""
+    def build_prophet_model(self, df: pd.DataFrame, params: Dict) -> Prophet:
+        """Cria (sem ajustar) o modelo Prophet com parâmetros específicos"""
         model = Prophet(
             yearly_seasonality=True,
             weekly_seasonality=True,
@@ -116,18 +122,309 @@ class BacktestingService:
             if regressor in df.columns:
                 model.add_regressor(regressor, standardize=True)
         
-        model.fit(df)
         return model
     
+    def train_prophet_model(
+        self, df: pd.DataFrame, params: Dict, init_from: Optional[Prophet] = None, **fit_kwargs
+    ) -> Prophet:
+        """Treina modelo Prophet com parâmetros específicos.
+        
+        Com ``init_from`` (modelo já ajustado com os mesmos parâmetros) o
+        otimizador parte dos coeficientes dele, convertidos para a escala e
+        os pontos de mudança deste histórico.
+        """
+        model = self.build_prophet_model(df, params)
+        if init_from is not None:
+            probe = self.build_prophet_model(df, params)
+            probe.preprocess(df)
+            fit_kwargs['init'] = warm_start_init(init_from, probe)
+        model.fit(df, **fit_kwargs)
+        return model
+    
+    def get_fold_cutoffs(
+        self,
+        df_prep: pd.DataFrame,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
+    ) -> List[pd.Timestamp]:
+        """Datas de corte das janelas rolantes (na ordem cronológica)"""
+        horizon_delta = timedelta(days=horizon_days)
+        period_delta = timedelta(days=period_days)
+        end_date = df_prep['ds'].max()
+        
+        cutoffs = []
+        current_date = df_prep['ds'].min() + timedelta(days=initial_days)
+        while current_date + horizon_delta <= end_date:
+            cutoffs.append(current_date)
+            current_date += period_delta
+        return cutoffs
+    
+    def count_folds(
+        self,
+        df: pd.DataFrame,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
+    ) -> int:
+        """Quantidade de janelas (ajustes do Stan por candidato) de uma validação"""
+        df_prep = self.prepare_data_for_prophet(df)
+        return len(self.get_fold_cutoffs(df_prep, initial_days, horizon_days, period_days))
+    
+    def evaluate_fold(
+        self,
+        df_prep: pd.DataFrame,
+        cutoff: pd.Timestamp,
+        horizon_days: int,
+        params: Dict,
+        fold_timeout: Optional[float] = None,
+    ) -> Optional[BacktestResult]:
+        """Treina até ``cutoff`` e avalia os ``horizon_days`` seguintes (None se a janela for inválida)"""
+        return self._fit_fold(df_prep, cutoff, horizon_days, params, fold_timeout)[0]
+    
+    def _fit_fold(
+        self,
+        df_prep: pd.DataFrame,
+        cutoff: pd.Timestamp,
+        horizon_days: int,
+        params: Dict,
+        fold_timeout: Optional[float] = None,
+        init_from: Optional[Prophet] = None,
+    ) -> Tuple[Optional[BacktestResult], Optional[Prophet]]:
+        """Como ``evaluate_fold``, devolvendo também o modelo ajustado"""
+        try:
+            # Dados de treinamento
+            train_data = df_prep[df_prep['ds'] < cutoff].copy()
+            
+            if len(train_data) < 30:  # Mínimo de 30 dias para treinar
+                return None, None
+            
+            # Dados de teste
+            test_start = cutoff
+            test_end = cutoff + timedelta(days=horizon_days)
+            test_data = df_prep[
+                (df_prep['ds'] >= test_start) & (df_prep['ds'] < test_end)
+            ].copy()
+            
+            if len(test_data) == 0:
+                return None, None
+            
+            # Treinar modelo (timeout interrompe o otimizador do Stan)
+            fit_kwargs = {'timeout': fold_timeout} if fold_timeout else {}
+            model = self.train_prophet_model(train_data, params, init_from=init_from, **fit_kwargs)
+            
+            # Fazer previsão
+            future = model.make_future_dataframe(periods=len(test_data))
+            
+            # Adicionar features de calendário para o futuro
+            calendar_table.add_features(future, BACKTEST_CALENDAR_FEATURES)
+            
+            # Adicionar cap e floor
+            future['cap'] = train_data['cap'].iloc[-1]
+            future['floor'] = 0
+            
+            # Adicionar regressores externos se existirem
+            for regressor in params.get('regressors', []):
+                if regressor in train_data.columns:
+                    # Usar último valor conhecido para o futuro
+                    last_value = train_data[regressor].iloc[-1]
+                    future[regressor] = last_value
+            
+            forecast = model.predict(future)
+            
+            # Pegar apenas as previsões do período de teste
+            forecast_test = forecast[forecast['ds'] >= test_start].tail(len(test_data))
+            
+            if len(forecast_test) != len(test_data):
+                return None, model
+            
+            # Calcular métricas
+            actual = test_data['y'].values
+            predicted = forecast_test['yhat'].values
+            
+            metrics = self.calculate_metrics(actual, predicted)
+            
+            return BacktestResult(
+                params=params.copy(),
+                smape=metrics['smape'],
+                mae=metrics['mae'],
+                rmse=metrics['rmse'],
+                mape=metrics['mape'],
+                predictions=predicted.tolist(),
+                actuals=actual.tolist(),
+                dates=[d.strftime('%Y-%m-%d') for d in test_data['ds']]
+            ), model
+            
+        except Exception as e:
+            print(f"❌ Erro no backtest {cutoff}: {e}")
+            return None, None
+    
+    def _resolve_workers(self, n_folds: int, max_workers: Optional[int]) -> int:
+        if max_workers is None:
+            max_workers = get_settings().backtest_max_workers
+        if max_workers <= 0:  # automático: um processo por núcleo
+            max_workers = os.cpu_count() or 1
+        return max(1, min(max_workers, n_folds))
+    
+    @contextmanager
+    def fold_executor(self, df_prep: pd.DataFrame, max_workers: int):
+        """Pool de processos com uma única cópia de ``df_prep`` por processo.
+
+        O DataFrame vai para cada worker uma vez, no initializer; as tarefas
+        levam apenas a data de corte e os parâmetros. Os processos só sobem
+        na primeira tarefa (nada é criado se tudo vier do ``fold_store``).
+        """
+        executor = _LazyProcessPool(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_fold_worker,
+            initargs=(df_prep,),
+        )
+        try:
+            yield executor
+        finally:
+            executor.shutdown()
+    
+    def run_fold_tasks(
+        self,
+        df_prep: pd.DataFrame,
+        tasks: List[Tuple[Dict, pd.Timestamp]],
+        horizon_days: int,
+        executor: Optional[Executor] = None,
+        fold_timeout: Optional[float] = None,
+        warm_start: bool = False,
+    ) -> List[Optional[BacktestResult]]:
+        """Avalia pares (parâmetros, corte), em série ou no ``executor``, mantendo a ordem.
+        
+        Pares já avaliados antes (mesmos dados, parâmetros, corte e horizonte)
+        vêm do ``fold_store`` marcados com ``details['cached']`` e não são reajustados.
+        Com ``warm_start`` as janelas rodam em série e cada ajuste parte do
+        anterior com os mesmos parâmetros (ver ``train_prophet_model``).
+        """
+        if warm_start:
+            executor = None
+        results: List[Optional[BacktestResult]] = [None] * len(tasks)
+        keys: List[str] = []
+        pending = list(range(len(tasks)))
+        if self.fold_store is not None:
+            data_hash = self.fold_store.data_hash(df_prep)
+            keys = [
+                self.fold_store.make_key(data_hash, params, cutoff, horizon_days, warm_start)
+                for params, cutoff in tasks
+            ]
+            cached = self.fold_store.get_many(keys)
+            pending = []
+            for index, key in enumerate(keys):
+                if key in cached:
+                    results[index] = BacktestResult(**cached[key])
+                    results[index].details = {**results[index].details, 'cached': True}
+                else:
+                    pending.append(index)
+        
+        computed = self._evaluate_tasks(
+            df_prep, [tasks[i] for i in pending], horizon_days, executor, fold_timeout, warm_start
+        )
+        for index, result in zip(pending, computed):
+            results[index] = result
+        
+        if self.fold_store is not None:
+            self.fold_store.put_many({
+                keys[index]: asdict(result)
+                for index, result in zip(pending, computed)
+                if result is not None
+            })
+        return results
+    
+    def _evaluate_tasks(
+        self,
+        df_prep: pd.DataFrame,
+        tasks: List[Tuple[Dict, pd.Timestamp]],
+        horizon_days: int,
+        executor: Optional[Executor],
+        fold_timeout: Optional[float],
+        warm_start: bool = False,
+    ) -> List[Optional[BacktestResult]]:
+        if warm_start:
+            results = []
+            previous: Optional[Prophet] = None
+            previous_params: Optional[Dict] = None
+            for params, cutoff in tasks:
+                init_from = previous if params == previous_params else None
+                result, model = self._fit_fold(
+                    df_prep, cutoff, horizon_days, params, fold_timeout, init_from
+                )
+                if result is not None:
+                    result.details = {**result.details, 'warm_start': init_from is not None}
+                if model is not None:
+                    previous, previous_params = model, params
+                results.append(result)
+            return results
+        
+        if executor is None:
+            return [
+                self.evaluate_fold(df_prep, cutoff, horizon_days, params, fold_timeout)
+                for params, cutoff in tasks
+            ]
+        
+        futures = [
+            executor.submit(_run_fold_in_worker, cutoff, horizon_days, params, fold_timeout)
+            for params, cutoff in tasks
+        ]
+        results = []
+        for (_, cutoff), future in zip(tasks, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # worker morto, erro de serialização etc.
+                print(f"❌ Erro no backtest {cutoff}: {e}")
+                results.append(None)
+        return results
+    
+    @staticmethod
+    def count_cached(results: List[Optional[BacktestResult]]) -> int:
+        """Quantos ajustes do Stan foram evitados pelo ``fold_store``"""
+        return sum(1 for r in results if r is not None and r.details.get('cached'))
+    
+    def run_folds(
+        self,
+        df_prep: pd.DataFrame,
+        cutoffs: List[pd.Timestamp],
+        horizon_days: int,
+        params: Dict,
+        executor: Optional[Executor] = None,
+        fold_timeout: Optional[float] = None,
+        warm_start: bool = False,
+    ) -> List[Optional[BacktestResult]]:
+        """Avalia as janelas de um conjunto de parâmetros, na ordem de ``cutoffs``"""
+        tasks = [(params, cutoff) for cutoff in cutoffs]
+        return self.run_fold_tasks(df_prep, tasks, horizon_days, executor, fold_timeout, warm_start)
+    
     def rolling_cross_validation(
         self, 
         df: pd.DataFrame, 
         initial_days: int = 365,
         horizon_days: int = 30,
         period_days: int = 30,
-        params: Dict = None
+        params: Dict = None,
+        max_workers: Optional[int] = None,
+        fold_timeout: Optional[float] = None,
+        warm_start: bool = False,
+        executor: Optional[Executor] = None,
     ) -> List[BacktestResult]:
-        """Validação cruzada com janelas rolantes"""
+        """Validação cruzada com janelas rolantes.
+        
+        As janelas são independentes e rodam em paralelo (``max_workers``
+        processos; 0 = um por núcleo). O resultado é o mesmo, e na mesma
+        ordem, que na execução em série. Um ``executor`` já aberto com
+        ``fold_executor`` sobre os mesmos dados é usado no lugar de um pool
+        novo: buscas que chamam este método por candidato sobem os processos
+        uma vez só.
+        
+        ``warm_start`` encadeia as janelas em série: cada ajuste do Stan parte
+        dos coeficientes da janela anterior, que compartilha quase todo o
+        histórico, e converge em menos iterações. Em históricos curtos demais
+        para a sazonalidade anual o ótimo é pouco definido e as métricas
+        podem diferir das do ajuste a frio.
+        """
         
         if params is None:
             params = {
@@ -136,98 +433,35 @@ class BacktestingService:
                 'seasonality_prior_scale': 5,
                 'regressors': []
             }
+        if fold_timeout is None:
+            fold_timeout = get_settings().backtest_fold_timeout_seconds
         
         df_prep = self.prepare_data_for_prophet(df, params.get('regressors', []))
+        cutoffs = self.get_fold_cutoffs(df_prep, initial_days, horizon_days, period_days)
+        workers = 1 if warm_start else self._resolve_workers(len(cutoffs), max_workers)
         
-        # Converter dias para timestamps
-        initial_delta = timedelta(days=initial_days)
-        horizon_delta = timedelta(days=horizon_days)
-        period_delta = timedelta(days=period_days)
-        
-        start_date = df_prep['ds'].min()
-        end_date = df_prep['ds'].max()
+        if executor is not None and not warm_start:
+            fold_results = self.run_folds(
+                df_prep, cutoffs, horizon_days, params, executor, fold_timeout
+            )
+        elif workers > 1:
+            print(f"⚡ Executando {len(cutoffs)} janelas em {workers} processos")
+            with self.fold_executor(df_prep, workers) as executor:
+                fold_results = self.run_folds(
+                    df_prep, cutoffs, horizon_days, params, executor, fold_timeout
+                )
+        else:
+            fold_results = self.run_folds(
+                df_prep, cutoffs, horizon_days, params, None, fold_timeout, warm_start
+            )
         
         results = []
-        current_date = start_date + initial_delta
-        
-        while current_date + horizon_delta <= end_date:
-            try:
-                # Dados de treinamento
-                train_end = current_date
-                train_data = df_prep[df_prep['ds'] < train_end].copy()
-                
-                if len(train_data) < 30:  # Mínimo de 30 dias para treinar
-                    current_date += period_delta
-                    continue
-                
-                # Dados de teste
-                test_start = current_date
-                test_end = current_date + horizon_delta
-                test_data = df_prep[
-                    (df_prep['ds'] >= test_start) & (df_prep['ds'] < test_end)
-                ].copy()
-                
-                if len(test_data) == 0:
-                    current_date += period_delta
-                    continue
-                
-                # Treinar modelo
-                model = self.train_prophet_model(train_data, params)
-                
-                # Fazer previsão
-                future = model.make_future_dataframe(periods=len(test_data))
-                
-                # Adicionar features de calendário para o futuro
-                future['year'] = future['ds'].dt.year
-                future['month'] = future['ds'].dt.month
-                future['day_of_week'] = future['ds'].dt.dayofweek
-                future['is_weekend'] = (future['day_of_week'] >= 5).astype(int)
-                future['is_winter'] = future['month'].isin([5, 6, 7, 8, 9]).astype(int)
-                
-                # Adicionar cap e floor
-                future['cap'] = train_data['cap'].iloc[-1]
-                future['floor'] = 0
-                
-                # Adicionar regressores externos se existirem
-                for regressor in params.get('regressors', []):
-                    if regressor in train_data.columns:
-                        # Usar último valor conhecido para o futuro
-                        last_value = train_data[regressor].iloc[-1]
-                        future[regressor] = last_value
-                
-                forecast = model.predict(future)
-                
-                # Pegar apenas as previsões do período de teste
-                forecast_test = forecast[forecast['ds'] >= test_start].tail(len(test_data))
-                
-                if len(forecast_test) != len(test_data):
-                    current_date += period_delta
-                    continue
-                
-                # Calcular métricas
-                actual = test_data['y'].values
-                predicted = forecast_test['yhat'].values
-                
-                metrics = self.calculate_metrics(actual, predicted)
-                
-                result = BacktestResult(
-                    params=params.copy(),
-                    smape=metrics['smape'],
-                    mae=metrics['mae'],
-                    rmse=metrics['rmse'],
-                    mape=metrics['mape'],
-                    predictions=predicted.tolist(),
-                    actuals=actual.tolist(),
-                    dates=[d.strftime('%Y-%m-%d') for d in test_data['ds']]
-                )
-                
-                results.append(result)
-                print(f"✅ Backtest {len(results)}: {test_start.strftime('%Y-%m-%d')} a {test_end.strftime('%Y-%m-%d')} - sMAPE: {metrics['smape']:.2f}")
-                
-            except Exception as e:
-                print(f"❌ Erro no backtest {current_date}: {e}")
-            
-            current_date += period_delta
+        for cutoff, result in zip(cutoffs, fold_results):
+            if result is None:
+                continue
+            results.append(result)
+            test_end = cutoff + timedelta(days=horizon_days)
+            print(f"✅ Backtest {len(results)}: {cutoff.strftime('%Y-%m-%d')} a {test_end.strftime('%Y-%m-%d')} - sMAPE: {result.smape:.2f}")
         
         return results
     
@@ -274,98 +508,74 @@ class BacktestingService:
                 parallel="threads"
             )
             
-            print(f"✅ Prophet cross_validation concluído: {len(cv_results)} folds")
+            print(f"✅ Prophet cross_validation concluído: {cv_results['cutoff'].nunique()} folds")
             
-            # Converter resultados para formato BacktestResult
-            results = []
-            for i, (_, row) in enumerate(cv_results.iterrows()):
-                # Pegar dados reais correspondentes
-                actual_date = row['ds']
-                actual_data = df_prep[df_prep['ds'] == actual_date]
-                
-                if len(actual_data) > 0:
-                    actual_value = actual_data['y'].iloc[0]
-                    predicted_value = row['yhat']
-                    
-                    # Calcular métricas para este ponto
-                    metrics = self.calculate_metrics([actual_value], [predicted_value])
-                    
-                    result = BacktestResult(
-                        params=params.copy(),
-                        smape=metrics['smape'],
-                        mae=metrics['mae'],
-                        rmse=metrics['rmse'],
-                        mape=metrics['mape'],
-                        predictions=[predicted_value],
-                        actuals=[actual_value],
-                        dates=[actual_date.strftime('%Y-%m-%d')]
-                    )
-                    
-                    results.append(result)
-            
-            # Agrupar resultados por fold para métricas mais robustas
-            grouped_results = self._group_cv_results_by_fold(results, horizon_days)
-            
-            return grouped_results
+            # Converter resultados para formato BacktestResult (uma janela por cutoff)
+            return self._fold_results_from_cv(cv_results, df_prep, params)
             
         except Exception as e:
             print(f"⚠️  Erro no Prophet cross_validation: {e}")
             print(f"🔄 Fallback para validação cruzada manual...")
             return self.rolling_cross_validation(df, initial_days, horizon_days, period_days, params)
     
-    def _group_cv_results_by_fold(self, results: List[BacktestResult], horizon_days: int) -> List[BacktestResult]:
-        """Agrupa resultados de cross_validation por fold"""
-        if not results:
+    def _fold_results_from_cv(
+        self, cv_results: pd.DataFrame, df_prep: pd.DataFrame, params: Dict
+    ) -> List[BacktestResult]:
+        """Agrupa a saída de ``cross_validation`` por ``cutoff`` com métricas vetorizadas.
+        
+        Os valores reais vêm de ``df_prep`` (merge por ``ds``); as janelas
+        viram linhas de uma matriz com máscara e todas as métricas saem de
+        uma única chamada a ``batch_metrics``.
+        """
+        merged = cv_results[['ds', 'cutoff', 'yhat']].merge(
+            df_prep[['ds', 'y']], on='ds', how='inner'
+        ).sort_values(['cutoff', 'ds'], kind='stable')
+        if merged.empty:
             return []
         
-        # Agrupar por períodos de horizon_days
-        grouped = {}
-        current_fold = 0
+        # Fronteiras das janelas nas linhas já ordenadas por cutoff
+        cutoff_codes = merged['cutoff'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        boundaries = np.flatnonzero(np.diff(cutoff_codes)) + 1
+        predicted = np.split(merged['yhat'].to_numpy(dtype=float), boundaries)
+        actual = np.split(merged['y'].to_numpy(dtype=float), boundaries)
+        dates = np.split(merged['ds'].dt.strftime('%Y-%m-%d').to_numpy(), boundaries)
         
-        for i, result in enumerate(results):
-            fold_key = i // horizon_days
-            if fold_key not in grouped:
-                grouped[fold_key] = []
-            grouped[fold_key].append(result)
+        actual_matrix, mask = pad_ragged(actual)
+        predicted_matrix, _ = pad_ragged(predicted)
+        metrics = batch_metrics(actual_matrix, predicted_matrix, mask, mape_zero_handling='epsilon')
         
-        # Calcular métricas médias para cada fold
         fold_results = []
-        for fold_key, fold_results_list in grouped.items():
-            if len(fold_results_list) == 0:
-                continue
-            
-            # Calcular métricas médias do fold
-            avg_smape = np.mean([r.smape for r in fold_results_list])
-            avg_mae = np.mean([r.mae for r in fold_results_list])
-            avg_rmse = np.mean([r.rmse for r in fold_results_list])
-            avg_mape = np.mean([r.mape for r in fold_results_list])
-            
-            # Combinar todas as previsões e valores reais do fold
-            all_predictions = []
-            all_actuals = []
-            all_dates = []
-            
-            for result in fold_results_list:
-                all_predictions.extend(result.predictions)
-                all_actuals.extend(result.actuals)
-                all_dates.extend(result.dates)
-            
-            fold_result = BacktestResult(
-                params=fold_results_list[0].params.copy(),
-                smape=avg_smape,
-                mae=avg_mae,
-                rmse=avg_rmse,
-                mape=avg_mape,
-                predictions=all_predictions,
-                actuals=all_actuals,
-                dates=all_dates
-            )
-            
-            fold_results.append(fold_result)
-            print(f"✅ Fold {fold_key + 1}: sMAPE médio: {avg_smape:.2f}")
+        for i in range(len(metrics)):
+            fold_results.append(BacktestResult(
+                params=params.copy(),
+                smape=float(metrics.smape[i]),
+                mae=float(metrics.mae[i]),
+                rmse=float(metrics.rmse[i]),
+                mape=float(metrics.mape[i]),
+                predictions=predicted[i].tolist(),
+                actuals=actual[i].tolist(),
+                dates=dates[i].tolist(),
+            ))
+            print(f"✅ Fold {i + 1}: sMAPE médio: {metrics.smape[i]:.2f}")
         
         return fold_results
     
+    @contextmanager
+    def _search_executor(
+        self, df: pd.DataFrame, initial_days: int, horizon_days: int, period_days: int,
+        max_workers: Optional[int],
+    ):
+        """Pool de janelas compartilhado por todos os candidatos de uma busca (None em série)"""
+        df_prep = self.prepare_data_for_prophet(df)
+        cutoffs = self.get_fold_cutoffs(df_prep, initial_days, horizon_days, period_days)
+        workers = self._resolve_workers(len(cutoffs), max_workers)
+        if workers <= 1:
+            yield None
+            return
+        print(f"⚡ Janelas dos candidatos em {workers} processos")
+        with self.fold_executor(df_prep, workers) as executor:
+            yield executor
+    
     def grid_search(
         self, 
         df: pd.DataFrame,
@@ -373,7 +583,8 @@ class BacktestingService:
         initial_days: int = 365,
         horizon_days: int = 30,
         period_days: int = 30,
-        max_combinations: int = 20
+        max_combinations: int = 20,
+        max_workers: Optional[int] = None,
     ) -> List[BacktestResult]:
         """Grid search aprimorado para otimização de parâmetros"""
         
@@ -418,40 +629,42 @@ class BacktestingService:
         
         print(f"🔍 Iniciando grid search com {len(param_combinations)} combinações...")
         
-        for i, combination in enumerate(param_combinations):
-            params = dict(zip(param_names, combination))
+        with self._search_executor(df, initial_days, horizon_days, period_days, max_workers) as executor:
+            for i, combination in enumerate(param_combinations):
+                params = dict(zip(param_names, combination))
             
-            print(f"📊 Testando combinação {i+1}/{len(param_combinations)}: {params}")
+                print(f"📊 Testando combinação {i+1}/{len(param_combinations)}: {params}")
             
-            try:
-                results = self.rolling_cross_validation(
-                    df, initial_days, horizon_days, period_days, params
-                )
+                try:
+                    results = self.rolling_cross_validation(
+                        df, initial_days, horizon_days, period_days, params, executor=executor
+                    )
                 
-                if results:
-                    # Calcular métricas médias para esta combinação
-                    avg_smape = np.mean([r.smape for r in results])
-                    avg_mae = np.mean([r.mae for r in results])
+                    if results:
+                        # Calcular métricas médias para esta combinação
+                        avg_smape = np.mean([r.smape for r in results])
+                        avg_mae = np.mean([r.mae for r in results])
                     
-                    # Criar resultado agregado
-                    aggregated_result = BacktestResult(
-                        params=params,
-                        smape=avg_smape,
-                        mae=avg_mae,
-                        rmse=np.mean([r.rmse for r in results]),
-                        mape=np.mean([r.mape for r in results]),
-                        predictions=[],
-                        actuals=[],
-                        dates=[]
-                    )
+                        # Criar resultado agregado
+                        aggregated_result = BacktestResult(
+                            params=params,
+                            smape=avg_smape,
+                            mae=avg_mae,
+                            rmse=np.mean([r.rmse for r in results]),
+                            mape=np.mean([r.mape for r in results]),
+                            predictions=[],
+                            actuals=[],
+                            dates=[],
+                            details={'fits_saved': self.count_cached(results)},
+                        )
                     
-                    all_results.append(aggregated_result)
-                    print(f"✅ Combinação {i+1} - sMAPE médio: {avg_smape:.2f}")
-                else:
-                    print(f"⚠️  Combinação {i+1} - Sem resultados válidos")
+                        all_results.append(aggregated_result)
+                        print(f"✅ Combinação {i+1} - sMAPE médio: {avg_smape:.2f}")
+                    else:
+                        print(f"⚠️  Combinação {i+1} - Sem resultados válidos")
                     
-            except Exception as e:
-                print(f"❌ Erro na combinação {i+1}: {e}")
+                except Exception as e:
+                    print(f"❌ Erro na combinação {i+1}: {e}")
         
         # Ordenar por sMAPE (menor é melhor)
         all_results.sort(key=lambda x: x.smape)
@@ -464,63 +677,57 @@ class BacktestingService:
         n_iterations: int = 15,
         initial_days: int = 365,
         horizon_days: int = 30,
-        period_days: int = 30
+        period_days: int = 30,
+        max_workers: Optional[int] = None,
     ) -> List[BacktestResult]:
         """Busca aleatória para otimização mais eficiente"""
         
         # Definir espaços de parâmetros
-        param_spaces = {
-            'seasonality_mode': ['additive', 'multiplicative'],
-            'changepoint_prior_scale': [0.005, 0.01, 0.02, 0.05, 0.1],
-            'seasonality_prior_scale': [1, 2, 5, 10, 15],
-            'growth': ['linear', 'logistic'],
-            'changepoint_range': [0.6, 0.7, 0.8, 0.9],
-            'n_changepoints': [10, 15, 20, 25, 30, 35]
-        }
-        
-        import random
+        param_spaces = self.param_spaces
         
         all_results = []
         
         print(f"🎲 Iniciando busca aleatória com {n_iterations} iterações...")
         
-        for i in range(n_iterations):
-            # Gerar parâmetros aleatórios
-            params = {}
-            for param_name, param_values in param_spaces.items():
-                params[param_name] = random.choice(param_values)
+        with self._search_executor(df, initial_days, horizon_days, period_days, max_workers) as executor:
+            for i in range(n_iterations):
+                # Gerar parâmetros aleatórios
+                params = {}
+                for param_name, param_values in param_spaces.items():
+                    params[param_name] = random.choice(param_values)
             
-            print(f"📊 Iteração {i+1}/{n_iterations}: {params}")
+                print(f"📊 Iteração {i+1}/{n_iterations}: {params}")
             
-            try:
-                results = self.rolling_cross_validation(
-                    df, initial_days, horizon_days, period_days, params
-                )
+                try:
+                    results = self.rolling_cross_validation(
+                        df, initial_days, horizon_days, period_days, params, executor=executor
+                    )
                 
-                if results:
-                    # Calcular métricas médias para esta combinação
-                    avg_smape = np.mean([r.smape for r in results])
-                    avg_mae = np.mean([r.mae for r in results])
+                    if results:
+                        # Calcular métricas médias para esta combinação
+                        avg_smape = np.mean([r.smape for r in results])
+                        avg_mae = np.mean([r.mae for r in results])
                     
-                    # Criar resultado agregado
-                    aggregated_result = BacktestResult(
-                        params=params,
-                        smape=avg_smape,
-                        mae=avg_mae,
-                        rmse=np.mean([r.rmse for r in results]),
-                        mape=np.mean([r.mape for r in results]),
-                        predictions=[],
-                        actuals=[],
-                        dates=[]
-                    )
+                        # Criar resultado agregado
+                        aggregated_result = BacktestResult(
+                            params=params,
+                            smape=avg_smape,
+                            mae=avg_mae,
+                            rmse=np.mean([r.rmse for r in results]),
+                            mape=np.mean([r.mape for r in results]),
+                            predictions=[],
+                            actuals=[],
+                            dates=[],
+                            details={'fits_saved': self.count_cached(results)},
+                        )
                     
-                    all_results.append(aggregated_result)
-                    print(f"✅ Iteração {i+1} - sMAPE médio: {avg_smape:.2f}")
-                else:
-                    print(f"⚠️  Iteração {i+1} - Sem resultados válidos")
+                        all_results.append(aggregated_result)
+                        print(f"✅ Iteração {i+1} - sMAPE médio: {avg_smape:.2f}")
+                    else:
+                        print(f"⚠️  Iteração {i+1} - Sem resultados válidos")
                     
-            except Exception as e:
-                print(f"❌ Erro na iteração {i+1}: {e}")
+                except Exception as e:
+                    print(f"❌ Erro na iteração {i+1}: {e}")
         
         # Ordenar por sMAPE (menor é melhor)
         all_results.sort(key=lambda x: x.smape)
@@ -533,54 +740,57 @@ class BacktestingService:
         n_iterations: int = 20,
         initial_days: int = 365,
         horizon_days: int = 30,
-        period_days: int = 30
+        period_days: int = 30,
+        batch_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        max_workers: Optional[int] = None,
     ) -> List[BacktestResult]:
-        """Otimização bayesiana para busca mais inteligente"""
-        
-        # Implementação simplificada de otimização bayesiana
-        # Usando busca em grade com priorização baseada em resultados anteriores
-        
-        param_spaces = {
-            'seasonality_mode': ['additive', 'multiplicative'],
-            'changepoint_prior_scale': [0.005, 0.01, 0.02, 0.05, 0.1],
-            'seasonality_prior_scale': [1, 2, 5, 10, 15],
-            'growth': ['linear', 'logistic'],
-            'changepoint_range': [0.6, 0.7, 0.8, 0.9],
-            'n_changepoints': [10, 15, 20, 25, 30, 35]
-        }
+        """Otimização bayesiana (TPE) sobre ``param_spaces``.
+        
+        Cada lote de ``batch_size`` candidatos é avaliado em paralelo (todas as
+        janelas de todos os candidatos no mesmo pool). A curva de convergência
+        (melhor sMAPE após cada avaliação) vai em ``details`` do melhor resultado.
+        """
+        fold_timeout = get_settings().backtest_fold_timeout_seconds
+        df_prep = self.prepare_data_for_prophet(df)
+        cutoffs = self.get_fold_cutoffs(df_prep, initial_days, horizon_days, period_days)
+        if not cutoffs:
+            return []
+        
+        optimizer = TPEOptimizer(self.param_spaces, n_startup=min(5, n_iterations), seed=seed)
+        workers = self._resolve_workers(len(cutoffs) * (batch_size or 1), max_workers)
+        if batch_size is None:
+            # Lote suficiente para ocupar os processos disponíveis
+            batch_size = max(1, workers // len(cutoffs)) if workers > 1 else 1
         
         all_results = []
         best_smape = float('inf')
-        
-        print(f"🧠 Iniciando otimização bayesiana com {n_iterations} iterações...")
-        
-        for i in range(n_iterations):
-            # Priorizar parâmetros próximos aos melhores encontrados
-            if i < 5 or len(all_results) < 3:
-                # Primeiras iterações: busca aleatória
-                params = {}
-                for param_name, param_values in param_spaces.items():
-                    params[param_name] = random.choice(param_values)
-            else:
-                # Iterações posteriores: buscar próximo aos melhores
-                best_result = min(all_results, key=lambda x: x.smape)
-                params = best_result.params.copy()
-                
-                # Perturbar um parâmetro aleatório
-                param_to_change = random.choice(list(param_spaces.keys()))
-                params[param_to_change] = random.choice(param_spaces[param_to_change])
-            
-            print(f"📊 Iteração {i+1}/{n_iterations}: {params}")
-            
-            try:
-                results = self.rolling_cross_validation(
-                    df, initial_days, horizon_days, period_days, params
-                )
+        fits_saved = 0
+        
+        print(f"🧠 Iniciando otimização bayesiana (TPE) com {n_iterations} iterações, lotes de {batch_size}...")
+        
+        with (self.fold_executor(df_prep, workers) if workers > 1 else nullcontext()) as executor:
+            evaluated = 0
+            while evaluated < n_iterations:
+                batch = optimizer.suggest(min(batch_size, n_iterations - evaluated))
+                if not batch:  # espaço esgotado
+                    break
+                tasks = [(params, cutoff) for params in batch for cutoff in cutoffs]
+                fold_results = self.run_fold_tasks(df_prep, tasks, horizon_days, executor, fold_timeout)
                 
-                if results:
-                    avg_smape = np.mean([r.smape for r in results])
+                for position, params in enumerate(batch):
+                    evaluated += 1
+                    chunk = fold_results[position * len(cutoffs):(position + 1) * len(cutoffs)]
+                    results = [r for r in chunk if r is not None]
+                    print(f"📊 Iteração {evaluated}/{n_iterations}: {params}")
+                    if not results:
+                        print(f"⚠️  Iteração {evaluated} - Sem resultados válidos")
+                        continue
                     
-                    aggregated_result = BacktestResult(
+                    avg_smape = float(np.mean([r.smape for r in results]))
+                    fits_saved += self.count_cached(chunk)
+                    optimizer.observe(params, avg_smape)
+                    all_results.append(BacktestResult(
                         params=params,
                         smape=avg_smape,
                         mae=np.mean([r.mae for r in results]),
@@ -588,25 +798,156 @@ class BacktestingService:
                         mape=np.mean([r.mape for r in results]),
                         predictions=[],
                         actuals=[],
-                        dates=[]
-                    )
-                    
-                    all_results.append(aggregated_result)
+                        dates=[],
+                        details={'iteration': evaluated, 'fits_saved': self.count_cached(chunk)},
+                    ))
                     
                     if avg_smape < best_smape:
                         best_smape = avg_smape
                         print(f"🎯 Novo melhor! sMAPE: {avg_smape:.2f}")
                     else:
-                        print(f"✅ Iteração {i+1} - sMAPE: {avg_smape:.2f}")
-                else:
-                    print(f"⚠️  Iteração {i+1} - Sem resultados válidos")
-                    
-            except Exception as e:
-                print(f"❌ Erro na iteração {i+1}: {e}")
+                        print(f"✅ Iteração {evaluated} - sMAPE: {avg_smape:.2f}")
         
         # Ordenar por sMAPE (menor é melhor)
         all_results.sort(key=lambda x: x.smape)
+        if all_results:
+            all_results[0].details['convergence'] = optimizer.convergence_curve()
+            all_results[0].details['fits_used'] = evaluated * len(cutoffs) - fits_saved
+        
+        return all_results
+    
+    @staticmethod
+    def _halving_rungs(n_folds: int, eta: int, min_folds: int) -> List[int]:
+        """Número de janelas avaliadas em cada rodada (cresce ``eta`` vezes até todas)"""
+        rungs = []
+        folds = max(1, min(min_folds, n_folds))
+        while folds < n_folds:
+            rungs.append(folds)
+            folds *= eta
+        rungs.append(n_folds)
+        return rungs
+    
+    @staticmethod
+    def _halving_cost(n_candidates: int, rungs: List[int], eta: int) -> int:
+        """Total de ajustes do Stan para ``n_candidates`` (janelas já avaliadas são reaproveitadas)"""
+        cost, previous, alive = 0, 0, n_candidates
+        for folds in rungs:
+            cost += alive * (folds - previous)
+            previous = folds
+            alive = max(1, alive // eta)
+        return cost
+    
+    @staticmethod
+    def _mean_smape(fold_results: List[Optional[BacktestResult]]) -> float:
+        valid = [r.smape for r in fold_results if r is not None]
+        return float(np.mean(valid)) if valid else float('inf')
+    
+    def successive_halving_search(
+        self,
+        df: pd.DataFrame,
+        max_fits: int = 60,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
+        eta: int = 3,
+        min_folds: int = 1,
+        seed: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[BacktestResult]:
+        """Busca com successive halving, limitada a ``max_fits`` ajustes do Stan.
+        
+        Todos os candidatos são avaliados em poucas janelas (as mais recentes);
+        a cada rodada só o melhor ``1/eta`` segue para mais janelas, até o
+        conjunto completo. O número de candidatos é o maior que cabe no orçamento;
+        se nem um candidato em todas as janelas cabe, só as ``max_fits`` janelas
+        mais recentes são usadas.
+        """
+        import itertools
+        
+        fold_timeout = get_settings().backtest_fold_timeout_seconds
+        df_prep = self.prepare_data_for_prophet(df)
+        cutoffs = self.get_fold_cutoffs(df_prep, initial_days, horizon_days, period_days)
+        if not cutoffs:
+            return []
+        if max_fits < 1:
+            raise ValueError("max_fits deve ser pelo menos 1")
+        if len(cutoffs) > max_fits:
+            # Orçamento menor que o número de janelas: um candidato já estouraria
+            cutoffs = cutoffs[-max_fits:]
+        # Janelas mais recentes primeiro: as rodadas iniciais usam os dados mais atuais
+        fold_order = list(reversed(range(len(cutoffs))))
+        rungs = self._halving_rungs(len(cutoffs), eta, min_folds)
+        
+        space_size = int(np.prod([len(v) for v in self.param_spaces.values()]))
+        n_candidates = 1
+        while (n_candidates < space_size
+               and self._halving_cost(n_candidates + 1, rungs, eta) <= max_fits):
+            n_candidates += 1
+        
+        rng = random.Random(seed)
+        names = list(self.param_spaces)
+        combinations = rng.sample(
+            list(itertools.product(*self.param_spaces.values())), n_candidates
+        )
+        candidates = [dict(zip(names, combination)) for combination in combinations]
+        
+        print(f"✂️  Successive halving: {n_candidates} candidatos, rodadas com {rungs} janelas, orçamento {max_fits} ajustes")
+        
+        fold_results: Dict[int, List[Optional[BacktestResult]]] = {i: [] for i in range(n_candidates)}
+        alive = list(range(n_candidates))
+        fits_used = 0
+        previous = 0
+        workers = self._resolve_workers(n_candidates * rungs[0], max_workers)
+        
+        with (self.fold_executor(df_prep, workers) if workers > 1 else nullcontext()) as executor:
+            for rung_index, folds in enumerate(rungs):
+                tasks = [(i, fold_order[j]) for i in alive for j in range(previous, folds)]
+                results = self.run_fold_tasks(
+                    df_prep,
+                    [(candidates[i], cutoffs[j]) for i, j in tasks],
+                    horizon_days,
+                    executor,
+                    fold_timeout,
+                )
+                fits_used += len(tasks) - self.count_cached(results)
+                for (i, _), result in zip(tasks, results):
+                    fold_results[i].append(result)
+                
+                ranked = sorted(alive, key=lambda i: self._mean_smape(fold_results[i]))
+                ranked = [i for i in ranked if np.isfinite(self._mean_smape(fold_results[i]))]
+                print(f"📊 Rodada {rung_index + 1}: {len(alive)} candidatos em {folds} janelas - melhor sMAPE: "
+                      f"{self._mean_smape(fold_results[ranked[0]]) if ranked else float('nan'):.2f}")
+                if folds == rungs[-1] or not ranked:
+                    break
+                alive = ranked[:max(1, len(alive) // eta)]
+                previous = folds
         
+        all_results = []
+        for i, candidate_results in fold_results.items():
+            valid = [r for r in candidate_results if r is not None]
+            if not valid:
+                continue
+            all_results.append(BacktestResult(
+                params=candidates[i],
+                smape=float(np.mean([r.smape for r in valid])),
+                mae=float(np.mean([r.mae for r in valid])),
+                rmse=float(np.mean([r.rmse for r in valid])),
+                mape=float(np.mean([r.mape for r in valid])),
+                predictions=[],
+                actuals=[],
+                dates=[],
+                details={
+                    'folds_evaluated': len(candidate_results),
+                    'total_folds': len(cutoffs),
+                    'fits_saved': self.count_cached(candidate_results),
+                },
+            ))
+        
+        # Quem chegou mais longe vem primeiro; empate decidido pelo sMAPE
+        all_results.sort(key=lambda r: (-r.details['folds_evaluated'], r.smape))
+        if all_results:
+            all_results[0].details['fits_used'] = fits_used
+        print(f"✅ Successive halving concluído com {fits_used} ajustes")
         return all_results
     
     def get_best_parameters(self, results: List[BacktestResult], metric: str = 'smape') -> Dict:
@@ -634,8 +975,40 @@ class BacktestingService:
             'improvement': worst_result.smape - best_result.smape,
             'total_combinations_tested': len(results),
             'top_3_params': [r.params for r in results[:3]],
-            'top_3_smape': [r.smape for r in results[:3]]
+            'top_3_smape': [r.smape for r in results[:3]],
+            'convergence_curve': best_result.details.get('convergence', []),
         }
 
 # Instância global do serviço
-backtesting_service = BacktestingService()
+backtesting_service = BacktestingService(fold_store=fold_result_store)
+
+
+class _LazyProcessPool(Executor):
+    """ProcessPoolExecutor criado apenas no primeiro ``submit``"""
+
+    def __init__(self, **pool_kwargs):
+        self._pool_kwargs = pool_kwargs
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, fn, *args, **kwargs):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(**self._pool_kwargs)
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+# Cópia do DataFrame preparado em cada processo do pool de janelas
+_fold_data: Optional[pd.DataFrame] = None
+
+
+def _init_fold_worker(df_prep: pd.DataFrame) -> None:
+    global _fold_data
+    _fold_data = df_prep
+
+
+def _run_fold_in_worker(
+    cutoff: pd.Timestamp, horizon_days: int, params: Dict, fold_timeout: Optional[float]
+) -> Optional[BacktestResult]:
+    return backtesting_service.evaluate_fold(_fold_data, cutoff, horizon_days, params, fold_timeout)
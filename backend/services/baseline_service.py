@@ -3,6 +3,10 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
 from dataclasses import dataclass
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.ets_service import ets_service
+from services.metrics_service import BatchMetrics, batch_metrics
 
 @dataclass
 class BaselineResult:
@@ -24,103 +28,198 @@ class BaselineService:
     
     def calculate_smape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula sMAPE (Symmetric Mean Absolute Percentage Error)"""
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        denominator = (np.abs(actual) + np.abs(predicted)) / 2
-        denominator = np.where(denominator == 0, 1, denominator)
-        
-        smape = np.mean(np.abs(actual - predicted) / denominator) * 100
-        return float(smape)
+        return self.calculate_metrics(actual, predicted)['smape']
     
     def calculate_mae(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula MAE (Mean Absolute Error)"""
-        return float(np.mean(np.abs(actual - predicted)))
+        return self.calculate_metrics(actual, predicted)['mae']
     
     def calculate_rmse(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """Calcula RMSE (Root Mean Square Error)"""
-        return float(np.sqrt(np.mean((actual - predicted) ** 2)))
+        return self.calculate_metrics(actual, predicted)['rmse']
     
     def calculate_mape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
-        """Calcula MAPE (Mean Absolute Percentage Error)"""
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        actual = np.where(actual == 0, 1e-8, actual)
-        mape = np.mean(np.abs((actual - predicted) / actual)) * 100
-        return float(mape)
+        """Calcula MAPE (Mean Absolute Percentage Error; reais iguais a zero viram 1e-8)"""
+        return self.calculate_metrics(actual, predicted)['mape']
+    
+    def calculate_metrics(self, actual: List[float], predicted: List[float]) -> Dict[str, float]:
+        """Calcula todas as métricas de erro"""
+        metrics = batch_metrics(
+            np.asarray(actual, dtype=float).reshape(1, -1),
+            np.asarray(predicted, dtype=float).reshape(1, -1),
+            mape_zero_handling='epsilon',
+        )
+        return {name: float(getattr(metrics, name)[0]) for name in ('smape', 'mae', 'rmse', 'mape')}
+    
+    METHODS = [
+        'naive', 'seasonal_naive', 'moving_average', 'linear_trend',
+        'exponential_smoothing', 'seasonal_decomposition', 'ets',
+    ]
+    
+    def forecast_windows(
+        self,
+        values: np.ndarray,
+        train_ends: np.ndarray,
+        horizon: int,
+        methods: List[str] = None,
+        season_length: int = 7,
+        window: int = 7,
+        lookback: int = 30,
+        alpha: float = 0.3,
+    ) -> Dict[str, np.ndarray]:
+        """Previsões de cada baseline para várias janelas de uma vez
+        
+        A janela ``w`` treina com ``values[:train_ends[w]]`` e prevê os
+        ``horizon`` passos seguintes; o retorno tem uma matriz
+        (n_janelas × horizon) por método. Somas acumuladas e a suavização
+        exponencial são calculadas uma única vez para a série inteira, e cada
+        janela só consulta os prefixos, sem recortar DataFrames.
+        """
+        methods = methods or self.METHODS
+        values = np.asarray(values, dtype=float)
+        ends = np.asarray(train_ends, dtype=int)
+        steps = np.arange(horizon)
+        if len(values) == 0:  # sem histórico: previsão zero
+            return {method: np.zeros((len(ends), horizon)) for method in methods}
+        
+        # Naive: último valor observado (0 sem histórico)
+        last = np.where(ends > 0, values[np.maximum(ends - 1, 0)], 0.0)
+        naive = np.repeat(last[:, None], horizon, axis=1)
+        cumsum = np.concatenate([[0.0], np.cumsum(values)])
+        
+        forecasts = {}
+        for method in methods:
+            if method == 'naive':
+                forecasts[method] = naive
+            elif method == 'seasonal_naive':
+                # Mesma posição do último ciclo completo: y[t - m + (h mod m)]
+                index = ends[:, None] - season_length + (steps % season_length)[None, :]
+                seasonal = values[np.clip(index, 0, None)]
+                forecasts[method] = np.where((ends >= season_length)[:, None], seasonal, naive)
+            elif method == 'moving_average':
+                start = np.maximum(ends - window, 0)
+                average = (cumsum[ends] - cumsum[start]) / np.maximum(ends - start, 1)
+                forecasts[method] = np.where(
+                    (ends >= window)[:, None], np.repeat(average[:, None], horizon, axis=1), naive
+                )
+            elif method == 'linear_trend':
+                forecasts[method] = self._linear_trend_windows(values, ends, horizon, lookback, naive)
+            elif method == 'exponential_smoothing':
+                smoothed = pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+                level = np.where(ends > 0, smoothed[np.maximum(ends - 1, 0)], 0.0)
+                forecasts[method] = np.repeat(level[:, None], horizon, axis=1)
+            elif method == 'seasonal_decomposition':
+                forecasts[method] = self._seasonal_decomposition_windows(
+                    values, ends, horizon, season_length, naive
+                )
+            elif method == 'ets':
+                # Melhor modelo da família (SES/Holt/Holt-Winters) por janela, via AIC
+                forecasts[method] = ets_service.forecast_windows(
+                    values, ends, horizon, season_length=season_length
+                )
+            else:
+                raise ValueError(f"Método '{method}' não suportado")
+        return forecasts
+    
+    def _linear_trend_windows(
+        self, values: np.ndarray, ends: np.ndarray, horizon: int, lookback: int, naive: np.ndarray
+    ) -> np.ndarray:
+        """Regressão linear nos últimos ``lookback`` pontos de cada janela, via somas de prefixo"""
+        n = np.minimum(lookback, ends).astype(float)
+        start = ends - n.astype(int)
+        positions = np.arange(len(values), dtype=float)
+        sum_y_all = np.concatenate([[0.0], np.cumsum(values)])
+        sum_ky_all = np.concatenate([[0.0], np.cumsum(positions * values)])
+        
+        sum_y = sum_y_all[ends] - sum_y_all[start]
+        # x local = posição - início da janela de regressão
+        sum_xy = (sum_ky_all[ends] - sum_ky_all[start]) - start * sum_y
+        sum_x = n * (n - 1) / 2
+        sum_x2 = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sum_x2 - sum_x * sum_x
+        
+        valid = (ends >= 2) & (denominator != 0)
+        safe = np.where(valid, denominator, 1.0)
+        slope = np.where(valid, (n * sum_xy - sum_x * sum_y) / safe, 0.0)
+        intercept = np.where(valid, (sum_y - slope * sum_x) / np.maximum(n, 1), 0.0)
+        
+        x_future = n[:, None] + np.arange(horizon)[None, :]
+        trend = np.maximum(0, slope[:, None] * x_future + intercept[:, None])  # Evitar valores negativos
+        return np.where(valid[:, None], trend, naive)
+    
+    def _seasonal_decomposition_windows(
+        self, values: np.ndarray, ends: np.ndarray, horizon: int, season_length: int, naive: np.ndarray
+    ) -> np.ndarray:
+        """Tendência por média móvel centrada + padrão sazonal médio, para todas as janelas
+        
+        Com pelo menos ``2 * season_length`` pontos a média móvel tem
+        meia-largura fixa, então a tendência só depende da janela nos
+        últimos ``half`` pontos (truncados à direita). O resto vem de uma
+        tendência centrada única e de somas de prefixo por fase do ciclo.
+        """
+        total = len(values)
+        m = season_length
+        half = m // 2
+        enough = ends >= 2 * m
+        if not enough.any():
+            return naive
+        cumsum = np.concatenate([[0.0], np.cumsum(values)])
+        
+        # Tendência centrada (com truncamento só à esquerda)
+        index = np.arange(total)
+        lo = np.maximum(index - half, 0)
+        hi = np.minimum(index + half + 1, total)
+        centered = (cumsum[hi] - cumsum[lo]) / (hi - lo)
+        
+        # Somas de prefixo por fase: phase_sum[e, k] = Σ_{j<e, j%m==k} (y_j - tendência_j)
+        residual = np.zeros((total, m))
+        residual[index, index % m] = values - centered
+        phase_sum = np.vstack([np.zeros(m), np.cumsum(residual, axis=0)])
+        counts = np.zeros((total, m))
+        counts[index, index % m] = 1.0
+        phase_count = np.vstack([np.zeros(m), np.cumsum(counts, axis=0)])
+        
+        safe_ends = np.where(enough, ends, 2 * m).astype(int)
+        stable = safe_ends - half  # pontos cuja média móvel não encosta no fim da janela
+        sums = phase_sum[stable].copy()
+        n_phase = phase_count[stable].copy()
+        
+        # Últimos ``half`` pontos: média truncada em ``end``
+        last_trend = None
+        for offset in range(half, 0, -1):
+            j = safe_ends - offset
+            trend_j = (cumsum[safe_ends] - cumsum[np.maximum(j - half, 0)]) / (safe_ends - np.maximum(j - half, 0))
+            sums[np.arange(len(j)), j % m] += values[j] - trend_j
+            n_phase[np.arange(len(j)), j % m] += 1
+            last_trend = trend_j
+        if last_trend is None:  # half == 0 (m == 1): tendência do último ponto é o próprio valor
+            last_trend = values[safe_ends - 1]
+        
+        pattern = np.where(n_phase > 0, sums / np.maximum(n_phase, 1), 0.0)
+        # Fase do ciclo de cada passo previsto (posição absoluta na série)
+        phases = (safe_ends[:, None] + np.arange(horizon)[None, :]) % m
+        decomposition = np.maximum(0, last_trend[:, None] + np.take_along_axis(pattern, phases, axis=1))
+        return np.where(enough[:, None], decomposition, naive)
+    
+    def _forecast_single(self, df: pd.DataFrame, horizon: int, method: str, **kwargs) -> List[float]:
+        values = df['y'].to_numpy(dtype=float)
+        return self.forecast_windows(values, np.array([len(values)]), horizon, [method], **kwargs)[method][0].tolist()
     
     def naive_forecast(self, df: pd.DataFrame, horizon: int) -> List[float]:
         """Baseline Naive: usa o último valor observado"""
-        if len(df) == 0:
-            return [0.0] * horizon
-        
-        last_value = df['y'].iloc[-1]
-        return [last_value] * horizon
+        return self._forecast_single(df, horizon, 'naive')
     
     def seasonal_naive_forecast(self, df: pd.DataFrame, horizon: int, season_length: int = 7) -> List[float]:
-        """Baseline Sazonal-Naive: usa valores da mesma época do ano anterior"""
-        if len(df) < season_length:
-            # Se não tiver dados suficientes, usar naive
-            return self.naive_forecast(df, horizon)
-        
-        predictions = []
-        
-        for i in range(horizon):
-            # Pegar valor de 'season_length' dias atrás
-            if len(df) > season_length + i:
-                pred_value = df['y'].iloc[-(season_length + i)]
-            else:
-                # Se não tiver dados suficientes, usar o último valor
-                pred_value = df['y'].iloc[-1]
-            
-            predictions.append(pred_value)
-        
-        return predictions
+        """Baseline Sazonal-Naive: repete o último ciclo completo (mesmo dia da semana)"""
+        return self._forecast_single(df, horizon, 'seasonal_naive', season_length=season_length)
     
     def moving_average_forecast(self, df: pd.DataFrame, horizon: int, window: int = 7) -> List[float]:
         """Baseline Média Móvel: usa média dos últimos 'window' dias"""
-        if len(df) < window:
-            # Se não tiver dados suficientes, usar naive
-            return self.naive_forecast(df, horizon)
-        
-        last_window_avg = df['y'].tail(window).mean()
-        return [last_window_avg] * horizon
+        return self._forecast_single(df, horizon, 'moving_average', window=window)
     
     def linear_trend_forecast(self, df: pd.DataFrame, horizon: int) -> List[float]:
-        """Baseline Tendência Linear: extrapola tendência linear"""
-        if len(df) < 2:
-            return self.naive_forecast(df, horizon)
-        
-        # Calcular tendência usando os últimos 30 dias ou todos os dados se menor
-        lookback = min(30, len(df))
-        recent_data = df['y'].tail(lookback).values
-        
-        # Regressão linear simples
-        x = np.arange(len(recent_data))
-        y = recent_data
-        
-        # Calcular coeficientes
-        n = len(x)
-        sum_x = np.sum(x)
-        sum_y = np.sum(y)
-        sum_xy = np.sum(x * y)
-        sum_x2 = np.sum(x * x)
-        
-        # Evitar divisão por zero
-        if n * sum_x2 - sum_x * sum_x == 0:
-            return self.naive_forecast(df, horizon)
-        
-        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x * sum_x)
-        intercept = (sum_y - slope * sum_x) / n
-        
-        # Fazer previsões
-        predictions = []
-        for i in range(1, horizon + 1):
-            pred_value = slope * (len(recent_data) + i - 1) + intercept
-            predictions.append(max(0, pred_value))  # Evitar valores negativos
-        
-        return predictions
+        """Baseline Tendência Linear: extrapola tendência linear dos últimos 30 dias"""
+        return self._forecast_single(df, horizon, 'linear_trend')
     
     def evaluate_baseline(
         self, 
@@ -142,20 +241,9 @@ class BaselineService:
             raise ValueError("Dados de teste insuficientes")
         
         # Fazer previsão baseada no método
-        if method == 'naive':
-            predictions = self.naive_forecast(train_data, horizon)
-        elif method == 'seasonal_naive':
-            predictions = self.seasonal_naive_forecast(train_data, horizon)
-        elif method == 'moving_average':
-            predictions = self.moving_average_forecast(train_data, horizon)
-        elif method == 'linear_trend':
-            predictions = self.linear_trend_forecast(train_data, horizon)
-        elif method == 'exponential_smoothing':
-            predictions = self.exponential_smoothing_forecast(train_data, horizon)
-        elif method == 'seasonal_decomposition':
-            predictions = self.seasonal_decomposition_forecast(train_data, horizon)
-        else:
+        if method not in self.METHODS:
             raise ValueError(f"Método '{method}' não suportado")
+        predictions = self._forecast_single(train_data, horizon, method)
         
         # Garantir que temos o número correto de previsões
         predictions = predictions[:len(test_data)]
@@ -164,12 +252,7 @@ class BaselineService:
         actual = test_data['y'].values
         predicted = np.array(predictions)
         
-        metrics = {
-            'smape': self.calculate_smape(actual, predicted),
-            'mae': self.calculate_mae(actual, predicted),
-            'rmse': self.calculate_rmse(actual, predicted),
-            'mape': self.calculate_mape(actual, predicted)
-        }
+        metrics = self.calculate_metrics(actual, predicted)
         
         return BaselineResult(
             method=method,
@@ -184,58 +267,62 @@ class BaselineService:
     
     def exponential_smoothing_forecast(self, df: pd.DataFrame, horizon: int, alpha: float = 0.3) -> List[float]:
         """Baseline Suavização Exponencial: usa média ponderada com decaimento exponencial"""
-        if len(df) == 0:
-            return [0.0] * horizon
-        
-        # Calcular suavização exponencial
-        values = df['y'].values
-        smoothed = [values[0]]  # Primeiro valor
-        
-        for i in range(1, len(values)):
-            smoothed.append(alpha * values[i] + (1 - alpha) * smoothed[i-1])
-        
-        # Usar o último valor suavizado para todas as previsões
-        last_smoothed = smoothed[-1]
-        return [last_smoothed] * horizon
+        return self._forecast_single(df, horizon, 'exponential_smoothing', alpha=alpha)
     
     def seasonal_decomposition_forecast(self, df: pd.DataFrame, horizon: int, season_length: int = 7) -> List[float]:
         """Baseline Decomposição Sazonal: separa tendência e sazonalidade"""
-        if len(df) < season_length * 2:
-            return self.naive_forecast(df, horizon)
-        
-        values = df['y'].values
-        
-        # Decomposição simples: tendência + sazonalidade
-        # Calcular tendência usando média móvel
-        trend_window = min(season_length, len(values) // 2)
-        trend = []
-        for i in range(len(values)):
-            start = max(0, i - trend_window // 2)
-            end = min(len(values), i + trend_window // 2 + 1)
-            trend.append(np.mean(values[start:end]))
-        
-        # Calcular sazonalidade
-        seasonal = values - np.array(trend)
-        
-        # Média sazonal para cada posição no ciclo
-        seasonal_pattern = []
-        for i in range(season_length):
-            seasonal_values = []
-            for j in range(i, len(seasonal), season_length):
-                seasonal_values.append(seasonal[j])
-            seasonal_pattern.append(np.mean(seasonal_values) if seasonal_values else 0)
-        
-        # Fazer previsões
-        predictions = []
-        last_trend = trend[-1]
-        
-        for i in range(horizon):
-            # Extrapolar tendência (simples)
-            trend_pred = last_trend
-            seasonal_pred = seasonal_pattern[i % season_length]
-            predictions.append(max(0, trend_pred + seasonal_pred))
-        
-        return predictions
+        return self._forecast_single(df, horizon, 'seasonal_decomposition', season_length=season_length)
+    
+    def cross_validation_windows(
+        self,
+        ds: pd.Series,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
+        min_train: int = 30,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Índices (fim do treino, fim do teste) de cada janela rolante em ``ds`` ordenado"""
+        dates = pd.to_datetime(ds).to_numpy()
+        if len(dates) == 0:
+            return np.array([], dtype=int), np.array([], dtype=int)
+        cutoffs = np.arange(
+            dates[0] + np.timedelta64(initial_days, 'D'),
+            dates[-1] - np.timedelta64(horizon_days, 'D') + np.timedelta64(1, 'ns'),
+            np.timedelta64(period_days, 'D'),
+        )
+        train_ends = np.searchsorted(dates, cutoffs, side='left')
+        test_ends = np.searchsorted(dates, cutoffs + np.timedelta64(horizon_days, 'D'), side='left')
+        keep = (train_ends >= min_train) & (test_ends > train_ends)
+        return train_ends[keep], test_ends[keep]
+    
+    def cross_validate_baselines(
+        self,
+        df: pd.DataFrame,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
+        methods: List[str] = None,
+    ) -> Dict[str, BatchMetrics]:
+        """Métricas de cada baseline em todas as janelas rolantes (uma linha por janela)"""
+        df = df.assign(ds=pd.to_datetime(df['ds'])).sort_values('ds', kind='stable')
+        values = df['y'].to_numpy(dtype=float)
+        train_ends, test_ends = self.cross_validation_windows(
+            df['ds'], initial_days, horizon_days, period_days
+        )
+        if len(train_ends) == 0:
+            return {}
+        
+        # Valores reais de todas as janelas como visão deslizante (sem cópia por janela)
+        horizon = int((test_ends - train_ends).max())
+        padded = np.concatenate([values, np.full(horizon, np.nan)])
+        actual = sliding_window_view(padded, horizon)[train_ends]
+        mask = np.arange(horizon)[None, :] < (test_ends - train_ends)[:, None]
+        
+        forecasts = self.forecast_windows(values, train_ends, horizon, methods)
+        return {
+            method: batch_metrics(actual, predicted, mask, mape_zero_handling='epsilon')
+            for method, predicted in forecasts.items()
+        }
     
     def rolling_cross_validation_baselines(
         self, 
@@ -244,91 +331,44 @@ class BaselineService:
         horizon_days: int = 30,
         period_days: int = 30
     ) -> Dict[str, List[float]]:
-        """Validação cruzada para baselines"""
-        
-        df['ds'] = pd.to_datetime(df['ds'])
-        df = df.sort_values('ds').reset_index(drop=True)
-        
-        # Converter dias para timestamps
-        initial_delta = timedelta(days=initial_days)
-        horizon_delta = timedelta(days=horizon_days)
-        period_delta = timedelta(days=period_days)
-        
-        start_date = df['ds'].min()
-        end_date = df['ds'].max()
-        
-        methods = ['naive', 'seasonal_naive', 'moving_average', 'linear_trend', 'exponential_smoothing']
-        all_smape = {method: [] for method in methods}
-        
-        current_date = start_date + initial_delta
-        
-        while current_date + horizon_delta <= end_date:
-            try:
-                # Dados de treinamento e teste
-                train_end = current_date
-                test_start = current_date
-                test_end = current_date + horizon_delta
-                
-                train_data = df[df['ds'] < train_end].copy()
-                test_data = df[(df['ds'] >= test_start) & (df['ds'] < test_end)].copy()
-                
-                if len(train_data) < 30 or len(test_data) == 0:
-                    current_date += period_delta
-                    continue
-                
-                # Avaliar cada método
-                for method in methods:
-                    try:
-                        result = self.evaluate_baseline(
-                            pd.concat([train_data, test_data]), 
-                            method, 
-                            len(test_data),
-                            len(train_data)
-                        )
-                        all_smape[method].append(result.smape)
-                    except Exception as e:
-                        print(f"⚠️  Erro no método {method}: {e}")
-                
-                current_date += period_delta
-                
-            except Exception as e:
-                print(f"❌ Erro na validação cruzada: {e}")
-                current_date += period_delta
-        
-        return all_smape
+        """Validação cruzada para baselines (sMAPE de cada janela por método)"""
+        metrics = self.cross_validate_baselines(df, initial_days, horizon_days, period_days)
+        return {method: batch.smape.tolist() for method, batch in metrics.items()}
     
     def compare_all_baselines(
         self, 
         df: pd.DataFrame, 
         horizon: int,
         test_start_idx: int = None,
-        use_cross_validation: bool = False
+        use_cross_validation: bool = False,
+        initial_days: int = 365,
+        horizon_days: int = 30,
+        period_days: int = 30,
     ) -> List[BaselineResult]:
         """Compara todos os baselines disponíveis"""
         
         if use_cross_validation:
             # Usar validação cruzada
-            cv_results = self.rolling_cross_validation_baselines(df)
+            cv_results = self.cross_validate_baselines(df, initial_days, horizon_days, period_days)
             
             results = []
-            for method, smape_values in cv_results.items():
-                if smape_values:
-                    avg_smape = np.mean(smape_values)
-                    std_smape = np.std(smape_values)
-                    
-                    # Criar resultado agregado
-                    result = BaselineResult(
-                        method=method,
-                        predictions=[],
-                        actuals=[],
-                        dates=[],
-                        smape=avg_smape,
-                        mae=0,  # Não calculado na CV
-                        rmse=0,  # Não calculado na CV
-                        mape=0   # Não calculado na CV
-                    )
-                    results.append(result)
-                    print(f"✅ {method}: sMAPE = {avg_smape:.2f} ± {std_smape:.2f} (CV)")
+            for method, metrics in cv_results.items():
+                avg_smape = float(np.mean(metrics.smape))
+                std_smape = float(np.std(metrics.smape))
+                
+                # Criar resultado agregado (média das janelas)
+                result = BaselineResult(
+                    method=method,
+                    predictions=[],
+                    actuals=[],
+                    dates=[],
+                    smape=avg_smape,
+                    mae=float(np.mean(metrics.mae)),
+                    rmse=float(np.mean(metrics.rmse)),
+                    mape=float(np.mean(metrics.mape))
+                )
+                results.append(result)
+                print(f"✅ {method}: sMAPE = {avg_smape:.2f} ± {std_smape:.2f} (CV, {len(metrics)} janelas)")
             
             # Ordenar por sMAPE (menor é melhor)
             results.sort(key=lambda x: x.smape)
@@ -336,7 +376,7 @@ class BaselineService:
         
         else:
             # Avaliação simples
-            methods = ['naive', 'seasonal_naive', 'moving_average', 'linear_trend', 'exponential_smoothing', 'seasonal_decomposition']
+            methods = self.METHODS
             results = []
             
             print(f"🔍 Avaliando {len(methods)} baselines...")
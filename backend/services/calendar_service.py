@@ -1,7 +1,104 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict
-import calendar
+from typing import List, Dict, Optional, Sequence
+
+CALENDAR_START = np.datetime64('1990-01-01', 'D')
+CALENDAR_END = np.datetime64('2100-12-31', 'D')
+
+# Colunas recalculadas por treino, previsão e backtesting
+BASIC_FEATURES = ['year', 'month', 'day_of_week', 'day_of_year', 'is_weekend', 'is_winter']
+
+# Colunas de create_calendar_features, na ordem original
+PRONTO_SOCORRO_FEATURES = [
+    'is_payday', 'month_end', 'is_weekend', 'day_of_week', 'is_monday', 'is_friday',
+    'is_winter', 'is_school_holiday', 'month', 'day_of_month', 'quarter',
+]
+
+
+def compute_calendar_columns(days: np.ndarray) -> Dict[str, np.ndarray]:
+    """Todas as features de calendário para dias ``datetime64[D]`` (vetorizado)"""
+    days = np.asarray(days, dtype='datetime64[D]')
+    month_start = days.astype('datetime64[M]')
+    year = days.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = (month_start.astype(np.int64) % 12 + 1).astype(np.int8)
+    day_of_month = ((days - month_start).astype(np.int64) + 1).astype(np.int8)
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+    day_of_year = (days - days.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+    day_of_week = ((days.astype(np.int64) + 3) % 7).astype(np.int8)  # 1970-01-01 foi quinta
+    return {
+        'year': year.astype(np.int16),
+        'month': month,
+        'day_of_month': day_of_month,
+        'day_of_week': day_of_week,
+        'day_of_year': day_of_year.astype(np.int16),
+        'quarter': ((month - 1) // 3 + 1).astype(np.int8),
+        # Payday: dias 01-05 do mês (quando salários são pagos)
+        'is_payday': (day_of_month <= 5).astype(np.int8),
+        # Month end: últimos 2 dias do mês
+        'month_end': (day_of_month >= days_in_month - 1).astype(np.int8),
+        'is_weekend': (day_of_week >= 5).astype(np.int8),
+        'is_monday': (day_of_week == 0).astype(np.int8),
+        'is_friday': (day_of_week == 4).astype(np.int8),
+        # Sazonalidade brasileira (inverno: maio-setembro)
+        'is_winter': ((month >= 5) & (month <= 9)).astype(np.int8),
+        # Período de férias escolares (dezembro-fevereiro)
+        'is_school_holiday': np.isin(month, (12, 1, 2)).astype(np.int8),
+    }
+
+
+class CalendarTable:
+    """Tabela de calendário pré-calculada, indexada pelo número do dia.
+
+    Cada feature é um array NumPy com uma posição por dia entre ``start`` e
+    ``end``. Intervalos contíguos viram fatias (sem cópia) e datas
+    arbitrárias um ``take``; datas fora da tabela são calculadas na hora
+    com a mesma função, então o resultado não depende do intervalo.
+    """
+
+    def __init__(self, start: np.datetime64 = CALENDAR_START, end: np.datetime64 = CALENDAR_END):
+        self.start = np.datetime64(start, 'D')
+        self.end = np.datetime64(end, 'D')
+        self.columns = compute_calendar_columns(np.arange(self.start, self.end + 1))
+
+    def __len__(self) -> int:
+        return int((self.end - self.start).astype(np.int64)) + 1
+
+    def _positions(self, days: np.ndarray) -> np.ndarray:
+        return (days - self.start).astype(np.int64)
+
+    def lookup(self, dates, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Features das datas pedidas (qualquer ordem, repetições permitidas)"""
+        columns = list(columns or self.columns)
+        days = np.asarray(pd.DatetimeIndex(dates).values, dtype='datetime64[D]')
+        if len(days) == 0:
+            return {name: self.columns[name][:0] for name in columns}
+        positions = self._positions(days)
+        if positions.min() < 0 or positions.max() >= len(self):
+            computed = compute_calendar_columns(days)
+            return {name: computed[name] for name in columns}
+        first = positions[0]
+        if positions[-1] - first == len(positions) - 1 and np.all(np.diff(positions) == 1):
+            # Dias consecutivos: fatia da tabela
+            return {name: self.columns[name][first:first + len(positions)] for name in columns}
+        return {name: self.columns[name].take(positions) for name in columns}
+
+    def frame(self, start_date, end_date, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """DataFrame com ``ds`` diário de ``start_date`` a ``end_date`` e as features pedidas"""
+        dates = pd.date_range(start=start_date, end=end_date, freq='D')
+        return pd.DataFrame({'ds': dates, **self.lookup(dates, columns)})
+
+    def add_features(self, df: pd.DataFrame, columns: Sequence[str] = BASIC_FEATURES,
+                     date_column: str = 'ds') -> pd.DataFrame:
+        """Acrescenta (ou sobrescreve) as features em ``df``, alinhadas à coluna de datas"""
+        for name, values in self.lookup(df[date_column], columns).items():
+            df[name] = values
+        return df
+
+
+# Tabela única compartilhada por todos os serviços
+calendar_table = CalendarTable()
+
 
 class CalendarService:
     """Serviço para criar regressores de calendário específicos para pronto-socorro"""
@@ -17,47 +114,7 @@ class CalendarService:
         - is_weekend: fim de semana
         - day_of_week: dia da semana (0=segunda, 6=domingo)
         """
-        dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        features = []
-        
-        for date in dates:
-            # Payday: dias 01-05 do mês (quando salários são pagos)
-            is_payday = 1 if 1 <= date.day <= 5 else 0
-            
-            # Month end: últimos 2 dias do mês
-            last_day_of_month = calendar.monthrange(date.year, date.month)[1]
-            month_end = 1 if date.day >= (last_day_of_month - 1) else 0
-            
-            # Features básicas
-            is_weekend = 1 if date.dayofweek >= 5 else 0
-            day_of_week = date.dayofweek  # 0=segunda, 6=domingo
-            
-            # Features específicas para pronto-socorro
-            is_monday = 1 if date.dayofweek == 0 else 0  # Segunda-feira (pico comum)
-            is_friday = 1 if date.dayofweek == 4 else 0  # Sexta-feira (fim de semana)
-            
-            # Sazonalidade brasileira (inverno: maio-setembro)
-            is_winter = 1 if date.month in [5, 6, 7, 8, 9] else 0
-            
-            # Período de férias escolares (dezembro-fevereiro)
-            is_school_holiday = 1 if date.month in [12, 1, 2] else 0
-            
-            features.append({
-                'ds': date,
-                'is_payday': is_payday,
-                'month_end': month_end,
-                'is_weekend': is_weekend,
-                'day_of_week': day_of_week,
-                'is_monday': is_monday,
-                'is_friday': is_friday,
-                'is_winter': is_winter,
-                'is_school_holiday': is_school_holiday,
-                'month': date.month,
-                'day_of_month': date.day,
-                'quarter': (date.month - 1) // 3 + 1
-            })
-        
-        return pd.DataFrame(features)
+        return calendar_table.frame(start_date, end_date, PRONTO_SOCORRO_FEATURES)
     
     def get_calendar_insights(self, start_date: datetime, end_date: datetime) -> List[Dict]:
         """
@@ -65,24 +122,11 @@ class CalendarService:
         """
         insights = []
         
-        # Contar dias de payday
-        payday_count = 0
-        month_end_count = 0
-        weekend_count = 0
-        
-        current = start_date
-        while current <= end_date:
-            if 1 <= current.day <= 5:
-                payday_count += 1
-            
-            last_day = calendar.monthrange(current.year, current.month)[1]
-            if current.day >= (last_day - 1):
-                month_end_count += 1
-            
-            if current.dayofweek >= 5:
-                weekend_count += 1
-            
-            current += timedelta(days=1)
+        # Contar dias de payday, fim de mês e fim de semana
+        features = calendar_table.frame(start_date, end_date, ['is_payday', 'month_end', 'is_weekend'])
+        payday_count = int(features['is_payday'].sum())
+        month_end_count = int(features['month_end'].sum())
+        weekend_count = int(features['is_weekend'].sum())
         
         total_days = (end_date - start_date).days + 1
         
@@ -0,0 +1,191 @@
+"""Circuit breaker por API externa (CNES, SIH, BrasilAPI, OpenWeather...).
+
+Cada upstream tem uma janela móvel (``window_seconds``) com o resultado e a
+latência das chamadas recentes. Com chamadas suficientes na janela, taxa de
+erro ou de chamadas lentas acima do limite abre o circuito: durante
+``open_seconds`` as chamadas falham na hora (``CircuitOpenError``) e os
+serviços vão direto para os dados de fallback, sem esperar timeout. Depois
+disso o circuito fica meio aberto e deixa passar uma chamada de teste:
+sucesso fecha, falha reabre.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Hosts conhecidos agrupados por upstream (o resto usa o próprio host)
+UPSTREAM_HOSTS = {
+    "cnes.datasus.gov.br": "cnes",
+    "sih.datasus.gov.br": "sih",
+    "brasilapi.com.br": "brasilapi",
+    "api.openweathermap.org": "openweather",
+    "servicodados.ibge.gov.br": "ibge",
+}
+
+
+def upstream_for_host(host: str) -> str:
+    return UPSTREAM_HOSTS.get(host, host)
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Chamada recusada sem ir à rede: o circuito do upstream está aberto"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuito aberto para {upstream}; nova tentativa em {retry_after:.0f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Estado do circuito de um upstream, seguro para várias threads"""
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (instante, falhou, duração)
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self) -> Tuple[float, float]:
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, duration in self._calls if duration >= self.slow_call_seconds)
+        return failures / total, slow / total
+
+    def _open(self, now: float) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.times_opened += 1
+        print(f"🔌 Circuito aberto para {self.name}: usando fallback por {self.open_seconds:.0f}s")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                return STATE_HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """True se a chamada pode ir à rede; no meio aberto, só uma chamada de teste por vez"""
+        with self._lock:
+            now = self._clock()
+            if self._state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+                self._state = STATE_HALF_OPEN
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: Optional[bool], duration: float) -> None:
+        """Registra o fim de uma chamada permitida; ``None`` = cancelada, sem resultado"""
+        with self._lock:
+            now = self._clock()
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                if success is None:
+                    return
+                if success and duration < self.slow_call_seconds:
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                    print(f"🔌 Circuito fechado para {self.name}")
+                else:
+                    self._open(now)
+                return
+            if success is None or self._state != STATE_CLOSED:
+                return
+            self._calls.append((now, not success, duration))
+            self._prune(now)
+            if len(self._calls) >= self.min_calls:
+                error_rate, slow_rate = self._rates()
+                if error_rate >= self.error_rate_threshold or slow_rate >= self.slow_rate_threshold:
+                    self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            self._prune(self._clock())
+            error_rate, slow_rate = self._rates()
+            durations = sorted(duration for _, _, duration in self._calls)
+            return {
+                "state": state,
+                "calls_in_window": len(self._calls),
+                "error_rate": round(error_rate, 4),
+                "slow_rate": round(slow_rate, 4),
+                "p95_latency_seconds": (
+                    round(durations[int(0.95 * (len(durations) - 1))], 3) if durations else None
+                ),
+                "retry_after_seconds": (
+                    round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 1)
+                    if state == STATE_OPEN else 0.0
+                ),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Um circuito por upstream, criado na primeira chamada com a mesma configuração"""
+
+    def __init__(self, **breaker_kwargs):
+        self._breaker_kwargs = breaker_kwargs
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_host(self, host: str) -> CircuitBreaker:
+        return self.get(upstream_for_host(host))
+
+    def get(self, upstream: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(upstream)
+            if breaker is None:
+                breaker = self._breakers[upstream] = CircuitBreaker(upstream, **self._breaker_kwargs)
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
@@ -1,14 +1,16 @@
-import requests
 import json
 from typing import List, Dict, Optional
 import pandas as pd
 
+from services.http_client import HttpClient, http_client
+
 class CityService:
     """Serviço para buscar dados de cidades brasileiras"""
     
-    def __init__(self):
+    def __init__(self, http: Optional[HttpClient] = None):
         self.ibge_base_url = "https://servicodados.ibge.gov.br/api/v1"
         self.openweather_api_key = None  # Pode ser configurado via env
+        self.http = http if http is not None else http_client
     
     def search_cities(self, query: str, limit: int = 10) -> List[Dict]:
         """
@@ -123,25 +125,33 @@ class CityService:
         Busca informações completas de uma cidade
         """
         try:
-            url = f"{self.ibge_base_url}/localidades/municipios/{city_id}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            city_data = response.json()
-            
-            return {
-                'id': city_data['id'],
-                'nome': city_data['nome'],
-                'uf': city_data['microrregiao']['mesorregiao']['UF']['sigla'],
-                'estado': city_data['microrregiao']['mesorregiao']['UF']['nome'],
-                'regiao': city_data['microrregiao']['mesorregiao']['UF']['regiao']['nome'],
-                'latitude': city_data['centroide']['latitude'],
-                'longitude': city_data['centroide']['longitude']
-            }
+            city_data = self.http.get_json(f"{self.ibge_base_url}/localidades/municipios/{city_id}")
+            return self._parse_city_info(city_data)
             
         except Exception as e:
             print(f"Erro ao buscar informações da cidade {city_id}: {e}")
             return None
+    
+    async def aget_city_info(self, city_id: str) -> Optional[Dict]:
+        """Versão assíncrona de ``get_city_info``"""
+        try:
+            city_data = await self.http.aget_json(f"{self.ibge_base_url}/localidades/municipios/{city_id}")
+            return self._parse_city_info(city_data)
+        except Exception as e:
+            print(f"Erro ao buscar informações da cidade {city_id}: {e}")
+            return None
+    
+    @staticmethod
+    def _parse_city_info(city_data: Dict) -> Dict:
+        return {
+            'id': city_data['id'],
+            'nome': city_data['nome'],
+            'uf': city_data['microrregiao']['mesorregiao']['UF']['sigla'],
+            'estado': city_data['microrregiao']['mesorregiao']['UF']['nome'],
+            'regiao': city_data['microrregiao']['mesorregiao']['UF']['regiao']['nome'],
+            'latitude': city_data['centroide']['latitude'],
+            'longitude': city_data['centroide']['longitude']
+        }
 
 # Instância global do serviço
 city_service = CityService()
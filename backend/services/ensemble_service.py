@@ -1,78 +1,115 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from services.history_store import SeriesHistory, history_store, weekday_last_values
 from services.prophet_service import generate_forecast
-from services.metrics_service import metrics_service
+from services.metrics_service import batch_metrics
+from services.model_registry import model_registry
+
+# Passos do horizonte que fecham cada faixa: 1-7, 8-14, 15-30 e 31+
+DEFAULT_HORIZON_BUCKETS = (7, 14, 30)
+
+
+@dataclass
+class EnsembleWeights:
+    """Peso do Prophet no ensemble (o Naive Semanal recebe o complemento)"""
+    prophet_weight: float
+    bucket_edges: List[int] = field(default_factory=list)
+    bucket_weights: List[float] = field(default_factory=list)  # len(bucket_edges) + 1
+    source: str = 'fixed'
+    n_folds: int = 0
+    n_points: int = 0
+    fitted_at: Optional[str] = None
+
+    def prophet_weights(self, horizon: int) -> np.ndarray:
+        """Peso do Prophet para cada passo 1..horizon"""
+        steps = np.arange(1, horizon + 1)
+        if not self.bucket_weights:
+            return np.full(horizon, self.prophet_weight)
+        buckets = np.searchsorted(self.bucket_edges, steps, side='left')
+        return np.asarray(self.bucket_weights, dtype=float)[buckets]
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> 'EnsembleWeights':
+        return cls(**payload)
+
 
 class EnsembleService:
-    """Serviço para criar ensemble Prophet + NaiveSemanal"""
+    """Serviço para criar ensemble Prophet + NaiveSemanal
+
+    Os pesos padrão são fixos (0,7/0,3). Depois de um backtest,
+    ``fit_and_store_weights`` aprende pesos por série (e por faixa do
+    horizonte) a partir das previsões fora da amostra das janelas e os grava
+    no registro de modelos; ``create_ensemble_forecast`` passa a usá-los sem
+    nenhum ajuste adicional.
+    """
     
-    def __init__(self):
+    def __init__(self, horizon_buckets: Sequence[int] = DEFAULT_HORIZON_BUCKETS,
+                 min_points_per_bucket: int = 14):
         self.prophet_weight = 0.7  # Peso do Prophet
         self.naive_weight = 0.3    # Peso do Naive Semanal
+        self.horizon_buckets = tuple(horizon_buckets)
+        self.min_points_per_bucket = min_points_per_bucket
+    
+    def default_weights(self) -> EnsembleWeights:
+        return EnsembleWeights(prophet_weight=self.prophet_weight)
     
-    def naive_weekly_forecast(self, historical_data: pd.DataFrame, horizon: int) -> pd.DataFrame:
+    def get_weights(self, series_id: str) -> EnsembleWeights:
+        """Pesos aprendidos no último backtest da série, ou os fixos"""
+        metadata = model_registry.get(series_id)
+        if metadata is not None and metadata.ensemble_weights:
+            try:
+                return EnsembleWeights.from_dict(metadata.ensemble_weights)
+            except TypeError:
+                print(f"⚠️  Pesos do ensemble de '{series_id}' ilegíveis, usando os fixos")
+        return self.default_weights()
+    
+    def naive_weekly_forecast(self, historical_data, horizon: int) -> pd.DataFrame:
         """
-        Implementa Naive Semanal: usa o valor do mesmo dia da semana anterior
+        Implementa Naive Semanal: usa o último valor observado do mesmo dia da semana
+
+        ``historical_data`` pode ser um ``SeriesHistory`` (índice por dia da
+        semana já calculado) ou um DataFrame com ``ds``/``y``.
         """
-        if len(historical_data) < 7:
+        history = (
+            historical_data if isinstance(historical_data, SeriesHistory)
+            else SeriesHistory.from_frame(historical_data)
+        )
+        forecast_dates = pd.date_range(start=history.last_date + timedelta(days=1), periods=horizon, freq='D')
+
+        if len(history) < 7:
             # Se não há dados suficientes, usar média simples
-            mean_val = historical_data['y'].mean()
-            naive_forecast = pd.DataFrame({
-                'ds': pd.date_range(start=historical_data['ds'].max() + timedelta(days=1), periods=horizon, freq='D'),
-                'yhat': [mean_val] * horizon,
-                'yhat_lower': [mean_val * 0.8] * horizon,
-                'yhat_upper': [mean_val * 1.2] * horizon
-            })
-            return naive_forecast
-        
-        # Criar forecast usando Naive Semanal
-        last_date = historical_data['ds'].max()
-        forecast_dates = pd.date_range(start=last_date + timedelta(days=1), periods=horizon, freq='D')
-        
-        naive_values = []
-        naive_lower = []
-        naive_upper = []
-        
-        for date in forecast_dates:
-            # Encontrar o mesmo dia da semana na semana anterior
-            target_weekday = date.dayofweek
-            target_date = date - timedelta(weeks=1)
-            
-            # Procurar pelo valor mais próximo do mesmo dia da semana
-            same_weekday_data = historical_data[historical_data['ds'].dt.dayofweek == target_weekday]
-            
-            if len(same_weekday_data) > 0:
-                # Usar o valor mais recente do mesmo dia da semana
-                naive_val = same_weekday_data['y'].iloc[-1]
-                
-                # Calcular intervalos de confiança simples (±20%)
-                naive_lower_val = naive_val * 0.8
-                naive_upper_val = naive_val * 1.2
-            else:
-                # Fallback: usar média geral
-                naive_val = historical_data['y'].mean()
-                naive_lower_val = naive_val * 0.8
-                naive_upper_val = naive_val * 1.2
-            
-            naive_values.append(naive_val)
-            naive_lower.append(naive_lower_val)
-            naive_upper.append(naive_upper_val)
-        
+            naive_values = np.full(horizon, history.mean)
+        else:
+            naive_values = history.weekday_last[forecast_dates.dayofweek.to_numpy()]
+            # Fallback: usar média geral para dias da semana sem observação
+            naive_values = np.where(np.isnan(naive_values), history.mean, naive_values)
+
+        # Intervalos de confiança simples (±20%)
         return pd.DataFrame({
             'ds': forecast_dates,
             'yhat': naive_values,
-            'yhat_lower': naive_lower,
-            'yhat_upper': naive_upper
+            'yhat_lower': naive_values * 0.8,
+            'yhat_upper': naive_values * 1.2
         })
     
-    def create_ensemble_forecast(self, series_id: str, historical_data: pd.DataFrame, 
-                                horizon: int, future_regressors: pd.DataFrame = None) -> Dict:
+    def create_ensemble_forecast(self, series_id: str, historical_data=None,
+                                horizon: int = 30, future_regressors: pd.DataFrame = None) -> Dict:
         """
         Cria forecast ensemble combinando Prophet e Naive Semanal
+
+        Sem ``historical_data``, usa o histórico gravado no treino da série.
         """
         print(f"🎯 Criando ensemble Prophet + Naive Semanal...")
+        if historical_data is None:
+            historical_data = history_store.load(series_id)
+            if historical_data is None:
+                raise FileNotFoundError(f"Histórico de treino da série '{series_id}' não encontrado.")
         
         # 1. Forecast Prophet
         print(f"📊 Gerando forecast Prophet...")
@@ -83,14 +120,18 @@ class EnsembleService:
         naive_forecast = self.naive_weekly_forecast(historical_data, horizon)
         
         # 3. Combinar forecasts
-        print(f"🔄 Combinando forecasts (Prophet: {self.prophet_weight}, Naive: {self.naive_weight})...")
+        weights = self.get_weights(series_id)
+        prophet_weights = weights.prophet_weights(horizon)
+        print(f"🔄 Combinando forecasts (pesos {weights.source}, Prophet médio: {prophet_weights.mean():.2f})...")
         
+        # Alinhar por posição (o forecast do Prophet mantém o índice do futuro completo)
+        prophet_forecast = prophet_forecast.reset_index(drop=True)
         ensemble_forecast = prophet_forecast.copy()
         
         # Combinar valores principais
         ensemble_forecast['yhat'] = (
-            self.prophet_weight * prophet_forecast['yhat'] + 
-            self.naive_weight * naive_forecast['yhat']
+            prophet_weights * prophet_forecast['yhat'].to_numpy() + 
+            (1 - prophet_weights) * naive_forecast['yhat'].to_numpy()
         )
         
         # Combinar intervalos de confiança (mais conservador)
@@ -128,8 +169,11 @@ class EnsembleService:
             'prophet_forecast': prophet_forecast,
             'naive_forecast': naive_forecast,
             'weights': {
-                'prophet': self.prophet_weight,
-                'naive': self.naive_weight
+                'prophet': float(prophet_weights.mean()),
+                'naive': float(1 - prophet_weights.mean()),
+                'source': weights.source,
+                'bucket_edges': weights.bucket_edges,
+                'bucket_weights': weights.bucket_weights,
             },
             'statistics': {
                 'prophet_mean': prophet_mean,
@@ -138,59 +182,146 @@ class EnsembleService:
             }
         }
     
-    def evaluate_ensemble_performance(self, historical_data: pd.DataFrame, 
-                                    test_periods: int = 30) -> Dict:
+    def out_of_fold_predictions(self, fold_results, historical_data) -> Dict[str, np.ndarray]:
         """
-        Avalia performance do ensemble usando backtesting
+        Previsões fora da amostra das janelas de backtest, achatadas
+
+        O Prophet vem das próprias janelas; o Naive Semanal de cada janela é
+        calculado do histórico anterior à janela (sem ajuste nenhum).
         """
-        print(f"🔍 Avaliando performance do ensemble...")
-        
-        if len(historical_data) < test_periods + 7:
-            print(f"⚠️  Dados insuficientes para avaliação (mínimo: {test_periods + 7} dias)")
-            return {'error': 'Dados insuficientes'}
-        
-        # Dividir dados em treino e teste
-        train_data = historical_data.iloc[:-test_periods].copy()
-        test_data = historical_data.iloc[-test_periods:].copy()
-        
-        # Criar ensemble para período de teste
-        ensemble_result = self.create_ensemble_forecast(
-            'ensemble_test', train_data, test_periods
+        history = (
+            historical_data if isinstance(historical_data, SeriesHistory)
+            else SeriesHistory.from_frame(historical_data)
         )
+        columns = {name: [] for name in ('actual', 'prophet', 'naive', 'step', 'fold')}
+        for fold, result in enumerate(fold_results):
+            if not result.dates:
+                continue
+            dates = pd.DatetimeIndex(pd.to_datetime(result.dates))
+            first_day = dates[0].to_datetime64().astype('datetime64[D]').astype(np.int64)
+            n_train = int(np.searchsorted(history.days, first_day, side='left'))
+            if n_train == 0:
+                continue
+            train_y = history.y[:n_train]
+            weekday_index = weekday_last_values(history.days[:n_train], train_y)
+            naive = weekday_index[dates.dayofweek.to_numpy()]
+            naive = np.where(np.isnan(naive), train_y.mean(), naive)
+            columns['actual'].append(np.asarray(result.actuals, dtype=float))
+            columns['prophet'].append(np.asarray(result.predictions, dtype=float))
+            columns['naive'].append(naive)
+            columns['step'].append(np.arange(1, len(dates) + 1))
+            columns['fold'].append(np.full(len(dates), fold))
+        if not columns['actual']:
+            return {name: np.array([]) for name in columns}
+        return {name: np.concatenate(parts) for name, parts in columns.items()}
+    
+    @staticmethod
+    def _optimal_weight(actual: np.ndarray, prophet: np.ndarray, naive: np.ndarray) -> Optional[float]:
+        """Peso w em [0, 1] que minimiza o erro quadrático de w·Prophet + (1-w)·Naive"""
+        diff = prophet - naive
+        denominator = float(np.dot(diff, diff))
+        if denominator <= 1e-12:
+            return None  # componentes idênticos: qualquer peso serve
+        return float(np.clip(np.dot(actual - naive, diff) / denominator, 0.0, 1.0))
+    
+    def _fit_arrays(self, oof: Dict[str, np.ndarray], n_folds: int) -> EnsembleWeights:
+        actual, prophet, naive, steps = oof['actual'], oof['prophet'], oof['naive'], oof['step']
+        overall = self._optimal_weight(actual, prophet, naive)
+        if overall is None:
+            overall = self.prophet_weight
         
-        # Calcular métricas
-        ensemble_forecast = ensemble_result['ensemble_forecast']
-        prophet_forecast = ensemble_result['prophet_forecast']
-        naive_forecast = ensemble_result['naive_forecast']
+        bucket_of = np.searchsorted(self.horizon_buckets, steps, side='left')
+        bucket_weights = []
+        for bucket in range(len(self.horizon_buckets) + 1):
+            in_bucket = bucket_of == bucket
+            weight = None
+            # Faixas com poucos pontos herdam o peso geral
+            if in_bucket.sum() >= self.min_points_per_bucket:
+                weight = self._optimal_weight(actual[in_bucket], prophet[in_bucket], naive[in_bucket])
+            bucket_weights.append(overall if weight is None else weight)
         
-        # Métricas para cada método
-        ensemble_metrics = metrics_service.calculate_all_metrics(
-            test_data['y'].values, ensemble_forecast['yhat'].values
+        return EnsembleWeights(
+            prophet_weight=overall,
+            bucket_edges=list(self.horizon_buckets),
+            bucket_weights=bucket_weights,
+            source='learned',
+            n_folds=n_folds,
+            n_points=int(len(actual)),
+            fitted_at=datetime.now(UTC).isoformat(),
         )
+    
+    def fit_weights(self, fold_results, historical_data) -> EnsembleWeights:
+        """Aprende os pesos do ensemble das previsões fora da amostra do backtest"""
+        oof = self.out_of_fold_predictions(fold_results, historical_data)
+        if len(oof['actual']) == 0:
+            return self.default_weights()
+        return self._fit_arrays(oof, len(np.unique(oof['fold'])))
+    
+    def evaluate_ensemble_performance(self, fold_results, historical_data) -> Dict:
+        """
+        Compara pesos fixos e aprendidos nas previsões fora da amostra do backtest
+
+        ``learned_cv`` avalia cada janela com pesos aprendidos nas demais
+        (deixa-uma-janela-de-fora), estimativa honesta do ganho; ``learned``
+        usa os pesos ajustados em todas as janelas.
+        """
+        print(f"🔍 Avaliando performance do ensemble...")
+        oof = self.out_of_fold_predictions(fold_results, historical_data)
+        if len(oof['actual']) == 0:
+            return {'error': 'Nenhuma janela de backtest com histórico anterior'}
         
-        prophet_metrics = metrics_service.calculate_all_metrics(
-            test_data['y'].values, prophet_forecast['yhat'].values
+        actual, prophet, naive, steps, folds = (
+            oof['actual'], oof['prophet'], oof['naive'], oof['step'], oof['fold']
         )
+        fold_ids = np.unique(folds)
+        weights = self._fit_arrays(oof, len(fold_ids))
+        learned = weights.prophet_weights(int(steps.max()))[steps - 1]
         
-        naive_metrics = metrics_service.calculate_all_metrics(
-            test_data['y'].values, naive_forecast['yhat'].values
-        )
+        learned_cv = np.empty_like(learned)
+        for fold in fold_ids:
+            held_out = folds == fold
+            if len(fold_ids) == 1:
+                learned_cv[held_out] = self.prophet_weight
+                continue
+            others = {name: values[~held_out] for name, values in oof.items()}
+            fold_weights = self._fit_arrays(others, len(fold_ids) - 1)
+            learned_cv[held_out] = fold_weights.prophet_weights(int(steps.max()))[steps[held_out] - 1]
         
+        strategies = {
+            'prophet': np.ones_like(learned),
+            'naive': np.zeros_like(learned),
+            'fixed': np.full_like(learned, self.prophet_weight),
+            'learned': learned,
+            'learned_cv': learned_cv,
+        }
+        predicted = np.vstack([w * prophet + (1 - w) * naive for w in strategies.values()])
+        metrics = batch_metrics(
+            np.tile(actual, (len(strategies), 1)), predicted, mape_zero_handling='epsilon'
+        )
+        report = {
+            name: {metric: float(getattr(metrics, metric)[i]) for metric in ('smape', 'mae', 'rmse', 'mape')}
+            for i, name in enumerate(strategies)
+        }
         return {
-            'ensemble_metrics': ensemble_metrics,
-            'prophet_metrics': prophet_metrics,
-            'naive_metrics': naive_metrics,
-            'improvement_over_prophet': {
-                'mape': prophet_metrics['mape'] - ensemble_metrics['mape'],
-                'rmse': prophet_metrics['rmse'] - ensemble_metrics['rmse'],
-                'smape': prophet_metrics['smape'] - ensemble_metrics['smape']
+            'weights': weights.to_dict(),
+            'metrics': report,
+            'improvement_over_fixed': {
+                metric: report['fixed'][metric] - report['learned_cv'][metric]
+                for metric in ('smape', 'mae', 'rmse')
             },
-            'improvement_over_naive': {
-                'mape': naive_metrics['mape'] - ensemble_metrics['mape'],
-                'rmse': naive_metrics['rmse'] - ensemble_metrics['rmse'],
-                'smape': naive_metrics['smape'] - ensemble_metrics['smape']
-            }
+            'n_folds': int(len(fold_ids)),
+            'n_points': int(len(actual)),
         }
+    
+    def fit_and_store_weights(self, series_id: str, fold_results, historical_data) -> Dict:
+        """Avalia, aprende e grava os pesos da série no registro de modelos"""
+        report = self.evaluate_ensemble_performance(fold_results, historical_data)
+        if 'error' in report:
+            return {**report, 'stored': False}
+        stored = model_registry.update_ensemble_weights(series_id, report['weights'])
+        if stored:
+            print(f"✅ Pesos do ensemble gravados para '{series_id}': {report['weights']['bucket_weights']}")
+        return {**report, 'stored': stored}
 
 # Instância global do serviço
 ensemble_service = EnsembleService()
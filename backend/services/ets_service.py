@@ -0,0 +1,284 @@
+"""Suavização exponencial (SES, Holt e Holt-Winters) com ajuste em lote por grade."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+ETS_MODELS = ('simple', 'holt', 'holt_winters_additive', 'holt_winters_multiplicative')
+
+
+@dataclass
+class EtsFit:
+    """Modelo ajustado: parâmetros e estados ao fim do histórico"""
+    model: str
+    params: Dict[str, float]
+    level: float
+    trend: float
+    season: np.ndarray  # um fator por fase (posição absoluta % season_length)
+    season_length: int
+    n_obs: int
+    sse: float
+    aic: float  # sobre os erros comuns a todos os modelos comparados
+    sigma: float
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        """Previsão pontual dos ``horizon`` passos seguintes (sem valores negativos)"""
+        steps = np.arange(1, horizon + 1)
+        phi = self.params.get('phi', 1.0)
+        damped = steps.astype(float) if phi == 1.0 else np.cumsum(phi ** steps)
+        base = self.level + damped * self.trend
+        phases = (self.n_obs - 1 + steps) % self.season_length
+        if self.model == 'holt_winters_additive':
+            base = base + self.season[phases]
+        elif self.model == 'holt_winters_multiplicative':
+            base = base * self.season[phases]
+        return np.maximum(0, base)
+
+    def intervals(self, horizon: int, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+        """Intervalo aproximado pela variância dos modelos lineares de inovação"""
+        alpha = self.params.get('alpha', 0.0)
+        beta = self.params.get('beta', 0.0)
+        gamma = self.params.get('gamma', 0.0)
+        phi = self.params.get('phi', 1.0)
+        j = np.arange(1, horizon)
+        damped = j.astype(float) if phi == 1.0 else np.cumsum(phi ** j)
+        c = alpha * (1 + beta * damped) + gamma * (j % self.season_length == 0)
+        variance = self.sigma ** 2 * (1 + np.concatenate([[0.0], np.cumsum(c ** 2)]))
+        point = self.forecast(horizon)
+        spread = z * np.sqrt(variance)
+        return np.maximum(0, point - spread), point + spread
+
+
+class EtsService:
+    """Família de suavização exponencial para baselines e previsões rápidas.
+
+    Cada modelo é ajustado por busca em grade minimizando o erro quadrático
+    de um passo. SES é um filtro linear (``scipy.signal.lfilter``, um por
+    ``alpha``); Holt e Holt-Winters percorrem a série uma vez com todos os
+    candidatos da grade como vetor. Janelas rolantes que começam no início
+    da série compartilham essa passada: o SSE de cada prefixo sai da soma
+    acumulada dos erros e o estado é capturado no fim de cada janela.
+    """
+
+    def __init__(
+        self,
+        alpha_grid=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 0.95),
+        beta_grid=(0.01, 0.05, 0.1, 0.2),
+        gamma_grid=(0.01, 0.05, 0.1, 0.2, 0.3),
+        phi_grid=(0.9, 0.98, 1.0),
+    ):
+        self.alpha_grid = alpha_grid
+        self.beta_grid = beta_grid
+        self.gamma_grid = gamma_grid
+        self.phi_grid = phi_grid
+
+    def _grid(self, model: str) -> Dict[str, np.ndarray]:
+        if model == 'simple':
+            names, axes = ('alpha',), (self.alpha_grid,)
+        elif model == 'holt':
+            names, axes = ('alpha', 'beta', 'phi'), (self.alpha_grid, self.beta_grid, self.phi_grid)
+        else:
+            names = ('alpha', 'beta', 'gamma', 'phi')
+            axes = (self.alpha_grid, self.beta_grid, self.gamma_grid, self.phi_grid)
+        combos = np.array(list(product(*axes)), dtype=float)
+        return {name: combos[:, i] for i, name in enumerate(names)}
+
+    @staticmethod
+    def _n_params(model: str, season_length: int) -> int:
+        """Parâmetros de suavização + estados iniciais (para o AIC)"""
+        return {'simple': 2, 'holt': 5}.get(model, 5 + season_length)
+
+    @staticmethod
+    def _start(model: str, season_length: int) -> int:
+        """Primeiro instante com erro de um passo (antes dele só há inicialização)"""
+        return {'simple': 1, 'holt': 2}.get(model, season_length)
+
+    def _min_length(self, model: str, season_length: int) -> int:
+        if model in ('simple', 'holt'):
+            return self._start(model, season_length) + 1
+        return 2 * season_length
+
+    def _run_simple(self, values: np.ndarray, ends: np.ndarray, grid: Dict[str, np.ndarray]):
+        alphas = grid['alpha']
+        sse = np.empty((len(ends), len(alphas)))
+        level = np.empty((len(ends), len(alphas)))
+        for g, alpha in enumerate(alphas):
+            levels = np.empty(len(values))
+            levels[0] = values[0]
+            if len(values) > 1:
+                levels[1:], _ = lfilter(
+                    [alpha], [1, alpha - 1], values[1:], zi=[(1 - alpha) * values[0]]
+                )
+            errors = values[1:] - levels[:-1]
+            cumulative = np.concatenate([[0.0, 0.0], np.cumsum(errors ** 2)])
+            sse[:, g] = cumulative[ends]
+            level[:, g] = levels[ends - 1]
+        return sse, level, np.zeros_like(level), None
+
+    def _run_recursive(
+        self, values: np.ndarray, ends: np.ndarray, model: str, grid: Dict[str, np.ndarray], m: int
+    ):
+        n_candidates = len(grid['alpha'])
+        alpha, beta, phi = grid['alpha'], grid['beta'], grid['phi']
+        gamma = grid.get('gamma')
+        seasonal = model != 'holt'
+        multiplicative = model == 'holt_winters_multiplicative'
+        start = self._start(model, m)
+
+        if seasonal:
+            first, second = values[:m].mean(), values[m:2 * m].mean()
+            level = np.full(n_candidates, first)
+            trend = np.full(n_candidates, (second - first) / m)
+            initial = values[:m] / first if multiplicative else values[:m] - first
+            season = np.tile(initial, (n_candidates, 1))
+        else:
+            level = np.full(n_candidates, values[1])
+            trend = np.full(n_candidates, values[1] - values[0])
+            season = None
+
+        sse_running = np.zeros(n_candidates)
+        sse = np.full((len(ends), n_candidates), np.inf)
+        level_at = np.zeros((len(ends), n_candidates))
+        trend_at = np.zeros((len(ends), n_candidates))
+        season_at = np.zeros((len(ends), n_candidates, m)) if seasonal else None
+        capture: Dict[int, List[int]] = {}
+        for w, end in enumerate(ends):
+            capture.setdefault(int(end) - 1, []).append(w)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for t in range(start, len(values)):
+                y = values[t]
+                damped_trend = phi * trend
+                base = level + damped_trend
+                if seasonal:
+                    p = t % m
+                    s = season[:, p]
+                    predicted = base * s if multiplicative else base + s
+                    new_level = alpha * (y / s if multiplicative else y - s) + (1 - alpha) * base
+                    season[:, p] = gamma * (y / new_level if multiplicative else y - new_level) + (1 - gamma) * s
+                else:
+                    predicted = base
+                    new_level = alpha * y + (1 - alpha) * base
+                trend = beta * (new_level - level) + (1 - beta) * damped_trend
+                level = new_level
+                sse_running += (y - predicted) ** 2
+
+                for w in capture.get(t, ()):
+                    sse[w] = sse_running
+                    level_at[w] = level
+                    trend_at[w] = trend
+                    if seasonal:
+                        season_at[w] = season
+
+        sse = np.where(np.isfinite(sse), sse, np.inf)
+        return sse, level_at, trend_at, season_at
+
+    def fit_windows(
+        self,
+        values,
+        train_ends,
+        model: str = 'auto',
+        season_length: int = 7,
+    ) -> List[Optional[EtsFit]]:
+        """Ajusta um modelo por janela ``values[:end]`` (``model='auto'`` escolhe pelo AIC)"""
+        values = np.asarray(values, dtype=float)
+        ends = np.asarray(train_ends, dtype=int)
+        models = ETS_MODELS if model == 'auto' else (model,)
+        for name in models:
+            if name not in ETS_MODELS:
+                raise ValueError(f"Modelo ETS '{name}' não suportado")
+
+        best: List[Optional[EtsFit]] = [None] * len(ends)
+        # Janelas com valores não positivos não admitem sazonalidade multiplicativa
+        non_positive = np.concatenate([[0], np.cumsum(values <= 0)])
+        # AICs só são comparáveis sobre os mesmos erros: cada janela conta a partir
+        # do maior início entre os modelos que cabem nela (Holt-Winters: uma temporada)
+        common_start = np.zeros(len(ends), dtype=int)
+        for name in models:
+            fits_window = ends >= self._min_length(name, season_length)
+            common_start[fits_window] = np.maximum(
+                common_start[fits_window], self._start(name, season_length)
+            )
+        for name in models:
+            min_length = self._min_length(name, season_length)
+            usable = ends >= min_length
+            if name == 'holt_winters_multiplicative':
+                usable &= non_positive[np.minimum(ends, len(values))] == 0
+            if not usable.any():
+                continue
+
+            grid = self._grid(name)
+            window_ends = ends[usable]
+            start = self._start(name, season_length)
+            offsets = common_start[usable]
+            # Mesma passada dá o SSE até o fim da janela e até o início comum
+            lengths = np.concatenate([window_ends, offsets])
+            if name == 'simple':
+                sse, level, trend, season = self._run_simple(values, lengths, grid)
+            else:
+                sse, level, trend, season = self._run_recursive(
+                    values, lengths, name, grid, season_length
+                )
+            n_windows = len(window_ends)
+            skipped_sse = np.where((offsets <= start)[:, None], 0.0, sse[n_windows:])
+
+            chosen = np.argmin(sse[:n_windows], axis=1)
+            n_errors = window_ends - start
+            k = self._n_params(name, season_length)
+            for row, (w, g) in enumerate(zip(np.flatnonzero(usable), chosen)):
+                window_sse = float(sse[row, g])
+                if not np.isfinite(window_sse):
+                    continue
+                n = int(n_errors[row])
+                n_common = int(window_ends[row] - offsets[row])
+                common_sse = window_sse - float(skipped_sse[row, g])
+                aic = n_common * np.log(max(common_sse, 1e-12) / n_common) + 2 * k
+                if best[w] is not None and best[w].aic <= aic:
+                    continue
+                best[w] = EtsFit(
+                    model=name,
+                    params={key: float(v[g]) for key, v in grid.items()},
+                    level=float(level[row, g]),
+                    trend=float(trend[row, g]),
+                    season=season[row, g].copy() if season is not None else np.zeros(season_length),
+                    season_length=season_length,
+                    n_obs=int(window_ends[row]),
+                    sse=window_sse,
+                    aic=float(aic),
+                    sigma=float(np.sqrt(window_sse / n)),
+                )
+        return best
+
+    def fit(self, values, model: str = 'auto', season_length: int = 7) -> Optional[EtsFit]:
+        """Ajusta o modelo à série inteira (None se curta demais)"""
+        values = np.asarray(values, dtype=float)
+        return self.fit_windows(values, [len(values)], model, season_length)[0]
+
+    def forecast_windows(
+        self,
+        values,
+        train_ends,
+        horizon: int,
+        model: str = 'auto',
+        season_length: int = 7,
+    ) -> np.ndarray:
+        """Matriz (n_janelas × horizon); janelas curtas demais repetem o último valor"""
+        values = np.asarray(values, dtype=float)
+        ends = np.asarray(train_ends, dtype=int)
+        fits = self.fit_windows(values, ends, model, season_length)
+        forecasts = np.zeros((len(ends), horizon))
+        for w, (end, fitted) in enumerate(zip(ends, fits)):
+            if fitted is not None:
+                forecasts[w] = fitted.forecast(horizon)
+            elif end > 0:
+                forecasts[w] = values[end - 1]
+        return forecasts
+
+
+# Instância global do serviço
+ets_service = EtsService()
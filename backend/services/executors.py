@@ -0,0 +1,118 @@
+"""Executores limitados para tirar trabalho pesado (pandas/Prophet) do event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.config import get_settings
+
+
+class ExecutorSaturated(RuntimeError):
+    """Executor sem vagas (workers ocupados e fila cheia)"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Servidor ocupado ({name}). Tente novamente em {retry_after}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Pool de threads com limite de concorrência e de fila.
+
+    Aceita no máximo ``max_workers`` tarefas rodando e ``max_queue`` esperando;
+    acima disso ``run`` falha na hora com ``ExecutorSaturated`` em vez de
+    acumular requisições. Threads bastam aqui: o ajuste do Stan roda em
+    processo externo (CmdStan) e numpy/pandas liberam o GIL nas partes pesadas.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(self.name, self.retry_after)
+            self._in_flight += 1
+        # Preserva contextvars (ex.: contexto de log) dentro da thread
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, func, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # A vaga só é liberada quando a thread termina, mesmo se o cliente desistir
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa ``func`` no pool e aguarda sem bloquear o event loop"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "running": min(self._in_flight, self.max_workers),
+                "queued": max(0, self._in_flight - self.max_workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def offload(executor: BoundedExecutor):
+    """Decorator: transforma uma função síncrona em corrotina executada em ``executor``"""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await executor.run(func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _build_executors() -> tuple[BoundedExecutor, BoundedExecutor]:
+    settings = get_settings()
+    interactive = BoundedExecutor(
+        "interactive",
+        max_workers=settings.interactive_max_workers,
+        max_queue=settings.interactive_max_queue,
+        retry_after=settings.interactive_retry_after_seconds,
+    )
+    analytics = BoundedExecutor(
+        "analytics",
+        max_workers=settings.analytics_max_workers,
+        max_queue=settings.analytics_max_queue,
+        retry_after=settings.analytics_retry_after_seconds,
+    )
+    return interactive, analytics
+
+
+# Instâncias globais: previsões interativas e análises em lote não disputam vagas
+interactive_executor, analytics_executor = _build_executors()
@@ -0,0 +1,144 @@
+"""Armazenamento persistente (SQLite) de resultados de janelas de backtesting."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+from core.config import get_settings
+
+# Incrementar quando a forma de treinar/avaliar uma janela mudar (invalida o histórico)
+FOLD_ENGINE_VERSION = 1
+
+
+class FoldResultStore:
+    """Memoização de janelas por conteúdo: (hash dos dados, parâmetros, corte, horizonte).
+
+    Backtests e buscas repetidos sobre o mesmo CSV reaproveitam ajustes já
+    feitos, inclusive entre reinícios do servidor. Só resultados válidos são
+    guardados; janelas que falharam (ex.: timeout) são refeitas.
+    """
+
+    def __init__(self, db_path: Path, max_age_days: float = 30.0):
+        self.db_path = Path(db_path)
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._schema_ready = False
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """Cria a tabela e descarta entradas antigas no primeiro acesso"""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS fold_results ("
+            " key TEXT PRIMARY KEY, created_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        if self.max_age_days > 0:
+            conn.execute(
+                "DELETE FROM fold_results WHERE created_at < ?",
+                (time.time() - self.max_age_days * 86400,),
+            )
+        self._schema_ready = True
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._schema_ready:
+                self._ensure_schema(conn)
+            with conn:  # commit/rollback
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def data_hash(df_prep: pd.DataFrame) -> str:
+        """Hash do DataFrame preparado (colunas e valores)"""
+        digest = hashlib.sha256()
+        digest.update("|".join(map(str, df_prep.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df_prep, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(
+        data_hash: str, params: Dict[str, Any], cutoff: Any, horizon_days: int, warm_start: bool = False
+    ) -> str:
+        key = {
+            "engine": FOLD_ENGINE_VERSION,
+            "data": data_hash,
+            "params": params,
+            "cutoff": pd.Timestamp(cutoff).isoformat(),
+            "horizon": int(horizon_days),
+        }
+        if warm_start:  # ajuste pode parar em outro ótimo local; não mistura com partida a frio
+            key["warm_start"] = True
+        payload = json.dumps(
+            key,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultados já conhecidos para as chaves pedidas"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, payload FROM fold_results WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update({key: json.loads(payload) for key, payload in rows})
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fold_results (key, created_at, payload) VALUES (?, ?, ?)",
+                [(key, now, json.dumps(value, default=float)) for key, value in items.items()],
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM fold_results")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM fold_results").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _build_fold_result_store() -> Optional[FoldResultStore]:
+    settings = get_settings()
+    if not settings.fold_store_enabled:
+        return None
+    db_path = settings.fold_store_path or (
+        Path(__file__).resolve().parents[1] / "data" / "fold_results.sqlite"
+    )
+    return FoldResultStore(Path(db_path), max_age_days=settings.fold_store_max_age_days)
+
+
+# Instância global (None quando desabilitado)
+fold_result_store = _build_fold_result_store()
@@ -0,0 +1,118 @@
+"""Cache de resultados de previsão (forecast + insights) com TTL e LRU."""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from core.config import get_settings
+
+
+class ForecastResultCache:
+    """Guarda resultados de ``/forecast/predict`` por alguns minutos.
+
+    A chave é ``(series_id, versão do modelo, horizonte, hash dos regressores
+    futuros, data de início)``; como a versão do modelo faz parte da chave,
+    um novo treino nunca reaproveita resultados antigos, mesmo em outro worker.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def fingerprint_regressors(future_regressors: Optional[pd.DataFrame]) -> str:
+        """Hash estável do conteúdo do DataFrame de regressores futuros"""
+        if future_regressors is None:
+            return "none"
+        digest = hashlib.sha1()
+        digest.update("|".join(map(str, future_regressors.columns)).encode("utf-8"))
+        digest.update(
+            pd.util.hash_pandas_object(future_regressors, index=False).values.tobytes()
+        )
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(
+        series_id: str,
+        model_version: str,
+        horizon: int,
+        regressors_fingerprint: str,
+        start_date: Any,
+    ) -> Tuple:
+        return (series_id, model_version, int(horizon), regressors_fingerprint, str(start_date))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna uma cópia do valor em cache, ou None se ausente/expirado"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        stored = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_series(self, series_id: str) -> int:
+        """Remove todos os resultados da série (chamado após novo treino)"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == series_id]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def _build_forecast_cache() -> ForecastResultCache:
+    settings = get_settings()
+    return ForecastResultCache(
+        max_entries=settings.forecast_cache_max_entries,
+        ttl_seconds=settings.forecast_cache_ttl_seconds,
+    )
+
+
+# Instância global do cache de resultados
+forecast_cache = _build_forecast_cache()
@@ -0,0 +1,227 @@
+"""Regressores futuros da previsão, buscando só as fontes que o modelo usa.
+
+O modelo persistido diz quais ``extra_regressors`` precisa. Cada regressor
+pertence a uma fonte: clima (rede/cache), feriados (API/cache) ou calendário
+(tabela local). Só as fontes necessárias são consultadas, em paralelo e com
+timeout próprio; o que faltar (fonte fora do ar, lenta ou sem coordenadas)
+recebe o valor padrão. Uma busca que estourou o timeout continua ocupando seu
+worker até terminar; enquanto isso a fonte não recebe novas buscas. Um modelo só com regressores de calendário não faz
+nenhuma chamada externa.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import get_settings
+from services.calendar_service import calendar_table, compute_calendar_columns
+from services.holidays_service import holidays_service
+from services.weather_service import weather_service
+
+SOURCE_WEATHER = "weather"
+SOURCE_HOLIDAYS = "holidays"
+SOURCE_CALENDAR = "calendar"
+
+# Valor usado quando a fonte não responde (ou o dia não veio)
+REGRESSOR_DEFAULTS: Dict[str, float] = {
+    "tmax": 25.0,
+    "tmin": 15.0,
+    "precip": 0.0,
+    "temp_avg": 20.0,
+    "temp_range": 10.0,
+    "thermal_comfort": 1,
+    "respiratory_risk": 0,
+    "dehydration_risk": 0,
+    "accident_risk": 0,
+    "is_summer": 0,
+    "is_holiday": 0,
+    "is_extraordinary_event": 0,
+    "after_holiday": 0,
+    "event_impact_factor": 1.0,
+    "is_holiday_weekend": 0,
+    "is_holiday_monday": 0,
+}
+
+WEATHER_REGRESSORS = frozenset({
+    "tmax", "tmin", "precip", "temp_avg", "temp_range", "thermal_comfort",
+    "respiratory_risk", "dehydration_risk", "accident_risk", "is_summer",
+})
+HOLIDAY_REGRESSORS = frozenset({
+    "is_holiday", "is_extraordinary_event", "after_holiday", "event_impact_factor",
+    "is_holiday_weekend", "is_holiday_monday",
+})
+CALENDAR_REGRESSORS = frozenset(compute_calendar_columns(np.array([], dtype="datetime64[D]")))
+
+
+def regressor_source(name: str) -> Optional[str]:
+    """Fonte de um regressor; None para colunas enviadas pelo usuário no treino"""
+    if name in CALENDAR_REGRESSORS:
+        return SOURCE_CALENDAR
+    if name in WEATHER_REGRESSORS:
+        return SOURCE_WEATHER
+    if name in HOLIDAY_REGRESSORS:
+        return SOURCE_HOLIDAYS
+    return None
+
+
+def default_regressor_values(names: Sequence[str], dates) -> Dict[str, np.ndarray]:
+    """Valores sem fonte externa: calendário calculado localmente, o resto com o padrão"""
+    dates = pd.DatetimeIndex(dates)
+    calendar_names = [name for name in names if name in CALENDAR_REGRESSORS]
+    values = calendar_table.lookup(dates, calendar_names) if calendar_names else {}
+    for name in names:
+        if name not in values:
+            values[name] = np.full(len(dates), float(REGRESSOR_DEFAULTS.get(name, 0.0)))
+    return {name: values[name] for name in names}
+
+
+@dataclass
+class FutureRegressors:
+    """Resultado da montagem: DataFrame (``ds`` + regressores) e insights das fontes"""
+    frame: pd.DataFrame
+    weather_insights: List[Dict] = field(default_factory=list)
+    holiday_insights: List[Dict] = field(default_factory=list)
+    # Situação de cada fonte consultada: ok, timeout, stalled (busca anterior ainda presa), error ou skipped
+    sources: Dict[str, str] = field(default_factory=dict)
+
+
+class FutureRegressorBuilder:
+    """Monta o DataFrame de regressores futuros a partir dos regressores do modelo"""
+
+    def __init__(
+        self,
+        weather=None,
+        holidays=None,
+        weather_timeout_seconds: float = 5.0,
+        holidays_timeout_seconds: float = 3.0,
+        max_workers: int = 4,
+    ):
+        self.weather = weather if weather is not None else weather_service
+        self.holidays = holidays if holidays is not None else holidays_service
+        self.timeouts = {
+            SOURCE_WEATHER: weather_timeout_seconds,
+            SOURCE_HOLIDAYS: holidays_timeout_seconds,
+        }
+        # Pool próprio: a previsão já roda num worker do executor interativo
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="regressors")
+        # Buscas que estouraram o timeout e ainda ocupam um worker, por fonte
+        self._stalled: Dict[str, Future] = {}
+        self._stalled_lock = threading.Lock()
+
+    def required_sources(self, regressors: Sequence[str]) -> Dict[str, List[str]]:
+        """Regressores agrupados por fonte externa (clima/feriados)"""
+        sources: Dict[str, List[str]] = {}
+        for name in regressors:
+            source = regressor_source(name)
+            if source in (SOURCE_WEATHER, SOURCE_HOLIDAYS) and name not in sources.get(source, []):
+                sources.setdefault(source, []).append(name)
+        return sources
+
+    def _fetch_weather(self, latitude: float, longitude: float, start: pd.Timestamp,
+                       end: pd.Timestamp, horizon: int) -> Tuple[pd.DataFrame, List[Dict]]:
+        return self.weather.get_enhanced_weather_forecast(latitude, longitude, horizon, start_date=start)
+
+    def _fetch_holidays(self, latitude: float, longitude: float, start: pd.Timestamp,
+                        end: pd.Timestamp, horizon: int) -> Tuple[pd.DataFrame, List[Dict]]:
+        return self.holidays.create_enhanced_holiday_regressor(start, end)
+
+    def build(
+        self,
+        regressors: Sequence[str],
+        start_date,
+        horizon: int,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> FutureRegressors:
+        """Regressores externos (clima/feriados) de ``start_date`` em diante, uma linha por dia.
+
+        Calendário e colunas próprias do treino ficam de fora: a previsão os
+        calcula a partir das datas do próprio modelo.
+        """
+        start = pd.Timestamp(start_date).normalize()
+        dates = pd.date_range(start=start, periods=horizon, freq="D")
+        end = dates[-1] if horizon else start
+        required = self.required_sources(regressors)
+        names = [name for columns in required.values() for name in columns]
+        values = default_regressor_values(names, dates)
+        result = FutureRegressors(frame=pd.DataFrame())
+
+        fetchers: Dict[str, Callable] = {
+            SOURCE_WEATHER: self._fetch_weather,
+            SOURCE_HOLIDAYS: self._fetch_holidays,
+        }
+        pending = {}
+        for source, columns in required.items():
+            if source == SOURCE_WEATHER and (latitude is None or longitude is None):
+                result.sources[source] = "skipped"
+                continue
+            with self._stalled_lock:
+                stalled = self._stalled.get(source)
+                if stalled is not None and not stalled.done():
+                    # Não empilhar outra busca atrás da que ainda está presa
+                    result.sources[source] = "stalled"
+                    continue
+                self._stalled.pop(source, None)
+            future = self._executor.submit(fetchers[source], latitude, longitude, start, end, horizon)
+            pending[source] = (future, columns, time.monotonic() + self.timeouts[source])
+
+        first_day = int(np.datetime64(start.date(), "D").astype(np.int64))
+        for source, (future, columns, deadline) in pending.items():
+            try:
+                frame, insights = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                if not future.cancel():
+                    with self._stalled_lock:
+                        self._stalled[source] = future
+                result.sources[source] = "timeout"
+                continue
+            except Exception:
+                result.sources[source] = "error"
+                continue
+            result.sources[source] = "ok"
+            if source == SOURCE_WEATHER:
+                result.weather_insights = list(insights or [])
+            else:
+                result.holiday_insights = list(insights or [])
+            if frame is None or frame.empty:
+                continue
+            # Alinhar pela data: cada linha da fonte cai na posição do seu dia
+            positions = (
+                pd.to_datetime(frame["ds"]).to_numpy().astype("datetime64[D]").astype(np.int64) - first_day
+            )
+            in_range = (positions >= 0) & (positions < horizon)
+            for name in columns:
+                if name not in frame.columns:
+                    continue
+                source_values = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)[in_range]
+                target = values[name].astype(float)
+                valid = ~np.isnan(source_values)
+                target[positions[in_range][valid]] = source_values[valid]
+                values[name] = target
+
+        result.frame = pd.DataFrame({"ds": dates, **values})
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _build_future_regressor_builder() -> FutureRegressorBuilder:
+    settings = get_settings()
+    return FutureRegressorBuilder(
+        weather_timeout_seconds=settings.regressor_weather_timeout_seconds,
+        holidays_timeout_seconds=settings.regressor_holidays_timeout_seconds,
+        max_workers=settings.regressor_max_workers,
+    )
+
+
+# Instância global do montador de regressores
+future_regressor_builder = _build_future_regressor_builder()
@@ -0,0 +1,182 @@
+"""Histórico de treino por série em formato colunar compacto (``.npz``).
+
+O treino grava o ``ds``/``y`` já limpo (após conversão de cumulativos e
+winsorização) em ``models/history/<série>.npz``, ao lado do modelo. Cada
+arquivo guarda as datas como dias desde 1970-01-01 (``int32``), os valores
+(``float64``) e um índice com o último valor observado de cada dia da semana,
+que é tudo o que o Naive Semanal do ensemble precisa.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+HISTORY_DIR_NAME = "history"
+HISTORY_SUFFIX = ".npz"
+HISTORY_FORMAT_VERSION = 1
+
+
+def weekday_last_values(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Último valor de cada dia da semana (0=segunda); NaN se o dia não aparece.
+
+    ``days`` são dias desde a época em ordem crescente.
+    """
+    weekdays = (np.asarray(days, dtype=np.int64) + 3) % 7  # 1970-01-01 foi quinta
+    index = np.full(7, np.nan)
+    # Atribuição com índices repetidos mantém a última ocorrência
+    index[weekdays] = np.asarray(values, dtype=float)
+    return index
+
+
+@dataclass
+class SeriesHistory:
+    """Histórico limpo de uma série e o índice semanal derivado dele"""
+    days: np.ndarray  # dias desde 1970-01-01, crescentes e sem repetição
+    y: np.ndarray
+    weekday_last: np.ndarray  # 7 valores, segunda a domingo
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def ds(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days.astype("datetime64[D]"))
+
+    @property
+    def last_date(self) -> pd.Timestamp:
+        return pd.Timestamp(np.datetime64(int(self.days[-1]), "D"))
+
+    @property
+    def mean(self) -> float:
+        return float(self.y.mean()) if len(self.y) else 0.0
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"ds": self.ds, "y": self.y})
+
+    @classmethod
+    def from_arrays(cls, ds, y) -> "SeriesHistory":
+        """Normaliza datas para dia, ordena e mantém o último valor de datas repetidas"""
+        days = pd.to_datetime(pd.Series(ds)).to_numpy().astype("datetime64[D]").astype(np.int64)
+        values = np.asarray(y, dtype=float)
+        if len(days) != len(values):
+            raise ValueError("ds e y devem ter o mesmo tamanho.")
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+        if len(days):
+            # Em datas repetidas fica a última ocorrência
+            keep = np.append(days[1:] != days[:-1], True)
+            days, values = days[keep], values[keep]
+        return cls(days.astype(np.int32), values, weekday_last_values(days, values))
+
+    @classmethod
+    def from_frame(cls, dataframe: pd.DataFrame) -> "SeriesHistory":
+        return cls.from_arrays(dataframe["ds"], dataframe["y"])
+
+
+class HistoryStore:
+    """Um ``.npz`` por série, com leitura em cache e escrita atômica.
+
+    ``append`` mescla novas observações ao histórico (valores novos
+    substituem datas já existentes) e regrava o arquivo; para séries diárias
+    são alguns KB, então regravar é mais simples que um formato incremental.
+    Leituras são servidas da memória enquanto ``mtime``/tamanho do arquivo
+    não mudam, o que também enxerga escritas feitas por outros processos
+    (o treino roda em processo separado).
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self._lock = threading.RLock()
+        self._cache: Dict[str, Tuple[Tuple[int, int], SeriesHistory]] = {}
+
+    def path_for(self, series_id: str) -> Path:
+        return self.base_dir / f"{series_id}{HISTORY_SUFFIX}"
+
+    def _write(self, series_id: str, history: SeriesHistory) -> Path:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(series_id)
+        fd, tmp_name = tempfile.mkstemp(dir=self.base_dir, prefix=".history-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.savez_compressed(
+                    handle,
+                    format_version=np.int8(HISTORY_FORMAT_VERSION),
+                    days=history.days,
+                    y=history.y,
+                    weekday_last=history.weekday_last,
+                )
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        with self._lock:
+            stat_result = path.stat()
+            self._cache[series_id] = ((stat_result.st_mtime_ns, stat_result.st_size), history)
+        return path
+
+    def save(self, series_id: str, dataframe: pd.DataFrame) -> SeriesHistory:
+        """Substitui o histórico da série pelo ``ds``/``y`` de ``dataframe``"""
+        history = SeriesHistory.from_frame(dataframe)
+        self._write(series_id, history)
+        return history
+
+    def append(self, series_id: str, dataframe: pd.DataFrame) -> SeriesHistory:
+        """Acrescenta observações ao histórico existente (ou cria um novo)"""
+        with self._lock:
+            current = self.load(series_id)
+            if current is None:
+                return self.save(series_id, dataframe)
+            new = SeriesHistory.from_frame(dataframe)
+            # Concatenar antigo + novo: em datas repetidas o novo prevalece
+            history = SeriesHistory.from_arrays(
+                np.concatenate([current.days, new.days]).astype("datetime64[D]"),
+                np.concatenate([current.y, new.y]),
+            )
+            self._write(series_id, history)
+            return history
+
+    def load(self, series_id: str) -> Optional[SeriesHistory]:
+        """Histórico persistido da série, ou None se ela nunca foi treinada"""
+        path = self.path_for(series_id)
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._cache.pop(series_id, None)
+            return None
+        identity = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            cached = self._cache.get(series_id)
+            if cached is not None and cached[0] == identity:
+                return cached[1]
+        with np.load(path) as payload:
+            history = SeriesHistory(
+                days=payload["days"],
+                y=payload["y"],
+                weekday_last=payload["weekday_last"],
+            )
+        with self._lock:
+            self._cache[series_id] = (identity, history)
+        return history
+
+    def delete(self, series_id: str) -> bool:
+        with self._lock:
+            self._cache.pop(series_id, None)
+            try:
+                self.path_for(series_id).unlink()
+            except FileNotFoundError:
+                return False
+            return True
+
+
+# Instância global (mesmo diretório de modelos usado por services.prophet_service)
+history_store = HistoryStore(Path(__file__).resolve().parents[1] / "models" / HISTORY_DIR_NAME)
@@ -1,32 +1,167 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import pandas as pd
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-import requests
 import numpy as np
 
+from core.config import get_settings
+from services.http_client import HttpClient, http_client
+
+HOLIDAYS_CACHE_VERSION = 1
+
+
 class HolidaysService:
-    """Serviço para buscar feriados brasileiros e eventos extraordinários"""
+    """Serviço para buscar feriados brasileiros e eventos extraordinários
+
+    Os feriados de cada ano são buscados na BrasilAPI uma única vez:
+    ficam memorizados no processo e gravados em ``cache_path`` (JSON) por
+    ``cache_ttl_days``. Sem rede, usa-se o calendário calculado localmente
+    (mantido só em memória, para a BrasilAPI ser consultada no próximo
+    processo). Os regressores são montados com aritmética vetorizada de
+    datas sobre esses conjuntos.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache_path: Optional[Path] = None,
+        cache_ttl_days: float = 365.0,
+        use_api: bool = True,
+        http: Optional[HttpClient] = None,
+    ):
         self.brasil_api_url = "https://brasilapi.com.br/api/feriados/v1"
         self.extraordinary_events = self._load_extraordinary_events()
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache_ttl_days = cache_ttl_days
+        self.use_api = use_api
+        self.http = http if http is not None else http_client
+        self._lock = threading.RLock()
+        self._years: Dict[int, List[Dict]] = {}
+        self._year_days: Dict[int, np.ndarray] = {}
+        self._file_years: Optional[Dict[str, Dict]] = None
+        # Limites dos eventos como dias (datetime64[D]), convertidos uma vez
+        self._event_bounds = np.array(
+            [[event["start_date"], event["end_date"]] for event in self.extraordinary_events],
+            dtype="datetime64[D]",
+        ).reshape(-1, 2)
+        self._event_impacts = np.array(
+            [event["impact_factor"] for event in self.extraordinary_events], dtype=float
+        )
+        self.api_calls = 0
     
     def get_holidays(self, year: int) -> List[Dict]:
         """
         Busca feriados brasileiros para um ano específico
         """
-        try:
-            # Tentar usar BrasilAPI
-            response = requests.get(f"{self.brasil_api_url}/{year}", timeout=10)
-            if response.status_code == 200:
-                holidays = response.json()
-                return [{"date": h["date"], "name": h["name"]} for h in holidays]
-        except Exception as e:
-            print(f"⚠️  Erro ao buscar feriados da BrasilAPI: {e}")
+        with self._lock:
+            cached = self._cached_year(year)
+        if cached is None:
+            # BrasilAPI fora do lock: anos já memorizados não esperam uma busca lenta
+            cached = self._fetch_holidays(year)
+        with self._lock:
+            self._years[year] = cached
+        return list(cached)
+    
+    async def aget_holidays(self, year: int) -> List[Dict]:
+        """Versão assíncrona de ``get_holidays`` (a BrasilAPI é aguardada fora do lock)"""
+        with self._lock:
+            cached = self._cached_year(year)
+        if cached is None:
+            cached = await self._afetch_holidays(year)
+        with self._lock:
+            self._years[year] = cached
+        return list(cached)
+    
+    def _cached_year(self, year: int) -> Optional[List[Dict]]:
+        cached = self._years.get(year)
+        if cached is None:
+            cached = self._read_cached_year(year)
+        return cached
+    
+    def _remember_api_year(self, year: int, data: List[Dict]) -> List[Dict]:
+        holidays = [{"date": h["date"], "name": h["name"]} for h in data]
+        with self._lock:
+            self._write_cached_year(year, holidays, "brasilapi")
+        return holidays
+    
+    def _fetch_holidays(self, year: int) -> List[Dict]:
+        if self.use_api:
+            try:
+                # Tentar usar BrasilAPI
+                self.api_calls += 1
+                return self._remember_api_year(year, self.http.get_json(f"{self.brasil_api_url}/{year}"))
+            except Exception as e:
+                print(f"⚠️  Erro ao buscar feriados da BrasilAPI: {e}")
         
         # Fallback: feriados fixos brasileiros
         return self._get_fixed_holidays(year)
     
+    async def _afetch_holidays(self, year: int) -> List[Dict]:
+        if self.use_api:
+            try:
+                self.api_calls += 1
+                data = await self.http.aget_json(f"{self.brasil_api_url}/{year}")
+                return self._remember_api_year(year, data)
+            except Exception as e:
+                print(f"⚠️  Erro ao buscar feriados da BrasilAPI: {e}")
+        
+        return self._get_fixed_holidays(year)
+    
+    # ------------------------------------------------------------ cache em arquivo
+    def _load_cache_file(self) -> Dict[str, Dict]:
+        if self._file_years is None:
+            self._file_years = {}
+            if self.cache_path is not None:
+                try:
+                    with open(self.cache_path, encoding="utf-8") as handle:
+                        payload = json.load(handle)
+                    if payload.get("version") == HOLIDAYS_CACHE_VERSION:
+                        self._file_years = payload.get("years", {})
+                except FileNotFoundError:
+                    pass
+                except (OSError, json.JSONDecodeError) as exc:
+                    print(f"⚠️  Cache de feriados ilegível, ignorando: {exc}")
+        return self._file_years
+    
+    def _read_cached_year(self, year: int) -> Optional[List[Dict]]:
+        entry = self._load_cache_file().get(str(year))
+        if entry is None:
+            return None
+        if self.cache_ttl_days > 0 and time.time() - entry["fetched_at"] > self.cache_ttl_days * 86400:
+            return None
+        return entry["holidays"]
+    
+    def _write_cached_year(self, year: int, holidays: List[Dict], source: str) -> None:
+        years = self._load_cache_file()
+        years[str(year)] = {"fetched_at": time.time(), "source": source, "holidays": holidays}
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_path.parent, prefix=".holidays-", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump({"version": HOLIDAYS_CACHE_VERSION, "years": years}, handle, ensure_ascii=False)
+            os.replace(tmp_name, self.cache_path)
+        except OSError as exc:
+            print(f"⚠️  Não foi possível gravar o cache de feriados: {exc}")
+    
+    def holiday_days(self, start_year: int, end_year: int) -> np.ndarray:
+        """Datas de feriado (``datetime64[D]``, ordenadas) dos anos no intervalo"""
+        parts = []
+        for year in range(start_year, end_year + 1):
+            days = self._year_days.get(year)
+            if days is None:
+                days = np.unique(np.array([h["date"] for h in self.get_holidays(year)], dtype="datetime64[D]"))
+                self._year_days[year] = days
+            parts.append(days)
+        if not parts:
+            return np.array([], dtype="datetime64[D]")
+        return np.concatenate(parts)
+    
     def _get_fixed_holidays(self, year: int) -> List[Dict]:
         """
         Lista de feriados fixos brasileiros
@@ -82,32 +217,12 @@ class HolidaysService:
         Cria um DataFrame com regressor de feriados para um período
         """
         dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        holiday_data = []
-        
-        # Buscar feriados para os anos no período
-        years = list(range(start_date.year, end_date.year + 1))
-        all_holidays = []
-        
-        for year in years:
-            all_holidays.extend(self.get_holidays(year))
-        
-        # Converter para DataFrame
-        holiday_df = pd.DataFrame(all_holidays)
-        if not holiday_df.empty:
-            holiday_df['date'] = pd.to_datetime(holiday_df['date'])
-        
-        # Criar regressor
-        for date in dates:
-            is_holiday = 0
-            if not holiday_df.empty:
-                is_holiday = 1 if date.date() in holiday_df['date'].dt.date.values else 0
-            
-            holiday_data.append({
-                'ds': date,
-                'is_holiday': is_holiday
-            })
-        
-        return pd.DataFrame(holiday_data)
+        days = dates.to_numpy().astype('datetime64[D]')
+        holidays = self.holiday_days(start_date.year, end_date.year)
+        return pd.DataFrame({
+            'ds': dates,
+            'is_holiday': np.isin(days, holidays).astype(int)
+        })
     
     def _load_extraordinary_events(self) -> List[Dict]:
         """
@@ -175,7 +290,6 @@ class HolidaysService:
         Retorna: (DataFrame com regressores, Lista de insights)
         """
         dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        regressor_data = []
         insights = []
         
         # Buscar feriados
@@ -185,11 +299,6 @@ class HolidaysService:
         for year in years:
             all_holidays.extend(self.get_holidays(year))
         
-        # Converter para DataFrame
-        holiday_df = pd.DataFrame(all_holidays)
-        if not holiday_df.empty:
-            holiday_df['date'] = pd.to_datetime(holiday_df['date'])
-        
         # Buscar eventos extraordinários
         extraordinary_events = self.get_extraordinary_events(start_date, end_date)
         
@@ -201,47 +310,35 @@ class HolidaysService:
         event_insights = self._analyze_extraordinary_events(extraordinary_events, start_date, end_date)
         insights.extend(event_insights)
         
-        # Criar regressores
-        for date in dates:
-            is_holiday = 0
-            is_extraordinary_event = 0
-            event_impact = 1.0
-            after_holiday = 0  # NOVO: Efeito rebote pós-feriado
-            
-            # Verificar se é feriado
-            if not holiday_df.empty:
-                is_holiday = 1 if date.date() in holiday_df['date'].dt.date.values else 0
-            
-            # NOVO: Verificar se é o primeiro dia útil após um feriado
-            if not holiday_df.empty and not is_holiday:
-                # Procurar feriados nos últimos 3 dias
-                for i in range(1, 4):
-                    prev_date = date - timedelta(days=i)
-                    if prev_date.date() in holiday_df['date'].dt.date.values:
-                        # Se é dia útil (segunda a sexta) e não é feriado
-                        if date.dayofweek < 5:
-                            after_holiday = 1
-                            break
-            
-            # Verificar eventos extraordinários
-            for event in extraordinary_events:
-                event_start = datetime.strptime(event["start_date"], "%Y-%m-%d").date()
-                event_end = datetime.strptime(event["end_date"], "%Y-%m-%d").date()
-                
-                if event_start <= date.date() <= event_end:
-                    is_extraordinary_event = 1
-                    event_impact = event["impact_factor"]
-                    break
-            
-            regressor_data.append({
-                'ds': date,
-                'is_holiday': is_holiday,
-                'is_extraordinary_event': is_extraordinary_event,
-                'after_holiday': after_holiday,  # NOVO: Efeito rebote
-                'event_impact_factor': event_impact,
-                'is_holiday_weekend': 1 if is_holiday and date.weekday() >= 5 else 0,
-                'is_holiday_monday': 1 if is_holiday and date.weekday() == 0 else 0
-            })
+        # Criar regressores (vetorizado sobre as datas)
+        days = dates.to_numpy().astype('datetime64[D]')
+        weekday = dates.dayofweek.to_numpy()
+        holidays = self.holiday_days(start_date.year, end_date.year)
+        is_holiday = np.isin(days, holidays)
+        
+        # Efeito rebote: dia útil, não feriado, com feriado nos 3 dias anteriores
+        recent_holiday = np.zeros(len(days), dtype=bool)
+        for lag in range(1, 4):
+            recent_holiday |= np.isin(days - lag, holidays)
+        after_holiday = recent_holiday & ~is_holiday & (weekday < 5)
+        
+        # Eventos extraordinários: vale o primeiro evento (na ordem cadastrada) que cobre o dia
+        is_extraordinary_event = np.zeros(len(days), dtype=bool)
+        event_impact = np.ones(len(days))
+        for (event_start, event_end), impact in zip(self._event_bounds, self._event_impacts):
+            in_event = (days >= event_start) & (days <= event_end) & ~is_extraordinary_event
+            event_impact[in_event] = impact
+            is_extraordinary_event |= in_event
+        
+        regressor_data = {
+            'ds': dates,
+            'is_holiday': is_holiday.astype(int),
+            'is_extraordinary_event': is_extraordinary_event.astype(int),
+            'after_holiday': after_holiday.astype(int),
+            'event_impact_factor': event_impact,
+            'is_holiday_weekend': (is_holiday & (weekday >= 5)).astype(int),
+            'is_holiday_monday': (is_holiday & (weekday == 0)).astype(int)
+        }
         
         return pd.DataFrame(regressor_data), insights
     
@@ -309,5 +406,17 @@ class HolidaysService:
         
         return insights
 
+def _build_holidays_service() -> HolidaysService:
+    settings = get_settings()
+    cache_path = settings.holidays_cache_path or (
+        Path(__file__).resolve().parents[1] / "data" / "holidays_cache.json"
+    )
+    return HolidaysService(
+        cache_path=Path(cache_path),
+        cache_ttl_days=settings.holidays_cache_ttl_days,
+        use_api=settings.holidays_api_enabled,
+    )
+
+
 # Instância global do serviço
-holidays_service = HolidaysService()
\ No newline at end of file
+holidays_service = _build_holidays_service()
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""Cliente HTTP compartilhado (httpx) para as APIs externas.
+
+Um único pool de conexões keep-alive atende clima, feriados, IBGE e
+Datasus, com limite de requisições simultâneas por host para não
+sobrecarregar nenhuma API. Há duas faces com a mesma configuração:
+
+- ``get``/``get_json``: síncronas, para código que já roda em threads
+  (executores, treino);
+- ``aget``/``aget_json``: assíncronas, para endpoints que consultam várias
+  fontes ao mesmo tempo sem ocupar workers do threadpool.
+
+Cada upstream passa por um circuit breaker (``services.circuit_breaker``):
+com o circuito aberto a chamada falha na hora com ``CircuitOpenError``
+(um ``httpx.HTTPError``), e o serviço cai no seu fallback sem esperar o
+timeout. HTTP/2 é usado quando o pacote opcional ``h2`` está instalado. Testes
+injetam um ``transport`` (ex.: ``httpx.MockTransport``) e nenhuma
+requisição sai da máquina.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+
+from core.config import get_settings
+from services.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+# Cabeçalhos HTTP precisam ser ASCII
+DEFAULT_USER_AGENT = "HospiCast/1.0 (Sistema de Previsao Hospitalar)"
+
+
+def _h2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _upstream_failure(status_code: int) -> bool:
+    """Status que indicam problema no upstream (4xx de uso, como chave inválida, não contam)"""
+    return status_code >= 500 or status_code == 429
+
+
+class HttpClient:
+    """Pool HTTP compartilhado com limite de concorrência por host.
+
+    O cliente assíncrono fica preso ao event loop em que foi criado; se o
+    loop mudar (ex.: testes), um novo cliente e novos semáforos são criados.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        per_host_limit: int = 8,
+        http2: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.per_host_limit = max(1, per_host_limit)
+        self.http2 = http2 and _h2_available()
+        self.headers = {"User-Agent": DEFAULT_USER_AGENT, "Accept": "application/json", **(headers or {})}
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        # Circuito por upstream (None desliga); rejeições não chegam à rede
+        self.breakers = breakers
+        self.rejected: Counter = Counter()
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "timeout": self.timeout,
+            "headers": self.headers,
+            "follow_redirects": True,
+        }
+        if self.transport is not None:
+            # Transporte injetado (testes) dispensa pool e HTTP/2
+            kwargs["transport"] = self.transport
+        else:
+            kwargs["limits"] = self.limits
+            kwargs["http2"] = self.http2
+        return kwargs
+
+    # ------------------------------------------------------------------ síncrono
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_kwargs())
+            return self._client
+
+    def _sync_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def _admit(self, host: str) -> Optional[CircuitBreaker]:
+        """Circuito do host; falha na hora (``CircuitOpenError``) se estiver aberto"""
+        if self.breakers is None:
+            return None
+        breaker = self.breakers.for_host(host)
+        if not breaker.allow():
+            self.rejected[host] += 1
+            raise CircuitOpenError(breaker.name, breaker.retry_after())
+        return breaker
+
+    def get(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> httpx.Response:
+        """GET com erro (``httpx.HTTPError``) para falhas de rede e status 4xx/5xx"""
+        host = httpx.URL(url).host
+        client = self._sync_client()
+        breaker = self._admit(host)
+        with self._sync_slot(host):
+            self.requests[host] += 1
+            started = time.monotonic()
+            success = None
+            try:
+                response = client.get(url, params=params, timeout=timeout or self.timeout)
+                success = not _upstream_failure(response.status_code)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                self.errors[host] += 1
+                success = bool(success)
+                raise
+            finally:
+                if breaker is not None:
+                    breaker.record(success, time.monotonic() - started)
+        return response
+
+    def get_json(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        return self.get(url, params=params, timeout=timeout).json()
+
+    # --------------------------------------------------------------- assíncrono
+    def _loop_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(**self._client_kwargs())
+            self._async_loop = loop
+            self._async_host_slots = {}
+        return self._async_client
+
+    def _async_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._async_host_slots.get(host)
+        if slot is None:
+            slot = self._async_host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slot
+
+    async def aget(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> httpx.Response:
+        """Versão assíncrona de ``get``; requisições além do limite do host aguardam a vez"""
+        host = httpx.URL(url).host
+        client = self._loop_client()
+        breaker = self._admit(host)
+        async with self._async_slot(host):
+            self.requests[host] += 1
+            started = time.monotonic()
+            success = None
+            try:
+                response = await client.get(url, params=params, timeout=timeout or self.timeout)
+                success = not _upstream_failure(response.status_code)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                self.errors[host] += 1
+                success = bool(success)
+                raise
+            finally:
+                if breaker is not None:
+                    breaker.record(success, time.monotonic() - started)
+        return response
+
+    async def aget_json(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        response = await self.aget(url, params=params, timeout=timeout)
+        return response.json()
+
+    # ------------------------------------------------------------------ ciclo de vida
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self) -> None:
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_loop = None
+        self._async_host_slots = {}
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "per_host_limit": self.per_host_limit,
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "rejected": dict(self.rejected),
+            "breakers": self.breakers.snapshot() if self.breakers is not None else {},
+        }
+
+
+def _build_http_client() -> HttpClient:
+    settings = get_settings()
+    return HttpClient(
+        timeout=settings.http_timeout_seconds,
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        per_host_limit=settings.http_per_host_limit,
+        http2=settings.http_http2_enabled,
+        breakers=CircuitBreakerRegistry(
+            window_seconds=settings.circuit_window_seconds,
+            min_calls=settings.circuit_min_calls,
+            error_rate_threshold=settings.circuit_error_rate_threshold,
+            slow_call_seconds=settings.circuit_slow_call_seconds,
+            slow_rate_threshold=settings.circuit_slow_rate_threshold,
+            open_seconds=settings.circuit_open_seconds,
+        ) if settings.circuit_breaker_enabled else None,
+    )
+
+
+# Instância global compartilhada pelos serviços de dados externos
+http_client = _build_http_client()
@@ -0,0 +1,133 @@
+"""Otimizador TPE (Tree-structured Parzen Estimator) para espaços discretos."""
+
+from __future__ import annotations
+
+import math
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class TPEOptimizer:
+    """Propõe hiperparâmetros com TPE sobre um espaço de listas de valores.
+
+    As observações são divididas entre "boas" (melhor ``gamma``) e "ruins";
+    para cada parâmetro é estimada uma densidade em cada grupo e os candidatos
+    são escolhidos pela maior razão ``l(x) / g(x)``. Valores numéricos usam um
+    kernel gaussiano sobre a posição na lista (vizinhos compartilham massa);
+    valores categóricos (ex.: ``seasonality_mode``, ``growth``) usam contagens
+    suavizadas. Lotes são propostos com a estratégia "constant liar": cada
+    proposta pendente entra como observação ruim até ser avaliada.
+    """
+
+    def __init__(
+        self,
+        param_spaces: Dict[str, Sequence[Any]],
+        n_startup: int = 5,
+        gamma: float = 0.25,
+        n_ei_candidates: int = 24,
+        seed: Optional[int] = None,
+    ):
+        self.param_spaces = {name: list(values) for name, values in param_spaces.items()}
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_ei_candidates = n_ei_candidates
+        self._rng = random.Random(seed)
+        self.observations: List[Tuple[Dict[str, Any], float]] = []
+
+    @staticmethod
+    def _is_numeric(values: Sequence[Any]) -> bool:
+        return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+    @staticmethod
+    def _key(params: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(params.items()))
+
+    @property
+    def space_size(self) -> int:
+        return math.prod(len(values) for values in self.param_spaces.values())
+
+    def observe(self, params: Dict[str, Any], loss: float) -> None:
+        """Registra o resultado (menor é melhor) de uma configuração avaliada"""
+        if math.isfinite(loss):
+            self.observations.append((dict(params), float(loss)))
+
+    def _random_params(self) -> Dict[str, Any]:
+        return {name: self._rng.choice(values) for name, values in self.param_spaces.items()}
+
+    def _density(self, name: str, group: List[Dict[str, Any]]) -> List[float]:
+        """Probabilidade de cada valor do parâmetro dado um grupo de observações"""
+        values = self.param_spaces[name]
+        n_values = len(values)
+        # Prior uniforme com peso de uma observação evita densidade zero
+        weights = [1.0 / n_values] * n_values
+        if self._is_numeric(values):
+            bandwidth = max(0.5, n_values / (len(group) + 1) / 2)
+            for params in group:
+                center = values.index(params[name])
+                kernel = [math.exp(-0.5 * ((i - center) / bandwidth) ** 2) for i in range(n_values)]
+                total = sum(kernel)
+                weights = [w + k / total for w, k in zip(weights, kernel)]
+        else:
+            for params in group:
+                weights[values.index(params[name])] += 1.0
+        total = sum(weights)
+        return [w / total for w in weights]
+
+    def _split(self, observations: List[Tuple[Dict[str, Any], float]]):
+        ranked = sorted(observations, key=lambda item: item[1])
+        n_good = max(1, int(math.ceil(self.gamma * len(ranked))))
+        return [p for p, _ in ranked[:n_good]], [p for p, _ in ranked[n_good:]]
+
+    def _propose_one(self, observations, excluded: set) -> Dict[str, Any]:
+        if len(observations) < self.n_startup:
+            for _ in range(100):
+                params = self._random_params()
+                if self._key(params) not in excluded:
+                    return params
+            return self._random_params()
+
+        good, bad = self._split(observations)
+        good_density = {name: self._density(name, good) for name in self.param_spaces}
+        bad_density = {name: self._density(name, bad) for name in self.param_spaces}
+
+        best_params, best_score = None, -math.inf
+        for _ in range(self.n_ei_candidates):
+            params, score = {}, 0.0
+            for name, values in self.param_spaces.items():
+                index = self._rng.choices(range(len(values)), weights=good_density[name])[0]
+                params[name] = values[index]
+                score += math.log(good_density[name][index]) - math.log(bad_density[name][index])
+            if self._key(params) in excluded:
+                continue
+            if score > best_score:
+                best_params, best_score = params, score
+        if best_params is None:  # todos os sorteados já avaliados
+            for _ in range(100):
+                params = self._random_params()
+                if self._key(params) not in excluded:
+                    return params
+            return self._random_params()
+        return best_params
+
+    def suggest(self, batch_size: int = 1) -> List[Dict[str, Any]]:
+        """Propõe ``batch_size`` configurações distintas e ainda não avaliadas"""
+        excluded = {self._key(params) for params, _ in self.observations}
+        observations = list(self.observations)
+        liar = max((loss for _, loss in observations), default=0.0)
+        batch = []
+        for _ in range(batch_size):
+            if len(excluded) >= self.space_size:
+                break
+            params = self._propose_one(observations, excluded)
+            excluded.add(self._key(params))
+            observations.append((params, liar))
+            batch.append(params)
+        return batch
+
+    def convergence_curve(self) -> List[float]:
+        """Melhor perda conhecida após cada avaliação"""
+        curve, best = [], math.inf
+        for _, loss in self.observations:
+            best = min(best, loss)
+            curve.append(best)
+        return curve
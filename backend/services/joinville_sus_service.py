@@ -1,13 +1,17 @@
-import requests
+import httpx
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import json
 import logging
 from urllib.parse import urlencode
 
+from services.circuit_breaker import CircuitOpenError, upstream_for_host
+from services.http_client import HttpClient, http_client
+from services.response_cache import ResponseCache, response_cache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,16 +53,12 @@ class JoinvilleSusData:
 class JoinvilleSusService:
     """Serviço para dados reais dos hospitais públicos de Joinville via SUS"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'HospiCast/1.0 (Sistema de Previsão Hospitalar)',
-            'Accept': 'application/json'
-        })
+    def __init__(self, http: Optional[HttpClient] = None, cache: Optional[ResponseCache] = None):
+        # Cliente HTTP compartilhado (pool keep-alive e limite por host)
+        self.http = http if http is not None else http_client
         
-        # Cache para dados
-        self.cache = {}
-        self.cache_timeout = 1800  # 30 minutos
+        # Cache de respostas compartilhado (TTL por fonte, stale-while-revalidate)
+        self.cache = cache if cache is not None else response_cache
         
         # Hospitais públicos de Joinville (dados reais conhecidos)
         self.hospitals = self._load_joinville_hospitals()
@@ -145,28 +145,46 @@ class JoinvilleSusService:
         return [JoinvilleSusHospital(**hospital) for hospital in hospitals_data]
     
     def _make_request(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
-        """Faz requisição HTTP com tratamento de erros"""
+        """Faz requisição HTTP com cache compartilhado e tratamento de erros"""
+        source = upstream_for_host(httpx.URL(url).host)
+        return self.cache.get_or_fetch(
+            source, ResponseCache.make_key(source, url, params),
+            lambda: self._fetch(url, params, timeout),
+        )
+    
+    async def _amake_request(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        """Versão assíncrona de ``_make_request`` (mesmo cache)"""
+        source = upstream_for_host(httpx.URL(url).host)
+        return await self.cache.aget_or_fetch(
+            source, ResponseCache.make_key(source, url, params),
+            lambda: self._afetch(url, params, timeout),
+        )
+    
+    def _fetch(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        """Requisição ao upstream; ``None`` em caso de erro (não vai para o cache)"""
         try:
-            cache_key = f"{url}_{json.dumps(params or {}, sort_keys=True)}"
-            
-            # Verificar cache
-            if cache_key in self.cache:
-                cached_data, timestamp = self.cache[cache_key]
-                if datetime.now().timestamp() - timestamp < self.cache_timeout:
-                    return cached_data
-            
             logger.info(f"Fazendo requisição para: {url}")
-            response = self.session.get(url, params=params, timeout=timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Salvar no cache
-            self.cache[cache_key] = (data, datetime.now().timestamp())
-            
-            return data
-            
-        except requests.exceptions.RequestException as e:
+            return self.http.get_json(url, params=params, timeout=timeout)
+        except CircuitOpenError as e:
+            # Upstream instável: fallback imediato, sem esperar timeout
+            logger.debug(f"Requisição para {url} recusada: {e}")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"Erro na requisição para {url}: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"Erro ao decodificar JSON de {url}: {e}")
+            return None
+    
+    async def _afetch(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        try:
+            logger.info(f"Fazendo requisição para: {url}")
+            return await self.http.aget_json(url, params=params, timeout=timeout)
+        except CircuitOpenError as e:
+            # Upstream instável: fallback imediato, sem esperar timeout
+            logger.debug(f"Requisição para {url} recusada: {e}")
+            return None
+        except httpx.HTTPError as e:
             logger.error(f"Erro na requisição para {url}: {e}")
             return None
         except json.JSONDecodeError as e:
@@ -178,34 +196,52 @@ class JoinvilleSusService:
         try:
             # Tentar buscar dados reais do SIH/Datasus
             real_data = self._get_datasus_sus_data(cnes, start_date, end_date)
+            return self._sus_data_or_generated(real_data, cnes, start_date, end_date)
             
-            if real_data:
-                logger.info(f"Carregados {len(real_data)} registros reais do SUS via API")
-                return real_data
-            
-            # Se não conseguir dados reais, gerar dados baseados em padrões SUS
-            logger.warning("Usando dados baseados em padrões SUS (gerados dinamicamente)")
+        except Exception as e:
+            logger.error(f"Erro ao buscar dados SUS: {e}")
             return self._generate_sus_realistic_data(cnes, start_date, end_date)
-            
+
+    async def aget_sus_data(self, cnes: str, start_date: str, end_date: str) -> List[JoinvilleSusData]:
+        """Versão assíncrona de ``get_sus_data``"""
+        try:
+            data = await self._amake_request(*self._datasus_request(cnes, start_date, end_date))
+            real_data = self._parse_datasus_sus_data(cnes, data)
+            return self._sus_data_or_generated(real_data, cnes, start_date, end_date)
         except Exception as e:
             logger.error(f"Erro ao buscar dados SUS: {e}")
             return self._generate_sus_realistic_data(cnes, start_date, end_date)
 
+    def _sus_data_or_generated(self, real_data: Optional[List[JoinvilleSusData]], cnes: str,
+                               start_date: str, end_date: str) -> List[JoinvilleSusData]:
+        if real_data:
+            logger.info(f"Carregados {len(real_data)} registros reais do SUS via API")
+            return real_data
+        
+        # Se não conseguir dados reais, gerar dados baseados em padrões SUS
+        logger.warning("Usando dados baseados em padrões SUS (gerados dinamicamente)")
+        return self._generate_sus_realistic_data(cnes, start_date, end_date)
+
+    @staticmethod
+    def _datasus_request(cnes: str, start_date: str, end_date: str) -> Tuple[str, Dict]:
+        # API do SIH para dados SUS
+        base_url = "https://sih.datasus.gov.br/services/sus/ocupacao"
+        
+        params = {
+            'co_cnes': cnes,
+            'dt_inicio': start_date,
+            'dt_fim': end_date,
+            'tipo_gestao': 'sus'
+        }
+        return base_url, params
+
     def _get_datasus_sus_data(self, cnes: str, start_date: str, end_date: str) -> Optional[List[JoinvilleSusData]]:
         """Busca dados reais do SUS via Datasus"""
+        data = self._make_request(*self._datasus_request(cnes, start_date, end_date))
+        return self._parse_datasus_sus_data(cnes, data)
+
+    def _parse_datasus_sus_data(self, cnes: str, data: Optional[Dict]) -> Optional[List[JoinvilleSusData]]:
         try:
-            # API do SIH para dados SUS
-            base_url = "https://sih.datasus.gov.br/services/sus/ocupacao"
-            
-            params = {
-                'co_cnes': cnes,
-                'dt_inicio': start_date,
-                'dt_fim': end_date,
-                'tipo_gestao': 'sus'
-            }
-            
-            data = self._make_request(base_url, params)
-            
             if not data:
                 return None
             
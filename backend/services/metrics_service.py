@@ -18,107 +18,186 @@ class MetricsResult:
     mase: float
     details: Dict
 
+@dataclass
+class BatchMetrics:
+    """Métricas de várias séries/janelas de uma vez (um valor por linha)"""
+    mape: np.ndarray
+    rmse: np.ndarray
+    smape: np.ndarray
+    mae: np.ndarray
+    mse: np.ndarray
+    r2: np.ndarray
+    bias: np.ndarray
+    mase: np.ndarray
+    n_samples: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.n_samples)
+    
+    def row(self, index: int) -> Dict[str, float]:
+        """Métricas da linha ``index`` como dicionário de floats"""
+        return {
+            name: float(getattr(self, name)[index])
+            for name in ('mape', 'rmse', 'smape', 'mae', 'mse', 'r2', 'bias', 'mase')
+        }
+
+
+def pad_ragged(sequences: List[List[float]], fill_value: float = np.nan) -> Tuple[np.ndarray, np.ndarray]:
+    """Empilha sequências de tamanhos diferentes em (matriz, máscara de posições válidas)"""
+    width = max((len(seq) for seq in sequences), default=0)
+    matrix = np.full((len(sequences), width), fill_value, dtype=float)
+    mask = np.zeros((len(sequences), width), dtype=bool)
+    for i, seq in enumerate(sequences):
+        matrix[i, :len(seq)] = seq
+        mask[i, :len(seq)] = True
+    return matrix, mask
+
+
+def batch_metrics(
+    actual,
+    predicted,
+    mask: Optional[np.ndarray] = None,
+    seasonal_period: int = 7,
+    mape_zero_handling: str = 'exclude',
+) -> BatchMetrics:
+    """
+    Calcula todas as métricas para matrizes (n_séries_ou_janelas × horizonte) numa passada
+    
+    ``mask`` marca as posições válidas (linhas de tamanhos diferentes); valores
+    não finitos também são ignorados. ``mape_zero_handling`` define o MAPE
+    quando o real é zero: ``'exclude'`` ignora o ponto, ``'epsilon'`` divide
+    por 1e-8. O MASE usa o naive sazonal sobre os próprios valores reais
+    (pares ``t``/``t - seasonal_period`` válidos); é ``inf`` com até
+    ``seasonal_period`` pontos ou erro naive nulo. Linhas sem pontos válidos
+    ficam com ``nan``.
+    """
+    actual = np.atleast_2d(np.asarray(actual, dtype=float))
+    predicted = np.atleast_2d(np.asarray(predicted, dtype=float))
+    if actual.shape != predicted.shape:
+        raise ValueError("Arrays de actual e predicted devem ter o mesmo tamanho")
+    if mape_zero_handling not in ('exclude', 'epsilon'):
+        raise ValueError("mape_zero_handling deve ser 'exclude' ou 'epsilon'")
+    
+    valid = np.isfinite(actual) & np.isfinite(predicted)
+    if mask is not None:
+        valid &= np.atleast_2d(np.asarray(mask, dtype=bool))
+    a = np.where(valid, actual, 0.0)
+    p = np.where(valid, predicted, 0.0)
+    n = valid.sum(axis=1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = np.where(n > 0, n, np.nan)
+        error = p - a
+        abs_error = np.abs(error)
+        squared = error ** 2
+        
+        mae = abs_error.sum(axis=1) / count
+        mse = squared.sum(axis=1) / count
+        bias = error.sum(axis=1) / count
+        
+        denominator = (np.abs(a) + np.abs(p)) / 2
+        smape = (abs_error / np.where(denominator == 0, 1.0, denominator)).sum(axis=1) / count * 100
+        
+        if mape_zero_handling == 'exclude':
+            nonzero = valid & (a != 0)
+            ratio = np.where(nonzero, abs_error / np.where(a == 0, 1.0, np.abs(a)), 0.0)
+            n_nonzero = nonzero.sum(axis=1)
+            mape = np.where(n_nonzero > 0, ratio.sum(axis=1) / np.maximum(n_nonzero, 1) * 100, 0.0)
+            mape = np.where(n > 0, mape, np.nan)
+        else:
+            ratio = np.abs(error / np.where(a == 0, 1e-8, a))
+            mape = np.where(valid, ratio, 0.0).sum(axis=1) / count * 100
+        
+        mean_actual = a.sum(axis=1, keepdims=True) / count[:, None]
+        ss_tot = np.where(valid, (a - mean_actual) ** 2, 0.0).sum(axis=1)
+        r2 = np.where(ss_tot == 0, 0.0, 1 - squared.sum(axis=1) / np.where(ss_tot == 0, 1.0, ss_tot))
+        r2 = np.where(n > 0, r2, np.nan)
+        
+        m = seasonal_period
+        mase = np.full(len(n), np.inf)
+        if 0 < m < actual.shape[1]:
+            pairs = valid[:, m:] & valid[:, :-m]
+            naive = np.where(pairs, np.abs(a[:, m:] - a[:, :-m]), 0.0)
+            n_pairs = pairs.sum(axis=1)
+            mae_naive = naive.sum(axis=1) / np.maximum(n_pairs, 1)
+            ok = (n > m) & (n_pairs > 0) & (mae_naive > 0)
+            mase = np.where(ok, mae / np.where(ok, mae_naive, 1.0), np.inf)
+        mase = np.where(n > 0, mase, np.nan)
+    
+    return BatchMetrics(
+        mape=mape,
+        rmse=np.sqrt(mse),
+        smape=smape,
+        mae=mae,
+        mse=mse,
+        r2=r2,
+        bias=bias,
+        mase=mase,
+        n_samples=n,
+    )
+
+
 class MetricsService:
     """Serviço para cálculo de métricas de avaliação de previsões"""
     
     def __init__(self):
         self.metrics = ['mape', 'rmse', 'smape', 'mae', 'mse', 'r2', 'bias', 'mase']
     
+    def _single(self, actual, predicted, seasonal_period: int = 7) -> BatchMetrics:
+        return batch_metrics(
+            np.asarray(actual, dtype=float).reshape(1, -1),
+            np.asarray(predicted, dtype=float).reshape(1, -1),
+            seasonal_period=seasonal_period,
+        )
+    
     def calculate_mape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula MAPE (Mean Absolute Percentage Error)
-        MAPE = (1/n) * Σ|actual - predicted| / |actual| * 100
+        MAPE = (1/n) * Σ|actual - predicted| / |actual| * 100 (ignorando reais iguais a zero)
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        # Evitar divisão por zero
-        mask = actual != 0
-        if not np.any(mask):
-            return 0.0
-        
-        actual_masked = actual[mask]
-        predicted_masked = predicted[mask]
-        
-        mape = np.mean(np.abs((actual_masked - predicted_masked) / actual_masked)) * 100
-        return float(mape)
+        return float(self._single(actual, predicted).mape[0])
     
     def calculate_smape(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula sMAPE (Symmetric Mean Absolute Percentage Error)
         sMAPE = (1/n) * Σ|actual - predicted| / ((|actual| + |predicted|) / 2) * 100
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        # Evitar divisão por zero
-        denominator = (np.abs(actual) + np.abs(predicted)) / 2
-        denominator = np.where(denominator == 0, 1e-8, denominator)
-        
-        smape = np.mean(np.abs(actual - predicted) / denominator) * 100
-        return float(smape)
+        return float(self._single(actual, predicted).smape[0])
     
     def calculate_rmse(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula RMSE (Root Mean Square Error)
         RMSE = sqrt(mean((actual - predicted)²))
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        mse = np.mean((actual - predicted) ** 2)
-        rmse = np.sqrt(mse)
-        return float(rmse)
+        return float(self._single(actual, predicted).rmse[0])
     
     def calculate_mae(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula MAE (Mean Absolute Error)
         MAE = mean(|actual - predicted|)
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        mae = np.mean(np.abs(actual - predicted))
-        return float(mae)
+        return float(self._single(actual, predicted).mae[0])
     
     def calculate_mse(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula MSE (Mean Square Error)
         MSE = mean((actual - predicted)²)
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        mse = np.mean((actual - predicted) ** 2)
-        return float(mse)
+        return float(self._single(actual, predicted).mse[0])
     
     def calculate_r2(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula R² (Coefficient of Determination)
         R² = 1 - (SS_res / SS_tot)
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        ss_res = np.sum((actual - predicted) ** 2)
-        ss_tot = np.sum((actual - np.mean(actual)) ** 2)
-        
-        if ss_tot == 0:
-            return 0.0
-        
-        r2 = 1 - (ss_res / ss_tot)
-        return float(r2)
+        return float(self._single(actual, predicted).r2[0])
     
     def calculate_bias(self, actual: np.ndarray, predicted: np.ndarray) -> float:
         """
         Calcula Bias (Mean Error)
         Bias = mean(predicted - actual)
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        bias = np.mean(predicted - actual)
-        return float(bias)
+        return float(self._single(actual, predicted).bias[0])
     
     def calculate_mase(self, actual: np.ndarray, predicted: np.ndarray, 
                       seasonal_period: int = 7) -> float:
@@ -126,31 +205,20 @@ class MetricsService:
         Calcula MASE (Mean Absolute Scaled Error)
         MASE = MAE / MAE_naive_seasonal
         """
-        actual = np.array(actual)
-        predicted = np.array(predicted)
-        
-        if len(actual) <= seasonal_period:
-            return float('inf')
-        
-        # MAE do modelo
-        mae_model = self.calculate_mae(actual, predicted)
-        
-        # MAE do modelo naive sazonal
-        naive_errors = []
-        for i in range(seasonal_period, len(actual)):
-            naive_pred = actual[i - seasonal_period]
-            naive_errors.append(abs(actual[i] - naive_pred))
-        
-        if len(naive_errors) == 0:
-            return float('inf')
-        
-        mae_naive = np.mean(naive_errors)
-        
-        if mae_naive == 0:
-            return float('inf')
-        
-        mase = mae_model / mae_naive
-        return float(mase)
+        return float(self._single(actual, predicted, seasonal_period).mase[0])
+    
+    def calculate_batch_metrics(
+        self,
+        actual,
+        predicted,
+        mask: Optional[np.ndarray] = None,
+        seasonal_period: int = 7,
+        mape_zero_handling: str = 'exclude',
+    ) -> BatchMetrics:
+        """
+        Calcula todas as métricas para várias séries/janelas de uma vez (ver ``batch_metrics``)
+        """
+        return batch_metrics(actual, predicted, mask, seasonal_period, mape_zero_handling)
     
     def calculate_all_metrics(self, actual: List[float], predicted: List[float], 
                             seasonal_period: int = 7) -> MetricsResult:
@@ -167,15 +235,8 @@ class MetricsService:
         if len(actual) == 0:
             raise ValueError("Arrays não podem estar vazios")
         
-        # Calcular métricas
-        mape = self.calculate_mape(actual, predicted)
-        smape = self.calculate_smape(actual, predicted)
-        rmse = self.calculate_rmse(actual, predicted)
-        mae = self.calculate_mae(actual, predicted)
-        mse = self.calculate_mse(actual, predicted)
-        r2 = self.calculate_r2(actual, predicted)
-        bias = self.calculate_bias(actual, predicted)
-        mase = self.calculate_mase(actual, predicted, seasonal_period)
+        # Calcular métricas (uma passada vetorizada)
+        metrics = self._single(actual, predicted, seasonal_period).row(0)
         
         # Detalhes adicionais
         details = {
@@ -192,17 +253,7 @@ class MetricsService:
             'seasonal_period': seasonal_period
         }
         
-        return MetricsResult(
-            mape=mape,
-            rmse=rmse,
-            smape=smape,
-            mae=mae,
-            mse=mse,
-            r2=r2,
-            bias=bias,
-            mase=mase,
-            details=details
-        )
+        return MetricsResult(**metrics, details=details)
     
     def evaluate_forecast_quality(self, metrics: MetricsResult) -> Dict[str, str]:
         """
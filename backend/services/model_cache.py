@@ -0,0 +1,200 @@
+"""Cache LRU em memória para modelos Prophet persistidos em disco."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from core.config import get_settings
+from services.model_serialization import load_model_file
+
+
+@dataclass
+class CachedModel:
+    """Entrada do cache: modelo carregado e a identidade do arquivo de origem"""
+    model: Any
+    path: Path
+    mtime_ns: int
+    size_bytes: int
+    version: str
+    checked_at: float
+
+
+class ModelCache:
+    """Cache LRU de modelos carregados, limitado por quantidade e por bytes.
+
+    A validade de cada entrada é conferida pelo ``mtime``/tamanho do arquivo.
+    Para que previsões "quentes" não toquem o disco, o ``stat`` só é refeito
+    depois de ``revalidate_seconds``; dentro do mesmo processo o treino chama
+    ``put``/``invalidate`` diretamente, então a janela só afeta outros workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 16,
+        max_bytes: int = 512 * 1024 * 1024,
+        revalidate_seconds: float = 2.0,
+        loader: Callable[[Path], Any] = load_model_file,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.loader = loader
+        self._entries: "OrderedDict[str, CachedModel]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _file_version(stat_result) -> str:
+        return f"{stat_result.st_mtime_ns}-{stat_result.st_size}"
+
+    def _lookup(self, series_id: str, path: Path) -> Optional[CachedModel]:
+        """Retorna a entrada válida (revalidando no disco se necessário) ou None"""
+        with self._lock:
+            entry = self._entries.get(series_id)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if entry.path == path and now - entry.checked_at < self.revalidate_seconds:
+                self._entries.move_to_end(series_id)
+                return entry
+
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            self.invalidate(series_id)
+            raise
+
+        with self._lock:
+            entry = self._entries.get(series_id)
+            if entry is None:
+                return None
+            if (
+                entry.path == path
+                and entry.mtime_ns == stat_result.st_mtime_ns
+                and entry.size_bytes == stat_result.st_size
+            ):
+                entry.checked_at = time.monotonic()
+                self._entries.move_to_end(series_id)
+                return entry
+            self._remove(series_id)
+            self.invalidations += 1
+            return None
+
+    def get(self, series_id: str, path: Path) -> Any:
+        """Retorna o modelo da série, carregando do disco apenas em caso de miss"""
+        entry = self._lookup(series_id, path)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry.model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(series_id, threading.Lock())
+
+        # Um único carregamento por série, mesmo com requisições concorrentes
+        with load_lock:
+            entry = self._lookup(series_id, path)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry.model
+
+            with self._lock:
+                self.misses += 1
+            stat_result = path.stat()
+            model = self.loader(path)
+            self._store(series_id, model, path, stat_result)
+            return model
+
+    def put(self, series_id: str, model: Any, path: Path) -> None:
+        """Registra um modelo recém-persistido, evitando recarregá-lo do disco"""
+        self._store(series_id, model, path, path.stat())
+
+    def get_version(self, series_id: str) -> Optional[str]:
+        """Versão (mtime + tamanho) do modelo em cache, se houver"""
+        with self._lock:
+            entry = self._entries.get(series_id)
+            return entry.version if entry else None
+
+    def _store(self, series_id: str, model: Any, path: Path, stat_result) -> None:
+        entry = CachedModel(
+            model=model,
+            path=path,
+            mtime_ns=stat_result.st_mtime_ns,
+            size_bytes=stat_result.st_size,
+            version=self._file_version(stat_result),
+            checked_at=time.monotonic(),
+        )
+        with self._lock:
+            self._remove(series_id)
+            if entry.size_bytes > self.max_bytes or self.max_entries <= 0:
+                # Modelo maior que o orçamento inteiro: não vale a pena guardar
+                return
+            self._entries[series_id] = entry
+            self._total_bytes += entry.size_bytes
+            self._evict()
+
+    def _remove(self, series_id: str) -> None:
+        entry = self._entries.pop(series_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size_bytes
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size_bytes
+            self.evictions += 1
+
+    def invalidate(self, series_id: str) -> None:
+        """Remove a série do cache (ex.: após novo treino ou exclusão do arquivo)"""
+        with self._lock:
+            if series_id in self._entries:
+                self._remove(series_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "series": list(self._entries.keys()),
+            }
+
+
+def _build_model_cache() -> ModelCache:
+    settings = get_settings()
+    return ModelCache(
+        max_entries=settings.model_cache_max_entries,
+        max_bytes=settings.model_cache_max_bytes,
+        revalidate_seconds=settings.model_cache_revalidate_seconds,
+    )
+
+
+# Instância global compartilhada por todas as rotas de previsão
+model_cache = _build_model_cache()
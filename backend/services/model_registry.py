@@ -0,0 +1,257 @@
+"""Registro (índice) de metadados dos modelos Prophet persistidos."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import numbers
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+try:  # pragma: no cover - indisponível no Windows
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+MODEL_SUFFIXES = (".joblib", ".hcm")
+REGISTRY_FILE_NAME = "registry.json"
+REGISTRY_FORMAT_VERSION = 1
+
+
+@dataclass
+class ModelMetadata:
+    """Metadados de um modelo treinado"""
+    series_id: str
+    version: int
+    trained_at: str
+    data_hash: str
+    row_count: int
+    regressors: Optional[List[str]]
+    growth: Optional[str]
+    file_name: str
+    file_size: int
+    data_start: Optional[str] = None
+    data_end: Optional[str] = None
+    backtest_metrics: Optional[Dict[str, Any]] = None
+    ensemble_weights: Optional[Dict[str, Any]] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def compute_data_hash(dataframe: pd.DataFrame, columns: Optional[List[str]] = None) -> str:
+    """Hash do conteúdo usado no treino (por padrão, colunas ds e y)"""
+    columns = [c for c in (columns or ["ds", "y"]) if c in dataframe.columns]
+    hashed = pd.util.hash_pandas_object(dataframe[columns], index=False).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+class ModelRegistry:
+    """Índice JSON em ``models/registry.json`` com um registro por série.
+
+    Leituras usam uma cópia em memória, recarregada apenas quando o índice
+    ou o diretório de modelos mudam (um ``stat`` de cada por chamada). Escritas
+    fazem ler-modificar-gravar sob lock (entre threads e entre processos) e
+    substituem o arquivo atomicamente com ``os.replace``.
+    """
+
+    def __init__(self, models_dir: Path):
+        self.models_dir = Path(models_dir)
+        self.index_path = self.models_dir / REGISTRY_FILE_NAME
+        self._lock = threading.RLock()
+        self._entries: Dict[str, ModelMetadata] = {}
+        self._index_mtime_ns: Optional[int] = None
+        self._dir_mtime_ns: Optional[int] = None
+
+    # ------------------------------------------------------------------ leitura
+    def _read_index(self) -> Dict[str, ModelMetadata]:
+        try:
+            with open(self.index_path, encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as exc:
+            print(f"⚠️  Registro de modelos ilegível, reconstruindo: {exc}")
+            return {}
+        entries = {}
+        for series_id, item in payload.get("models", {}).items():
+            try:
+                entries[series_id] = ModelMetadata(**item)
+            except TypeError:
+                continue
+        return entries
+
+    def _reconcile_with_directory(self, entries: Dict[str, ModelMetadata]) -> Dict[str, ModelMetadata]:
+        """Alinha o índice com os arquivos existentes (modelos antigos ou removidos à mão)"""
+        files = {
+            path.stem: path
+            for suffix in MODEL_SUFFIXES
+            for path in self.models_dir.glob(f"*{suffix}")
+        }
+        reconciled = {sid: meta for sid, meta in entries.items() if sid in files}
+        for series_id, path in files.items():
+            if series_id in reconciled:
+                continue
+            stat_result = path.stat()
+            reconciled[series_id] = ModelMetadata(
+                series_id=series_id,
+                version=1,
+                trained_at=datetime.fromtimestamp(stat_result.st_mtime, UTC).isoformat(),
+                data_hash="",
+                row_count=0,
+                regressors=None,  # desconhecido até o próximo treino
+                growth=None,
+                file_name=path.name,
+                file_size=stat_result.st_size,
+            )
+        return reconciled
+
+    def _refresh(self) -> None:
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        index_mtime = self.index_path.stat().st_mtime_ns if self.index_path.exists() else None
+        dir_mtime = self.models_dir.stat().st_mtime_ns
+        with self._lock:
+            if index_mtime == self._index_mtime_ns and dir_mtime == self._dir_mtime_ns:
+                return
+            entries = self._read_index()
+            self._entries = self._reconcile_with_directory(entries)
+            self._index_mtime_ns = index_mtime
+            self._dir_mtime_ns = dir_mtime
+
+    def get(self, series_id: str) -> Optional[ModelMetadata]:
+        self._refresh()
+        with self._lock:
+            return self._entries.get(series_id)
+
+    def list_series(self) -> List[str]:
+        self._refresh()
+        with self._lock:
+            return sorted(self._entries)
+
+    def list_models(self) -> List[ModelMetadata]:
+        self._refresh()
+        with self._lock:
+            return [self._entries[sid] for sid in sorted(self._entries)]
+
+    def get_regressors(self, series_id: str) -> Optional[List[str]]:
+        """Regressores exigidos pelo modelo, sem precisar desserializá-lo"""
+        metadata = self.get(series_id)
+        return list(metadata.regressors) if metadata and metadata.regressors is not None else None
+
+    # ------------------------------------------------------------------ escrita
+    @contextmanager
+    def _write_lock(self):
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.models_dir / f"{REGISTRY_FILE_NAME}.lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_index(self, entries: Dict[str, ModelMetadata]) -> None:
+        payload = {
+            "format_version": REGISTRY_FORMAT_VERSION,
+            "updated_at": datetime.now(UTC).isoformat(),
+            "models": {sid: asdict(meta) for sid, meta in sorted(entries.items())},
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=self.models_dir, prefix=".registry-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(payload, handle, ensure_ascii=False, indent=2)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_name, self.index_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        self._entries = entries
+        self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+        self._dir_mtime_ns = self.models_dir.stat().st_mtime_ns
+
+    def _update(self, mutate) -> Any:
+        with self._write_lock():
+            entries = self._reconcile_with_directory(self._read_index())
+            result = mutate(entries)
+            self._write_index(entries)
+            return result
+
+    def register(
+        self,
+        series_id: str,
+        model: Any,
+        training_data: pd.DataFrame,
+        model_path: Path,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> ModelMetadata:
+        """Registra (ou atualiza) o modelo recém-treinado da série"""
+        regressors = list(getattr(model, "extra_regressors", {}) or {})
+        ds = pd.to_datetime(training_data["ds"]) if "ds" in training_data else None
+
+        def mutate(entries: Dict[str, ModelMetadata]) -> ModelMetadata:
+            previous = entries.get(series_id)
+            # Entradas reconstruídas de arquivos legados (sem hash) não contam versão
+            registered_before = previous is not None and bool(previous.data_hash)
+            metadata = ModelMetadata(
+                series_id=series_id,
+                version=(previous.version + 1) if registered_before else 1,
+                trained_at=datetime.now(UTC).isoformat(),
+                data_hash=compute_data_hash(training_data),
+                row_count=int(len(training_data)),
+                regressors=regressors,
+                growth=getattr(model, "growth", None),
+                file_name=model_path.name,
+                file_size=model_path.stat().st_size,
+                data_start=ds.min().strftime("%Y-%m-%d") if ds is not None and len(ds) else None,
+                data_end=ds.max().strftime("%Y-%m-%d") if ds is not None and len(ds) else None,
+                extra=dict(extra or {}),
+            )
+            entries[series_id] = metadata
+            return metadata
+
+        return self._update(mutate)
+
+    def update_backtest_metrics(self, series_id: str, metrics: Dict[str, Any]) -> bool:
+        """Anexa as métricas do último backtest ao registro da série, se existir"""
+
+        def mutate(entries: Dict[str, ModelMetadata]) -> bool:
+            metadata = entries.get(series_id)
+            if metadata is None:
+                return False
+            metadata.backtest_metrics = {
+                **{k: float(v) for k, v in metrics.items() if isinstance(v, numbers.Real)},
+                "evaluated_at": datetime.now(UTC).isoformat(),
+            }
+            return True
+
+        return self._update(mutate)
+
+    def update_ensemble_weights(self, series_id: str, weights: Dict[str, Any]) -> bool:
+        """Grava os pesos do ensemble aprendidos no backtest, se a série existir"""
+
+        def mutate(entries: Dict[str, ModelMetadata]) -> bool:
+            metadata = entries.get(series_id)
+            if metadata is None:
+                return False
+            metadata.ensemble_weights = dict(weights)
+            return True
+
+        return self._update(mutate)
+
+    def remove(self, series_id: str) -> bool:
+        return self._update(lambda entries: entries.pop(series_id, None) is not None)
+
+
+# Instância global (mesmo diretório usado por services.prophet_service)
+model_registry = ModelRegistry(Path(__file__).resolve().parents[1] / "models")
@@ -0,0 +1,181 @@
+"""Formato compacto e versionado para persistir modelos Prophet.
+
+``joblib.dump`` serializa o objeto Prophet inteiro, incluindo o histórico de
+treino e artefatos do Stan. O formato compacto (``.hcm``) guarda apenas o que
+a previsão usa (parâmetros, changepoints, sazonalidades, regressores e
+constantes de escala), com o histórico truncado às últimas linhas.
+
+Layout do arquivo::
+
+    b"HCMODEL" | versão do formato (1 byte) | codec (1 byte) | payload
+
+O payload é o JSON de ``prophet.serialize.model_to_dict``, comprimido com
+zstd ou lz4 quando esses pacotes estão instalados (opcionais) e, caso
+contrário, com zlib da biblioteca padrão.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict
+
+import joblib
+
+try:  # pragma: no cover - dependência opcional
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:  # pragma: no cover - dependência opcional
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+MAGIC = b"HCMODEL"
+FORMAT_VERSION = 1
+COMPACT_SUFFIX = ".hcm"
+JOBLIB_SUFFIX = ".joblib"
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_LZ4 = 3
+
+CODEC_NAMES = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "lz4": CODEC_LZ4}
+
+
+def available_codecs() -> Dict[str, bool]:
+    return {
+        "none": True,
+        "zlib": True,
+        "zstd": zstandard is not None,
+        "lz4": lz4_frame is not None,
+    }
+
+
+def _resolve_codec(compression: str) -> int:
+    """Converte o nome configurado em codec; ``auto`` escolhe o melhor disponível"""
+    compression = (compression or "auto").lower()
+    if compression == "auto":
+        if zstandard is not None:
+            return CODEC_ZSTD
+        if lz4_frame is not None:
+            return CODEC_LZ4
+        return CODEC_ZLIB
+    if compression not in CODEC_NAMES:
+        raise ValueError(f"Compressão desconhecida: {compression}")
+    if not available_codecs()[compression]:
+        print(f"⚠️  Compressão '{compression}' indisponível, usando zlib")
+        return CODEC_ZLIB
+    return CODEC_NAMES[compression]
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == CODEC_LZ4:
+        return lz4_frame.compress(data)
+    raise ValueError(f"Codec desconhecido: {codec}")
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Modelo comprimido com zstd, mas 'zstandard' não está instalado.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_LZ4:
+        if lz4_frame is None:
+            raise RuntimeError("Modelo comprimido com lz4, mas 'lz4' não está instalado.")
+        return lz4_frame.decompress(data)
+    raise ValueError(f"Codec desconhecido: {codec}")
+
+
+def _truncate_history(model: Any, history_rows: int) -> Any:
+    """Cópia rasa do modelo com ``history``/``history_dates`` reduzidos às últimas linhas.
+
+    A previsão só usa o histórico para montar o ``make_future_dataframe`` (que
+    parte da última data) e para checar se o modelo foi treinado; as
+    constantes de escala já ficam guardadas em atributos próprios.
+    """
+    if history_rows <= 0 or model.history is None or len(model.history) <= history_rows:
+        return model
+    compact = copy.copy(model)
+    compact.history = model.history.tail(history_rows).reset_index(drop=True)
+    if model.history_dates is not None:
+        compact.history_dates = model.history_dates.tail(history_rows).reset_index(drop=True)
+    return compact
+
+
+def dumps_compact(model: Any, history_rows: int = 60, compression: str = "auto") -> bytes:
+    """Serializa um Prophet treinado no formato compacto"""
+    from prophet.serialize import model_to_dict
+
+    payload = {
+        "format_version": FORMAT_VERSION,
+        "history_rows": int(history_rows),
+        "model": model_to_dict(_truncate_history(model, history_rows)),
+    }
+    codec = _resolve_codec(compression)
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return MAGIC + bytes([FORMAT_VERSION, codec]) + _compress(body, codec)
+
+
+def loads_compact(data: bytes) -> Any:
+    """Reconstrói o Prophet a partir dos bytes do formato compacto"""
+    from prophet.serialize import model_from_dict
+
+    if not data.startswith(MAGIC) or len(data) < len(MAGIC) + 2:
+        raise ValueError("Arquivo não está no formato compacto de modelo.")
+    version, codec = data[len(MAGIC)], data[len(MAGIC) + 1]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Versão de formato {version} não suportada (máximo {FORMAT_VERSION}).")
+    payload = json.loads(_decompress(data[len(MAGIC) + 2:], codec))
+    return model_from_dict(payload["model"])
+
+
+def save_model_file(
+    model: Any,
+    path: Path,
+    history_rows: int = 60,
+    compression: str = "auto",
+) -> Path:
+    """Grava o modelo no formato indicado pelo sufixo do caminho, de forma atômica"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            if path.suffix == COMPACT_SUFFIX:
+                handle.write(dumps_compact(model, history_rows=history_rows, compression=compression))
+            else:
+                joblib.dump(model, handle)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return path
+
+
+def load_model_file(path: Path) -> Any:
+    """Carrega um modelo em qualquer formato suportado (compacto ou ``.joblib`` antigo)"""
+    path = Path(path)
+    with open(path, "rb") as handle:
+        header = handle.read(len(MAGIC))
+        if header != MAGIC:
+            handle.seek(0)
+            return joblib.load(handle)
+        return loads_compact(header + handle.read())
@@ -3,10 +3,18 @@ from __future__ import annotations
 from pathlib import Path
 from typing import List, Optional
 
-import joblib
 import pandas as pd
 import numpy as np
 
+from core.config import get_settings
+from services.calendar_service import BASIC_FEATURES, calendar_table
+from services.future_regressors import REGRESSOR_DEFAULTS, default_regressor_values
+from services.forecast_cache import forecast_cache
+from services.history_store import history_store
+from services.model_cache import model_cache
+from services.model_registry import model_registry
+from services.model_serialization import COMPACT_SUFFIX, JOBLIB_SUFFIX, save_model_file
+
 # Configurar ambiente para CmdStan ANTES de importar Prophet
 import os
 
@@ -56,7 +64,43 @@ def _get_models_dir() -> Path:
 
 
 def _get_model_path(series_id: str) -> Path:
-    return _get_models_dir() / f"{series_id}.joblib"
+    """Caminho onde o próximo treino grava o modelo (conforme o formato configurado)."""
+    suffix = COMPACT_SUFFIX if get_settings().model_storage_format == "compact" else JOBLIB_SUFFIX
+    return _get_models_dir() / f"{series_id}{suffix}"
+
+
+def resolve_model_path(series_id: str) -> Path:
+    """Caminho do modelo já persistido, em qualquer formato suportado."""
+    metadata = model_registry.get(series_id)
+    if metadata is not None:
+        registered = _get_models_dir() / metadata.file_name
+        if registered.exists():
+            return registered
+    for suffix in (COMPACT_SUFFIX, JOBLIB_SUFFIX):
+        candidate = _get_models_dir() / f"{series_id}{suffix}"
+        if candidate.exists():
+            return candidate
+    return _get_model_path(series_id)
+
+
+def load_model(series_id: str) -> Prophet:
+    """Carrega o modelo da série, reutilizando a cópia em memória quando válida."""
+    model_path = resolve_model_path(series_id)
+    try:
+        return model_cache.get(series_id, model_path)
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Modelo '{series_id}' não encontrado.") from exc
+
+
+def get_model_version(series_id: str) -> str:
+    """Versão do modelo persistido (muda a cada novo treino)."""
+    load_model(series_id)
+    version = model_cache.get_version(series_id)
+    if version is None:
+        # Modelo grande demais para o cache: usar a identidade do arquivo
+        stat_result = resolve_model_path(series_id).stat()
+        version = f"{stat_result.st_mtime_ns}-{stat_result.st_size}"
+    return version
 
 
 def _prepare_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
@@ -148,15 +192,8 @@ def _prepare_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
         print(f"   ⚠️  {outliers_removed} outliers removidos (P1={p1:.2f}, P99={p99:.2f}, 3σ={sigma_lower:.2f}-{sigma_upper:.2f})")
         print(f"   📊 Limites finais: {final_lower:.2f} - {final_upper:.2f}")
     
-    # Adicionar features de calendário úteis
-    df["year"] = df["ds"].dt.year
-    df["month"] = df["ds"].dt.month
-    df["day_of_week"] = df["ds"].dt.dayofweek
-    df["day_of_year"] = df["ds"].dt.dayofyear
-    df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
-    
-    # Adicionar sazonalidade de inverno (maio-setembro no Brasil)
-    df["is_winter"] = df["month"].isin([5, 6, 7, 8, 9]).astype(int)
+    # Adicionar features de calendário úteis (inclui inverno: maio-setembro no Brasil)
+    calendar_table.add_features(df, BASIC_FEATURES)
     
     print(f"✅ Dados preparados: {len(df)} registros, período: {df['ds'].min()} a {df['ds'].max()}")
     
@@ -337,25 +374,33 @@ def train_and_persist_model(series_id: str, dataframe: pd.DataFrame, regressors:
         print(f"❌ {error_msg}")
         raise RuntimeError(error_msg) from e
 
-    model_path = _get_model_path(series_id)
-    joblib.dump(model, model_path)
+    settings = get_settings()
+    model_path = save_model_file(
+        model,
+        _get_model_path(series_id),
+        history_rows=settings.model_compact_history_rows,
+        compression=settings.model_compression,
+    )
+    # Remove o arquivo no outro formato, se houver, para não restar versão antiga
+    for suffix in (COMPACT_SUFFIX, JOBLIB_SUFFIX):
+        stale_path = model_path.with_suffix(suffix)
+        if stale_path != model_path and stale_path.exists():
+            stale_path.unlink()
+    # Já deixa o modelo recém-treinado quente no cache (sem recarregar do disco)
+    model_cache.put(series_id, model, model_path)
+    forecast_cache.invalidate_series(series_id)
+    model_registry.register(series_id, model, df, model_path)
+    # Histórico limpo para componentes que precisam dos dados (ex.: Naive Semanal do ensemble)
+    history_store.save(series_id, df)
 
 
 def generate_forecast(series_id: str, horizon: int, future_regressors: Optional[pd.DataFrame] = None) -> pd.DataFrame:
-    model_path = _get_model_path(series_id)
-    if not model_path.exists():
-        raise FileNotFoundError(f"Modelo '{series_id}' não encontrado.")
-    
-    model: Prophet = joblib.load(model_path)
-    future = model.make_future_dataframe(periods=horizon)
+    model = load_model(series_id)
+    # Só o horizonte: prever o histórico inteiro para descartá-lo é desperdício
+    future = model.make_future_dataframe(periods=horizon, include_history=False)
     
     # Adicionar features de calendário para o futuro
-    future["year"] = future["ds"].dt.year
-    future["month"] = future["ds"].dt.month
-    future["day_of_week"] = future["ds"].dt.dayofweek
-    future["day_of_year"] = future["ds"].dt.dayofyear
-    future["is_weekend"] = (future["day_of_week"] >= 5).astype(int)
-    future["is_winter"] = future["month"].isin([5, 6, 7, 8, 9]).astype(int)
+    calendar_table.add_features(future, BASIC_FEATURES)
     
     # Adicionar cap e floor apenas se o modelo usar growth logistic
     if hasattr(model, 'growth') and model.growth == 'logistic':
@@ -378,57 +423,27 @@ def generate_forecast(series_id: str, horizon: int, future_regressors: Optional[
     else:
         print(f"📊 Usando growth linear - sem cap/floor")
     
-    # Se o modelo tem regressores mas não foram fornecidos, criar valores padrão
-    if future_regressors is None and hasattr(model, 'extra_regressors') and model.extra_regressors:
-        # Preencher somente as últimas linhas (horizonte futuro)
-        future_tail_idx = future.index[-horizon:]
-        # Criar regressores padrão para o futuro
-        for regressor in model.extra_regressors:
-            if regressor not in future.columns:
-                future[regressor] = np.nan
-            if regressor == 'tmax':
-                future.loc[future_tail_idx, 'tmax'] = 25.0  # temperatura máxima média
-            elif regressor == 'tmin':
-                future.loc[future_tail_idx, 'tmin'] = 15.0  # temperatura mínima média
-            elif regressor == 'precip':
-                future.loc[future_tail_idx, 'precip'] = 0.0  # sem precipitação
-            elif regressor == 'is_holiday':
-                future.loc[future_tail_idx, 'is_holiday'] = 0  # não é feriado
-    
-    elif future_regressors is not None:
-        print(f"🔍 Debug - Future regressors received: {future_regressors.shape}")
-        print(f"🔍 Debug - Future regressors columns: {list(future_regressors.columns)}")
-        print(f"🔍 Debug - Horizon: {horizon}")
-        
-        # Verificar e corrigir valores NaN nos regressores futuros
-        print(f"🔍 Verificando NaN nos regressores futuros:")
-        nan_columns = future_regressors.columns[future_regressors.isnull().any()].tolist()
-        if nan_columns:
-            print(f"⚠️  Colunas com NaN nos regressores futuros: {nan_columns}")
-            for col in nan_columns:
-                print(f"   {col}: {future_regressors[col].isnull().sum()} valores NaN")
-                future_regressors[col] = future_regressors[col].fillna(0)
-        
-        # Garantir que os regressores tenham o tamanho correto
-        for col in future_regressors.columns:
-            if col in {"tmax", "tmin", "precip", "is_holiday", "is_weekend", "is_winter", "day_of_week"}:
-                values = future_regressors[col].values
-                print(f"🔍 Debug - Regressor {col}: {len(values)} values, horizon: {horizon}")
-                # Normalizar para ter exatamente 'horizon' valores
-                if len(values) < horizon:
-                    last_value = values[-1] if len(values) > 0 else 0.0
-                    values = np.concatenate([values, np.full(horizon - len(values), last_value)])
-                elif len(values) > horizon:
-                    values = values[-horizon:]
-                # Garantir a coluna e atribuir apenas no futuro (últimas linhas)
-                if col not in future.columns:
-                    future[col] = np.nan
-                future_tail_idx = future.index[-horizon:]
-                future.loc[future_tail_idx, col] = values
-                print(f"🔍 Debug - Final regressor {col} length on tail: {len(values)}")
+    # Regressores exigidos pelo modelo: os recebidos (alinhados por posição no
+    # horizonte) e, para os demais, calendário calculado ou valor padrão
+    required = list(getattr(model, 'extra_regressors', {}) or {})
+    supplied = future_regressors if future_regressors is not None else pd.DataFrame()
+    missing = [name for name in required if name not in supplied.columns]
+    columns = default_regressor_values(missing, future['ds'])
+    for name in required:
+        if name not in supplied.columns:
+            continue
+        default = float(REGRESSOR_DEFAULTS.get(name, 0.0))
+        values = pd.to_numeric(supplied[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+        if len(values) < horizon:
+            # Repetir o último valor conhecido até completar o horizonte
+            pad = values[-1] if len(values) else default
+            values = np.concatenate([values, np.full(horizon - len(values), pad)])
+        columns[name] = values[:horizon]
+    if columns:
+        future = future.assign(**columns)
     
     forecast = model.predict(future)
-    forecast_result = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(horizon)
+    forecast_result = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].copy()
     
     # Validar e corrigir previsões negativas ou irreais
     print(f"🔍 Validando previsões...")
@@ -474,8 +489,17 @@ def generate_forecast(series_id: str, horizon: int, future_regressors: Optional[
 
 
 def list_available_models() -> List[str]:
-    models_dir = _get_models_dir()
-    return [path.stem for path in models_dir.glob("*.joblib")]
+    return model_registry.list_series()
+
+
+def get_model_regressors(series_id: str) -> List[str]:
+    """Regressores exigidos pelo modelo, lidos do registro sempre que possível."""
+    regressors = model_registry.get_regressors(series_id)
+    if regressors is None:
+        # Modelo anterior ao registro: desserializar uma única vez (fica no cache)
+        model = load_model(series_id)
+        regressors = list(getattr(model, "extra_regressors", {}) or {})
+    return regressors
 
 
 
@@ -0,0 +1,79 @@
+"""Inicialização do otimizador do Prophet a partir de um modelo já ajustado."""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+from prophet import Prophet
+
+
+def _days(delta) -> float:
+    return delta / np.timedelta64(1, "D") if isinstance(delta, np.timedelta64) else delta.total_seconds() / 86400
+
+
+def warm_start_init(previous: Prophet, target: Prophet) -> Dict[str, np.ndarray]:
+    """Converte ``k, m, delta, beta, sigma_obs`` de ``previous`` para a escala de ``target``.
+
+    ``target`` precisa estar pré-processado (``target.preprocess(df)``), pois
+    cada ajuste normaliza ``y`` por ``y_scale`` e o tempo por ``t_scale`` e
+    posiciona seus próprios pontos de mudança. A taxa de crescimento de
+    ``previous`` é levada para dias absolutos, interpolada nas datas dos
+    novos pontos de mudança (a quantidade pode ser diferente) e
+    reconvertida em ``delta``; depois do último ponto antigo ela fica
+    constante. Coeficientes aditivos e o ruído acompanham a troca de
+    ``y_scale``; os multiplicativos são relativos e passam direto.
+    """
+    params = {name: np.asarray(values, dtype=float) for name, values in previous.params.items()}
+    k = float(params["k"].ravel()[0])
+    m = float(params["m"].ravel()[0])
+    delta = params["delta"].reshape(-1) if params["delta"].size else np.zeros(0)
+
+    t_scale_prev = _days(previous.t_scale)
+    t_scale_new = _days(target.t_scale)
+    offset = _days(target.start - previous.start)  # dias entre os inícios dos históricos
+    y_ratio = previous.y_scale / target.y_scale
+
+    # Pontos de mudança em dias desde o início de ``previous``
+    cp_prev = np.asarray(previous.changepoints_t, dtype=float)[: delta.size] * t_scale_prev
+    cp_new = offset + np.asarray(target.changepoints_t, dtype=float) * t_scale_new
+
+    def rate_at(days: np.ndarray) -> np.ndarray:
+        """Taxa (escala de ``previous``) logo após cada instante, interpolada entre pontos"""
+        if cp_prev.size == 0:
+            return np.full_like(days, k, dtype=float)
+        rates = k + np.cumsum(delta)
+        return np.interp(days, cp_prev, rates, left=k, right=rates[-1])
+
+    start_rate = float(rate_at(np.array([offset]))[0])
+    new_rates = rate_at(cp_new)
+    rate_factor = t_scale_new / t_scale_prev
+    if previous.growth == "logistic":
+        # Em logística ``m`` é um instante (tempo normalizado) e ``cap`` já escala ``y``
+        new_k = start_rate * rate_factor
+        new_m = (m * t_scale_prev - offset) / t_scale_new
+        new_delta = np.diff(np.concatenate([[start_rate], new_rates])) * rate_factor
+    else:
+        t0 = offset / t_scale_prev
+        trend_at_start = k * t0 + m + float(np.sum(delta * np.clip(t0 - cp_prev / t_scale_prev, 0, None)))
+        new_k = start_rate * rate_factor * y_ratio
+        new_m = trend_at_start * y_ratio
+        new_delta = np.diff(np.concatenate([[start_rate], new_rates])) * rate_factor * y_ratio
+    if previous.growth == "flat":
+        new_delta = np.zeros_like(new_delta)
+
+    n_features = len(target.train_component_cols)
+    beta = params["beta"].reshape(-1)
+    if beta.size == n_features:
+        multiplicative = target.train_component_cols["multiplicative_terms"].to_numpy(dtype=bool)
+        new_beta = np.where(multiplicative, beta, beta * y_ratio)
+    else:
+        new_beta = np.zeros(n_features)
+
+    return {
+        "k": new_k,
+        "m": new_m,
+        "delta": new_delta,
+        "beta": new_beta,
+        "sigma_obs": float(params["sigma_obs"].ravel()[0]) * y_ratio,
+    }
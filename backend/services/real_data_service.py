@@ -1,13 +1,17 @@
-import requests
+import httpx
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import json
 import logging
 from urllib.parse import urlencode
 
+from services.circuit_breaker import CircuitOpenError, upstream_for_host
+from services.http_client import HttpClient, http_client
+from services.response_cache import ResponseCache, response_cache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,46 +53,67 @@ class RealOccupancyData:
 class RealDataService:
     """Serviço para integração com APIs de dados reais"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'HospiCast/1.0 (Sistema de Previsão Hospitalar)',
-            'Accept': 'application/json'
-        })
+    def __init__(self, http: Optional[HttpClient] = None, cache: Optional[ResponseCache] = None):
+        # Cliente HTTP compartilhado (pool keep-alive e limite por host)
+        self.http = http if http is not None else http_client
         
-        # Cache para evitar muitas requisições
-        self.cache = {}
-        self.cache_timeout = 3600  # 1 hora
+        # Cache de respostas compartilhado (TTL por fonte, stale-while-revalidate)
+        self.cache = cache if cache is not None else response_cache
         
     def _make_request(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
-        """Faz requisição HTTP com tratamento de erros"""
+        """Faz requisição HTTP com cache compartilhado e tratamento de erros"""
+        source = upstream_for_host(httpx.URL(url).host)
+        return self.cache.get_or_fetch(
+            source, ResponseCache.make_key(source, url, params),
+            lambda: self._fetch(url, params, timeout),
+        )
+    
+    async def _amake_request(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        """Versão assíncrona de ``_make_request`` (mesmo cache)"""
+        source = upstream_for_host(httpx.URL(url).host)
+        return await self.cache.aget_or_fetch(
+            source, ResponseCache.make_key(source, url, params),
+            lambda: self._afetch(url, params, timeout),
+        )
+    
+    def _fetch(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        """Requisição ao upstream; ``None`` em caso de erro (não vai para o cache)"""
         try:
-            cache_key = f"{url}_{json.dumps(params or {}, sort_keys=True)}"
-            
-            # Verificar cache
-            if cache_key in self.cache:
-                cached_data, timestamp = self.cache[cache_key]
-                if datetime.now().timestamp() - timestamp < self.cache_timeout:
-                    return cached_data
-            
             logger.info(f"Fazendo requisição para: {url}")
-            response = self.session.get(url, params=params, timeout=timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Salvar no cache
-            self.cache[cache_key] = (data, datetime.now().timestamp())
-            
-            return data
-            
-        except requests.exceptions.RequestException as e:
+            return self.http.get_json(url, params=params, timeout=timeout)
+        except CircuitOpenError as e:
+            # Upstream instável: fallback imediato, sem esperar timeout
+            logger.debug(f"Requisição para {url} recusada: {e}")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"Erro na requisição para {url}: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"Erro ao decodificar JSON de {url}: {e}")
+            return None
+    
+    async def _afetch(self, url: str, params: Dict = None, timeout: int = 30) -> Optional[Dict]:
+        try:
+            logger.info(f"Fazendo requisição para: {url}")
+            return await self.http.aget_json(url, params=params, timeout=timeout)
+        except CircuitOpenError as e:
+            # Upstream instável: fallback imediato, sem esperar timeout
+            logger.debug(f"Requisição para {url} recusada: {e}")
+            return None
+        except httpx.HTTPError as e:
             logger.error(f"Erro na requisição para {url}: {e}")
             return None
         except json.JSONDecodeError as e:
             logger.error(f"Erro ao decodificar JSON de {url}: {e}")
             return None
 
+    def upstream_status(self) -> Dict[str, Dict[str, Any]]:
+        """Estado do circuit breaker de cada API usada, sem chamadas à rede"""
+        upstreams = ("cnes", "sih", "brasilapi", "openweather")
+        if self.http.breakers is None:
+            return {name: {"state": "disabled"} for name in upstreams}
+        return {name: self.http.breakers.get(name).snapshot() for name in upstreams}
+
     def get_cnes_data(self, uf: str = None, municipio: str = None) -> List[RealHospitalData]:
         """Busca dados do CNES (Cadastro Nacional de Estabelecimentos de Saúde)"""
         try:
@@ -188,23 +213,30 @@ class RealDataService:
             logger.error(f"Erro ao buscar dados do SIH: {e}")
             return self._generate_simulated_occupancy(cnes, start_date, end_date)
 
+    def _weather_request(self, latitude: float, longitude: float) -> Tuple[str, Dict]:
+        # Usar API gratuita do OpenWeatherMap
+        api_key = "your_openweather_api_key"  # Substituir por chave real
+        base_url = "https://api.openweathermap.org/data/2.5/weather"
+        
+        params = {
+            'lat': latitude,
+            'lon': longitude,
+            'appid': api_key,
+            'units': 'metric',
+            'lang': 'pt_br'
+        }
+        return base_url, params
+
     def get_weather_data(self, latitude: float, longitude: float, date: str) -> Dict:
         """Busca dados meteorológicos da OpenWeatherMap"""
+        return self._parse_weather_data(self._make_request(*self._weather_request(latitude, longitude)))
+
+    async def aget_weather_data(self, latitude: float, longitude: float, date: str) -> Dict:
+        """Versão assíncrona de ``get_weather_data``"""
+        return self._parse_weather_data(await self._amake_request(*self._weather_request(latitude, longitude)))
+
+    def _parse_weather_data(self, data: Optional[Dict]) -> Dict:
         try:
-            # Usar API gratuita do OpenWeatherMap
-            api_key = "your_openweather_api_key"  # Substituir por chave real
-            base_url = "https://api.openweathermap.org/data/2.5/weather"
-            
-            params = {
-                'lat': latitude,
-                'lon': longitude,
-                'appid': api_key,
-                'units': 'metric',
-                'lang': 'pt_br'
-            }
-            
-            data = self._make_request(base_url, params)
-            
             if not data:
                 logger.warning("Não foi possível obter dados meteorológicos")
                 return self._get_fallback_weather()
@@ -226,11 +258,15 @@ class RealDataService:
 
     def get_holiday_data(self, uf: str, year: int) -> List[Dict]:
         """Busca dados de feriados via BrasilAPI"""
+        return self._parse_holiday_data(self._make_request(f"https://brasilapi.com.br/api/feriados/v1/{year}"), year)
+
+    async def aget_holiday_data(self, uf: str, year: int) -> List[Dict]:
+        """Versão assíncrona de ``get_holiday_data``"""
+        data = await self._amake_request(f"https://brasilapi.com.br/api/feriados/v1/{year}")
+        return self._parse_holiday_data(data, year)
+
+    def _parse_holiday_data(self, data: Optional[List[Dict]], year: int) -> List[Dict]:
         try:
-            base_url = f"https://brasilapi.com.br/api/feriados/v1/{year}"
-            
-            data = self._make_request(base_url)
-            
             if not data:
                 logger.warning("Não foi possível obter dados de feriados")
                 return self._get_fallback_holidays(year)
@@ -253,17 +289,23 @@ class RealDataService:
             logger.error(f"Erro ao buscar dados de feriados: {e}")
             return self._get_fallback_holidays(year)
 
+    @staticmethod
+    def _covid_request(uf: str = None) -> Tuple[str, Dict]:
+        params = {}
+        if uf:
+            params['uf'] = uf
+        return "https://brasilapi.com.br/api/covid19/v1", params
+
     def get_covid_data(self, uf: str = None) -> Dict:
         """Busca dados de COVID-19 via BrasilAPI"""
+        return self._parse_covid_data(self._make_request(*self._covid_request(uf)))
+
+    async def aget_covid_data(self, uf: str = None) -> Dict:
+        """Versão assíncrona de ``get_covid_data``"""
+        return self._parse_covid_data(await self._amake_request(*self._covid_request(uf)))
+
+    def _parse_covid_data(self, data: Optional[Dict]) -> Dict:
         try:
-            base_url = "https://brasilapi.com.br/api/covid19/v1"
-            
-            params = {}
-            if uf:
-                params['uf'] = uf
-            
-            data = self._make_request(base_url, params)
-            
             if not data:
                 logger.warning("Não foi possível obter dados de COVID-19")
                 return self._get_fallback_covid_data()
@@ -0,0 +1,544 @@
+"""Cache compartilhado de respostas das APIs externas (CNES, SIH, BrasilAPI...).
+
+Backends plugáveis, todos guardando o JSON da resposta:
+
+- ``MemoryBackend``: LRU em processo, limitado por entradas e bytes;
+- ``DiskBackend``: SQLite local, sobrevive a reinícios;
+- ``RedisBackend``: compartilhado entre workers do uvicorn (o docker-compose
+  já sobe um Redis e define ``REDIS_URL``). Com ``auto``, sem o pacote
+  ``redis`` ou sem ``REDIS_URL`` usa memória; com ``redis`` explícito, a
+  falta de qualquer um dos dois impede a inicialização.
+
+Sobre o backend, ``ResponseCache`` aplica TTL por fonte, stale-while-
+revalidate (depois do TTL, a resposta antiga ainda é servida por
+``stale_seconds`` enquanto uma atualização roda em segundo plano) e
+coalescência: chamadas simultâneas para a mesma chave sem cache fazem uma
+única busca no upstream e todas recebem o mesmo resultado.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from core.config import get_settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - dependência opcional
+    redis = None
+
+# Entrada lida do backend: (JSON da resposta, instante em que foi gravada)
+CacheEntry = Tuple[str, float]
+
+
+class MemoryBackend:
+    """LRU em memória limitado por número de entradas e bytes de JSON"""
+
+    # Sem E/S: pode ser consultado direto no event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        # chave -> (payload, gravado_em, expira_em)
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= self._clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def _pop(self, key: str) -> None:
+        payload, _, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def set(self, key: str, payload: str, stored_at: float, expire_after: float) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (payload, stored_at, stored_at + expire_after)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+            }
+
+
+class DiskBackend:
+    """Respostas em SQLite local; expiradas e excedentes são removidas a cada ``purge_every`` escritas"""
+
+    blocking = True
+
+    def __init__(self, db_path: Path, max_entries: int = 20000, purge_every: int = 100,
+                 clock: Callable[[], float] = time.time):
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, max_entries)
+        self.purge_every = max(1, purge_every)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._writes = 0
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache ("
+                    " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+                    " stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._schema_ready = True
+            with conn:  # commit/rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, stored_at FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, self._clock()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, payload: str, stored_at: float, expire_after: float) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, payload, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, payload, stored_at, stored_at + expire_after),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (self._clock(),))
+                conn.execute(
+                    "DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache"
+                    " ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM response_cache"
+            ).fetchone()
+        return {"backend": "disk", "entries": entries, "bytes": size, "path": str(self.db_path)}
+
+
+class RedisBackend:
+    """Respostas no Redis, com expiração do próprio Redis (``PX``).
+
+    Aceita qualquer cliente com ``get``/``set(px=)``/``delete``/``scan_iter``
+    (o ``redis.Redis`` oficial ou um falso em testes).
+    """
+
+    blocking = True
+
+    def __init__(self, client, prefix: str = "hospicast:response:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBackend":
+        if redis is None:
+            raise RuntimeError("Backend Redis requer o pacote 'redis' instalado.")
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5), **kwargs)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        entry = json.loads(raw)
+        return entry["p"], entry["t"]
+
+    def set(self, key: str, payload: str, stored_at: float, expire_after: float) -> None:
+        raw = json.dumps({"t": stored_at, "p": payload})
+        self.client.set(self.prefix + key, raw, px=max(1, int(expire_after * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "prefix": self.prefix}
+
+
+@dataclass(frozen=True)
+class SourcePolicy:
+    """Validade das respostas de uma fonte"""
+    ttl_seconds: float
+    stale_seconds: float
+
+
+def parse_source_ttls(spec: str) -> Dict[str, float]:
+    """``"sih=1800,cnes=86400"`` -> ``{"sih": 1800.0, "cnes": 86400.0}``"""
+    ttls = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, seconds = part.split("=", 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+class ResponseCache:
+    """TTL por fonte, stale-while-revalidate e uma busca por chave de cada vez.
+
+    Valores ``None`` (falha já tratada pelo serviço) não são gravados; se a
+    atualização em segundo plano falhar, a resposta antiga continua valendo
+    até o fim da janela ``stale``. Erros do backend (ex.: Redis fora do ar)
+    viram falta de cache, nunca erro para o chamador, e desligam o backend
+    por ``backend_retry_seconds``: nesse intervalo as chamadas não esperam
+    pelo timeout do backend a cada requisição.
+    """
+
+    def __init__(
+        self,
+        backend,
+        default_ttl_seconds: float = 3600.0,
+        source_ttls: Optional[Dict[str, float]] = None,
+        stale_seconds: float = 1800.0,
+        refresh_workers: int = 2,
+        backend_retry_seconds: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.backend = backend
+        self.backend_retry_seconds = backend_retry_seconds
+        self._backend_down_until = 0.0
+        self.default_ttl_seconds = default_ttl_seconds
+        self.source_ttls = dict(source_ttls or {})
+        self.stale_seconds = stale_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=max(1, refresh_workers), thread_name_prefix="cache-refresh"
+        )
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.backend_errors = 0
+        self.backend_skipped = 0
+
+    def policy(self, source: str) -> SourcePolicy:
+        return SourcePolicy(self.source_ttls.get(source, self.default_ttl_seconds), self.stale_seconds)
+
+    @staticmethod
+    def make_key(source: str, url: str, params: Optional[Dict] = None) -> str:
+        raw = f"{url}?{json.dumps(params or {}, sort_keys=True, default=str)}"
+        return f"{source}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+
+    # ------------------------------------------------------------------ backend
+    def _backend_available(self) -> bool:
+        if self._clock() < self._backend_down_until:
+            self.backend_skipped += 1
+            return False
+        return True
+
+    def _backend_failed(self, operation: str, exc: Exception) -> None:
+        self.backend_errors += 1
+        self._backend_down_until = self._clock() + self.backend_retry_seconds
+        print(
+            f"⚠️  Cache de respostas indisponível ({operation}): {exc}. "
+            f"Nova tentativa em {self.backend_retry_seconds:.0f}s"
+        )
+
+    def _read(self, key: str) -> Optional[Tuple[Any, float]]:
+        if not self._backend_available():
+            return None
+        try:
+            entry = self.backend.get(key)
+        except Exception as exc:
+            self._backend_failed("leitura", exc)
+            return None
+        if entry is None:
+            return None
+        try:
+            return json.loads(entry[0]), entry[1]
+        except ValueError:
+            return None
+
+    def _store(self, key: str, value: Any, policy: SourcePolicy) -> None:
+        if value is None:
+            return
+        try:
+            payload = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return  # resposta não serializável: só não vai para o cache
+        if not self._backend_available():
+            return
+        try:
+            self.backend.set(key, payload, self._clock(), policy.ttl_seconds + policy.stale_seconds)
+        except Exception as exc:
+            self._backend_failed("escrita", exc)
+
+    async def _alookup(self, key: str, policy: SourcePolicy) -> Tuple[Optional[Any], bool, bool]:
+        """``_lookup`` fora do event loop quando o backend faz E/S (SQLite, Redis)"""
+        if getattr(self.backend, "blocking", True):
+            return await asyncio.to_thread(self._lookup, key, policy)
+        return self._lookup(key, policy)
+
+    async def _astore(self, key: str, value: Any, policy: SourcePolicy) -> None:
+        if getattr(self.backend, "blocking", True):
+            await asyncio.to_thread(self._store, key, value, policy)
+        else:
+            self._store(key, value, policy)
+
+    def _lookup(self, key: str, policy: SourcePolicy) -> Tuple[Optional[Any], bool, bool]:
+        """(valor, encontrado, precisa_atualizar)"""
+        entry = self._read(key)
+        if entry is None:
+            return None, False, False
+        value, stored_at = entry
+        age = self._clock() - stored_at
+        if age < policy.ttl_seconds:
+            self.hits += 1
+            return value, True, False
+        if age < policy.ttl_seconds + policy.stale_seconds:
+            self.stale_hits += 1
+            return value, True, True
+        return None, False, False
+
+    # ------------------------------------------------------------- coalescência
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Future da busca em andamento para a chave e se quem chamou é o responsável por ela"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _leave(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    # ------------------------------------------------------------------ síncrono
+    def get_or_fetch(self, source: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Resposta em cache ou ``fetch()`` (uma só execução por chave entre chamadas simultâneas)"""
+        policy = self.policy(source)
+        value, found, stale = self._lookup(key, policy)
+        if found:
+            if stale and self._claim_refresh(key):
+                self._refresh_executor.submit(self._refresh, key, policy, fetch)
+            return value
+
+        self.misses += 1
+        future, leader = self._join(key)
+        if not leader:
+            self.coalesced += 1
+            return future.result()
+        try:
+            value = fetch()
+            self._store(key, value, policy)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._leave(key)
+
+    def _refresh(self, key: str, policy: SourcePolicy, fetch: Callable[[], Any]) -> None:
+        try:
+            future, leader = self._join(key)
+            if not leader:
+                return
+            try:
+                value = fetch()
+                self._store(key, value, policy)
+                self.refreshes += 1
+                future.set_result(value)
+            except Exception as exc:
+                print(f"⚠️  Atualização em segundo plano falhou para {key}: {exc}")
+                future.set_exception(exc)
+            finally:
+                self._leave(key)
+        finally:
+            self._release_refresh(key)
+
+    # --------------------------------------------------------------- assíncrono
+    async def aget_or_fetch(self, source: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de ``get_or_fetch``; coalesce também com chamadas síncronas.
+
+        Leituras e escritas em backends com E/S rodam em thread, para um Redis
+        lento ou fora do ar não travar o event loop.
+        """
+        policy = self.policy(source)
+        value, found, stale = await self._alookup(key, policy)
+        if found:
+            if stale and self._claim_refresh(key):
+                task = asyncio.get_running_loop().create_task(self._arefresh(key, policy, fetch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+
+        self.misses += 1
+        future, leader = self._join(key)
+        if not leader:
+            self.coalesced += 1
+            return await asyncio.wrap_future(future)
+        try:
+            value = await fetch()
+            await self._astore(key, value, policy)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._leave(key)
+
+    async def _arefresh(self, key: str, policy: SourcePolicy, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            future, leader = self._join(key)
+            if not leader:
+                return
+            try:
+                value = await fetch()
+                await self._astore(key, value, policy)
+                self.refreshes += 1
+                future.set_result(value)
+            except Exception as exc:
+                print(f"⚠️  Atualização em segundo plano falhou para {key}: {exc}")
+                future.set_exception(exc)
+            finally:
+                self._leave(key)
+        finally:
+            self._release_refresh(key)
+
+    # ------------------------------------------------------------------ gestão
+    def clear(self) -> None:
+        try:
+            self.backend.clear()
+        except Exception as exc:
+            self.backend_errors += 1
+            print(f"⚠️  Não foi possível limpar o cache de respostas: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            backend_stats = self.backend.stats()
+        except Exception as exc:
+            backend_stats = {"error": str(exc)}
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            **backend_stats,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "backend_errors": self.backend_errors,
+            "backend_skipped": self.backend_skipped,
+            "backend_retry_in_seconds": round(max(0.0, self._backend_down_until - self._clock()), 1),
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _build_backend(settings):
+    """Backend configurado; ``redis`` explícito sem pacote ou sem URL é erro de inicialização"""
+    kind = settings.response_cache_backend
+    if kind == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requer REDIS_URL.")
+        return RedisBackend.from_url(settings.redis_url)
+    if kind == "auto" and settings.redis_url:
+        if redis is not None:
+            return RedisBackend.from_url(settings.redis_url)
+        print("⚠️  REDIS_URL definida, mas o pacote 'redis' não está instalado. Usando cache em memória.")
+    if kind == "disk":
+        db_path = settings.response_cache_path or (
+            Path(__file__).resolve().parents[1] / "data" / "response_cache.sqlite"
+        )
+        return DiskBackend(Path(db_path), max_entries=settings.response_cache_max_entries)
+    return MemoryBackend(
+        max_entries=settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+    )
+
+
+def _build_response_cache() -> ResponseCache:
+    settings = get_settings()
+    return ResponseCache(
+        _build_backend(settings),
+        default_ttl_seconds=settings.response_cache_ttl_seconds,
+        source_ttls=parse_source_ttls(settings.response_cache_source_ttls),
+        stale_seconds=settings.response_cache_stale_seconds,
+        backend_retry_seconds=settings.response_cache_backend_retry_seconds,
+    )
+
+
+# Instância global compartilhada pelos serviços de dados externos
+response_cache = _build_response_cache()
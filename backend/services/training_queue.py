@@ -0,0 +1,390 @@
+"""Fila de jobs de treino executados em processos separados."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import pandas as pd
+
+from core.config import get_settings
+
+try:  # pragma: no cover - indisponível no Windows
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class TrainingQueueFull(RuntimeError):
+    """Fila de treino cheia; o cliente deve tentar novamente mais tarde"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Fila de treino cheia. Tente novamente em instantes.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class TrainingJob:
+    """Estado persistido de um job de treino"""
+    job_id: str
+    series_id: str
+    fingerprint: str
+    regressors: List[str]
+    rows: int
+    status: str = JOB_QUEUED
+    submitted_at: str = field(default_factory=lambda: datetime.now(UTC).isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    attempts: int = 0
+    owner_pid: int = field(default_factory=os.getpid)
+    owner_id: str = ""  # instância da fila dona do job (o PID se repete após reinício em contêiner)
+    heartbeat_at: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+def compute_job_fingerprint(series_id: str, dataframe: pd.DataFrame, regressors: List[str]) -> str:
+    """Identifica jobs idênticos (mesma série, mesmos dados e regressores)"""
+    digest = hashlib.sha256()
+    digest.update(series_id.encode("utf-8"))
+    digest.update("|".join(regressors).encode("utf-8"))
+    digest.update("|".join(map(str, dataframe.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(dataframe, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def run_training_job(series_id: str, payload_path: str, regressors: List[str]) -> Dict[str, Any]:
+    """Executado no processo de treino: carrega o payload, treina e persiste o modelo"""
+    from services.model_registry import model_registry
+    from services.prophet_service import train_and_persist_model
+
+    dataframe = pd.read_pickle(payload_path)
+    train_and_persist_model(series_id=series_id, dataframe=dataframe, regressors=regressors)
+    metadata = model_registry.get(series_id)
+    return asdict(metadata) if metadata is not None else {"series_id": series_id}
+
+
+class TrainingQueue:
+    """Fila limitada de treinos com deduplicação e estado persistido em disco.
+
+    Cada job vira ``<job_id>.json`` (estado) e ``<job_id>.pkl`` (dados de treino)
+    em ``jobs_dir``. No máximo ``max_workers`` treinos rodam ao mesmo tempo, em
+    processos separados, então o Stan não disputa o GIL nem o event loop das
+    previsões.
+
+    Cada fila tem um ``instance_id`` próprio e renova o ``heartbeat_at`` dos
+    seus jobs ativos a cada ``lease_seconds / 3``. Um job só conta como ativo
+    se pertence a esta instância ou tem heartbeat recente (outro worker vivo);
+    os demais são órfãos (processo da API reiniciado) e são retomados por
+    ``recover``.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Path,
+        max_workers: int = 1,
+        max_pending: int = 8,
+        max_attempts: int = 2,
+        retention_hours: float = 24.0,
+        lease_seconds: float = 60.0,
+        executor_factory: Optional[Callable[[int], Executor]] = None,
+        job_function: Callable[[str, str, List[str]], Dict[str, Any]] = run_training_job,
+    ):
+        self.jobs_dir = Path(jobs_dir)
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.retention_hours = retention_hours
+        self.lease_seconds = lease_seconds
+        self.instance_id = uuid.uuid4().hex
+        self.executor_factory = executor_factory or self._default_executor
+        self.job_function = job_function
+        self._executor: Optional[Executor] = None
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._pending: Deque[str] = deque()
+        self._running: Dict[str, Future] = {}
+        self._listeners: List[Callable[[TrainingJob], None]] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def _default_executor(max_workers: int) -> Executor:
+        # spawn: não herda threads/locks do servidor (fork com threads é inseguro)
+        return ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def add_listener(self, callback: Callable[[TrainingJob], None]) -> None:
+        """Registra callback chamado quando um job termina (sucesso ou falha)"""
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------ disco
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _payload_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.pkl"
+
+    def _save(self, job: TrainingJob) -> None:
+        if job.owner_id == self.instance_id and job.status in ACTIVE_STATUSES:
+            job.heartbeat_at = datetime.now(UTC).isoformat()
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.jobs_dir, prefix=".job-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(asdict(job), handle, ensure_ascii=False, indent=2)
+            os.replace(tmp_name, self._job_path(job.job_id))
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def _load(self, job_id: str) -> Optional[TrainingJob]:
+        try:
+            with open(self._job_path(job_id), encoding="utf-8") as handle:
+                return TrainingJob(**json.load(handle))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return None
+
+    def _load_all(self) -> List[TrainingJob]:
+        if not self.jobs_dir.exists():
+            return []
+        jobs = [self._load(path.stem) for path in self.jobs_dir.glob("*.json")]
+        return [job for job in jobs if job is not None]
+
+    @contextmanager
+    def _dir_lock(self):
+        """Lock entre processos da API (vários workers do uvicorn)"""
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.jobs_dir / ".queue.lock", "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _is_active(self, job: TrainingJob) -> bool:
+        """Job na fila/em execução com dono vivo: esta instância ou outra com heartbeat recente"""
+        if job.status not in ACTIVE_STATUSES:
+            return False
+        if job.owner_id == self.instance_id:
+            return True
+        if not job.heartbeat_at:
+            return False
+        age = datetime.now(UTC) - datetime.fromisoformat(job.heartbeat_at)
+        return age.total_seconds() < self.lease_seconds
+
+    # ------------------------------------------------------------------ API
+    def submit(self, series_id: str, dataframe: pd.DataFrame, regressors: List[str]) -> tuple[TrainingJob, bool]:
+        """Enfileira um treino; retorna ``(job, deduplicado)``.
+
+        Um job idêntico ainda na fila ou em execução é reaproveitado em vez de
+        treinar de novo. Levanta ``TrainingQueueFull`` quando a fila está cheia.
+        """
+        regressors = list(regressors or [])
+        fingerprint = compute_job_fingerprint(series_id, dataframe, regressors)
+        with self._dir_lock():
+            active = [job for job in self._load_all() if self._is_active(job)]
+            for job in active:
+                if job.fingerprint == fingerprint:
+                    return job, True
+            if len(active) >= self.max_workers + self.max_pending:
+                raise TrainingQueueFull(retry_after=self._estimate_retry_after())
+
+            job = TrainingJob(
+                job_id=uuid.uuid4().hex,
+                series_id=series_id,
+                fingerprint=fingerprint,
+                regressors=regressors,
+                rows=int(len(dataframe)),
+                owner_id=self.instance_id,
+            )
+            dataframe.to_pickle(self._payload_path(job.job_id))
+            self._save(job)
+            self._jobs[job.job_id] = job
+            self._pending.append(job.job_id)
+        self._purge_expired()
+        self._start_heartbeat()
+        self._dispatch()
+        return job, False
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        """Estado do job (de memória ou do disco, se criado por outro worker)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def list_jobs(self, series_id: Optional[str] = None) -> List[TrainingJob]:
+        jobs = self._load_all()
+        if series_id is not None:
+            jobs = [job for job in jobs if job.series_id == series_id]
+        return sorted(jobs, key=lambda job: job.submitted_at, reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": len(self._running),
+                "pending": len(self._pending),
+            }
+
+    def recover(self) -> int:
+        """Reenfileira jobs cujo dono morreu (reinício da API): outra instância e sem heartbeat recente"""
+        recovered = 0
+        with self._dir_lock():
+            for job in self._load_all():
+                if job.status not in ACTIVE_STATUSES or self._is_active(job):
+                    continue
+                if not self._payload_path(job.job_id).exists() or job.attempts >= self.max_attempts:
+                    job.status = JOB_FAILED
+                    job.error = "Job interrompido pelo reinício do servidor."
+                    job.finished_at = datetime.now(UTC).isoformat()
+                    self._save(job)
+                    continue
+                job.status = JOB_QUEUED
+                job.owner_pid = os.getpid()
+                job.owner_id = self.instance_id
+                self._save(job)
+                with self._lock:
+                    self._jobs[job.job_id] = job
+                    self._pending.append(job.job_id)
+                recovered += 1
+        if recovered:
+            print(f"🔄 {recovered} job(s) de treino retomados após reinício")
+            self._start_heartbeat()
+        self._dispatch()
+        return recovered
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stopped.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ------------------------------------------------------------------ heartbeat
+    def _start_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat_thread is not None or self._stopped.is_set():
+                return
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop, name="training-heartbeat", daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                self._renew_leases()
+            except OSError as exc:  # pragma: no cover - disco indisponível: tenta no próximo ciclo
+                print(f"⚠️  Não foi possível renovar o heartbeat dos jobs de treino: {exc}")
+
+    def _renew_leases(self) -> None:
+        """Renova o heartbeat dos jobs ativos desta instância (sinal de vida para outros workers)"""
+        with self._dir_lock():
+            with self._lock:
+                jobs = [job for job in self._jobs.values() if job.status in ACTIVE_STATUSES]
+            for job in jobs:
+                self._save(job)
+
+    # ------------------------------------------------------------------ execução
+    def _estimate_retry_after(self) -> int:
+        return 30 * (1 + len(self._pending) // self.max_workers)
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            while self._pending and len(self._running) < self.max_workers:
+                job = self._jobs[self._pending.popleft()]
+                if self._executor is None:
+                    self._executor = self.executor_factory(self.max_workers)
+                job.status = JOB_RUNNING
+                job.started_at = datetime.now(UTC).isoformat()
+                job.attempts += 1
+                self._save(job)
+                future = self._executor.submit(
+                    self.job_function, job.series_id, str(self._payload_path(job.job_id)), job.regressors
+                )
+                self._running[job.job_id] = future
+                future.add_done_callback(lambda fut, job_id=job.job_id: self._on_done(job_id, fut))
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._running.pop(job_id, None)
+            job = self._jobs[job_id]
+            try:
+                job.result = future.result()
+                job.status = JOB_SUCCEEDED
+                print(f"✅ Job de treino {job_id} concluído ({job.series_id})")
+            except Exception as exc:
+                if isinstance(exc, BrokenExecutor):
+                    # Processo de treino morreu (ex.: falta de memória): recriar o pool
+                    self._executor = None
+                job.status = JOB_FAILED
+                job.error = str(exc) or exc.__class__.__name__
+                print(f"❌ Job de treino {job_id} falhou: {job.error}")
+            job.finished_at = datetime.now(UTC).isoformat()
+            self._save(job)
+            self._payload_path(job_id).unlink(missing_ok=True)
+        for callback in self._listeners:
+            try:
+                callback(job)
+            except Exception as exc:  # pragma: no cover - callbacks não derrubam a fila
+                print(f"⚠️  Erro no callback do job {job_id}: {exc}")
+        self._dispatch()
+
+    def _purge_expired(self) -> None:
+        """Remove do disco jobs finalizados há mais de ``retention_hours``"""
+        limit = datetime.now(UTC) - timedelta(hours=self.retention_hours)
+        for job in self._load_all():
+            if job.status in ACTIVE_STATUSES or not job.finished_at:
+                continue
+            if datetime.fromisoformat(job.finished_at) < limit:
+                self._job_path(job.job_id).unlink(missing_ok=True)
+                self._payload_path(job.job_id).unlink(missing_ok=True)
+                with self._lock:
+                    self._jobs.pop(job.job_id, None)
+
+
+def _build_training_queue() -> TrainingQueue:
+    settings = get_settings()
+    jobs_dir = settings.training_jobs_dir or Path(__file__).resolve().parents[1] / "data" / "training_jobs"
+    executor_factory = None
+    if settings.training_executor == "thread":
+        executor_factory = lambda workers: ThreadPoolExecutor(  # noqa: E731
+            max_workers=workers, thread_name_prefix="training"
+        )
+    return TrainingQueue(
+        jobs_dir=Path(jobs_dir),
+        max_workers=settings.training_max_workers,
+        max_pending=settings.training_max_pending,
+        lease_seconds=settings.training_lease_seconds,
+        executor_factory=executor_factory,
+    )
+
+
+# Instância global da fila de treino
+training_queue = _build_training_queue()
@@ -0,0 +1,231 @@
+"""Arquivo local de clima histórico diário, particionado por célula da grade e ano.
+
+Layout::
+
+    data/weather_archive/<célula>/<ano>.npz   (days, tmax, tmin, precip)
+
+``days`` são dias desde 1970-01-01 em ordem crescente. O importador aceita
+dumps diários em CSV ou Parquet (Parquet requer ``pyarrow`` ou
+``fastparquet``, opcionais), com uma ou várias coordenadas por arquivo.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import get_settings
+from services.weather_cache import WeatherDay, cell_key, grid_cell
+
+WEATHER_FIELDS = ("tmax", "tmin", "precip")
+
+# Nomes aceitos nos dumps (inclui o formato diário do Open-Meteo Archive)
+COLUMN_ALIASES = {
+    "ds": ("ds", "date", "data", "time"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "tmax": ("tmax", "temperature_2m_max", "temp_max"),
+    "tmin": ("tmin", "temperature_2m_min", "temp_min"),
+    "precip": ("precip", "precipitation_sum", "precipitation", "prcp"),
+}
+
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Renomeia as colunas conhecidas (ignorando caixa e unidades entre parênteses)"""
+    renamed = {}
+    for column in df.columns:
+        base = str(column).split("(")[0].strip().lower()
+        for target, aliases in COLUMN_ALIASES.items():
+            if base in aliases and target not in renamed.values():
+                renamed[column] = target
+                break
+    return df.rename(columns=renamed)
+
+
+class WeatherArchive:
+    """Leitura e importação do arquivo histórico, com partições em cache.
+
+    Cada partição (célula, ano) lida fica em memória enquanto o ``mtime``
+    do arquivo não muda. ``read_range`` monta anos de dados de uma célula
+    com uma atribuição vetorizada por partição.
+    """
+
+    def __init__(self, base_dir: Path, grid_degrees: float = 0.1):
+        self.base_dir = Path(base_dir)
+        self.grid_degrees = grid_degrees
+        self._lock = threading.RLock()
+        self._partitions: Dict[Tuple[str, int], Tuple[int, Dict[str, np.ndarray]]] = {}
+
+    def _partition_path(self, cell: str, year: int) -> Path:
+        return self.base_dir / cell.replace(":", "_") / f"{year}.npz"
+
+    # ------------------------------------------------------------------ leitura
+    def _load_partition(self, cell: str, year: int) -> Optional[Dict[str, np.ndarray]]:
+        path = self._partition_path(cell, year)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._partitions.get((cell, year))
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+        with np.load(path) as payload:
+            partition = {name: payload[name] for name in ("days",) + WEATHER_FIELDS}
+        with self._lock:
+            self._partitions[(cell, year)] = (mtime_ns, partition)
+        return partition
+
+    def read_range(self, latitude: float, longitude: float, start_date, end_date) -> pd.DataFrame:
+        """Clima diário de ``start_date`` a ``end_date`` (inclusive); dias ausentes ficam NaN"""
+        cell = cell_key(grid_cell(latitude, longitude, self.grid_degrees), self.grid_degrees)
+        first = np.datetime64(pd.Timestamp(start_date).date(), "D")
+        last = np.datetime64(pd.Timestamp(end_date).date(), "D")
+        n_days = max(int((last - first).astype(np.int64)) + 1, 0)
+        values = {name: np.full(n_days, np.nan) for name in WEATHER_FIELDS}
+
+        first_number = int(first.astype(np.int64))
+        first_year = first.astype("datetime64[Y]").astype(int) + 1970
+        last_year = last.astype("datetime64[Y]").astype(int) + 1970
+        for year in range(first_year, last_year + 1):
+            partition = self._load_partition(cell, year)
+            if partition is None:
+                continue
+            positions = partition["days"].astype(np.int64) - first_number
+            in_range = (positions >= 0) & (positions < n_days)
+            for name in WEATHER_FIELDS:
+                values[name][positions[in_range]] = partition[name][in_range]
+
+        return pd.DataFrame({
+            "ds": pd.date_range(start=pd.Timestamp(first), periods=n_days, freq="D"),
+            **values,
+        })
+
+    def read_days(self, cell: str, day_numbers: np.ndarray) -> Dict[int, WeatherDay]:
+        """Dias arquivados de uma célula (formato do cache de clima); ignora ausentes"""
+        day_numbers = np.asarray(day_numbers, dtype=np.int64)
+        found: Dict[int, WeatherDay] = {}
+        if len(day_numbers) == 0:
+            return found
+        years = day_numbers.astype("datetime64[D]").astype("datetime64[Y]").astype(int) + 1970
+        for year in np.unique(years):
+            partition = self._load_partition(cell, int(year))
+            if partition is None:
+                continue
+            wanted = day_numbers[years == year]
+            index = np.searchsorted(partition["days"], wanted)
+            index = np.minimum(index, len(partition["days"]) - 1)
+            hit = partition["days"][index] == wanted
+            for day, i in zip(wanted[hit], index[hit]):
+                found[int(day)] = (
+                    float(partition["tmax"][i]),
+                    float(partition["tmin"][i]),
+                    float(partition["precip"][i]),
+                    "archive",
+                )
+        return found
+
+    def coverage(self, latitude: float, longitude: float) -> List[int]:
+        """Anos arquivados da célula que contém a coordenada"""
+        cell = cell_key(grid_cell(latitude, longitude, self.grid_degrees), self.grid_degrees)
+        directory = self._partition_path(cell, 0).parent
+        return sorted(int(path.stem) for path in directory.glob("*.npz"))
+
+    # ---------------------------------------------------------------- importação
+    def _write_partition(self, cell: str, year: int, partition: Dict[str, np.ndarray]) -> None:
+        path = self._partition_path(cell, year)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".archive-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                np.savez_compressed(handle, **partition)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def import_frame(
+        self,
+        df: pd.DataFrame,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> Dict[str, int]:
+        """Importa um dump diário; ``latitude``/``longitude`` valem para dumps de um só ponto.
+
+        Vários pontos na mesma célula e dia são combinados pela média. Dados
+        novos substituem os já arquivados para os mesmos dias.
+        """
+        df = _normalize_columns(df)
+        if latitude is not None:
+            df["latitude"] = latitude
+        if longitude is not None:
+            df["longitude"] = longitude
+        required = ["ds", "latitude", "longitude", *WEATHER_FIELDS]
+        missing = [column for column in required if column not in df.columns]
+        if missing:
+            raise ValueError(f"Dump de clima sem as colunas: {missing}")
+
+        frame = pd.DataFrame({
+            "day": pd.to_datetime(df["ds"]).values.astype("datetime64[D]").astype(np.int64),
+            "row": np.floor(df["latitude"].astype(float) / self.grid_degrees).astype(np.int64),
+            "col": np.floor(df["longitude"].astype(float) / self.grid_degrees).astype(np.int64),
+            **{name: pd.to_numeric(df[name], errors="coerce") for name in WEATHER_FIELDS},
+        }).dropna(subset=list(WEATHER_FIELDS))
+        frame["year"] = frame["day"].values.astype("datetime64[D]").astype("datetime64[Y]").astype(int) + 1970
+        daily = frame.groupby(["row", "col", "year", "day"], sort=True)[list(WEATHER_FIELDS)].mean()
+
+        partitions = 0
+        with self._lock:
+            for (row, col, year), group in daily.groupby(level=["row", "col", "year"], sort=False):
+                cell = cell_key((int(row), int(col)), self.grid_degrees)
+                new_days = group.index.get_level_values("day").to_numpy(dtype=np.int64)
+                merged = {"days": new_days, **{name: group[name].to_numpy() for name in WEATHER_FIELDS}}
+                existing = self._load_partition(cell, int(year))
+                if existing is not None:
+                    keep = ~np.isin(existing["days"], new_days)
+                    days = np.concatenate([existing["days"][keep], new_days])
+                    order = np.argsort(days, kind="stable")
+                    merged = {"days": days[order]}
+                    for name in WEATHER_FIELDS:
+                        merged[name] = np.concatenate([existing[name][keep], group[name].to_numpy()])[order]
+                merged["days"] = merged["days"].astype(np.int32)
+                self._write_partition(cell, int(year), merged)
+                self._partitions.pop((cell, int(year)), None)
+                partitions += 1
+        return {"rows": int(len(daily)), "partitions": partitions}
+
+    def import_file(
+        self,
+        path: Path,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> Dict[str, int]:
+        """Importa um arquivo CSV (``,`` ou ``;``) ou Parquet"""
+        path = Path(path)
+        if path.suffix.lower() in (".parquet", ".pq"):
+            try:
+                df = pd.read_parquet(path)
+            except ImportError as exc:
+                raise RuntimeError("Leitura de Parquet requer pyarrow ou fastparquet instalados.") from exc
+        else:
+            df = pd.read_csv(path, sep=None, engine="python", comment="#")
+        return self.import_frame(df, latitude, longitude)
+
+
+def _build_weather_archive() -> WeatherArchive:
+    settings = get_settings()
+    base_dir = settings.weather_archive_dir or (
+        Path(__file__).resolve().parents[1] / "data" / "weather_archive"
+    )
+    return WeatherArchive(Path(base_dir), grid_degrees=settings.weather_grid_degrees)
+
+
+# Instância global do arquivo histórico
+weather_archive = _build_weather_archive()
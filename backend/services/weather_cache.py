@@ -0,0 +1,136 @@
+"""Cache persistente (SQLite) de clima diário por célula da grade e data."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.config import get_settings
+
+# Um dia em cache: (tmax, tmin, precip, origem)
+WeatherDay = Tuple[float, float, float, str]
+
+SECONDS_PER_DAY = 86400
+
+
+def grid_cell(latitude: float, longitude: float, grid_degrees: float = 0.1) -> Tuple[int, int]:
+    """Índices (linha, coluna) da célula que contém a coordenada"""
+    return int(np.floor(latitude / grid_degrees)), int(np.floor(longitude / grid_degrees))
+
+
+def cell_key(cell: Tuple[int, int], grid_degrees: float = 0.1) -> str:
+    return f"{grid_degrees:g}:{cell[0]}:{cell[1]}"
+
+
+def cell_center(cell: Tuple[int, int], grid_degrees: float = 0.1) -> Tuple[float, float]:
+    return (cell[0] + 0.5) * grid_degrees, (cell[1] + 0.5) * grid_degrees
+
+
+class WeatherCache:
+    """Clima diário por (célula, dia), compartilhado entre hospitais próximos.
+
+    Só é imutável o dia gravado depois de terminado (``fetched_at`` após o
+    fim do dia): o valor vale para sempre. Os demais são previsões, inclusive
+    as de dias que já passaram, e expiram após ``forecast_ttl_seconds``. Os
+    dias são guardados como número do dia (``datetime64[D]`` em inteiro).
+    """
+
+    def __init__(self, db_path: Path, forecast_ttl_seconds: float = 3 * 3600):
+        self.db_path = Path(db_path)
+        self.forecast_ttl_seconds = forecast_ttl_seconds
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS weather_days ("
+                    " cell TEXT NOT NULL, day INTEGER NOT NULL,"
+                    " tmax REAL NOT NULL, tmin REAL NOT NULL, precip REAL NOT NULL,"
+                    " source TEXT NOT NULL, fetched_at REAL NOT NULL,"
+                    " PRIMARY KEY (cell, day))"
+                )
+                self._schema_ready = True
+            with conn:  # commit/rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def get_days(
+        self, cell: str, first_day: int, last_day: int, today: int, now: Optional[float] = None
+    ) -> Dict[int, WeatherDay]:
+        """Dias válidos em cache no intervalo fechado ``[first_day, last_day]``"""
+        now = time.time() if now is None else now
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, tmax, tmin, precip, source, fetched_at FROM weather_days"
+                " WHERE cell = ? AND day BETWEEN ? AND ?",
+                (cell, int(first_day), int(last_day)),
+            ).fetchall()
+        valid = {
+            day: (tmax, tmin, precip, source)
+            for day, tmax, tmin, precip, source, fetched_at in rows
+            if fetched_at >= (day + 1) * SECONDS_PER_DAY or now - fetched_at <= self.forecast_ttl_seconds
+        }
+        self.hits += len(valid)
+        self.misses += int(last_day - first_day + 1) - len(valid)
+        return valid
+
+    def put_days(self, cell: str, days: Dict[int, WeatherDay], now: Optional[float] = None) -> None:
+        if not days:
+            return
+        now = time.time() if now is None else now
+        rows = [
+            (cell, int(day), float(tmax), float(tmin), float(precip), source, now)
+            for day, (tmax, tmin, precip, source) in days.items()
+        ]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO weather_days"
+                " (cell, day, tmax, tmin, precip, source, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM weather_days")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock, self._connect() as conn:
+            entries, cells = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT cell) FROM weather_days"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "cells": cells,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _build_weather_cache() -> Optional[WeatherCache]:
+    settings = get_settings()
+    if not settings.weather_cache_enabled:
+        return None
+    db_path = settings.weather_cache_path or (
+        Path(__file__).resolve().parents[1] / "data" / "weather_cache.sqlite"
+    )
+    return WeatherCache(Path(db_path), forecast_ttl_seconds=settings.weather_forecast_ttl_seconds)
+
+
+# Instância global (None quando desabilitado)
+weather_cache = _build_weather_cache()
@@ -1,75 +1,211 @@
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 
+from core.config import get_settings
+from services.calendar_service import calendar_table
+from services.http_client import HttpClient, http_client
+from services.weather_archive import WeatherArchive, weather_archive
+from services.weather_cache import WeatherCache, WeatherDay, cell_center, cell_key, grid_cell, weather_cache
+
+# O endpoint /forecast gratuito cobre 5 dias em passos de 3 horas
+OPENWEATHER_MAX_STEPS = 40
+
+
 class WeatherService:
-    """Serviço para buscar dados climáticos"""
+    """Serviço para buscar dados climáticos
+
+    O clima é resolvido por célula da grade (``grid_degrees``, ~11 km com
+    0,1°): hospitais da mesma cidade compartilham a célula e o cache. Dias
+    passados vêm primeiro do arquivo histórico local; o restante sai do
+    cache e só os dias ausentes são buscados. Dias sem dado real são
+    simulados de forma determinística a partir da célula e da data (e não
+    vão para o cache, para não esconder dados importados depois).
+    """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[WeatherCache] = None, grid_degrees: float = 0.1,
+                 api_key: Optional[str] = None, archive: Optional[WeatherArchive] = None,
+                 http: Optional[HttpClient] = None):
         # Usar OpenWeatherMap API (gratuita com limite)
-        self.api_key = None  # Pode ser configurado via env
+        self.api_key = api_key  # Pode ser configurado via env (OPENWEATHER_API_KEY)
         self.base_url = "https://api.openweathermap.org/data/2.5"
+        self.cache = cache
+        self.grid_degrees = grid_degrees
+        self.archive = archive
+        self.http = http if http is not None else http_client
+    
+    def _lookup(self, latitude: float, longitude: float, days: int, start_date):
+        """Dias pedidos já resolvidos (arquivo/cache) e os que faltam buscar"""
+        today = np.datetime64(datetime.now().date(), 'D')
+        first_day = np.datetime64(pd.Timestamp(start_date).date(), 'D') if start_date is not None else today
+        day_numbers = np.arange(first_day, first_day + days).astype(np.int64)
+        cell = grid_cell(latitude, longitude, self.grid_degrees)
+        key = cell_key(cell, self.grid_degrees)
+        today_number = int(today.astype(np.int64))
+        
+        weather: Dict[int, WeatherDay] = {}
+        past = day_numbers[day_numbers < today_number]
+        if self.archive is not None and len(past):
+            weather.update(self.archive.read_days(key, past))
+        if self.cache is not None and 0 < len(day_numbers) and len(weather) < len(day_numbers):
+            cached = self.cache.get_days(key, day_numbers[0], day_numbers[-1], today_number)
+            for day, values in cached.items():
+                weather.setdefault(day, values)
+        missing = [int(day) for day in day_numbers if int(day) not in weather]
+        return cell, key, day_numbers, today_number, weather, missing
+    
+    def _store(self, key: str, weather: Dict[int, WeatherDay], fetched: Dict[int, WeatherDay]) -> None:
+        weather.update(fetched)
+        if self.cache is not None:
+            self.cache.put_days(key, {
+                day: values for day, values in fetched.items() if values[3] != 'simulated'
+            })
     
-    def get_weather_forecast(self, latitude: float, longitude: float, days: int = 14) -> Optional[pd.DataFrame]:
+    @staticmethod
+    def _to_frame(day_numbers: np.ndarray, weather: Dict[int, WeatherDay]) -> pd.DataFrame:
+        if len(day_numbers) == 0:
+            return pd.DataFrame(columns=['ds', 'tmax', 'tmin', 'precip'])
+        values = np.array([weather[int(day)][:3] for day in day_numbers], dtype=float)
+        return pd.DataFrame({
+            'ds': pd.DatetimeIndex(day_numbers.astype('datetime64[D]')),
+            'tmax': values[:, 0],
+            'tmin': values[:, 1],
+            'precip': values[:, 2]
+        })
+    
+    def get_weather_forecast(self, latitude: float, longitude: float, days: int = 14,
+                             start_date=None) -> Optional[pd.DataFrame]:
         """
-        Busca previsão do tempo para os próximos dias
+        Busca o clima diário de ``days`` dias a partir de ``start_date`` (padrão: hoje)
         """
-        try:
+        cell, key, day_numbers, today, weather, missing = self._lookup(latitude, longitude, days, start_date)
+        if missing:
+            request = self._forecast_request(cell, missing, today)
+            forecast = self._fetch_openweather(*request) if request else {}
+            self._store(key, weather, self._complete_days(cell, missing, forecast))
+        return self._to_frame(day_numbers, weather)
+    
+    async def aget_weather_forecast(self, latitude: float, longitude: float, days: int = 14,
+                                    start_date=None) -> Optional[pd.DataFrame]:
+        """Versão assíncrona de ``get_weather_forecast`` (só a chamada à API é aguardada)"""
+        cell, key, day_numbers, today, weather, missing = self._lookup(latitude, longitude, days, start_date)
+        if missing:
+            request = self._forecast_request(cell, missing, today)
+            forecast = await self._afetch_openweather(*request) if request else {}
+            self._store(key, weather, self._complete_days(cell, missing, forecast))
+        return self._to_frame(day_numbers, weather)
+    
+    def get_historical_weather(self, latitude: float, longitude: float, start_date, end_date) -> pd.DataFrame:
+        """
+        Clima diário de um período passado para treino, lido do arquivo local numa chamada
+
+        Dias ausentes do arquivo são completados como em ``get_weather_forecast``.
+        """
+        if self.archive is None:
+            days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+            return self.get_weather_forecast(latitude, longitude, days, start_date)
+        
+        weather_df = self.archive.read_range(latitude, longitude, start_date, end_date)
+        gaps = weather_df[['tmax', 'tmin', 'precip']].isna().any(axis=1).to_numpy()
+        print(f"🗄️  Clima histórico: {int((~gaps).sum())} de {len(weather_df)} dias no arquivo local")
+        if gaps.any():
+            first_gap = int(np.argmax(gaps))
+            filler = self.get_weather_forecast(
+                latitude, longitude, len(weather_df) - first_gap, weather_df['ds'].iloc[first_gap]
+            )
+            for column in ('tmax', 'tmin', 'precip'):
+                values = weather_df[column].to_numpy(copy=True)
+                values[gaps] = filler[column].to_numpy()[gaps[first_gap:]]
+                weather_df[column] = values
+        return weather_df
+    
+    def _forecast_request(self, cell: Tuple[int, int], missing: List[int], today: int) -> Optional[Tuple[float, float, int]]:
+        """(latitude, longitude, dias à frente) para a API, ou None se não há o que buscar nela"""
+        future = [day for day in missing if day >= today]
+        if not future or not self.api_key:
+            return None
+        latitude, longitude = cell_center(cell, self.grid_degrees)
+        return latitude, longitude, max(future) - today + 1
+    
+    def _complete_days(self, cell: Tuple[int, int], missing: List[int],
+                       fetched: Dict[int, WeatherDay]) -> Dict[int, WeatherDay]:
+        """Dias ausentes: os da previsão da API e simulação no resto"""
+        fetched = dict(fetched)
+        remaining = np.array([day for day in missing if day not in fetched], dtype=np.int64)
+        if len(remaining):
             if not self.api_key:
                 print("⚠️  API key do OpenWeatherMap não configurada. Usando dados simulados.")
-                return self._generate_simulated_weather(latitude, longitude, days)
-            
+            fetched.update(self._generate_simulated_weather(cell, remaining))
+        return fetched
+    
+    def _openweather_params(self, latitude: float, longitude: float, days_ahead: int) -> Dict:
+        return {
+            'lat': latitude,
+            'lon': longitude,
+            'appid': self.api_key,
+            'units': 'metric',
+            'cnt': min(days_ahead * 8, OPENWEATHER_MAX_STEPS)  # 8 previsões por dia (3 horas cada)
+        }
+    
+    @staticmethod
+    def _parse_openweather(data: Dict) -> Dict[int, WeatherDay]:
+        # Processar dados
+        weather_data = []
+        for item in data['list']:
+            weather_data.append({
+                'ds': pd.to_datetime(item['dt_txt']),
+                'tmax': item['main']['temp_max'],
+                'tmin': item['main']['temp_min'],
+                'precip': item.get('rain', {}).get('3h', 0) + item.get('snow', {}).get('3h', 0)
+            })
+        if not weather_data:
+            return {}
+        
+        df = pd.DataFrame(weather_data)
+        
+        # Agrupar por dia: máxima, mínima e chuva acumulada
+        df['day'] = df['ds'].values.astype('datetime64[D]').astype(np.int64)
+        daily_weather = df.groupby('day').agg({
+            'tmax': 'max',
+            'tmin': 'min',
+            'precip': 'sum'
+        })
+        return {
+            int(day): (row.tmax, row.tmin, row.precip, 'openweathermap')
+            for day, row in daily_weather.iterrows()
+        }
+    
+    def _fetch_openweather(self, latitude: float, longitude: float, days_ahead: int) -> Dict[int, WeatherDay]:
+        try:
             # Buscar previsão do tempo
-            url = f"{self.base_url}/forecast"
-            params = {
-                'lat': latitude,
-                'lon': longitude,
-                'appid': self.api_key,
-                'units': 'metric',
-                'cnt': days * 8  # 8 previsões por dia (3 horas cada)
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Processar dados
-            weather_data = []
-            for item in data['list']:
-                weather_data.append({
-                    'ds': pd.to_datetime(item['dt_txt']),
-                    'tmax': item['main']['temp_max'],
-                    'tmin': item['main']['temp_min'],
-                    'precip': item.get('rain', {}).get('3h', 0) + item.get('snow', {}).get('3h', 0)
-                })
-            
-            df = pd.DataFrame(weather_data)
-            
-            # Agrupar por dia e calcular médias
-            df['date'] = df['ds'].dt.date
-            daily_weather = df.groupby('date').agg({
-                'tmax': 'max',
-                'tmin': 'min',
-                'precip': 'sum'
-            }).reset_index()
-            
-            daily_weather['ds'] = pd.to_datetime(daily_weather['date'])
-            daily_weather = daily_weather.drop('date', axis=1)
-            
-            return daily_weather.head(days)
-            
+            data = self.http.get_json(
+                f"{self.base_url}/forecast", params=self._openweather_params(latitude, longitude, days_ahead)
+            )
+            return self._parse_openweather(data)
         except Exception as e:
             print(f"❌ Erro ao buscar dados climáticos: {e}")
-            return self._generate_simulated_weather(latitude, longitude, days)
+            return {}
     
-    def _generate_simulated_weather(self, latitude: float, longitude: float, days: int) -> pd.DataFrame:
+    async def _afetch_openweather(self, latitude: float, longitude: float, days_ahead: int) -> Dict[int, WeatherDay]:
+        try:
+            data = await self.http.aget_json(
+                f"{self.base_url}/forecast", params=self._openweather_params(latitude, longitude, days_ahead)
+            )
+            return self._parse_openweather(data)
+        except Exception as e:
+            print(f"❌ Erro ao buscar dados climáticos: {e}")
+            return {}
+    
+    def _generate_simulated_weather(self, cell: Tuple[int, int], day_numbers: np.ndarray) -> Dict[int, WeatherDay]:
         """
         Gera dados climáticos simulados baseados na localização
+
+        O ruído de cada dia vem de um gerador semeado pela célula e pela
+        data, então o mesmo dia simulado é sempre igual.
         """
-        print(f"🌤️  Gerando dados climáticos simulados para {days} dias")
+        latitude, _ = cell_center(cell, self.grid_degrees)
+        print(f"🌤️  Gerando dados climáticos simulados para {len(day_numbers)} dias")
         
         # Determinar estação baseada na latitude
         if latitude < -15:  # Sul do Brasil
@@ -83,41 +219,48 @@ class WeatherService:
             base_temp = 28
             temp_variation = 4
         
-        # Gerar dados para os próximos dias
-        dates = pd.date_range(start=datetime.now(), periods=days, freq='D')
-        weather_data = []
-        
-        for i, date in enumerate(dates):
-            # Variação sazonal
-            day_of_year = date.timetuple().tm_yday
-            seasonal_factor = np.sin(2 * np.pi * day_of_year / 365)
-            
-            # Temperatura com variação sazonal e aleatória
-            temp_base = base_temp + seasonal_factor * temp_variation
-            temp_noise = np.random.normal(0, 2)
-            
-            tmax = max(temp_base + temp_noise + 3, 15)  # Mínimo 15°C
-            tmin = max(temp_base + temp_noise - 3, 10)  # Mínimo 10°C
-            
-            # Precipitação (mais comum no verão)
-            precip_prob = 0.3 + 0.2 * seasonal_factor  # 30-50% chance
-            precip = np.random.exponential(5) if np.random.random() < precip_prob else 0
-            
-            weather_data.append({
-                'ds': date,
-                'tmax': round(tmax, 1),
-                'tmin': round(tmin, 1),
-                'precip': round(precip, 1)
-            })
-        
-        return pd.DataFrame(weather_data)
+        # Ruído de cada dia: N(0, 2) na temperatura, sorteio e volume da chuva.
+        # Sementes não negativas: deslocar índices da célula e o dia
+        offset = 1 << 20
+        noise, rain_draw, rain_volume = np.empty((3, len(day_numbers)))
+        for i, day in enumerate(day_numbers):
+            rng = np.random.default_rng([cell[0] + offset, cell[1] + offset, int(day) + offset])
+            noise[i], rain_draw[i], rain_volume[i] = rng.normal(0, 2), rng.random(), rng.exponential(5)
+        
+        # Variação sazonal
+        day_of_year = calendar_table.lookup(day_numbers.astype('datetime64[D]'), ['day_of_year'])['day_of_year']
+        seasonal_factor = np.sin(2 * np.pi * day_of_year / 365)
+        
+        # Temperatura com variação sazonal e aleatória
+        temp_base = base_temp + seasonal_factor * temp_variation
+        tmax = np.maximum(temp_base + noise + 3, 15)  # Mínimo 15°C
+        tmin = np.maximum(temp_base + noise - 3, 10)  # Mínimo 10°C
+        
+        # Precipitação (mais comum no verão)
+        precip_prob = 0.3 + 0.2 * seasonal_factor  # 30-50% chance
+        precip = np.where(rain_draw < precip_prob, rain_volume, 0.0)
+        
+        return {
+            int(day): (round(float(hi), 1), round(float(lo), 1), round(float(p), 1), 'simulated')
+            for day, hi, lo, p in zip(day_numbers, tmax, tmin, precip)
+        }
     
-    def get_enhanced_weather_forecast(self, latitude: float, longitude: float, days: int = 14) -> Tuple[pd.DataFrame, List[Dict]]:
+    def get_enhanced_weather_forecast(self, latitude: float, longitude: float, days: int = 14,
+                                      start_date=None) -> Tuple[pd.DataFrame, List[Dict]]:
         """
         Busca previsão do tempo aprimorada com insights
         Retorna: (DataFrame com dados climáticos, Lista de insights)
         """
-        weather_df = self.get_weather_forecast(latitude, longitude, days)
+        weather_df = self.get_weather_forecast(latitude, longitude, days, start_date)
+        return self._enhance(weather_df)
+    
+    async def aget_enhanced_weather_forecast(self, latitude: float, longitude: float, days: int = 14,
+                                             start_date=None) -> Tuple[pd.DataFrame, List[Dict]]:
+        """Versão assíncrona de ``get_enhanced_weather_forecast``"""
+        weather_df = await self.aget_weather_forecast(latitude, longitude, days, start_date)
+        return self._enhance(weather_df)
+    
+    def _enhance(self, weather_df: Optional[pd.DataFrame]) -> Tuple[pd.DataFrame, List[Dict]]:
         insights = []
         
         if weather_df is not None and not weather_df.empty:
@@ -318,5 +461,15 @@ class WeatherService:
         
         return insights
 
+def _build_weather_service() -> WeatherService:
+    settings = get_settings()
+    return WeatherService(
+        cache=weather_cache,
+        grid_degrees=settings.weather_grid_degrees,
+        api_key=settings.openweather_api_key,
+        archive=weather_archive,
+    )
+
+
 # Instância global do serviço
-weather_service = WeatherService()
+weather_service = _build_weather_service()
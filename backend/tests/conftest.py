@@ -0,0 +1,25 @@
+"""Fixtures compartilhadas pelos testes."""
+
+from types import SimpleNamespace
+
+import pytest
+import routers.forecast as forecast_router
+import services.ensemble_service as ensemble_module
+import services.history_store as history_store_module
+import services.model_registry as model_registry_module
+import services.prophet_service as prophet_module
+from services.history_store import HISTORY_DIR_NAME, HistoryStore
+from services.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def model_storage(tmp_path, monkeypatch):
+    """Modelos, registro e histórico das séries gravados em ``tmp_path`` em vez de backend/models"""
+    registry = ModelRegistry(tmp_path)
+    history = HistoryStore(tmp_path / HISTORY_DIR_NAME)
+    monkeypatch.setattr(prophet_module, "_get_models_dir", lambda: tmp_path)
+    for module in (model_registry_module, prophet_module, ensemble_module, forecast_router):
+        monkeypatch.setattr(module, "model_registry", registry)
+    for module in (history_store_module, prophet_module, ensemble_module, forecast_router):
+        monkeypatch.setattr(module, "history_store", history)
+    return SimpleNamespace(models_dir=tmp_path, registry=registry, history=history)
@@ -0,0 +1,224 @@
+"""Testes para o serviço de backtesting."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services.backtesting_service import BacktestingService
+from services.fold_result_store import FoldResultStore
+
+
+@pytest.fixture(scope="module")
+def daily_series():
+    """Série diária com sazonalidade semanal e ruído reprodutível."""
+    rng = np.random.default_rng(42)
+    days = 420
+    dates = pd.date_range(start="2023-01-01", periods=days, freq="D")
+    values = 60 + 8 * np.sin(np.arange(days) * 2 * np.pi / 7) + rng.normal(0, 3, days)
+    return pd.DataFrame({"ds": dates, "y": values.round(1)})
+
+
+def _service(tmp_path, name="folds"):
+    """Serviço com armazenamento de janelas próprio do teste (nunca o de backend/data)"""
+    return BacktestingService(fold_store=FoldResultStore(tmp_path / f"{name}.sqlite"))
+
+
+def test_parallel_folds_match_serial_results_in_order(daily_series, tmp_path):
+    """Teste: Janelas em paralelo produzem o mesmo resultado, na mesma ordem, que em série."""
+    # Arrange
+    kwargs = dict(initial_days=300, horizon_days=30, period_days=30)
+
+    # Act - armazenamentos separados: as duas execuções ajustam de fato
+    serial = _service(tmp_path, "serial").rolling_cross_validation(daily_series, max_workers=1, **kwargs)
+    parallel = _service(tmp_path, "parallel").rolling_cross_validation(daily_series, max_workers=2, **kwargs)
+
+    # Assert
+    assert len(serial) == 3
+    assert [r.dates for r in parallel] == [r.dates for r in serial]
+    assert serial[0].dates[0] == "2023-10-28"
+    np.testing.assert_allclose([r.smape for r in parallel], [r.smape for r in serial], rtol=1e-6)
+
+
+def test_fold_cutoffs_follow_initial_period_and_horizon(daily_series):
+    """Teste: Cortes começam após o período inicial e param antes do fim dos dados."""
+    # Arrange
+    service = BacktestingService()
+    df_prep = service.prepare_data_for_prophet(daily_series)
+
+    # Act
+    cutoffs = service.get_fold_cutoffs(df_prep, initial_days=300, horizon_days=30, period_days=45)
+
+    # Assert
+    assert cutoffs[0] == pd.Timestamp("2023-10-28")
+    assert all(b - a == pd.Timedelta(days=45) for a, b in zip(cutoffs[:-1], cutoffs[1:], strict=True))
+    assert cutoffs[-1] + pd.Timedelta(days=30) <= df_prep["ds"].max()
+
+
+def test_grid_search_shares_one_fold_pool_across_candidates(daily_series, tmp_path, monkeypatch):
+    """Teste: Grid search abre um único pool de janelas para todos os candidatos."""
+    # Arrange
+    service = _service(tmp_path)
+    opened = []
+    fold_executor = service.fold_executor
+
+    def counting_executor(df_prep, max_workers):
+        opened.append(max_workers)
+        return fold_executor(df_prep, max_workers)
+
+    monkeypatch.setattr(service, "fold_executor", counting_executor)
+    grid = {"seasonality_mode": ["additive"], "changepoint_prior_scale": [0.01, 0.05]}
+
+    # Act
+    results = service.grid_search(
+        daily_series, grid, initial_days=300, horizon_days=30, period_days=60, max_workers=2
+    )
+
+    # Assert
+    assert len(results) == 2
+    assert opened == [2]
+
+
+def test_successive_halving_respects_fit_budget(daily_series, tmp_path):
+    """Teste: Successive halving não passa do orçamento e promove só os melhores."""
+    # Arrange
+    service = _service(tmp_path)
+    budget = 8
+
+    # Act
+    results = service.successive_halving_search(
+        daily_series, max_fits=budget, initial_days=300, horizon_days=30,
+        period_days=30, eta=2, seed=1, max_workers=1,
+    )
+
+    # Assert
+    fits_used = sum(r.details["folds_evaluated"] for r in results)
+    assert fits_used == results[0].details["fits_used"] <= budget
+    assert results[0].details["folds_evaluated"] == 3
+    assert any(r.details["folds_evaluated"] == 1 for r in results)
+    finalists = [r for r in results if r.details["folds_evaluated"] == 3]
+    assert [r.smape for r in finalists] == sorted(r.smape for r in finalists)
+
+
+def test_successive_halving_budget_smaller_than_folds_uses_recent_folds(daily_series, tmp_path):
+    """Teste: Orçamento menor que o número de janelas avalia só as janelas mais recentes, sem estourar."""
+    # Arrange
+    service = _service(tmp_path)
+
+    # Act
+    results = service.successive_halving_search(
+        daily_series, max_fits=2, initial_days=300, horizon_days=30,
+        period_days=30, eta=2, seed=1, max_workers=1,
+    )
+
+    # Assert
+    assert len(results) == 1
+    assert results[0].details["fits_used"] == results[0].details["folds_evaluated"] == 2
+    with pytest.raises(ValueError):
+        service.successive_halving_search(daily_series, max_fits=0, initial_days=300, horizon_days=30)
+
+
+def test_grid_search_endpoint_rejects_fit_budget_for_full_grid(daily_series):
+    """Teste: max_fits com o método grid é recusado em vez de ser ignorado."""
+    # Arrange
+    client = TestClient(app)
+    csv = daily_series.to_csv(index=False).encode()
+
+    # Act
+    response = client.post(
+        "/forecast/grid-search",
+        data={"series_id": "grade", "optimization_method": "grid", "max_fits": "10"},
+        files={"file": ("serie.csv", csv, "text/csv")},
+    )
+
+    # Assert
+    assert response.status_code == 422
+    assert "max_fits" in response.json()["detail"]
+
+
+def test_bayesian_optimization_reports_convergence(daily_series, tmp_path):
+    """Teste: Otimização bayesiana roda sem erros e devolve a curva de convergência."""
+    # Arrange
+    service = _service(tmp_path)
+
+    # Act
+    results = service.bayesian_optimization(
+        daily_series, n_iterations=3, initial_days=300, horizon_days=30,
+        period_days=60, batch_size=2, seed=0, max_workers=1,
+    )
+    summary = service.get_optimization_summary(results)
+
+    # Assert
+    assert len(results) == 3
+    curve = summary["convergence_curve"]
+    assert len(curve) == 3 and curve[-1] == results[0].smape
+    assert results[0].details["fits_used"] == 3 * 2
+
+
+def test_fold_store_reuses_results_across_runs(daily_series, tmp_path):
+    """Teste: Segunda execução sobre os mesmos dados vem do armazenamento de janelas."""
+    # Arrange
+    store = FoldResultStore(tmp_path / "folds.sqlite")
+    service = BacktestingService(fold_store=store)
+    kwargs = dict(initial_days=300, horizon_days=30, period_days=60, max_workers=1)
+
+    # Act
+    first = service.rolling_cross_validation(daily_series, **kwargs)
+    second = service.rolling_cross_validation(daily_series, **kwargs)
+
+    # Assert
+    assert service.count_cached(first) == 0
+    assert service.count_cached(second) == len(second) == len(first)
+    assert [r.smape for r in second] == pytest.approx([r.smape for r in first])
+    assert store.stats()["entries"] == len(first)
+
+
+def test_warm_start_matches_cold_start_metrics(tmp_path):
+    """Teste: Com histórico identificável (> 2 anos), warm start chega às métricas do ajuste a frio."""
+    # Arrange
+    rng = np.random.default_rng(7)
+    days = 820
+    t = np.arange(days)
+    values = 80 + 0.02 * t + 8 * np.sin(t * 2 * np.pi / 7) + 6 * np.sin(t * 2 * np.pi / 365.25)
+    series = pd.DataFrame({
+        "ds": pd.date_range(start="2021-01-01", periods=days, freq="D"),
+        "y": (values + rng.normal(0, 2, days)).round(1),
+    })
+    service = _service(tmp_path)
+    kwargs = dict(initial_days=740, horizon_days=30, period_days=20, max_workers=1)
+
+    # Act
+    cold = service.rolling_cross_validation(series, **kwargs)
+    warm = service.rolling_cross_validation(series, warm_start=True, **kwargs)
+
+    # Assert
+    assert [r.dates for r in warm] == [r.dates for r in cold]
+    assert [r.details["warm_start"] for r in warm] == [False, True, True]
+    np.testing.assert_allclose([r.smape for r in warm], [r.smape for r in cold], atol=0.1)
+
+
+def test_fold_results_from_cv_groups_by_cutoff(daily_series):
+    """Teste: Saída do cross_validation vira uma janela por cutoff, com métricas da janela inteira."""
+    # Arrange
+    service = BacktestingService()
+    df_prep = service.prepare_data_for_prophet(daily_series)
+    cutoffs = [pd.Timestamp("2023-10-01"), pd.Timestamp("2023-11-01")]
+    frames = []
+    for cutoff, days in zip(cutoffs, [5, 3], strict=True):  # janelas de tamanhos diferentes
+        ds = pd.date_range(cutoff + pd.Timedelta(days=1), periods=days, freq="D")
+        frames.append(pd.DataFrame({"ds": ds, "cutoff": cutoff, "yhat": np.linspace(55, 65, days)}))
+    cv_results = pd.concat(frames[::-1], ignore_index=True)
+    params = {"seasonality_mode": "additive"}
+
+    # Act
+    results = service._fold_results_from_cv(cv_results, df_prep, params)
+
+    # Assert
+    assert [len(r.dates) for r in results] == [5, 3]
+    assert results[0].dates[0] == "2023-10-02"
+    for result, frame in zip(results, frames, strict=True):
+        actual = df_prep.set_index("ds").loc[frame["ds"], "y"].to_numpy()
+        expected = service.calculate_metrics(actual, frame["yhat"].to_numpy())
+        assert result.actuals == actual.tolist()
+        for metric in ("smape", "mae", "rmse", "mape"):
+            assert getattr(result, metric) == pytest.approx(expected[metric])
@@ -0,0 +1,76 @@
+"""Testes para o serviço de baselines."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from services.baseline_service import BaselineService
+
+
+@pytest.fixture(scope="module")
+def weekly_series():
+    """Série diária de dois anos com padrão semanal."""
+    rng = np.random.default_rng(5)
+    days = 730
+    values = 50 + 10 * np.sin(np.arange(days) * 2 * np.pi / 7) + rng.normal(0, 2, days)
+    return pd.DataFrame({"ds": pd.date_range("2022-01-01", periods=days, freq="D"), "y": values})
+
+
+# Métricas por janela (smape, rmse) de ``weekly_series`` calculadas com o laço original,
+# uma chamada de evaluate_baseline por janela; sazonal-naive e decomposição já com a fase
+# do calendário corrigida. Referência fixa para pegar regressões do cálculo em lote.
+REFERENCE_WINDOW_METRICS = {
+    "naive": (
+        [14.1733, 15.454, 17.1478, 17.8717, 21.0702, 17.697, 16.9752, 12.7496],
+        [7.8067, 9.3907, 10.2944, 11.4385, 12.3936, 11.4897, 10.6056, 7.5679],
+    ),
+    "seasonal_naive": (
+        [3.9033, 4.106, 3.537, 5.7611, 4.7462, 3.2972, 4.359, 3.9911],
+        [2.4373, 2.4345, 2.3439, 3.2534, 3.1777, 2.1964, 2.5376, 2.4471],
+    ),
+    "moving_average": (
+        [14.1745, 13.241, 11.8605, 13.8705, 14.0899, 12.3124, 14.1447, 12.6678],
+        [7.8385, 7.3842, 6.8332, 7.8397, 7.7117, 6.9112, 8.0089, 7.1851],
+    ),
+    "linear_trend": (
+        [15.6283, 13.6545, 11.9593, 13.8792, 14.8787, 13.1188, 15.1286, 13.6285],
+        [9.166, 7.8126, 6.9013, 7.8717, 8.4169, 7.3263, 8.8917, 7.8574],
+    ),
+    "exponential_smoothing": (
+        [14.8445, 14.4908, 13.7658, 14.3799, 14.3229, 12.1339, 14.2568, 13.3145],
+        [8.5442, 8.4566, 8.2169, 8.7149, 7.9286, 6.9082, 8.0363, 7.4642],
+    ),
+    "seasonal_decomposition": (
+        [12.4012, 10.5705, 11.9092, 6.6161, 3.1763, 4.4501, 6.6633, 8.6927],
+        [6.2108, 5.7171, 5.797, 3.6504, 2.1184, 2.6635, 3.8603, 4.5099],
+    ),
+}
+
+
+def test_cross_validation_matches_reference_window_loop(weekly_series):
+    """Teste: Janelas calculadas em lote reproduzem as métricas do laço original janela a janela."""
+    # Arrange
+    service = BaselineService()
+
+    # Act
+    batch = service.cross_validate_baselines(
+        weekly_series, initial_days=365, horizon_days=30, period_days=45
+    )
+
+    # Assert
+    assert set(batch) == set(service.METHODS)
+    for method, (smape, rmse) in REFERENCE_WINDOW_METRICS.items():
+        assert batch[method].smape == pytest.approx(smape, abs=1e-4), method
+        assert batch[method].rmse == pytest.approx(rmse, abs=1e-4), method
+
+
+def test_seasonal_naive_repeats_last_cycle_in_calendar_order():
+    """Teste: Sazonal-naive repete o último ciclo completo, na ordem dos dias."""
+    # Arrange
+    service = BaselineService()
+    df = pd.DataFrame({"y": np.arange(1.0, 16.0)})  # 15 dias
+
+    # Act
+    predictions = service.seasonal_naive_forecast(df, horizon=9)
+
+    # Assert
+    assert predictions == [9.0, 10.0, 11.0, 12.0, 13.0, 14.0, 15.0, 9.0, 10.0]
@@ -0,0 +1,58 @@
+"""Testes para a tabela de calendário compartilhada."""
+
+import numpy as np
+import pandas as pd
+from services.calendar_service import CalendarService, calendar_table
+
+
+def test_table_matches_pandas_date_attributes():
+    """Teste: Tabela pré-calculada coincide com os atributos de data do pandas em todo o intervalo."""
+    # Arrange
+    ds = pd.Series(pd.date_range(str(calendar_table.start), str(calendar_table.end), freq="D"))
+
+    # Act
+    columns = calendar_table.columns
+
+    # Assert
+    assert len(calendar_table) == len(ds)
+    np.testing.assert_array_equal(columns["year"], ds.dt.year)
+    np.testing.assert_array_equal(columns["month"], ds.dt.month)
+    np.testing.assert_array_equal(columns["day_of_month"], ds.dt.day)
+    np.testing.assert_array_equal(columns["day_of_week"], ds.dt.dayofweek)
+    np.testing.assert_array_equal(columns["day_of_year"], ds.dt.dayofyear)
+    np.testing.assert_array_equal(columns["month_end"], ds.dt.day >= ds.dt.days_in_month - 1)
+
+
+def test_lookup_slices_ranges_and_handles_any_dates():
+    """Teste: Intervalos contíguos são fatias da tabela; datas soltas ou fora dela dão os mesmos valores."""
+    # Arrange
+    contiguous = pd.date_range("2024-02-27", periods=5, freq="D")
+    scattered = pd.DatetimeIndex(["2024-03-01", "1985-06-15", "2024-02-28 13:30", "2150-01-01"])
+
+    # Act
+    sliced = calendar_table.lookup(contiguous, ["month_end", "is_winter"])
+    mixed = calendar_table.lookup(scattered, ["year", "is_winter", "day_of_week"])
+
+    # Assert
+    assert np.shares_memory(sliced["month_end"], calendar_table.columns["month_end"])
+    assert sliced["month_end"].tolist() == [0, 1, 1, 0, 0]  # 2024 é bissexto
+    assert mixed["year"].tolist() == [2024, 1985, 2024, 2150]
+    assert mixed["is_winter"].tolist() == [0, 1, 0, 0]
+    assert mixed["day_of_week"].tolist() == [4, 5, 2, 3]
+
+
+def test_calendar_features_keep_original_columns():
+    """Teste: create_calendar_features mantém colunas e regras de pronto-socorro."""
+    # Arrange
+    service = CalendarService()
+
+    # Act
+    df = service.create_calendar_features(pd.Timestamp("2023-12-29"), pd.Timestamp("2024-01-06"))
+
+    # Assert
+    assert list(df.columns) == [
+        "ds", "is_payday", "month_end", "is_weekend", "day_of_week", "is_monday",
+        "is_friday", "is_winter", "is_school_holiday", "month", "day_of_month", "quarter",
+    ]
+    assert df["is_payday"].tolist() == [0, 0, 0, 1, 1, 1, 1, 1, 0]
+    assert df["quarter"].tolist() == [4, 4, 4, 1, 1, 1, 1, 1, 1]
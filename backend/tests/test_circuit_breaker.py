@@ -0,0 +1,106 @@
+"""Testes para os circuit breakers das APIs externas."""
+
+import asyncio
+
+import httpx
+from routers import real_data as real_data_router
+from services.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+from services.http_client import HttpClient
+from services.real_data_service import RealDataService
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_on_errors_and_probes_when_half_open():
+    """Teste: Erros acima do limite abrem o circuito; depois do tempo aberto, uma chamada de teste decide."""
+    # Arrange
+    clock = _Clock()
+    breaker = CircuitBreaker("sih", min_calls=4, error_rate_threshold=0.5, open_seconds=30, clock=clock)
+
+    # Act
+    for success in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success, 0.1)
+    rejected_while_open = breaker.allow()
+    clock.now += 31
+    probe_allowed = breaker.allow()
+    concurrent_probe = breaker.allow()
+    breaker.record(False, 0.1)  # teste falhou: reabre
+    reopened = breaker.state
+    clock.now += 31
+    breaker.allow()
+    breaker.record(True, 0.1)
+
+    # Assert
+    assert rejected_while_open is False
+    assert probe_allowed is True and concurrent_probe is False
+    assert reopened == STATE_OPEN
+    assert breaker.state == STATE_CLOSED
+    assert breaker.snapshot()["times_opened"] == 2
+
+
+def test_slow_calls_open_the_breaker_and_old_calls_leave_the_window():
+    """Teste: Chamadas lentas (mesmo com sucesso) abrem o circuito; a janela móvel esquece o passado."""
+    # Arrange
+    clock = _Clock()
+    slow = CircuitBreaker("cnes", min_calls=3, slow_call_seconds=2.0, slow_rate_threshold=0.8, clock=clock)
+    forgetful = CircuitBreaker("ibge", window_seconds=60, min_calls=3, clock=clock)
+
+    # Act
+    for _ in range(3):
+        slow.record(True, 5.0)
+    slow_state, slow_p95 = slow.state, slow.snapshot()["p95_latency_seconds"]
+    forgetful.record(False, 0.1)
+    forgetful.record(False, 0.1)
+    clock.now += 61
+    forgetful.record(False, 0.1)
+
+    # Assert
+    assert slow_state == STATE_OPEN and slow_p95 == 5.0
+    assert forgetful.state == STATE_CLOSED  # só 1 chamada na janela
+    assert slow.state == STATE_HALF_OPEN  # 61s depois: pronto para a chamada de teste
+
+
+def test_open_circuit_fails_fast_to_fallback_and_status_reads_breakers(monkeypatch):
+    """Teste: Upstream travado só é chamado até abrir o circuito; o status não faz chamadas."""
+    # Arrange
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        raise httpx.ReadTimeout("sem resposta", request=request)
+
+    http = HttpClient(
+        transport=httpx.MockTransport(handler),
+        breakers=CircuitBreakerRegistry(min_calls=2, open_seconds=60),
+    )
+    service = RealDataService(http=http)
+    monkeypatch.setattr(real_data_router, "real_data_service", service)
+
+    # Act
+    results = [service.get_covid_data(uf) for uf in ("SC", "PR", "SP", "RS", "RJ")]
+    status = asyncio.run(real_data_router.get_data_sources_status())
+
+    # Assert
+    assert len(calls) == 2
+    assert all(result == service._get_fallback_covid_data() for result in results)
+    assert http.stats()["rejected"] == {"brasilapi.com.br": 3}
+    assert status["data_sources"]["brasil_api"] is False
+    assert status["data_sources"]["cnes_api"] == "unknown"  # nunca chamada: não conta como disponível
+    assert status["data_sources"]["overall_status"] == "offline"
+    assert real_data_router._upstream_availability({"state": STATE_CLOSED, "calls_in_window": 3}) is True
+    assert real_data_router._upstream_availability({"state": STATE_HALF_OPEN, "calls_in_window": 0}) is False
+    assert status["circuit_breakers"]["brasilapi"]["state"] == STATE_OPEN
+    assert len(calls) == 2  # status não sondou nenhuma API
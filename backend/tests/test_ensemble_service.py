@@ -0,0 +1,135 @@
+"""Testes para o ensemble Prophet + Naive Semanal."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services.ensemble_service import EnsembleService
+from services.history_store import SeriesHistory
+from services.prophet_service import _get_model_path, train_and_persist_model
+
+
+def test_naive_weekly_uses_last_value_of_each_weekday():
+    """Teste: Naive Semanal repete o último valor do mesmo dia da semana, com média onde falta."""
+    # Arrange
+    service = EnsembleService()
+    ds = pd.date_range("2024-01-01", periods=40, freq="D")
+    history = pd.DataFrame({"ds": ds, "y": np.arange(40.0)}).drop(index=[36])  # sem a última sexta
+
+    # Act
+    forecast = service.naive_weekly_forecast(SeriesHistory.from_frame(history), horizon=10)
+
+    # Assert
+    expected = []
+    for date in forecast["ds"]:
+        same_weekday = history[history["ds"].dt.dayofweek == date.dayofweek]
+        expected.append(same_weekday["y"].iloc[-1])
+    assert forecast["ds"].iloc[0] == pd.Timestamp("2024-02-10")
+    np.testing.assert_allclose(forecast["yhat"], expected)
+
+
+def test_predict_ensemble_uses_history_saved_by_training(model_storage):
+    """Teste: Ensemble lê o histórico gravado no treino em vez de dados simulados."""
+    # Arrange
+    client = TestClient(app)
+    series_id = "test_ensemble_history"
+    ds = pd.date_range("2024-01-01", periods=60, freq="D")
+    values = 50 + 10 * (ds.dayofweek == 0)
+    train_and_persist_model(series_id, pd.DataFrame({"ds": ds, "y": values}), regressors=[])
+
+    # Act
+    response = client.post("/forecast/predict-ensemble", json={"series_id": series_id, "horizon": 7})
+    missing = client.post("/forecast/predict-ensemble", json={"series_id": "sem_modelo", "horizon": 7})
+
+    # Assert
+    assert response.status_code == 200
+    body = response.json()
+    assert body["forecast"][0]["ds"] == "2024-03-01"
+    assert body["ensemble_info"]["naive_mean"] == np.mean([50] * 6 + [60])
+    assert missing.status_code == 404
+
+    # Cleanup
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
+    _get_model_path(series_id).unlink(missing_ok=True)
+
+
+def _fold_results(history, cutoffs, horizon, prophet_fn):
+    """Janelas de backtest simuladas (mesmos campos de BacktestResult)."""
+    folds = []
+    for cutoff in cutoffs:
+        test = history[(history["ds"] >= cutoff)].head(horizon)
+        folds.append(SimpleNamespace(
+            dates=test["ds"].dt.strftime("%Y-%m-%d").tolist(),
+            actuals=test["y"].tolist(),
+            predictions=prophet_fn(test).tolist(),
+        ))
+    return folds
+
+
+@pytest.fixture
+def weekly_history():
+    rng = np.random.default_rng(21)
+    ds = pd.date_range("2023-01-01", periods=300, freq="D")
+    y = 40 + 15 * (ds.dayofweek >= 5) + rng.normal(0, 1, len(ds))
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+def test_learned_weights_recover_mixture_of_components(weekly_history):
+    """Teste: Quando o real é 0,4·Prophet + 0,6·Naive, o empilhamento aprende peso 0,4 em toda faixa."""
+    # Arrange
+    service = EnsembleService()
+    cutoffs = pd.date_range("2023-06-01", periods=5, freq="20D")
+    naive_folds = _fold_results(weekly_history, cutoffs, 30, lambda t: np.zeros(len(t)))
+    oof = service.out_of_fold_predictions(naive_folds, weekly_history)
+    prophet = oof["naive"] + np.random.default_rng(2).normal(0, 5, len(oof["naive"]))
+    folds = []
+    for fold, result in enumerate(naive_folds):
+        in_fold = oof["fold"] == fold
+        actual = 0.4 * prophet[in_fold] + 0.6 * oof["naive"][in_fold]
+        folds.append(SimpleNamespace(dates=result.dates, actuals=actual.tolist(), predictions=prophet[in_fold].tolist()))
+
+    # Act
+    weights = service.fit_weights(folds, weekly_history)
+
+    # Assert
+    assert weights.source == "learned"
+    assert weights.n_folds == 5 and weights.n_points == 150
+    assert weights.prophet_weight == pytest.approx(0.4)
+    assert weights.bucket_weights[:3] == pytest.approx([0.4, 0.4, 0.4])
+    assert weights.bucket_weights[3] == pytest.approx(0.4)  # faixa 31+ vazia herda o geral
+    assert weights.prophet_weights(9).tolist() == pytest.approx([0.4] * 9)
+
+
+def test_evaluation_report_and_stored_weights_drive_predictions(weekly_history, model_storage):
+    """Teste: Relatório compara fixo e aprendido; pesos gravados são usados na previsão sem novo ajuste."""
+    # Arrange
+    service = EnsembleService()
+    series_id = "test_ensemble_weights"
+    cutoffs = pd.date_range("2023-06-01", periods=4, freq="30D")
+    # Prophet ruim (constante): o aprendido deve apoiar-se no Naive Semanal
+    folds = _fold_results(weekly_history, cutoffs, 14, lambda t: np.full(len(t), 60.0))
+    train_and_persist_model(series_id, weekly_history, regressors=[])
+
+    # Act
+    report = service.fit_and_store_weights(series_id, folds, weekly_history)
+    result = service.create_ensemble_forecast(series_id, horizon=10)
+
+    # Assert
+    metrics = report["metrics"]
+    assert report["stored"] is True
+    assert metrics["learned_cv"]["smape"] < metrics["fixed"]["smape"]
+    assert report["improvement_over_fixed"]["mae"] > 0
+    assert report["weights"]["prophet_weight"] < 0.2
+    assert result["weights"]["source"] == "learned"
+    assert result["weights"]["prophet"] == pytest.approx(np.mean(
+        service.get_weights(series_id).prophet_weights(10)
+    ))
+
+    # Cleanup
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
+    _get_model_path(series_id).unlink(missing_ok=True)
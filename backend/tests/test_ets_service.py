@@ -0,0 +1,109 @@
+"""Testes para a família de suavização exponencial (ETS)."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services.ets_service import EtsService
+
+
+@pytest.fixture(scope="module")
+def weekly_values():
+    """Série diária com tendência leve e padrão semanal."""
+    rng = np.random.default_rng(11)
+    t = np.arange(200)
+    return 40 + 0.05 * t + 8 * np.sin(t * 2 * np.pi / 7) + rng.normal(0, 1.5, len(t))
+
+
+def test_holt_winters_additive_matches_explicit_recursion(weekly_values):
+    """Teste: Recursão vetorizada reproduz o laço explícito de Holt-Winters aditivo."""
+    # Arrange
+    alpha, beta, gamma, phi, m = 0.3, 0.05, 0.1, 0.98, 7
+    service = EtsService(alpha_grid=(alpha,), beta_grid=(beta,), gamma_grid=(gamma,), phi_grid=(phi,))
+    y = weekly_values
+    level = y[:m].mean()
+    trend = (y[m:2 * m].mean() - level) / m
+    season = list(y[:m] - level)
+    sse = 0.0
+    for t in range(m, len(y)):
+        s = season[t % m]
+        base = level + phi * trend
+        sse += (y[t] - (base + s)) ** 2
+        new_level = alpha * (y[t] - s) + (1 - alpha) * base
+        season[t % m] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+
+    # Act
+    fitted = service.fit(y, model="holt_winters_additive")
+
+    # Assert
+    assert fitted.sse == pytest.approx(sse)
+    assert fitted.level == pytest.approx(level)
+    assert fitted.trend == pytest.approx(trend)
+
+
+def test_window_fits_match_individual_fits(weekly_values):
+    """Teste: Ajuste em lote por janela dá o mesmo modelo que ajustar cada prefixo sozinho."""
+    # Arrange
+    service = EtsService()
+    ends = [30, 90, 200]
+
+    # Act
+    batch = service.fit_windows(weekly_values, ends)
+
+    # Assert
+    for end, fitted in zip(ends, batch, strict=True):
+        alone = service.fit(weekly_values[:end])
+        assert (fitted.model, fitted.params) == (alone.model, alone.params)
+        np.testing.assert_allclose(fitted.forecast(10), alone.forecast(10))
+    assert batch[-1].model.startswith("holt_winters")
+
+
+def test_auto_compares_aic_over_the_same_errors():
+    """Teste: Escolha automática compara os modelos só a partir da primeira temporada completa."""
+    # Arrange - série sem sazonalidade, com valores discrepantes antes da primeira temporada
+    rng = np.random.default_rng(24)
+    y = 100 + rng.normal(0, 1, 28)
+    y[1:6] += rng.normal(0, 30, 5)
+    service = EtsService()
+
+    # Act
+    fitted = service.fit(y)
+
+    # Assert - Holt-Winters não ganha por pular os erros iniciais
+    assert fitted.model == "simple"
+    alpha, level, sse = fitted.params["alpha"], y[0], 0.0
+    for t in range(1, len(y)):
+        if t >= 7:
+            sse += (y[t] - level) ** 2
+        level = alpha * y[t] + (1 - alpha) * level
+    n = len(y) - 7
+    assert fitted.aic == pytest.approx(n * np.log(sse / n) + 2 * 2)
+
+
+def test_ets_endpoint_returns_forecast_with_intervals(weekly_values):
+    """Teste: Endpoint ETS devolve a previsão do horizonte pedido, com intervalos."""
+    # Arrange
+    client = TestClient(app)
+    csv = pd.DataFrame({
+        "ds": pd.date_range("2024-01-01", periods=len(weekly_values), freq="D"),
+        "y": weekly_values.round(2),
+    }).to_csv(index=False)
+
+    # Act
+    response = client.post(
+        "/forecast/ets",
+        data={"series_id": "ets_teste", "horizon": 10},
+        files={"file": ("serie.csv", io.BytesIO(csv.encode()), "text/csv")},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["forecast"]) == 10
+    assert body["forecast"][0]["ds"] == "2024-07-19"
+    assert all(p["yhat_lower"] <= p["yhat"] <= p["yhat_upper"] for p in body["forecast"])
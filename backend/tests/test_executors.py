@@ -0,0 +1,72 @@
+"""Testes para os executores limitados das rotas de previsão."""
+
+import asyncio
+import inspect
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services.executors import BoundedExecutor, ExecutorSaturated, interactive_executor, offload
+
+
+def test_bounded_executor_rejects_when_saturated():
+    """Teste: Com workers ocupados e fila cheia, novas tarefas são recusadas na hora."""
+    # Arrange
+    executor = BoundedExecutor("teste", max_workers=1, max_queue=1, retry_after=7)
+    release = threading.Event()
+    running = executor.submit(release.wait, 5)
+    queued = executor.submit(lambda: "ok")
+
+    # Act / Assert
+    with pytest.raises(ExecutorSaturated) as exc_info:
+        executor.submit(lambda: "excedente")
+    assert exc_info.value.retry_after == 7
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    assert running.result(timeout=5) is True
+    assert queued.result(timeout=5) == "ok"
+    assert executor.stats()["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_offload_runs_outside_event_loop_and_keeps_signature():
+    """Teste: Função decorada vira corrotina executada em outra thread."""
+    # Arrange
+    executor = BoundedExecutor("teste", max_workers=1, max_queue=0)
+
+    @offload(executor)
+    def heavy(series_id: str, horizon: int = 7):
+        return threading.current_thread().name, series_id, horizon
+
+    # Act
+    thread_name, series_id, horizon = asyncio.run(heavy("serie", horizon=3))
+
+    # Assert
+    assert inspect.iscoroutinefunction(heavy)
+    assert list(inspect.signature(heavy).parameters) == ["series_id", "horizon"]
+    assert thread_name.startswith("teste")
+    assert (series_id, horizon) == ("serie", 3)
+    executor.shutdown()
+
+
+def test_saturated_endpoint_returns_503_with_retry_after(monkeypatch):
+    """Teste: API responde 503 com Retry-After quando o pool interativo está lotado."""
+    # Arrange
+    monkeypatch.setattr(interactive_executor, "max_queue", 0)
+    release = threading.Event()
+    blockers = [interactive_executor.submit(release.wait, 5) for _ in range(interactive_executor.max_workers)]
+    client = TestClient(app)
+
+    try:
+        # Act
+        response = client.post("/forecast/predict", json={"series_id": "qualquer", "horizon": 7})
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result(timeout=5)
+
+    # Assert
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(interactive_executor.retry_after)
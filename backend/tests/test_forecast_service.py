@@ -23,7 +23,7 @@ def sample_dataframe():
     return pd.DataFrame({'ds': dates, 'y': values})
 
 
-def test_train_model_creates_model_file(sample_dataframe):
+def test_train_model_creates_model_file(sample_dataframe, model_storage):
     """Teste: Treinar modelo deve criar arquivo de modelo."""
     # Arrange
     series_id = "test_series_tdd"
@@ -46,9 +46,11 @@ def test_train_model_creates_model_file(sample_dataframe):
     # Cleanup
     if model_path.exists():
         model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
 
 
-def test_generate_forecast_returns_dataframe(sample_dataframe):
+def test_generate_forecast_returns_dataframe(sample_dataframe, model_storage):
     """Teste: Gerar previsão deve retornar DataFrame."""
     # Arrange
     series_id = "test_forecast_tdd"
@@ -77,9 +79,11 @@ def test_generate_forecast_returns_dataframe(sample_dataframe):
     # Cleanup
     if model_path.exists():
         model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
 
 
-def test_forecast_has_confidence_intervals(sample_dataframe):
+def test_forecast_has_confidence_intervals(sample_dataframe, model_storage):
     """Teste: Previsão deve ter intervalos de confiança."""
     # Arrange
     series_id = "test_intervals_tdd"
@@ -108,9 +112,11 @@ def test_forecast_has_confidence_intervals(sample_dataframe):
     # Cleanup
     if model_path.exists():
         model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
 
 
-def test_train_model_with_regressors(sample_dataframe):
+def test_train_model_with_regressors(sample_dataframe, model_storage):
     """Teste: Treinar modelo com regressores deve funcionar."""
     # Arrange
     series_id = "test_regressors_tdd"
@@ -141,4 +147,67 @@ def test_train_model_with_regressors(sample_dataframe):
     # Cleanup
     if model_path.exists():
         model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
 
+
+
+def test_warm_forecast_reuses_cached_model(sample_dataframe, monkeypatch, model_storage):
+    """Teste: Previsões repetidas não devem recarregar o modelo do disco."""
+    # Arrange
+    from services.model_cache import model_cache
+
+    series_id = "test_cache_tdd"
+    model_path = _get_model_path(series_id)
+    train_and_persist_model(series_id=series_id, dataframe=sample_dataframe, regressors=[])
+
+    def _fail_load(path):
+        raise AssertionError("joblib.load não deveria ser chamado em previsão quente")
+
+    monkeypatch.setattr(model_cache, "loader", _fail_load)
+    hits_before = model_cache.hits
+
+    # Act
+    generate_forecast(series_id=series_id, horizon=7)
+    generate_forecast(series_id=series_id, horizon=7)
+
+    # Assert
+    assert model_cache.hits >= hits_before + 2
+
+    # Cleanup
+    model_cache.invalidate(series_id)
+    if model_path.exists():
+        model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
+
+
+def test_forecast_result_cache_expires_and_invalidates_on_train(sample_dataframe, monkeypatch, model_storage):
+    """Teste: Cache de resultados respeita TTL e é limpo ao re-treinar a série."""
+    # Arrange
+    from services import forecast_cache as forecast_cache_module
+    from services.forecast_cache import ForecastResultCache, forecast_cache
+
+    cache = ForecastResultCache(max_entries=2, ttl_seconds=10)
+    clock = [100.0]
+    monkeypatch.setattr(forecast_cache_module.time, "monotonic", lambda: clock[0])
+    key = cache.make_key("serie", "v1", 7, cache.fingerprint_regressors(None), "2024-01-01")
+    cache.set(key, {"valor": 1})
+
+    # Act / Assert - TTL
+    assert cache.get(key) == {"valor": 1}
+    clock[0] += 11
+    assert cache.get(key) is None
+
+    # Act / Assert - invalidação por novo treino
+    series_id = "test_result_cache_tdd"
+    forecast_cache.set(("test_result_cache_tdd", "v0", 7, "none", "2024-01-01"), "antigo")
+    train_and_persist_model(series_id=series_id, dataframe=sample_dataframe, regressors=[])
+    assert forecast_cache.get(("test_result_cache_tdd", "v0", 7, "none", "2024-01-01")) is None
+
+    # Cleanup
+    model_path = _get_model_path(series_id)
+    if model_path.exists():
+        model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
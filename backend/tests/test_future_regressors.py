@@ -0,0 +1,132 @@
+"""Testes para a montagem dos regressores futuros da previsão."""
+
+import time
+
+import numpy as np
+import pandas as pd
+from services.future_regressors import FutureRegressorBuilder
+from services.prophet_service import _get_model_path, generate_forecast, train_and_persist_model
+
+
+class _ForbiddenSource:
+    """Fonte que falha se for consultada"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"fonte externa consultada: {name}")
+
+
+class _SlowWeather:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def get_enhanced_weather_forecast(self, latitude, longitude, days, start_date=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        # Começa um dia depois do pedido: o primeiro dia fica com o padrão
+        dates = pd.date_range(pd.Timestamp(start_date) + pd.Timedelta(days=1), periods=days, freq="D")
+        return pd.DataFrame({"ds": dates, "tmax": 30.0, "tmin": 20.0, "precip": 5.0}), [{"type": "clima"}]
+
+
+class _SlowHolidays:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def create_enhanced_holiday_regressor(self, start_date, end_date):
+        time.sleep(self.delay)
+        dates = pd.date_range(start_date, end_date, freq="D")
+        return pd.DataFrame({"ds": dates, "is_holiday": (dates.day == 25).astype(int)}), []
+
+
+def test_calendar_only_model_makes_no_external_calls():
+    """Teste: Modelo só com regressores de calendário não consulta clima nem feriados."""
+    # Arrange
+    builder = FutureRegressorBuilder(weather=_ForbiddenSource(), holidays=_ForbiddenSource())
+
+    # Act
+    built = builder.build(["is_payday", "month_end", "is_weekend"], "2024-12-20", 10, -26.3, -48.8)
+
+    # Assert
+    assert list(built.frame.columns) == ["ds"]
+    assert len(built.frame) == 10
+    assert built.sources == {}
+
+
+def test_sources_run_concurrently_with_per_source_timeouts():
+    """Teste: Fontes rodam em paralelo; a lenta estoura o timeout e recebe valores padrão."""
+    # Arrange
+    fast = FutureRegressorBuilder(weather=_SlowWeather(0.3), holidays=_SlowHolidays(0.3))
+    slow_weather = _SlowWeather(1.0)
+    timed_out = FutureRegressorBuilder(
+        weather=slow_weather, holidays=_SlowHolidays(0.0), weather_timeout_seconds=0.1
+    )
+    regressors = ["tmax", "precip", "is_holiday", "is_weekend"]
+
+    # Act
+    started = time.perf_counter()
+    built = fast.build(regressors, "2024-12-20", 10, -26.3, -48.8)
+    elapsed = time.perf_counter() - started
+    degraded = timed_out.build(regressors, "2024-12-20", 10, -26.3, -48.8)
+
+    # Assert
+    assert elapsed < 0.55  # em sequência seriam 0.6s
+    assert built.sources == {"weather": "ok", "holidays": "ok"}
+    assert list(built.frame.columns) == ["ds", "tmax", "precip", "is_holiday"]
+    np.testing.assert_array_equal(built.frame["tmax"], [25.0] + [30.0] * 9)
+    assert built.frame.loc[built.frame["ds"] == "2024-12-25", "is_holiday"].item() == 1
+    assert built.weather_insights == [{"type": "clima"}]
+    assert degraded.sources == {"weather": "timeout", "holidays": "ok"}
+    assert (degraded.frame["tmax"] == 25.0).all()
+    assert degraded.frame["is_holiday"].sum() == 1
+
+
+def test_source_with_stalled_fetch_gets_no_new_work():
+    """Teste: Enquanto a busca que estourou o timeout não termina, a fonte não recebe novas buscas."""
+    # Arrange
+    slow_weather = _SlowWeather(0.4)
+    builder = FutureRegressorBuilder(
+        weather=slow_weather, holidays=_SlowHolidays(0.0), weather_timeout_seconds=0.05
+    )
+    regressors = ["tmax", "is_holiday"]
+
+    # Act
+    first = builder.build(regressors, "2024-12-20", 10, -26.3, -48.8)
+    second = builder.build(regressors, "2024-12-20", 10, -26.3, -48.8)
+    time.sleep(0.5)
+    third = builder.build(regressors, "2024-12-20", 10, -26.3, -48.8)
+
+    # Assert
+    assert first.sources == {"weather": "timeout", "holidays": "ok"}
+    assert second.sources == {"weather": "stalled", "holidays": "ok"}
+    assert (second.frame["tmax"] == 25.0).all()
+    assert slow_weather.calls == 2  # a segunda previsão não ocupou outro worker
+    assert third.sources["weather"] == "timeout"
+
+
+def test_generate_forecast_fills_required_regressors_for_horizon_only(model_storage):
+    """Teste: Previsão cobre só o horizonte e preenche regressores de calendário e padrões."""
+    # Arrange
+    series_id = "test_future_regressors"
+    dates = pd.date_range("2024-01-01", periods=60, freq="D")
+    df = pd.DataFrame({
+        "ds": dates,
+        "y": 100 + np.arange(60) % 7 * 5 + (dates.day <= 5) * 20,
+        "is_payday": (dates.day <= 5).astype(int),
+        "tmax": 25.0 + np.sin(np.arange(60)),
+    })
+    train_and_persist_model(series_id, df, ["is_payday", "tmax"])
+
+    # Act
+    forecast = generate_forecast(series_id=series_id, horizon=7)
+
+    # Assert
+    assert len(forecast) == 7
+    assert forecast["ds"].iloc[0] == pd.Timestamp("2024-03-01")
+    assert not forecast[["yhat", "yhat_lower", "yhat_upper"]].isna().any().any()
+
+    # Cleanup
+    model_path = _get_model_path(series_id)
+    if model_path.exists():
+        model_path.unlink()
+    model_storage.registry.remove(series_id)
+    model_storage.history.delete(series_id)
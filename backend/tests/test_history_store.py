@@ -0,0 +1,37 @@
+"""Testes para o histórico de treino por série."""
+
+import numpy as np
+import pandas as pd
+from services.history_store import HistoryStore
+
+
+def test_append_merges_new_days_and_refreshes_weekday_index(tmp_path):
+    """Teste: Append acrescenta dias novos, sobrescreve datas repetidas e atualiza o índice semanal."""
+    # Arrange
+    store = HistoryStore(tmp_path)
+    first = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=10), "y": np.arange(10.0)})
+    second = pd.DataFrame({"ds": pd.date_range("2024-01-09", periods=4), "y": [80.0, 90.0, 100.0, 110.0]})
+    store.save("serie", first)
+
+    # Act
+    history = store.append("serie", second)
+    reloaded = HistoryStore(tmp_path).load("serie")
+
+    # Assert
+    assert len(history) == 12
+    assert history.last_date == pd.Timestamp("2024-01-12")
+    assert history.y[7:].tolist() == [7.0, 80.0, 90.0, 100.0, 110.0]
+    # 2024-01-08 é segunda; 2024-01-12 é sexta
+    assert history.weekday_last.tolist() == [7.0, 80.0, 90.0, 100.0, 110.0, 5.0, 6.0]
+    np.testing.assert_array_equal(reloaded.days, history.days)
+    np.testing.assert_array_equal(reloaded.weekday_last, history.weekday_last)
+
+
+def test_load_missing_series_returns_none(tmp_path):
+    """Teste: Série sem histórico gravado devolve None."""
+    # Arrange
+    store = HistoryStore(tmp_path)
+
+    # Act / Assert
+    assert store.load("inexistente") is None
+    assert store.delete("inexistente") is False
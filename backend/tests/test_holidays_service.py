@@ -0,0 +1,107 @@
+"""Testes para o serviço de feriados."""
+
+import threading
+from datetime import datetime
+
+import httpx
+import pandas as pd
+from services.holidays_service import HolidaysService
+from services.http_client import HttpClient
+
+
+def test_enhanced_regressor_flags_from_holiday_calendar():
+    """Teste: Flags de feriado, rebote, fim de semana, segunda e eventos seguem as regras por dia."""
+    # Arrange
+    service = HolidaysService(use_api=False)
+
+    # Act
+    df, insights = service.create_enhanced_holiday_regressor(datetime(2023, 4, 18), datetime(2023, 6, 5))
+    by_day = df.set_index(df["ds"].dt.strftime("%Y-%m-%d"))
+
+    # Assert
+    assert by_day.loc["2023-04-21", "is_holiday"] == 1  # Tiradentes (sexta)
+    assert by_day.loc["2023-04-24", "after_holiday"] == 1  # segunda seguinte
+    assert by_day.loc["2023-04-25", "after_holiday"] == 0  # 4 dias depois
+    assert by_day.loc["2023-05-01", "is_holiday_monday"] == 1
+    assert by_day.loc["2023-05-02", "after_holiday"] == 1
+    assert by_day["is_holiday_weekend"].sum() == 0
+    # Greve (0,7) e inverno (1,15) começam juntos: vale o primeiro evento cadastrado
+    assert by_day.loc["2023-06-01", "event_impact_factor"] == 0.7
+    assert by_day.loc["2023-05-31", "is_extraordinary_event"] == 0
+    assert any(i["type"] == "holiday_bridge" for i in insights)
+
+
+def test_holidays_are_fetched_once_and_persisted(tmp_path):
+    """Teste: Cada ano é buscado na BrasilAPI uma vez; outro processo lê do arquivo até o TTL vencer."""
+    # Arrange
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        year = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json=[{"date": f"{year}-01-01", "name": "Ano Novo", "type": "national"}])
+
+    http = HttpClient(transport=httpx.MockTransport(handler))
+    cache_path = tmp_path / "feriados.json"
+    service = HolidaysService(cache_path=cache_path, http=http)
+
+    # Act
+    service.create_holiday_regressor(datetime(2020, 1, 1), datetime(2022, 12, 31))
+    service.create_holiday_regressor(datetime(2021, 6, 1), datetime(2022, 6, 1))
+    other_process = HolidaysService(cache_path=cache_path, http=http)
+    holidays = other_process.get_holidays(2021)
+    expired = HolidaysService(cache_path=cache_path, cache_ttl_days=1e-9, http=http)
+    expired.get_holidays(2021)
+
+    # Assert
+    assert len(calls) == 4  # 2020-2022 uma vez cada, mais o cache vencido
+    assert holidays == [{"date": "2021-01-01", "name": "Ano Novo"}]
+
+
+def test_api_failure_falls_back_without_persisting(tmp_path):
+    """Teste: Sem rede usa o calendário local, sem gravá-lo no cache em arquivo."""
+    # Arrange
+    def handler(request):
+        raise httpx.ConnectError("sem rede", request=request)
+
+    cache_path = tmp_path / "feriados.json"
+    service = HolidaysService(cache_path=cache_path, http=HttpClient(transport=httpx.MockTransport(handler)))
+
+    # Act
+    df = service.create_holiday_regressor(datetime(2024, 1, 1), datetime(2024, 12, 31))
+
+    # Assert
+    assert df["is_holiday"].sum() == 11
+    assert pd.Timestamp("2024-03-29") in set(df.loc[df["is_holiday"] == 1, "ds"])  # Sexta-feira Santa
+    assert service.api_calls == 1
+    assert not cache_path.exists()
+
+
+def test_memoized_years_do_not_wait_for_a_slow_fetch(tmp_path):
+    """Teste: Ano já memorizado responde enquanto outro ano ainda espera a BrasilAPI."""
+    # Arrange
+    release = threading.Event()
+
+    def handler(request):
+        year = request.url.path.rsplit("/", 1)[-1]
+        if year == "2024":
+            release.wait(5)
+        return httpx.Response(200, json=[{"date": f"{year}-01-01", "name": "Ano Novo", "type": "national"}])
+
+    service = HolidaysService(cache_path=tmp_path / "feriados.json", http=HttpClient(transport=httpx.MockTransport(handler)))
+    service.get_holidays(2023)
+    slow = threading.Thread(target=service.get_holidays, args=(2024,))
+    slow.start()
+
+    # Act
+    try:
+        holidays = service.get_holidays(2023)
+        waiting = slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+
+    # Assert
+    assert holidays == [{"date": "2023-01-01", "name": "Ano Novo"}]
+    assert waiting
+    assert service.get_holidays(2024) == [{"date": "2024-01-01", "name": "Ano Novo"}]
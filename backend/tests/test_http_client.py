@@ -0,0 +1,103 @@
+"""Testes para o cliente HTTP compartilhado das APIs externas."""
+
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+from services.city_service import CityService
+from services.http_client import HttpClient
+from services.joinville_sus_service import JoinvilleSusService
+from services.real_data_service import RealDataService
+from services.response_cache import MemoryBackend, ResponseCache
+
+
+def test_async_requests_respect_per_host_limit():
+    """Teste: Requisições assíncronas ao mesmo host ficam limitadas; outro host não espera por elas."""
+    # Arrange
+    active, peak = Counter(), Counter()
+
+    async def handler(request):
+        host = request.url.host
+        active[host] += 1
+        peak[host] = max(peak[host], active[host])
+        await asyncio.sleep(0.05)
+        active[host] -= 1
+        return httpx.Response(200, json={"host": host})
+
+    http = HttpClient(per_host_limit=2, transport=httpx.MockTransport(handler))
+
+    async def fan_out():
+        urls = ["https://lenta.example/a"] * 6 + ["https://outra.example/b"] * 2
+        try:
+            return await asyncio.gather(*[http.aget_json(url) for url in urls])
+        finally:
+            await http.aclose()
+
+    # Act
+    results = asyncio.run(fan_out())
+
+    # Assert
+    assert len(results) == 8
+    assert peak["lenta.example"] == 2
+    assert peak["outra.example"] == 2
+    assert http.stats()["requests"] == {"lenta.example": 6, "outra.example": 2}
+
+
+def test_http_errors_are_counted_and_services_fall_back():
+    """Teste: Status 5xx vira httpx.HTTPError; serviços usam o fallback sem propagar o erro."""
+    # Arrange
+    def handler(request):
+        if request.url.host == "brasilapi.com.br":
+            return httpx.Response(503)
+        return httpx.Response(200, json={
+            "id": 4209102, "nome": "Joinville",
+            "microrregiao": {"mesorregiao": {"UF": {"sigla": "SC", "nome": "Santa Catarina", "regiao": {"nome": "Sul"}}}},
+            "centroide": {"latitude": -26.3, "longitude": -48.8},
+        })
+
+    http = HttpClient(transport=httpx.MockTransport(handler))
+
+    # Act
+    with pytest.raises(httpx.HTTPStatusError):
+        http.get("https://brasilapi.com.br/api/covid19/v1")
+    covid = RealDataService(http=http).get_covid_data("SC")
+    city = CityService(http=http).get_city_info("4209102")
+
+    # Assert
+    assert covid == RealDataService(http=http)._get_fallback_covid_data()
+    assert city["uf"] == "SC" and city["latitude"] == -26.3
+    assert http.stats()["errors"] == {"brasilapi.com.br": 2}
+
+
+def test_async_sus_data_fans_out_with_stub_transport():
+    """Teste: Dados SUS de vários hospitais são buscados em paralelo pelo transporte injetado."""
+    # Arrange
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.params["co_cnes"])
+        return httpx.Response(200, json={"data": [{
+            "dt_ocupacao": "2024-05-01", "pc_ocupacao_leitos": 91, "pc_ocupacao": 88,
+        }]})
+
+    service = JoinvilleSusService(
+        http=HttpClient(transport=httpx.MockTransport(handler)),
+        cache=ResponseCache(MemoryBackend()),
+    )
+
+    async def fetch_all():
+        return await asyncio.gather(*[
+            service.aget_sus_data(hospital.cnes, "2024-05-01", "2024-05-01")
+            for hospital in service.get_all_hospitals()
+        ])
+
+    # Act
+    results = asyncio.run(fetch_all())
+    cached = service.get_sus_data(service.hospitals[0].cnes, "2024-05-01", "2024-05-01")
+
+    # Assert
+    assert sorted(seen) == sorted(h.cnes for h in service.hospitals)
+    assert [round(r[0].ocupacao_leitos, 2) for r in results] == [0.91] * len(service.hospitals)
+    assert cached == results[0]  # servido do mesmo cache, sem nova requisição
+    assert len(seen) == len(service.hospitals)
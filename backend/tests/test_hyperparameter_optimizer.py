@@ -0,0 +1,77 @@
+"""Testes para o otimizador TPE de hiperparâmetros."""
+
+import random
+
+from services.backtesting_service import BacktestingService
+from services.hyperparameter_optimizer import TPEOptimizer
+
+SPACES = BacktestingService.param_spaces
+TARGET = {
+    "seasonality_mode": "additive",
+    "changepoint_prior_scale": 0.02,
+    "seasonality_prior_scale": 5,
+    "growth": "linear",
+    "changepoint_range": 0.8,
+    "n_changepoints": 25,
+}
+
+
+def _loss(params):
+    """Perda sintética: distância ao ótimo (posição para numéricos, 3 para categóricos)."""
+    total = 0.0
+    for name, value in params.items():
+        values = SPACES[name]
+        if isinstance(value, str):
+            total += 0 if value == TARGET[name] else 3
+        else:
+            total += abs(values.index(value) - values.index(TARGET[name])) ** 1.5
+    return total
+
+
+def _evaluations_until(propose, observe, budget=150):
+    for evaluations in range(1, budget + 1):
+        params = propose()
+        loss = _loss(params)
+        observe(params, loss)
+        if loss <= 1:
+            return evaluations
+    return budget
+
+
+def test_tpe_needs_fewer_evaluations_than_random_search():
+    """Teste: TPE chega perto do ótimo com bem menos avaliações que busca aleatória."""
+    # Arrange
+    tpe_counts, random_counts = [], []
+
+    # Act
+    for seed in range(10):
+        optimizer = TPEOptimizer(SPACES, seed=seed)
+        tpe_counts.append(_evaluations_until(
+            lambda optimizer=optimizer: optimizer.suggest(1)[0], optimizer.observe
+        ))
+        rng = random.Random(seed)
+        random_counts.append(_evaluations_until(
+            lambda rng=rng: {name: rng.choice(values) for name, values in SPACES.items()},
+            lambda params, loss: None,
+        ))
+
+    # Assert
+    assert sum(tpe_counts) * 3 <= sum(random_counts)
+
+
+def test_batch_suggestions_are_distinct_and_unseen():
+    """Teste: Lotes trazem configurações distintas e ainda não avaliadas."""
+    # Arrange
+    optimizer = TPEOptimizer(SPACES, n_startup=3, seed=0)
+    for params in optimizer.suggest(3):
+        optimizer.observe(params, _loss(params))
+    seen = {tuple(sorted(p.items())) for p, _ in optimizer.observations}
+
+    # Act
+    batch = optimizer.suggest(4)
+
+    # Assert
+    keys = {tuple(sorted(p.items())) for p in batch}
+    assert len(keys) == 4
+    assert not keys & seen
+    assert optimizer.convergence_curve() == sorted(optimizer.convergence_curve(), reverse=True)
@@ -0,0 +1,57 @@
+"""Testes para o cálculo de métricas em lote."""
+
+import numpy as np
+import pytest
+from services.metrics_service import batch_metrics, metrics_service, pad_ragged
+
+
+def test_batch_metrics_with_mask_matches_row_by_row():
+    """Teste: Linhas de tamanhos diferentes em lote dão as mesmas métricas que uma a uma."""
+    # Arrange
+    rng = np.random.default_rng(3)
+    actual_rows = [rng.uniform(20, 80, size) for size in (30, 12, 7)]
+    predicted_rows = [a + rng.normal(0, 5, len(a)) for a in actual_rows]
+    actual, mask = pad_ragged(actual_rows)
+    predicted, _ = pad_ragged(predicted_rows)
+
+    # Act
+    batch = batch_metrics(actual, predicted, mask)
+
+    # Assert
+    for i, (a, p) in enumerate(zip(actual_rows, predicted_rows, strict=True)):
+        single = metrics_service.calculate_all_metrics(a, p)
+        for name in ("mape", "smape", "rmse", "mae", "mse", "r2", "bias", "mase"):
+            assert batch.row(i)[name] == pytest.approx(getattr(single, name))
+    assert batch.n_samples.tolist() == [30, 12, 7]
+    assert batch.mase[2] == np.inf  # até seasonal_period pontos
+
+
+def test_mase_uses_seasonal_naive_errors():
+    """Teste: MASE divide o MAE pelo erro do naive sazonal sobre os valores reais."""
+    # Arrange
+    actual = np.array([10, 12, 14, 11, 13, 15, 12, 16, 13, 18], dtype=float)
+    predicted = actual + 1.5
+
+    # Act
+    mase = metrics_service.calculate_mase(actual, predicted, seasonal_period=3)
+
+    # Assert
+    naive = np.mean([abs(actual[i] - actual[i - 3]) for i in range(3, len(actual))])
+    assert mase == pytest.approx(1.5 / naive)
+
+
+def test_mape_zero_handling_modes():
+    """Teste: Zeros no real são ignorados ('exclude') ou divididos por 1e-8 ('epsilon')."""
+    # Arrange
+    actual = np.array([[0.0, 10.0, 20.0]])
+    predicted = np.array([[1.0, 11.0, 18.0]])
+
+    # Act
+    excluded = batch_metrics(actual, predicted, mape_zero_handling="exclude").mape[0]
+    epsilon = batch_metrics(actual, predicted, mape_zero_handling="epsilon").mape[0]
+
+    # Assert
+    assert excluded == pytest.approx((10 + 10) / 2)
+    assert epsilon > 1e9
+    with pytest.raises(ValueError):
+        batch_metrics(actual, predicted, mape_zero_handling="ignorar")
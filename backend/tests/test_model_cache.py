@@ -0,0 +1,79 @@
+"""Testes para o cache LRU de modelos carregados."""
+
+import os
+
+import pytest
+from services.model_cache import ModelCache
+
+
+def _write(path, content: bytes):
+    path.write_bytes(content)
+    return path
+
+
+def _counting_loader(calls):
+    def loader(path):
+        calls.append(path)
+        return {"path": str(path), "content": path.read_bytes()}
+
+    return loader
+
+
+def test_warm_get_skips_loader(tmp_path):
+    calls = []
+    cache = ModelCache(max_entries=4, max_bytes=1024, revalidate_seconds=60, loader=_counting_loader(calls))
+    path = _write(tmp_path / "a.joblib", b"model-a")
+
+    first = cache.get("a", path)
+    second = cache.get("a", path)
+
+    assert first is second
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    calls = []
+    cache = ModelCache(max_entries=4, max_bytes=1024, revalidate_seconds=0, loader=_counting_loader(calls))
+    path = _write(tmp_path / "a.joblib", b"model-a")
+    cache.get("a", path)
+
+    _write(path, b"model-a-retrained")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    model = cache.get("a", path)
+
+    assert model["content"] == b"model-a-retrained"
+    assert len(calls) == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    cache = ModelCache(max_entries=2, max_bytes=10, revalidate_seconds=60, loader=_counting_loader([]))
+    paths = {name: _write(tmp_path / f"{name}.joblib", b"1234") for name in "abc"}
+
+    cache.get("a", paths["a"])
+    cache.get("b", paths["b"])
+    cache.get("a", paths["a"])  # "a" passa a ser o mais recente
+    cache.get("c", paths["c"])
+
+    assert cache.stats()["series"] == ["a", "c"]
+
+    big = _write(tmp_path / "big.joblib", b"x" * 9)
+    cache.get("big", big)
+    assert cache.stats()["series"] == ["big"]
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_missing_file_raises_and_evicts(tmp_path):
+    cache = ModelCache(max_entries=2, max_bytes=100, revalidate_seconds=0, loader=_counting_loader([]))
+    path = _write(tmp_path / "a.joblib", b"model")
+    cache.get("a", path)
+    path.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        cache.get("a", path)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,66 @@
+"""Testes para o registro de metadados de modelos."""
+
+from types import SimpleNamespace
+
+import pandas as pd
+from services.model_registry import ModelRegistry
+
+
+def _fake_model(regressors):
+    return SimpleNamespace(extra_regressors={name: {} for name in regressors}, growth="linear")
+
+
+def _training_data(days=10):
+    return pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=days), "y": range(days)})
+
+
+def test_register_records_metadata_and_bumps_version(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    model_path = tmp_path / "serie.joblib"
+    model_path.write_bytes(b"modelo")
+
+    first = registry.register("serie", _fake_model(["tmax"]), _training_data(), model_path)
+    second = registry.register("serie", _fake_model(["tmax", "is_holiday"]), _training_data(12), model_path)
+
+    assert first.version == 1
+    assert second.version == 2
+    assert second.row_count == 12
+    assert second.data_start == "2024-01-01"
+    assert registry.get_regressors("serie") == ["tmax", "is_holiday"]
+    assert registry.list_series() == ["serie"]
+    assert not list(tmp_path.glob(".registry-*.tmp"))
+
+    # Outra instância (outro worker) enxerga o índice persistido
+    other = ModelRegistry(tmp_path)
+    assert other.get("serie").version == 2
+
+
+def test_registry_reconciles_legacy_and_removed_files(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    kept = tmp_path / "mantido.joblib"
+    kept.write_bytes(b"modelo")
+    removed = tmp_path / "removido.joblib"
+    removed.write_bytes(b"modelo")
+    registry.register("removido", _fake_model([]), _training_data(), removed)
+
+    legacy = tmp_path / "legado.joblib"
+    legacy.write_bytes(b"modelo antigo")
+    removed.unlink()
+
+    assert registry.list_series() == ["legado", "mantido"]
+    assert registry.get_regressors("legado") is None
+
+
+def test_backtest_metrics_are_attached(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    model_path = tmp_path / "serie.joblib"
+    model_path.write_bytes(b"modelo")
+    registry.register("serie", _fake_model([]), _training_data(), model_path)
+
+    assert registry.update_backtest_metrics("serie", {"smape": 12.5, "mae": 3})
+    assert not registry.update_backtest_metrics("inexistente", {"smape": 1.0})
+
+    metrics = registry.get("serie").backtest_metrics
+    assert metrics["smape"] == 12.5
+    assert metrics["mae"] == 3.0
+    assert "evaluated_at" in metrics
@@ -0,0 +1,71 @@
+"""Testes para o formato compacto de persistência de modelos."""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from services.model_serialization import (
+    COMPACT_SUFFIX,
+    MAGIC,
+    dumps_compact,
+    load_model_file,
+    loads_compact,
+    save_model_file,
+)
+
+
+@pytest.fixture(scope="module")
+def fitted_model():
+    """Prophet treinado em dois anos de dados diários."""
+    from services.prophet_service import Prophet
+
+    dates = pd.date_range(start="2022-01-01", periods=730, freq="D")
+    rng = np.random.default_rng(0)
+    values = 50 + 10 * np.sin(np.arange(730) * 2 * np.pi / 7) + rng.normal(0, 2, 730)
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False)
+    model.fit(pd.DataFrame({"ds": dates, "y": values}))
+    return model
+
+
+def test_compact_round_trip_keeps_predictions_and_is_smaller(fitted_model, tmp_path):
+    """Teste: Modelo compacto prevê igual ao original e ocupa menos espaço."""
+    # Arrange
+    compact_path = tmp_path / f"serie{COMPACT_SUFFIX}"
+    joblib_path = tmp_path / "serie.joblib"
+
+    # Act
+    save_model_file(fitted_model, compact_path, history_rows=30, compression="zlib")
+    save_model_file(fitted_model, joblib_path)
+    restored = load_model_file(compact_path)
+
+    # Assert
+    assert compact_path.read_bytes().startswith(MAGIC)
+    assert compact_path.stat().st_size < joblib_path.stat().st_size / 2
+    assert len(restored.history) == 30
+    future = fitted_model.make_future_dataframe(periods=14, include_history=False)
+    pd.testing.assert_frame_equal(
+        restored.make_future_dataframe(periods=14, include_history=False), future
+    )
+    np.testing.assert_allclose(
+        restored.predict(future)["yhat"].values,
+        fitted_model.predict(future)["yhat"].values,
+    )
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_reader_keeps_legacy_joblib_and_rejects_newer_versions(fitted_model, tmp_path):
+    """Teste: Leitor carrega .joblib antigo e recusa versões futuras do formato."""
+    # Arrange
+    legacy_path = tmp_path / "legado.joblib"
+    joblib.dump(fitted_model, legacy_path)
+    data = dumps_compact(fitted_model, history_rows=10, compression="none")
+    future_version = MAGIC + bytes([99]) + data[len(MAGIC) + 1:]
+
+    # Act
+    legacy = load_model_file(legacy_path)
+
+    # Assert
+    assert len(legacy.history) == len(fitted_model.history)
+    assert len(loads_compact(data).history) == 10
+    with pytest.raises(ValueError):
+        loads_compact(future_version)
@@ -0,0 +1,236 @@
+"""Testes para o cache compartilhado de respostas das APIs externas."""
+
+import asyncio
+import fnmatch
+import threading
+import time
+
+import httpx
+from services.http_client import HttpClient
+from services.real_data_service import RealDataService
+from services.response_cache import DiskBackend, MemoryBackend, RedisBackend, ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _FakeRedis:
+    """Subconjunto do redis.Redis usado pelo RedisBackend, em memória"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._data = {}
+
+    def get(self, key):
+        value, expires_at = self._data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self._clock():
+            self._data.pop(key)
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self._data[key] = (value.encode("utf-8"), self._clock() + px / 1000 if px else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self._data) if fnmatch.fnmatch(key, match)]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_lru_limits_and_stale_while_revalidate_with_per_source_ttl():
+    """Teste: LRU respeita os limites; depois do TTL da fonte serve o valor antigo e atualiza em segundo plano."""
+    # Arrange
+    clock = _Clock()
+    lru = MemoryBackend(max_entries=2, max_bytes=1000, clock=clock)
+    cache = ResponseCache(
+        MemoryBackend(clock=clock), default_ttl_seconds=3600,
+        source_ttls={"openweather": 60}, stale_seconds=120, clock=clock,
+    )
+    versions = iter(["v1", "v2"])
+
+    # Act
+    lru.set("a", '"a"', clock(), 60)
+    lru.set("b", '"b"', clock(), 60)
+    lru.get("a")  # "a" passa a ser a mais recente
+    lru.set("c", '"c"', clock(), 60)
+    lru.set("grande", "x" * 2000, clock(), 60)  # maior que o limite: ignorada
+    kept = [key for key in ("a", "b", "c", "grande") if lru.get(key)]
+
+    first = cache.get_or_fetch("openweather", "k", lambda: next(versions))
+    clock.now += 90  # além do TTL (60s), dentro da janela stale
+    stale = cache.get_or_fetch("openweather", "k", lambda: next(versions))
+    _wait_for(lambda: cache.refreshes == 1)
+    refreshed = cache.get_or_fetch("openweather", "k", lambda: next(versions))
+    clock.now += 500  # além do TTL e da janela stale: busca de novo
+    expired = cache.get_or_fetch("openweather", "k", lambda: "v3")
+
+    # Assert
+    assert kept == ["a", "c"] and lru.stats()["evictions"] == 1
+    assert (first, stale, refreshed, expired) == ("v1", "v1", "v2", "v3")
+    assert cache.stats()["stale_hits"] == 1 and cache.policy("sih").ttl_seconds == 3600
+
+
+def test_concurrent_callers_share_one_upstream_fetch():
+    """Teste: Chamadas simultâneas (threads e corrotinas) para a mesma chave fazem uma única requisição."""
+    # Arrange
+    calls = []
+    release = threading.Event()
+
+    def slow_fetch():
+        calls.append("sync")
+        release.wait(2)
+        return {"casos": 10}
+
+    cache = ResponseCache(MemoryBackend())
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("sih", "k", slow_fetch)))
+        for _ in range(8)
+    ]
+
+    async def handler(request):
+        calls.append("async")
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"data": {"confirmed": 7, "deaths": 1, "recovered": 5}})
+
+    service = RealDataService(
+        http=HttpClient(transport=httpx.MockTransport(handler)), cache=ResponseCache(MemoryBackend())
+    )
+
+    async def fan_out():
+        return await asyncio.gather(*[service.aget_covid_data("SC") for _ in range(10)])
+
+    # Act
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.coalesced == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+    covid = asyncio.run(fan_out())
+    again = service.get_covid_data("SC")
+
+    # Assert
+    assert results == [{"casos": 10}] * 8
+    assert calls == ["sync", "async"]
+    assert all(item == covid[0] for item in covid) and again == covid[0]
+    assert service.cache.stats()["coalesced"] == 9
+
+
+def test_redis_and_disk_backends_are_shared_between_instances(tmp_path):
+    """Teste: Workers diferentes enxergam o mesmo Redis/SQLite; o Redis expira a chave sozinho."""
+    # Arrange
+    clock = _Clock()
+    fake_redis = _FakeRedis(clock)
+    worker_a = ResponseCache(RedisBackend(fake_redis), default_ttl_seconds=60, stale_seconds=30, clock=clock)
+    worker_b = ResponseCache(RedisBackend(fake_redis), default_ttl_seconds=60, stale_seconds=30, clock=clock)
+    disk_a = ResponseCache(DiskBackend(tmp_path / "cache.sqlite", clock=clock), clock=clock)
+    disk_b = ResponseCache(DiskBackend(tmp_path / "cache.sqlite", clock=clock), clock=clock)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return [{"date": "2024-12-25", "name": "Natal"}]
+
+    # Act
+    worker_a.get_or_fetch("brasilapi", "feriados", fetch)
+    from_b = worker_b.get_or_fetch("brasilapi", "feriados", fetch)
+    disk_a.get_or_fetch("cnes", "hospitais", lambda: {"total": 3})
+    from_disk = disk_b.get_or_fetch("cnes", "hospitais", lambda: {"total": 0})
+    clock.now += 91  # TTL + stale: o Redis já apagou a chave
+    after_expiry = fake_redis.get("hospicast:response:feriados")
+    worker_a.get_or_fetch("brasilapi", "feriados", fetch)
+    worker_b.clear()
+
+    # Assert
+    assert from_b == [{"date": "2024-12-25", "name": "Natal"}]
+    assert len(fetches) == 2  # worker_b reaproveitou; nova busca só após a expiração
+    assert from_disk == {"total": 3}
+    assert after_expiry is None and fake_redis.scan_iter() == []
+
+
+def test_backend_errors_disable_backend_for_retry_window():
+    """Teste: Backend fora do ar falha uma vez e fica desligado pela janela, sem custo por requisição."""
+    # Arrange
+    clock = _Clock()
+    attempts = []
+
+    class _DownBackend:
+        def get(self, key):
+            attempts.append("get")
+            raise ConnectionError("redis fora do ar")
+
+        def set(self, key, payload, stored_at, expire_after):
+            attempts.append("set")
+            raise ConnectionError("redis fora do ar")
+
+        def stats(self):
+            return {"backend": "down"}
+
+    cache = ResponseCache(_DownBackend(), backend_retry_seconds=30, clock=clock)
+
+    # Act
+    values = [cache.get_or_fetch("sih", "k", lambda: {"v": 1}) for _ in range(5)]
+    attempts_during_window = list(attempts)
+    clock.now += 31
+    cache.get_or_fetch("sih", "k", lambda: {"v": 1})
+
+    # Assert
+    assert values == [{"v": 1}] * 5
+    assert attempts_during_window == ["get"]
+    assert attempts == ["get", "get"]
+    stats = cache.stats()
+    assert stats["backend_errors"] == 2 and stats["backend_skipped"] == 10
+    assert stats["backend_retry_in_seconds"] == 30
+
+
+def test_async_lookups_on_blocking_backend_do_not_stall_event_loop():
+    """Teste: Backend com E/S lenta é consultado fora do event loop nas chamadas assíncronas."""
+    # Arrange
+    class _SlowBackend:
+        def get(self, key):
+            time.sleep(0.3)
+            return None
+
+        def set(self, key, payload, stored_at, expire_after):
+            time.sleep(0.3)
+
+        def stats(self):
+            return {"backend": "slow"}
+
+    cache = ResponseCache(_SlowBackend())
+
+    async def fetch():
+        return {"v": 1}
+
+    async def scenario():
+        started = time.perf_counter()
+        ticks = []
+
+        async def ticker():
+            for _ in range(3):
+                await asyncio.sleep(0.05)
+                ticks.append(time.perf_counter() - started)
+
+        value, _ = await asyncio.gather(cache.aget_or_fetch("sih", "k", fetch), ticker())
+        return value, ticks
+
+    # Act
+    value, ticks = asyncio.run(scenario())
+
+    # Assert
+    assert value == {"v": 1}
+    assert ticks[-1] < 0.25  # o loop seguiu rodando durante a leitura de 0,3s
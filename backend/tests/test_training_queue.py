@@ -0,0 +1,160 @@
+"""Testes para a fila de jobs de treino."""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+
+import pandas as pd
+import pytest
+from services.training_queue import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    TrainingQueue,
+    TrainingQueueFull,
+)
+
+
+def _dataframe(offset=0):
+    return pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=10), "y": range(offset, offset + 10)})
+
+
+def _thread_executor(workers):
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+class _BlockingJob:
+    """Função de treino falsa que só termina quando liberada"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, series_id, payload_path, regressors):
+        self.calls.append(series_id)
+        assert pd.read_pickle(payload_path).shape == (10, 2)
+        self.release.wait(timeout=5)
+        if series_id == "falha":
+            raise ValueError("dados inválidos")
+        return {"series_id": series_id, "version": 1}
+
+
+def _orphan(queue, job, **changes):
+    """Regrava o job como se o dono tivesse parado de renovar o heartbeat há uma hora"""
+    path = queue.jobs_dir / f"{job.job_id}.json"
+    record = json.loads(path.read_text(encoding="utf-8"))
+    record.update(heartbeat_at=(datetime.now(UTC) - timedelta(hours=1)).isoformat(), **changes)
+    path.write_text(json.dumps(record), encoding="utf-8")
+
+
+def _wait_for(queue, job_id, status):
+    for _ in range(200):
+        if queue.get(job_id).status == status:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} não chegou a {status}")
+
+
+def test_submit_dedupes_in_flight_jobs_and_persists_result(tmp_path):
+    """Teste: Jobs idênticos em andamento são reaproveitados e o resultado fica salvo."""
+    # Arrange
+    job_function = _BlockingJob()
+    queue = TrainingQueue(tmp_path, max_workers=1, executor_factory=_thread_executor, job_function=job_function)
+    finished = []
+    queue.add_listener(finished.append)
+
+    # Act
+    first, first_dedup = queue.submit("serie", _dataframe(), [])
+    second, second_dedup = queue.submit("serie", _dataframe(), [])
+    other, _ = queue.submit("serie", _dataframe(offset=5), [])
+
+    # Assert - retorno imediato, sem treinar duas vezes
+    assert first.status == JOB_RUNNING
+    assert not first_dedup and second_dedup
+    assert second.job_id == first.job_id
+    assert queue.get(other.job_id).status == JOB_QUEUED
+
+    job_function.release.set()
+    _wait_for(queue, other.job_id, JOB_SUCCEEDED)
+    assert job_function.calls == ["serie", "serie"]
+    assert queue.get(first.job_id).result == {"series_id": "serie", "version": 1}
+    assert [job.status for job in finished] == [JOB_SUCCEEDED, JOB_SUCCEEDED]
+    assert not list(tmp_path.glob("*.pkl"))
+    queue.shutdown()
+
+
+def test_queue_full_and_failed_jobs(tmp_path):
+    """Teste: Fila cheia recusa novos jobs e falhas ficam registradas."""
+    # Arrange
+    job_function = _BlockingJob()
+    queue = TrainingQueue(
+        tmp_path, max_workers=1, max_pending=1, executor_factory=_thread_executor, job_function=job_function
+    )
+    failing, _ = queue.submit("falha", _dataframe(), [])
+    queue.submit("outra", _dataframe(), [])
+
+    # Act / Assert
+    with pytest.raises(TrainingQueueFull) as exc_info:
+        queue.submit("terceira", _dataframe(), [])
+    assert exc_info.value.retry_after > 0
+
+    job_function.release.set()
+    _wait_for(queue, failing.job_id, JOB_FAILED)
+    assert queue.get(failing.job_id).error == "dados inválidos"
+    queue.shutdown()
+
+
+def test_recover_requeues_jobs_of_dead_process(tmp_path):
+    """Teste: Jobs de um processo da API que morreu são retomados no reinício."""
+    # Arrange
+    stalled = TrainingQueue(tmp_path, executor_factory=_thread_executor, job_function=_BlockingJob())
+    stalled._dispatch = lambda: None  # simula queda antes de iniciar o treino
+    job, _ = stalled.submit("serie", _dataframe(), ["tmax"])
+    _orphan(stalled, job, owner_pid=2 ** 22 + 1)  # pid inexistente
+
+    job_function = _BlockingJob()
+    job_function.release.set()
+    restarted = TrainingQueue(tmp_path, executor_factory=_thread_executor, job_function=job_function)
+
+    # Act
+    recovered = restarted.recover()
+
+    # Assert
+    assert recovered == 1
+    _wait_for(restarted, job.job_id, JOB_SUCCEEDED)
+    assert job_function.calls == ["serie"]
+    restarted.shutdown()
+
+
+def test_recover_ignores_reused_pid_and_respects_live_leases(tmp_path):
+    """Teste: Mesmo PID após reinício (contêiner) não segura o job; heartbeat recente de outro worker segura."""
+    # Arrange
+    crashed = TrainingQueue(tmp_path, executor_factory=_thread_executor, job_function=_BlockingJob())
+    crashed._dispatch = lambda: None
+    orphan, _ = crashed.submit("orfa", _dataframe(), [])
+    _orphan(crashed, orphan, owner_pid=os.getpid())  # API reiniciada com o mesmo PID
+    other_worker = TrainingQueue(tmp_path, executor_factory=_thread_executor, job_function=_BlockingJob())
+    other_worker._dispatch = lambda: None
+    alive, _ = other_worker.submit("viva", _dataframe(offset=3), [])
+
+    job_function = _BlockingJob()
+    restarted = TrainingQueue(tmp_path, executor_factory=_thread_executor, job_function=job_function)
+
+    # Act
+    recovered = restarted.recover()
+    _, deduped_onto_orphan = restarted.submit("orfa", _dataframe(), [])
+    duplicate, deduped_onto_alive = restarted.submit("viva", _dataframe(offset=3), [])
+    job_function.release.set()
+
+    # Assert
+    assert recovered == 1
+    assert restarted.get(orphan.job_id).owner_id == restarted.instance_id
+    assert deduped_onto_orphan  # reaproveita o job retomado, agora desta instância
+    assert deduped_onto_alive and duplicate.job_id == alive.job_id
+    _wait_for(restarted, orphan.job_id, JOB_SUCCEEDED)
+    assert job_function.calls == ["orfa"]
+    for queue in (crashed, other_worker, restarted):
+        queue.shutdown()
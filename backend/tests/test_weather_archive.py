@@ -0,0 +1,67 @@
+"""Testes para o arquivo local de clima histórico."""
+
+import numpy as np
+import pandas as pd
+from services.weather_archive import WeatherArchive
+from services.weather_cache import WeatherCache, cell_key, grid_cell
+from services.weather_service import WeatherService
+
+
+def test_import_partitions_by_cell_and_year_and_reads_ranges(tmp_path):
+    """Teste: Importação agrupa por célula/ano, faz média na célula e reimportar substitui os dias."""
+    # Arrange
+    archive = WeatherArchive(tmp_path)
+    days = pd.date_range("2022-12-30", periods=4, freq="D").strftime("%Y-%m-%d")
+    dump = pd.DataFrame({
+        "date": list(days) * 2 + ["2023-01-01"],
+        "lat": [-26.32] * 4 + [-26.38] * 4 + [-23.55],
+        "lon": [-48.84] * 8 + [-46.63],
+        "temperature_2m_max (°C)": [30.0, 31.0, 32.0, 33.0, 32.0, 33.0, 34.0, 35.0, 40.0],
+        "tmin": [20.0] * 9,
+        "precip": [0.0, 1.0, 2.0, 3.0, 0.0, 1.0, 2.0, 3.0, 9.0],
+    })
+
+    # Act
+    summary = archive.import_frame(dump)
+    archive.import_frame(
+        pd.DataFrame({"ds": ["2023-01-02"], "tmax": [99.0], "tmin": [1.0], "precip": [0.0]}),
+        latitude=-26.35, longitude=-48.84,
+    )
+    df = archive.read_range(-26.35, -48.84, "2022-12-29", "2023-01-03")
+
+    # Assert
+    assert summary == {"rows": 5, "partitions": 3}
+    assert df["ds"].dt.strftime("%Y-%m-%d").tolist()[0] == "2022-12-29"
+    np.testing.assert_array_equal(df["tmax"], [np.nan, 31.0, 32.0, 33.0, 99.0, np.nan])
+    assert archive.coverage(-26.35, -48.84) == [2022, 2023]
+    assert archive.read_range(-23.55, -46.63, "2023-01-01", "2023-01-01")["precip"].tolist() == [9.0]
+
+
+def test_training_weather_reads_archive_and_fills_gaps_offline(tmp_path):
+    """Teste: Clima de treino vem do arquivo; só os dias ausentes são simulados, sempre iguais."""
+    # Arrange
+    archive = WeatherArchive(tmp_path / "arquivo")
+    archive.import_frame(
+        pd.DataFrame({
+            "ds": pd.date_range("2021-01-01", "2021-12-31", freq="D"),
+            "tmax": 28.0, "tmin": 19.0, "precip": 1.5,
+        }),
+        latitude=-26.32, longitude=-48.84,
+    )
+    cache = WeatherCache(tmp_path / "clima.sqlite")
+    key = cell_key(grid_cell(-26.32, -48.84))
+    # Valor em cache para um dia que também está no arquivo não deve esconder o arquivo
+    cache.put_days(key, {int(np.datetime64("2021-06-01").astype(np.int64)): (10.0, 5.0, 0.0, "openweathermap")})
+    service = WeatherService(cache=cache, archive=archive)
+
+    # Act
+    first = service.get_historical_weather(-26.32, -48.84, "2021-06-01", "2022-01-10")
+    again = service.get_historical_weather(-26.32, -48.84, "2021-06-01", "2022-01-10")
+
+    # Assert
+    assert len(first) == 224
+    assert (first["tmax"].iloc[:214] == 28.0).all()
+    assert not first.isna().any().any()
+    assert (first["tmax"].iloc[214:] != 28.0).any()  # simulado
+    pd.testing.assert_frame_equal(first, again)
+    assert cache.stats()["entries"] == 1  # simulação não vai para o cache
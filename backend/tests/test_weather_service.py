@@ -0,0 +1,109 @@
+"""Testes para o clima diário com cache por célula da grade."""
+
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import numpy as np
+from services.http_client import HttpClient
+from services.weather_cache import WeatherCache
+from services.weather_service import WeatherService
+
+
+def _fake_openweather(calls):
+    """OpenWeatherMap falso: 8 passos de 3 horas por dia a partir de hoje."""
+
+    def handler(request):
+        cnt = int(request.url.params["cnt"])
+        calls.append(cnt)
+        items = []
+        for step in range(cnt):
+            day = date.today() + timedelta(days=step // 8)
+            items.append({
+                "dt_txt": f"{day.isoformat()} {3 * (step % 8):02d}:00:00",
+                "main": {"temp_max": 30.0 + step % 8, "temp_min": 18.0 - step % 8},
+                "rain": {"3h": 0.5},
+            })
+        return httpx.Response(200, json={"list": items})
+
+    return HttpClient(transport=httpx.MockTransport(handler))
+
+
+def test_overlapping_requests_fetch_only_missing_days(tmp_path):
+    """Teste: Hospitais na mesma célula reaproveitam o cache e só os dias novos são buscados."""
+    # Arrange
+    calls = []
+    service = WeatherService(
+        cache=WeatherCache(tmp_path / "clima.sqlite"), api_key="chave", http=_fake_openweather(calls)
+    )
+    yesterday = date.today() - timedelta(days=1)
+
+    # Act
+    first = service.get_weather_forecast(-26.32, -48.84, days=3)
+    second = service.get_weather_forecast(-26.38, -48.81, days=5)  # mesma célula de 0,1°
+    with_past = service.get_weather_forecast(-26.38, -48.81, days=3, start_date=yesterday)
+
+    # Assert
+    assert calls == [24, 40]  # segunda chamada só por causa dos dias 4 e 5
+    assert first.equals(second.head(3))
+    assert first["tmax"].tolist() == [37.0, 37.0, 37.0]
+    assert first["precip"].tolist() == [4.0, 4.0, 4.0]
+    assert with_past["ds"].iloc[0].date() == yesterday  # dia passado simulado, sem nova chamada
+    assert len(calls) == 2
+    assert service.cache.stats()["cells"] == 1
+
+
+def test_async_forecast_matches_sync_and_shares_cache(tmp_path):
+    """Teste: Versão assíncrona usa o mesmo cache e devolve os mesmos dados da síncrona."""
+    # Arrange
+    calls = []
+    service = WeatherService(
+        cache=WeatherCache(tmp_path / "clima.sqlite"), api_key="chave", http=_fake_openweather(calls)
+    )
+
+    # Act
+    fetched = asyncio.run(service.aget_weather_forecast(-26.32, -48.84, days=3))
+    cached = service.get_weather_forecast(-26.32, -48.84, days=3)
+
+    # Assert
+    assert calls == [24]
+    assert fetched.equals(cached)
+
+
+def test_forecast_days_expire_and_past_days_are_immutable(tmp_path):
+    """Teste: Previsões expiram após o TTL, mesmo depois que o dia passa; dias gravados já encerrados não."""
+    # Arrange
+    cache = WeatherCache(tmp_path / "clima.sqlite", forecast_ttl_seconds=60)
+    today = 20000
+    written_at = today * 86400 + 1000.0  # hoje, depois do fim de ontem
+    cache.put_days("0.1:-264:-489", {
+        today - 2: (24.0, 14.0, 0.0, "openweathermap"),  # previsão gravada três dias antes
+    }, now=(today - 3) * 86400.0)
+    cache.put_days("0.1:-264:-489", {
+        today - 1: (25.0, 15.0, 0.0, "openweathermap"),
+        today: (26.0, 16.0, 1.0, "openweathermap"),
+    }, now=written_at)
+
+    # Act
+    fresh = cache.get_days("0.1:-264:-489", today - 2, today, today, now=written_at + 30)
+    stale = cache.get_days("0.1:-264:-489", today - 2, today, today, now=written_at + 100)
+
+    # Assert
+    assert sorted(fresh) == [today - 1, today]
+    assert sorted(stale) == [today - 1]
+
+
+def test_simulated_weather_is_deterministic_per_cell_and_day():
+    """Teste: Simulação dá os mesmos valores para o mesmo dia e célula, sem depender do cache."""
+    # Arrange
+    service = WeatherService(cache=None)
+
+    # Act
+    first = service.get_weather_forecast(-26.32, -48.84, days=30, start_date="2024-01-01")
+    again = service.get_weather_forecast(-26.32, -48.84, days=10, start_date="2024-01-21")
+    other_city = service.get_weather_forecast(-23.55, -46.63, days=30, start_date="2024-01-01")
+
+    # Assert
+    assert first.tail(10).reset_index(drop=True).equals(again)
+    assert not np.array_equal(first["tmax"], other_city["tmax"])
+    assert (first["tmin"] >= 10).all() and (first["tmax"] >= 15).all()
@@ -89,6 +89,21 @@ function App() {
     setShowCityDropdown(false);
   };
 
+  // O treino roda em segundo plano no backend: consultar o job até terminar
+  const waitForTrainingJob = async (jobId) => {
+    for (;;) {
+      const res = await fetch(`${apiBaseUrl}/forecast/jobs/${jobId}`);
+      if (!res.ok) {
+        throw new Error(`HTTP ${res.status}: ${res.statusText}`);
+      }
+      const { job } = await res.json();
+      if (job.status !== 'queued' && job.status !== 'running') {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
   const handleTrain = async () => {
     if (!csvFile) {
       setStatusMsg('❌ Por favor, selecione um arquivo CSV');
@@ -108,7 +123,13 @@ function App() {
 
       if (res.ok) {
         const result = await res.json();
-        setStatusMsg(`✅ Modelo treinado com sucesso! (ID: ${result.series_id})`);
+        setStatusMsg(`🔄 Treino na fila (job ${result.job_id})...`);
+        const job = await waitForTrainingJob(result.job_id);
+        if (job.status === 'succeeded') {
+          setStatusMsg(`✅ Modelo treinado com sucesso! (ID: ${result.series_id})`);
+        } else {
+          setStatusMsg(`❌ Erro ao treinar: ${job.error || 'falha no treino'}`);
+        }
       } else {
         let errorMsg = 'Erro desconhecido';
         try {